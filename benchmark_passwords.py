@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Benchmark
+Times each password hashing cost setting on this machine and recommends one for Config.PASSWORD_HASHING
+"""
+
+import os
+import sys
+import argparse
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.auth.passwords import SCRYPT_AVAILABLE, TARGET_LOGIN_MS, calibrate, time_hash
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument("--target-ms", type=float, default=TARGET_LOGIN_MS, help="longest acceptable hash time")
+    parser.add_argument("--scheme", choices=["scrypt", "pbkdf2-sha256"],
+                        default="scrypt" if SCRYPT_AVAILABLE else "pbkdf2-sha256", help="key derivation function")
+    parser.add_argument("--samples", type=int, default=3, help="hashes timed per setting")
+    args = parser.parse_args()
+    
+    print("=" * 70)
+    print(f"📊 Password hashing benchmark: {args.scheme}, target {args.target_ms:g} ms per login")
+    print("=" * 70)
+    
+    if args.scheme == "scrypt":
+        if not SCRYPT_AVAILABLE:
+            print("❌ This Python's hashlib has no scrypt; use --scheme pbkdf2-sha256")
+            return
+        print(f"\n{'n':>10} {'memory':>10} {'time':>10}")
+        for power in range(12, 21):
+            params = {'n': 2 ** power, 'r': 8, 'p': 1}
+            elapsed = time_hash(args.scheme, params, args.samples)
+            print(f"{params['n']:>10,} {128 * params['n'] * params['r'] // 1024 ** 2:>8} MB {elapsed:>7.1f} ms")
+            if elapsed > 4 * args.target_ms:
+                break
+    else:
+        print(f"\n{'iterations':>12} {'time':>10}")
+        for step in range(8):
+            params = {'i': 50000 * 2 ** step}
+            elapsed = time_hash(args.scheme, params, args.samples)
+            print(f"{params['i']:>12,} {elapsed:>7.1f} ms")
+            if elapsed > 4 * args.target_ms:
+                break
+                
+    params, elapsed = calibrate(args.target_ms, args.scheme, args.samples)
+    print(f"\n⚙️  Recommended ({elapsed:.1f} ms per hash):")
+    print(f"   self.PASSWORD_HASHING = {dict({'scheme': args.scheme}, **params)!r}")
+    print("\n" + "=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+WAL Archive Benchmark
+Measures what continuous WAL archiving costs in write throughput and how long a restore takes
+"""
+
+import os
+import sys
+import shutil
+import time
+import argparse
+
+# Add src to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.database.db_manager import DatabaseManager
+from src.database.wal_archive import restore_to
+
+WORK_DIR = "benchmark_wal"
+
+def remove_database(path):
+    """Delete a database file with its WAL and shared-memory files"""
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+def write_patients(db, transactions, rows):
+    """Insert rows patients per transaction; returns transactions per second"""
+    started = time.perf_counter()
+    for n in range(transactions):
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, address) VALUES (?, ?, ?, ?, ?, ?)",
+                [(f"{n}-{i}", "Bench", "Patient", "1980-01-01", "Male", "x" * 200) for i in range(rows)]
+            )
+    return transactions / (time.perf_counter() - started)
+
+def run(profile, transactions, rows, interval, archive):
+    """Time one write run with or without archiving"""
+    db_path = os.path.join(WORK_DIR, f"{profile}.db")
+    archive_path = os.path.join(WORK_DIR, f"{profile}_archive")
+    remove_database(db_path)
+    shutil.rmtree(archive_path, ignore_errors=True)
+    
+    db = DatabaseManager(
+        db_path, profile=profile,
+        wal_archive=archive_path if archive else None, archive_interval=interval
+    )
+    db.create_tables()
+    rate = write_patients(db, transactions, rows)
+    db.close()
+    
+    result = {'rate': rate}
+    if archive:
+        result['archive_bytes'] = sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, dirs, names in os.walk(archive_path) for name in names
+        )
+        restored = os.path.join(WORK_DIR, "restored.db")
+        remove_database(restored)
+        started = time.perf_counter()
+        summary = restore_to(archive_path, restored)
+        result['restore_seconds'] = time.perf_counter() - started
+        result['restored_transactions'] = summary['transactions']
+        result['database_bytes'] = os.path.getsize(restored)
+        remove_database(restored)
+    remove_database(db_path)
+    shutil.rmtree(archive_path, ignore_errors=True)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[-1])
+    parser.add_argument("--transactions", type=int, default=5000, help="write transactions per run")
+    parser.add_argument("--rows", type=int, default=5, help="patients inserted per transaction")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between archive runs")
+    parser.add_argument("--profiles", default="durable,balanced,fast", help="PRAGMA profiles to compare")
+    args = parser.parse_args()
+    
+    os.makedirs(WORK_DIR, exist_ok=True)
+    print("=" * 70)
+    print(f"📊 WAL archive benchmark: {args.transactions} transactions of {args.rows} rows, "
+          f"archiving every {args.interval:g} s")
+    print("=" * 70)
+    
+    try:
+        for profile in args.profiles.split(","):
+            plain = run(profile, args.transactions, args.rows, args.interval, archive=False)
+            archived = run(profile, args.transactions, args.rows, args.interval, archive=True)
+            overhead = 1 - archived['rate'] / plain['rate']
+            print(f"\n⚙️  Profile '{profile}'")
+            print(f"   Without archiving: {plain['rate']:,.0f} transactions/s")
+            print(f"   With archiving:    {archived['rate']:,.0f} transactions/s ({overhead:+.1%} overhead)")
+            print(f"   Archive size:      {archived['archive_bytes']:,} bytes "
+                  f"for a {archived['database_bytes']:,} byte database")
+            print(f"   Restore:           {archived['restored_transactions']:,} transactions replayed "
+                  f"in {archived['restore_seconds']:.2f} s")
+    finally:
+        shutil.rmtree(WORK_DIR, ignore_errors=True)
+    print("\n" + "=" * 70)
+
+if __name__ == "__main__":
+    main()
@@ -100,6 +100,31 @@ def check_database():
         print(f"❌ Database test failed: {e}")
         return False
 
+def check_query_plans():
+    """Check that hot queries are answered through indexes"""
+    print("\n🔎 Checking query plans...")
+    
+    try:
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager(":memory:")
+        db.create_tables()
+        report = db.verify_indexes()
+        db.close()
+        
+        all_good = True
+        for entry in report:
+            if entry['uses_index']:
+                print(f"✅ {entry['name']}")
+            else:
+                print(f"❌ {entry['name']} ({'; '.join(entry['full_scans'])})")
+                all_good = False
+                
+        return all_good
+    except Exception as e:
+        print(f"❌ Query plan check failed: {e}")
+        return False
+
 def main():
     """Main check function"""
     print("=" * 60)
@@ -110,7 +135,8 @@ def main():
         check_python_version(),
         check_imports(),
         check_file_structure(),
-        check_database()
+        check_database(),
+        check_query_plans()
     ]
     
     check_optional_imports()
@@ -18,6 +18,7 @@ from src.database.db_manager import DatabaseManager
 from src.gui.main_window import MainWindow
 from src.utils.config import Config
 from src.auth.authentication import AuthenticationManager
+from src.auth.passwords import PasswordHasher
 
 class HospitalManagementSystem:
     def __init__(self):
@@ -27,9 +28,18 @@ class HospitalManagementSystem:
         self.root.configure(bg='#f0f0f0')
         
         # Initialize components
-        self.db_manager = DatabaseManager()
-        self.auth_manager = AuthenticationManager(self.db_manager)
         self.config = Config()
+        self.db_manager = DatabaseManager(
+            self.config.DATABASE_PATH,
+            pool_size=self.config.DATABASE_POOL_SIZE,
+            profile=self.config.DATABASE_PROFILE,
+            working_hours=(self.config.WORKING_HOURS_START, self.config.WORKING_HOURS_END),
+            wal_archive=self.config.WAL_ARCHIVE_PATH,
+            archive_interval=self.config.WAL_ARCHIVE_INTERVAL,
+            backup_store=self.config.BACKUP_PATH if self.config.BACKUP_SCHEDULE else None,
+            backup_retention=self.config.BACKUP_RETENTION
+        )
+        self.auth_manager = AuthenticationManager(self.db_manager, PasswordHasher(**self.config.PASSWORD_HASHING))
         
         # Create database tables
         self.setup_database()
@@ -7,14 +7,22 @@ A simplified, user-friendly console-based hospital management system
 import os
 import sys
 import sqlite3
-import hashlib
-import shutil
 from datetime import datetime, timedelta
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from src.auth.authentication import AuthenticationManager
+from src.auth.passwords import PasswordHasher
 from src.database.db_manager import DatabaseManager
+from src.database.scheduling import AppointmentConflictError, OUTCOME_SKIPPED
+from src.database.availability import WEEKDAYS, format_time_ranges
+from src.database.date_ranges import month_range, last_days, age_band
+from src.database.backup_store import BackupStore
+from src.database.backup_scheduler import is_failed
+from src.database.wal_archive import list_generations, list_gaps, restore_to
+from src.utils.config import Config
+from src.utils.money import Money
 
 class SimpleHospitalSystem:
     def __init__(self):
@@ -22,11 +30,23 @@ class SimpleHospitalSystem:
         print("🏥 HOSPITAL MANAGEMENT SYSTEM v2.0 - SIMPLE INTERFACE")
         print("=" * 70)
         
+        self.config = Config()
+        
         # Initialize database
         try:
-            self.db = DatabaseManager()
+            self.db = DatabaseManager(
+                self.config.DATABASE_PATH,
+                pool_size=self.config.DATABASE_POOL_SIZE,
+                profile=self.config.DATABASE_PROFILE,
+                working_hours=(self.config.WORKING_HOURS_START, self.config.WORKING_HOURS_END),
+                wal_archive=self.config.WAL_ARCHIVE_PATH,
+                archive_interval=self.config.WAL_ARCHIVE_INTERVAL,
+                backup_store=self.config.BACKUP_PATH if self.config.BACKUP_SCHEDULE else None,
+                backup_retention=self.config.BACKUP_RETENTION
+            )
             self.db.create_tables()
             self.db.create_default_admin()
+            self.auth = AuthenticationManager(self.db, PasswordHasher(**self.config.PASSWORD_HASHING))
             print("✅ Database initialized successfully")
         except Exception as e:
             print(f"❌ Database error: {e}")
@@ -65,21 +85,13 @@ class SimpleHospitalSystem:
                 attempts += 1
                 continue
                 
-            # Hash password
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
-            
             # Check credentials
+            print("Verifying...")
             try:
-                query = '''
-                    SELECT user_id, username, role, full_name
-                    FROM users 
-                    WHERE username = ? AND password_hash = ? AND is_active = 1
-                '''
-                
-                result = self.db.execute_query(query, (username, password_hash))
+                user_data = self.auth.authenticate(username, password)
                 
-                if result:
-                    self.current_user = dict(result[0])
+                if user_data:
+                    self.current_user = user_data
                     print(f"✅ Login successful! Welcome, {self.current_user['full_name']}")
                     input("\nPress Enter to continue...")
                     return True
@@ -219,21 +231,13 @@ class SimpleHospitalSystem:
             insurance_info = input("Insurance Information: ").strip()
             
             # Insert into database
-            query = '''
-                INSERT INTO patients (
-                    national_id, first_name, last_name, date_of_birth, gender,
-                    phone, email, address, emergency_contact, emergency_phone,
-                    blood_group, allergies, insurance_info
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            '''
-            
             values = (
                 national_id, first_name, last_name, date_of_birth, gender,
                 phone, email, address, emergency_contact, emergency_phone,
                 blood_group, allergies, insurance_info
             )
             
-            patient_id = self.db.execute_insert(query, values)
+            patient_id = self.db.execute_named_insert('patient_insert', values)
             
             print(f"\n✅ Patient added successfully!")
             print(f"Patient ID: {patient_id}")
@@ -249,14 +253,7 @@ class SimpleHospitalSystem:
         self.print_header("ALL PATIENTS")
         
         try:
-            query = '''
-                SELECT patient_id, national_id, first_name, last_name, 
-                       date_of_birth, gender, phone
-                FROM patients 
-                ORDER BY last_name, first_name
-            '''
-            
-            patients = self.db.execute_query(query)
+            patients = self.db.execute_named('patients_list')
             
             if not patients:
                 print("📭 No patients found in the system.")
@@ -291,11 +288,7 @@ class SimpleHospitalSystem:
                 input("Press Enter to continue...")
                 return
                 
-            query = '''
-                SELECT * FROM patients WHERE patient_id = ?
-            '''
-            
-            result = self.db.execute_query(query, (int(patient_id),))
+            result = self.db.execute_named('patient_by_id', (int(patient_id),))
             
             if not result:
                 print(f"❌ No patient found with ID: {patient_id}")
@@ -408,20 +401,12 @@ class SimpleHospitalSystem:
             fee = float(consultation_fee) if consultation_fee.replace('.','').isdigit() else None
             
             # Insert into database
-            query = '''
-                INSERT INTO doctors (
-                    employee_id, first_name, last_name, specialization,
-                    qualification, experience_years, phone, email, address,
-                    consultation_fee, is_available
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            '''
-            
             values = (
                 employee_id, first_name, last_name, specialization,
                 qualification, exp_years, phone, email, address, fee, 1
             )
             
-            doctor_id = self.db.execute_insert(query, values)
+            doctor_id = self.db.execute_named_insert('doctor_insert', values)
             
             print(f"\n✅ Doctor added successfully!")
             print(f"Doctor ID: {doctor_id}")
@@ -438,14 +423,7 @@ class SimpleHospitalSystem:
         self.print_header("ALL DOCTORS")
         
         try:
-            query = '''
-                SELECT doctor_id, employee_id, first_name, last_name, 
-                       specialization, experience_years, consultation_fee, is_available
-                FROM doctors 
-                ORDER BY last_name, first_name
-            '''
-            
-            doctors = self.db.execute_query(query)
+            doctors = self.db.execute_named('doctors_list')
             
             if not doctors:
                 print("📭 No doctors found in the system.")
@@ -482,11 +460,7 @@ class SimpleHospitalSystem:
                 input("Press Enter to continue...")
                 return
                 
-            query = '''
-                SELECT * FROM doctors WHERE doctor_id = ?
-            '''
-            
-            result = self.db.execute_query(query, (int(doctor_id),))
+            result = self.db.execute_named('doctor_by_id', (int(doctor_id),))
             
             if not result:
                 print(f"❌ No doctor found with ID: {doctor_id}")
@@ -507,6 +481,23 @@ class SimpleHospitalSystem:
                 print(f"Status: {'Available' if doctor['is_available'] else 'Unavailable'}")
                 print(f"Created: {doctor['created_at']}")
                 
+                # Weekly hours and upcoming leave / on-call
+                schedule = self.db.get_doctor_schedule(doctor['doctor_id'])
+                print(f"\n🕒 Weekly Hours:")
+                if not schedule:
+                    print("Default working hours every day")
+                else:
+                    for weekday, name in enumerate(WEEKDAYS):
+                        ranges = [(row['start_time'], row['end_time']) for row in schedule if row['weekday'] == weekday]
+                        print(f"{name:<10} {format_time_ranges(ranges) or 'Off'}")
+                        
+                exceptions = self.db.get_schedule_exceptions(doctor['doctor_id'])
+                if exceptions:
+                    print(f"\n📌 Upcoming Leave / On-Call:")
+                    for row in exceptions:
+                        hours = format_time_ranges([(row['start_time'], row['end_time'])]) if row['start_time'] else 'All day'
+                        print(f"{row['exception_date']} {row['kind'].replace('_', ' ').title():<8} {hours} {row['reason'] or ''}")
+                
         except Exception as e:
             print(f"❌ Error viewing doctor: {e}")
             
@@ -555,9 +546,7 @@ class SimpleHospitalSystem:
         
         try:
             # Show available doctors
-            doctors = self.db.execute_query(
-                "SELECT doctor_id, first_name, last_name, specialization FROM doctors WHERE is_available = 1"
-            )
+            doctors = self.db.execute_named('available_doctors')
             
             if not doctors:
                 print("❌ No available doctors found")
@@ -580,9 +569,7 @@ class SimpleHospitalSystem:
                 return
                 
             # Show patients
-            patients = self.db.execute_query(
-                "SELECT patient_id, first_name, last_name FROM patients ORDER BY last_name"
-            )
+            patients = self.db.execute_named('patient_choices_by_last_name')
             
             if not patients:
                 print("❌ No patients found")
@@ -607,26 +594,40 @@ class SimpleHospitalSystem:
                 input("Press Enter to continue...")
                 return
                 
+            # Suggest the doctor's next free slots
+            today = datetime.now().date()
+            free_slots = self.db.find_free_slots(
+                today, today + timedelta(days=14), doctor_id=int(doctor_id), limit=5
+            )
+            if free_slots:
+                print("\nNext free 30-minute slots:")
+                for slot in free_slots:
+                    print(f"  {slot['date']} {slot['start_time'][:5]}")
+                print()
+                
             # Get appointment details
             appointment_date = input("Appointment Date (YYYY-MM-DD): ").strip()
             appointment_time = input("Appointment Time (HH:MM): ").strip()
             duration = input("Duration in minutes (default 30): ").strip() or "30"
+            weeks = input("Repeat weekly for how many weeks? (default 1): ").strip() or "1"
             notes = input("Notes (optional): ").strip()
             
-            # Insert appointment
-            query = '''
-                INSERT INTO appointments (
-                    patient_id, doctor_id, appointment_date, appointment_time,
-                    duration_minutes, status, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            '''
-            
-            values = (
-                int(patient_id), int(doctor_id), appointment_date, 
-                appointment_time + ":00", int(duration), 'scheduled', notes
-            )
-            
-            appointment_id = self.db.execute_insert(query, values)
+            if weeks != "1":
+                self.schedule_series(int(patient_id), int(doctor_id), appointment_date,
+                                     appointment_time, int(duration), int(weeks), notes)
+                input("\nPress Enter to continue...")
+                return
+                
+            # Insert appointment unless the doctor is already booked then
+            try:
+                appointment_id = self.db.book_appointment(
+                    int(patient_id), int(doctor_id), appointment_date,
+                    appointment_time, int(duration), notes
+                )
+            except AppointmentConflictError as e:
+                print(f"❌ Time slot not available: {e}")
+                input("\nPress Enter to continue...")
+                return
             
             print(f"\n✅ Appointment scheduled successfully!")
             print(f"Appointment ID: {appointment_id}")
@@ -638,6 +639,35 @@ class SimpleHospitalSystem:
             
         input("\nPress Enter to continue...")
         
+    def schedule_series(self, patient_id, doctor_id, first_date, appointment_time, duration, weeks, notes):
+        """Book a weekly series, offering to skip the dates that are taken"""
+        series_id, outcomes = self.db.book_recurring(
+            patient_id, doctor_id, first_date, appointment_time, weeks, duration, notes=notes
+        )
+        if series_id is None:
+            failed = [outcome for outcome in outcomes if outcome['status'] != OUTCOME_SKIPPED]
+            print(f"\n❌ {len(failed)} of {len(outcomes)} dates are not available:")
+            for outcome in failed:
+                print(f"  {outcome['appointment_date']}: {outcome['message']}")
+            if len(failed) == len(outcomes):
+                return
+            if input(f"Book the {len(outcomes) - len(failed)} available dates only? (y/N): ").strip().lower() != 'y':
+                return
+            series_id, outcomes = self.db.book_recurring(
+                patient_id, doctor_id, first_date, appointment_time, weeks, duration,
+                notes=notes, skip_conflicts=True
+            )
+            if series_id is None:
+                print("❌ The available dates were taken in the meantime")
+                return
+                
+        print(f"\n✅ Appointment series {series_id} scheduled!")
+        for outcome in outcomes:
+            if outcome['appointment_id']:
+                print(f"  {outcome['appointment_date']} {outcome['appointment_time'][:5]}  (ID {outcome['appointment_id']})")
+            else:
+                print(f"  {outcome['appointment_date']} skipped: {outcome['message']}")
+                
     def list_today_appointments(self):
         """List today's appointments"""
         self.print_header("TODAY'S APPOINTMENTS")
@@ -645,18 +675,7 @@ class SimpleHospitalSystem:
         try:
             today = datetime.now().strftime('%Y-%m-%d')
             
-            query = '''
-                SELECT a.appointment_id, a.appointment_time, a.status,
-                       (p.first_name || ' ' || p.last_name) as patient_name,
-                       (d.first_name || ' ' || d.last_name) as doctor_name
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.patient_id
-                JOIN doctors d ON a.doctor_id = d.doctor_id
-                WHERE DATE(a.appointment_date) = ?
-                ORDER BY a.appointment_time
-            '''
-            
-            appointments = self.db.execute_query(query, (today,))
+            appointments = self.db.execute_named('appointments_for_day', (today,))
             
             if not appointments:
                 print(f"📭 No appointments scheduled for today ({today})")
@@ -682,18 +701,7 @@ class SimpleHospitalSystem:
         self.print_header("ALL APPOINTMENTS")
         
         try:
-            query = '''
-                SELECT a.appointment_id, a.appointment_date, a.appointment_time, a.status,
-                       (p.first_name || ' ' || p.last_name) as patient_name,
-                       (d.first_name || ' ' || d.last_name) as doctor_name
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.patient_id
-                JOIN doctors d ON a.doctor_id = d.doctor_id
-                ORDER BY a.appointment_date DESC, a.appointment_time DESC
-                LIMIT 20
-            '''
-            
-            appointments = self.db.execute_query(query)
+            appointments = self.db.execute_named('appointments_recent')
             
             if not appointments:
                 print("📭 No appointments found")
@@ -725,10 +733,11 @@ class SimpleHospitalSystem:
         print("3. 👁️  View Bill Details")
         print("4. 📄 List Pending Bills")
         print("5. 📊 Financial Summary")
-        print("6. ⬅️  Back to Main Menu")
+        print("6. ⏳ Receivables Aging")
+        print("7. ⬅️  Back to Main Menu")
         print()
         
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-7): ").strip()
         
         if choice == '1':
             self.create_bill()
@@ -743,9 +752,11 @@ class SimpleHospitalSystem:
         elif choice == '5':
             self.financial_summary()
         elif choice == '6':
+            self.aging_report()
+        elif choice == '7':
             return
         else:
-            print("❌ Invalid choice. Please select 1-6.")
+            print("❌ Invalid choice. Please select 1-7.")
             input("Press Enter to continue...")
             
         # Return to billing menu
@@ -757,9 +768,7 @@ class SimpleHospitalSystem:
         
         try:
             # Show patients
-            patients = self.db.execute_query(
-                "SELECT patient_id, first_name, last_name FROM patients ORDER BY last_name"
-            )
+            patients = self.db.execute_named('patient_choices_by_last_name')
             
             if not patients:
                 print("❌ No patients found")
@@ -784,9 +793,12 @@ class SimpleHospitalSystem:
                 input("Press Enter to continue...")
                 return
                 
-            total_amount = input("Total Amount: $").strip()
-            
-            if not total_amount.replace('.','').isdigit():
+            try:
+                total_amount = Money.parse(input("Total Amount: $").strip())
+            except ValueError:
+                total_amount = Money(0)
+                
+            if total_amount <= Money(0):
                 print("❌ Please enter a valid amount")
                 input("Press Enter to continue...")
                 return
@@ -795,24 +807,17 @@ class SimpleHospitalSystem:
             notes = input("Notes (optional): ").strip()
             
             # Insert bill
-            query = '''
-                INSERT INTO billing (
-                    patient_id, total_amount, paid_amount, payment_status,
-                    bill_date, due_date, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            '''
-            
             values = (
-                int(patient_id), float(total_amount), 0, 'pending',
+                int(patient_id), total_amount.cents, 0, 'pending',
                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
                 due_date if due_date else None, notes
             )
             
-            bill_id = self.db.execute_insert(query, values)
+            bill_id = self.db.execute_named_insert('bill_insert', values)
             
             print(f"\n✅ Bill created successfully!")
             print(f"Bill ID: {bill_id}")
-            print(f"Amount: ${total_amount}")
+            print(f"Amount: {total_amount}")
             print(f"Status: Pending")
             
         except Exception as e:
@@ -825,16 +830,7 @@ class SimpleHospitalSystem:
         self.print_header("PENDING BILLS")
         
         try:
-            query = '''
-                SELECT b.bill_id, b.total_amount, b.paid_amount, b.bill_date, b.due_date,
-                       (p.first_name || ' ' || p.last_name) as patient_name
-                FROM billing b
-                JOIN patients p ON b.patient_id = p.patient_id
-                WHERE b.payment_status = 'pending'
-                ORDER BY b.due_date, b.bill_date
-            '''
-            
-            bills = self.db.execute_query(query)
+            bills = self.db.execute_named('bills_pending')
             
             if not bills:
                 print("📭 No pending bills found")
@@ -845,7 +841,7 @@ class SimpleHospitalSystem:
                 print("-" * 60)
                 
                 for bill in bills:
-                    amount = f"${bill['total_amount']:.2f}"
+                    amount = str(Money(bill['total_cents']))
                     due_date = bill['due_date'] or 'No due date'
                     
                     # Calculate days until due
@@ -871,46 +867,72 @@ class SimpleHospitalSystem:
             
         input("\nPress Enter to continue...")
         
+    def aging_report(self):
+        """Show receivables by days past due and the bills to follow up"""
+        self.print_header("RECEIVABLES AGING")
+        
+        try:
+            run = input("Run the aging job now? (y/N): ").strip().lower() == 'y'
+            summary = self.db.run_aging() if run else self.db.get_aging_summary()
+            
+            print(f"📅 As of {summary['as_of']}:")
+            print()
+            print("Days Past Due | Bills | Outstanding")
+            print("-" * 40)
+            print(f"{'Not yet due':<13} | {summary['current_bills']:<5} | {Money(summary['current_cents'])}")
+            for bucket, bills, cents in summary['buckets']:
+                print(f"{bucket:<13} | {bills:<5} | {Money(cents)}")
+            if run:
+                print()
+                print(f"Marked overdue: {summary['marked_overdue']}, no longer overdue: {summary['cleared_overdue']}")
+                
+            bills = self.db.get_dunning_list(limit=20)
+            if bills:
+                print()
+                print("⚠️  Most overdue bills:")
+                print("ID | Patient               | Balance   | Due Date   | Days")
+                print("-" * 60)
+                for bill in bills:
+                    print(f"{bill['bill_id']:<2} | {bill['patient_name']:<21} | "
+                          f"{str(Money(bill['balance_cents'])):<9} | {bill['due_date']:<10} | {bill['days_overdue']}")
+                          
+        except Exception as e:
+            print(f"❌ Error loading aging report: {e}")
+            
+        input("\nPress Enter to continue...")
+        
     def financial_summary(self):
         """Show financial summary"""
         self.print_header("FINANCIAL SUMMARY")
         
         try:
             # Total revenue
-            revenue_result = self.db.execute_query(
-                "SELECT SUM(paid_amount) as revenue FROM billing"
-            )
-            total_revenue = revenue_result[0]['revenue'] if revenue_result and revenue_result[0]['revenue'] else 0
+            revenue_result = self.db.execute_named('billing_revenue_total')
+            total_revenue = Money.of(revenue_result[0]['revenue_cents'] if revenue_result else 0)
             
             # Outstanding amount
-            outstanding_result = self.db.execute_query(
-                "SELECT SUM(total_amount - paid_amount) as outstanding FROM billing WHERE payment_status != 'paid'"
-            )
-            outstanding = outstanding_result[0]['outstanding'] if outstanding_result and outstanding_result[0]['outstanding'] else 0
+            outstanding_result = self.db.execute_named('billing_outstanding_total')
+            outstanding = Money.of(outstanding_result[0]['outstanding_cents'] if outstanding_result else 0)
             
             # This month's revenue
-            month_result = self.db.execute_query(
-                "SELECT SUM(paid_amount) as month_revenue FROM billing WHERE strftime('%Y-%m', bill_date) = strftime('%Y-%m', 'now')"
-            )
-            month_revenue = month_result[0]['month_revenue'] if month_result and month_result[0]['month_revenue'] else 0
+            month_result = self.db.execute_named('billing_revenue_between', month_range().params())
+            month_revenue = Money.of(month_result[0]['revenue_cents'] if month_result else 0)
             
             # Pending bills count
-            pending_result = self.db.execute_query(
-                "SELECT COUNT(*) as pending_count FROM billing WHERE payment_status = 'pending'"
-            )
+            pending_result = self.db.execute_named('billing_pending_count')
             pending_count = pending_result[0]['pending_count'] if pending_result else 0
             
             print("💰 Financial Overview:")
             print("=" * 40)
-            print(f"Total Revenue:        ${total_revenue:,.2f}")
-            print(f"Outstanding Amount:   ${outstanding:,.2f}")
-            print(f"This Month's Revenue: ${month_revenue:,.2f}")
+            print(f"Total Revenue:        {total_revenue}")
+            print(f"Outstanding Amount:   {outstanding}")
+            print(f"This Month's Revenue: {month_revenue}")
             print(f"Pending Bills:        {pending_count}")
             print()
             
-            if outstanding > 0:
+            if outstanding > Money(0):
                 print("⚠️  Action Required:")
-                print(f"   • Follow up on ${outstanding:,.2f} in outstanding payments")
+                print(f"   • Follow up on {outstanding} in outstanding payments")
                 print(f"   • {pending_count} bills need attention")
                 
         except Exception as e:
@@ -959,12 +981,11 @@ class SimpleHospitalSystem:
         
         try:
             # Get counts
-            patients_count = len(self.db.execute_query("SELECT patient_id FROM patients"))
-            doctors_count = len(self.db.execute_query("SELECT doctor_id FROM doctors"))
-            appointments_total = len(self.db.execute_query("SELECT appointment_id FROM appointments"))
-            appointments_today = len(self.db.execute_query(
-                "SELECT appointment_id FROM appointments WHERE DATE(appointment_date) = DATE('now')"
-            ))
+            counts = self.db.get_dashboard_counts()
+            patients_count = counts['patients']
+            doctors_count = counts['doctors']
+            appointments_total = counts['appointments']
+            appointments_today = counts['appointments_today']
             
             print("📊 System Statistics:")
             print("=" * 40)
@@ -979,15 +1000,11 @@ class SimpleHospitalSystem:
             print("-" * 40)
             
             # New patients
-            new_patients = len(self.db.execute_query(
-                "SELECT patient_id FROM patients WHERE DATE(created_at) >= DATE('now', '-7 days')"
-            ))
+            new_patients = counts['patients_last_7_days']
             print(f"New Patients:         {new_patients}")
             
             # Recent appointments
-            recent_appointments = len(self.db.execute_query(
-                "SELECT appointment_id FROM appointments WHERE DATE(appointment_date) >= DATE('now', '-7 days')"
-            ))
+            recent_appointments = counts['appointments_last_7_days']
             print(f"Appointments Booked:  {recent_appointments}")
             
         except Exception as e:
@@ -1001,9 +1018,7 @@ class SimpleHospitalSystem:
         
         try:
             # Gender distribution
-            gender_data = self.db.execute_query(
-                "SELECT gender, COUNT(*) as count FROM patients GROUP BY gender"
-            )
+            gender_data = self.db.execute_named('patient_gender_counts')
             
             print("👥 Patient Demographics:")
             print("=" * 30)
@@ -1015,15 +1030,18 @@ class SimpleHospitalSystem:
             
             # Age distribution (simplified)
             print("Age Groups (approximate):")
+            age_groups = self.db.execute_named(
+                'patient_age_groups',
+                age_band(0, 18).params() + age_band(18, 65).params() + age_band(65).params()
+            )[0]
             age_ranges = [
-                ("Children (0-18)", "date_of_birth >= DATE('now', '-18 years')"),
-                ("Adults (19-65)", "date_of_birth < DATE('now', '-18 years') AND date_of_birth >= DATE('now', '-65 years')"),
-                ("Seniors (65+)", "date_of_birth < DATE('now', '-65 years')")
+                ("Children (0-18)", 'children'),
+                ("Adults (19-65)", 'adults'),
+                ("Seniors (65+)", 'seniors')
             ]
             
-            for label, condition in age_ranges:
-                result = self.db.execute_query(f"SELECT COUNT(*) as count FROM patients WHERE {condition}")
-                count = result[0]['count'] if result else 0
+            for label, column in age_ranges:
+                count = age_groups[column] or 0
                 print(f"  {label}: {count} patients")
                 
         except Exception as e:
@@ -1037,9 +1055,7 @@ class SimpleHospitalSystem:
         
         try:
             # Specialization distribution
-            spec_data = self.db.execute_query(
-                "SELECT specialization, COUNT(*) as count FROM doctors GROUP BY specialization ORDER BY count DESC"
-            )
+            spec_data = self.db.execute_named('doctor_specialization_counts')
             
             print("👨‍⚕️ Doctor Distribution by Specialization:")
             print("=" * 45)
@@ -1049,9 +1065,7 @@ class SimpleHospitalSystem:
             print()
             
             # Availability
-            avail_data = self.db.execute_query(
-                "SELECT is_available, COUNT(*) as count FROM doctors GROUP BY is_available"
-            )
+            avail_data = self.db.execute_named('doctor_availability_counts')
             
             print("Availability Status:")
             for row in avail_data:
@@ -1069,9 +1083,7 @@ class SimpleHospitalSystem:
         
         try:
             # Status distribution
-            status_data = self.db.execute_query(
-                "SELECT status, COUNT(*) as count FROM appointments GROUP BY status"
-            )
+            status_data = self.db.execute_named('appointment_status_counts')
             
             print("📅 Appointment Status Distribution:")
             print("=" * 40)
@@ -1081,9 +1093,7 @@ class SimpleHospitalSystem:
             print()
             
             # This week's appointments
-            week_data = self.db.execute_query(
-                "SELECT DATE(appointment_date) as date, COUNT(*) as count FROM appointments WHERE DATE(appointment_date) >= DATE('now', '-7 days') GROUP BY DATE(appointment_date) ORDER BY date"
-            )
+            week_data = self.db.execute_named('appointments_by_day', last_days(7).params())
             
             if week_data:
                 print("This Week's Appointments:")
@@ -1106,10 +1116,13 @@ class SimpleHospitalSystem:
         print("3. 💾 Database Backup")
         print("4. 📁 List Backups")
         print("5. ℹ️  System Information")
-        print("6. ⬅️  Back to Main Menu")
+        print("6. 🔄 Rebuild Statistics")
+        print("7. ♻️  Restore Backup")
+        print("8. ⏪ Point-in-Time Restore")
+        print("9. ⬅️  Back to Main Menu")
         print()
         
-        choice = input("Enter your choice (1-6): ").strip()
+        choice = input("Enter your choice (1-9): ").strip()
         
         if choice == '1':
             self.user_management()
@@ -1122,14 +1135,36 @@ class SimpleHospitalSystem:
         elif choice == '5':
             self.system_info()
         elif choice == '6':
+            self.rebuild_statistics()
+        elif choice == '7':
+            self.restore_backup()
+        elif choice == '8':
+            self.point_in_time_restore()
+        elif choice == '9':
             return
         else:
-            print("❌ Invalid choice. Please select 1-6.")
+            print("❌ Invalid choice. Please select 1-9.")
             input("Press Enter to continue...")
             
         # Return to settings menu
         self.settings_menu()
         
+    def rebuild_statistics(self):
+        """Recompute the dashboard counters and rollup tables from the data"""
+        self.print_header("REBUILD STATISTICS")
+        
+        try:
+            print("🔄 Recounting dashboard counters and revenue/appointment rollups...")
+            start = datetime.now()
+            self.db.rebuild_counters()
+            self.db.rebuild_rollups()
+            elapsed = (datetime.now() - start).total_seconds()
+            print(f"✅ Statistics rebuilt in {elapsed:.2f} seconds")
+        except Exception as e:
+            print(f"❌ Error rebuilding statistics: {e}")
+            
+        input("\nPress Enter to continue...")
+        
     def user_management(self):
         """User management menu"""
         self.print_header("USER MANAGEMENT")
@@ -1246,7 +1281,7 @@ class SimpleHospitalSystem:
         
         try:
             # Hash password
-            password_hash = hashlib.sha256(password.encode()).hexdigest()
+            password_hash = self.auth.hash_password(password)
             
             query = '''
                 INSERT INTO users (username, password_hash, role, full_name, email, phone)
@@ -1398,11 +1433,7 @@ class SimpleHospitalSystem:
             return
             
         # Verify current password
-        current_hash = hashlib.sha256(current_password.encode()).hexdigest()
-        query = "SELECT user_id FROM users WHERE user_id = ? AND password_hash = ?"
-        result = self.db.execute_query(query, (self.current_user['user_id'], current_hash))
-        
-        if not result:
+        if not self.auth.check_password(self.current_user['user_id'], current_password):
             print("❌ Current password is incorrect")
             input("Press Enter to continue...")
             return
@@ -1421,10 +1452,8 @@ class SimpleHospitalSystem:
             return
             
         try:
-            # Update password
-            new_hash = hashlib.sha256(new_password.encode()).hexdigest()
-            update_query = "UPDATE users SET password_hash = ? WHERE user_id = ?"
-            self.db.execute_update(update_query, (new_hash, self.current_user['user_id']))
+            # Update password; the current one was just verified, so this hits the cache
+            self.auth.change_password(self.current_user['user_id'], current_password, new_password)
             
             print("\n✅ Password changed successfully!")
             
@@ -1439,7 +1468,7 @@ class SimpleHospitalSystem:
         
         try:
             # Get the database file path from the database manager
-            db_path = "data/hospital.db"  # Default database path
+            db_path = self.db.db_path
             
             # Check if database file exists
             if not os.path.exists(db_path):
@@ -1449,28 +1478,19 @@ class SimpleHospitalSystem:
                 input("Press Enter to continue...")
                 return
             
-            # Create backups directory if it doesn't exist
-            backup_dir = "backups"
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            
-            # Create backup filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = os.path.join(backup_dir, f"hospital_db_backup_{timestamp}.db")
-            
-            # Copy database file
-            shutil.copy2(db_path, backup_filename)
+            # Snapshot the live database into the deduplicated backup store;
+            # only chunks that changed since earlier snapshots are written
+            print("💾 Backing up...")
+            store = BackupStore(self.config.BACKUP_PATH)
+            report = store.snapshot(db_path)
             
             print(f"✅ Database backup created successfully!")
-            print(f"📁 Backup file: {os.path.basename(backup_filename)}")
-            print(f"📊 Location: {os.path.abspath(backup_filename)}")
-            
-            # Show backup size
-            backup_size = os.path.getsize(backup_filename)
-            print(f"💾 Size: {backup_size:,} bytes")
-            
+            print(f"📊 Location: {os.path.abspath(store.root)}")
+            for line in report.lines():
+                print(f"💾 {line}")
+                
             # Show backup time
-            print(f"⏰ Created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            print(f"⏰ Created: {report.manifest['created']}")
             
         except Exception as e:
             print(f"❌ Error creating backup: {e}")
@@ -1479,43 +1499,153 @@ class SimpleHospitalSystem:
         input("Press Enter to continue...")
         
     def list_backups(self):
-        """List existing backup files"""
+        """List existing backup snapshots"""
         self.print_header("EXISTING BACKUPS")
         
-        backup_dir = "backups"
-        
         try:
-            if not os.path.exists(backup_dir):
-                print("📁 No backup directory found.")
+            store = BackupStore(self.config.BACKUP_PATH)
+            snapshots = store.snapshots()
+            
+            if not snapshots:
+                print("📁 No backups found.")
                 print("Create your first backup to see backups listed here.")
                 input("Press Enter to continue...")
                 return
             
-            backup_files = [f for f in os.listdir(backup_dir) if f.endswith('.db')]
+            print(f"Found {len(snapshots)} backup(s):")
+            print("=" * 60)
+            
+            for i, snapshot in enumerate(reversed(snapshots), 1):
+                verified = snapshot.get('verified')
+                if not verified:
+                    status = "⏳ Not verified yet"
+                elif verified['result'] == 'ok':
+                    status = f"✅ Verified {verified['at']}"
+                else:
+                    status = f"❌ Failed check {verified['at']}: {verified['result']}"
+                print(f"{i}. 📄 {snapshot['snapshot_id']} ({snapshot.get('label') or 'manual'})")
+                print(f"   💾 Size: {snapshot['size']:,} bytes")
+                print(f"   ⏰ Created: {snapshot['created']}")
+                print(f"   {status}")
+                print()
+                
+            stats = store.stats()
+            print(f"📊 Store: {stats['chunks']:,} chunks, {stats['stored_bytes']:,} bytes on disk "
+                  f"for {stats['snapshot_bytes']:,} bytes of snapshots")
+                  
+            # The scheduler keeps failed snapshots for inspection; deleting them is up to the operator
+            failed = [snapshot for snapshot in snapshots if is_failed(snapshot)]
+            if failed and input(f"\nDelete the {len(failed)} snapshot(s) that failed verification? (y/N): ").strip().lower() == 'y':
+                for snapshot in failed:
+                    store.delete_snapshot(snapshot['snapshot_id'])
+                print(f"🗑️  Deleted {len(failed)} failed snapshot(s)")
+                  
+        except Exception as e:
+            print(f"❌ Error listing backups: {e}")
+            
+        input("Press Enter to continue...")
+        
+    def restore_backup(self):
+        """Rebuild a backup snapshot as a database file"""
+        self.print_header("RESTORE BACKUP")
+        
+        try:
+            store = BackupStore(self.config.BACKUP_PATH)
+            snapshots = list(reversed(store.snapshots()))
+            
+            if not snapshots:
+                print("📁 No backups found.")
+                input("Press Enter to continue...")
+                return
+            
+            for i, snapshot in enumerate(snapshots, 1):
+                print(f"{i}. {snapshot['snapshot_id']}  ({snapshot['created']}, {snapshot['size']:,} bytes)")
+            print()
             
-            if not backup_files:
-                print("📁 No backup files found in the backups directory.")
+            choice = input("Backup number to restore: ").strip()
+            if not choice.isdigit() or not 1 <= int(choice) <= len(snapshots):
+                print("❌ Invalid backup number.")
                 input("Press Enter to continue...")
                 return
+            snapshot = snapshots[int(choice) - 1]
             
-            print(f"Found {len(backup_files)} backup file(s):")
-            print("=" * 60)
+            default = os.path.join(os.path.dirname(self.db.db_path), f"restored_{snapshot['snapshot_id']}.db")
+            destination = input(f"Restore to [{default}]: ").strip() or default
+            if os.path.abspath(destination) == os.path.abspath(self.db.db_path):
+                print("❌ Cannot restore over the database that is in use.")
+                input("Press Enter to continue...")
+                return
+            if os.path.exists(destination):
+                print("❌ That file already exists.")
+                input("Press Enter to continue...")
+                return
+                
+            print("♻️ Restoring...")
+            store.restore(snapshot['snapshot_id'], destination)
+            print(f"✅ Backup restored to {os.path.abspath(destination)}")
+            print("To use it, exit the system and replace the database file with it.")
+            
+        except Exception as e:
+            print(f"❌ Error restoring backup: {e}")
             
-            for i, backup_file in enumerate(sorted(backup_files, reverse=True), 1):
-                backup_path = os.path.join(backup_dir, backup_file)
-                file_size = os.path.getsize(backup_path)
-                file_time = datetime.fromtimestamp(os.path.getmtime(backup_path))
+        input("Press Enter to continue...")
+    
+    def point_in_time_restore(self):
+        """Rebuild the database as it was at a chosen time from the WAL archive"""
+        self.print_header("POINT-IN-TIME RESTORE")
+        
+        try:
+            archive = self.config.WAL_ARCHIVE_PATH
+            generations = list_generations(archive) if archive else []
+            if not generations:
+                print("📁 No WAL archive found. Point-in-time recovery is off or has not run yet.")
+                input("Press Enter to continue...")
+                return
                 
-                print(f"{i}. 📄 {backup_file}")
-                print(f"   💾 Size: {file_size:,} bytes")
-                print(f"   ⏰ Modified: {file_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                print()
+            last = generations[-1]['segments'][-1]['archived_at'] if generations[-1]['segments'] else generations[-1]['created']
+            print(f"📅 Restorable from {generations[0]['created'][:19]} to {last[:19]}")
+            print(f"   ({sum(len(g['segments']) for g in generations)} archived segments in {len(generations)} generation(s))")
+            for gap in list_gaps(archive):
+                print(f"⚠️  Gap: commits after {(gap['last_archived'] or '?')[:19]} up to {gap['at'][:19]} were not archived")
+            print()
+            
+            when = input("Restore to (YYYY-MM-DD HH:MM[:SS], blank for latest): ").strip()
+            target = None
+            if when:
+                try:
+                    target = datetime.strptime(when, "%Y-%m-%d %H:%M:%S" if when.count(':') == 2 else "%Y-%m-%d %H:%M")
+                except ValueError:
+                    print("❌ Invalid date/time format.")
+                    input("Press Enter to continue...")
+                    return
+                    
+            stamp = (target or datetime.now()).strftime("%Y%m%d_%H%M%S")
+            default = os.path.join(os.path.dirname(self.db.db_path), f"restored_{stamp}.db")
+            destination = input(f"Restore to file [{default}]: ").strip() or default
+            if os.path.abspath(destination) == os.path.abspath(self.db.db_path) or os.path.exists(destination):
+                print("❌ Choose a new file; the database in use cannot be replaced while running.")
+                input("Press Enter to continue...")
+                return
+                
+            # Archive the latest commits first so "latest" really is the latest
+            if self.db.wal_archiver and self.db.wal_archiver.active and target is None:
+                self.db.wal_archiver.archive()
                 
+            print("⏪ Restoring...")
+            result = restore_to(archive, destination, target)
+            print(f"✅ Database restored to {os.path.abspath(destination)}")
+            print(f"📅 State as of {result['restored_to'][:19]}")
+            if result['gap']:
+                print(f"⚠️  Commits from then until {result['gap']['at'][:19]} were lost to the archive")
+            print(f"💾 Base copy from {result['base_created'][:19]} plus {result['transactions']:,} transactions "
+                  f"from {result['segments']} segment(s)")
+            print("To use it, exit the system and replace the database file with it.")
+            
         except Exception as e:
-            print(f"❌ Error listing backups: {e}")
+            print(f"❌ Error restoring: {e}")
             
         input("Press Enter to continue...")
-    
+        
     def system_info(self):
         """Show system information"""
         self.print_header("SYSTEM INFORMATION")
@@ -1524,6 +1654,8 @@ class SimpleHospitalSystem:
         print("=" * 40)
         print("Version: 2.0 (Simple Interface)")
         print("Database: SQLite")
+        print(f"Journal Mode: {self.db.pragma_settings.get('journal_mode', 'Unknown')}")
+        print(f"Synchronous: {self.db.pragma_settings.get('synchronous', 'Unknown')}")
         print("Interface: Console-based")
         print("Created: 2025")
         print()
@@ -1553,17 +1685,7 @@ class SimpleHospitalSystem:
             return
             
         try:
-            query = '''
-                SELECT patient_id, national_id, first_name, last_name, 
-                       date_of_birth, gender, phone
-                FROM patients 
-                WHERE LOWER(first_name) LIKE ? OR LOWER(last_name) LIKE ? 
-                   OR LOWER(national_id) LIKE ? OR CAST(patient_id AS TEXT) LIKE ?
-                ORDER BY last_name, first_name
-            '''
-            
-            search_pattern = f"%{search_term.lower()}%"
-            results = self.db.execute_query(query, (search_pattern, search_pattern, search_pattern, search_pattern))
+            results = self.db.search_patients(search_term)
             
             if not results:
                 print(f"📭 No patients found matching '{search_term}'")
@@ -1599,8 +1721,7 @@ class SimpleHospitalSystem:
             
         try:
             # Get current patient data
-            query = "SELECT * FROM patients WHERE patient_id = ?"
-            result = self.db.execute_query(query, (int(patient_id),))
+            result = self.db.execute_named('patient_by_id', (int(patient_id),))
             
             if not result:
                 print(f"❌ No patient found with ID: {patient_id}")
@@ -1621,14 +1742,9 @@ class SimpleHospitalSystem:
             address = input(f"Address [{patient['address'] or 'N/A'}]: ").strip() or patient['address']
             
             # Update database
-            update_query = '''
-                UPDATE patients 
-                SET first_name = ?, last_name = ?, phone = ?, email = ?, address = ?,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE patient_id = ?
-            '''
-            
-            self.db.execute_update(update_query, (first_name, last_name, phone, email, address, int(patient_id)))
+            self.db.execute_named_update(
+                'patient_update_contact', (first_name, last_name, phone, email, address, int(patient_id))
+            )
             
             print(f"\n✅ Patient updated successfully!")
             
@@ -1650,8 +1766,7 @@ class SimpleHospitalSystem:
             
         try:
             # Get patient data first
-            query = "SELECT first_name, last_name FROM patients WHERE patient_id = ?"
-            result = self.db.execute_query(query, (int(patient_id),))
+            result = self.db.execute_named('patient_name_by_id', (int(patient_id),))
             
             if not result:
                 print(f"❌ No patient found with ID: {patient_id}")
@@ -1671,7 +1786,7 @@ class SimpleHospitalSystem:
             
             if confirm == 'DELETE':
                 # Delete patient
-                self.db.execute_update("DELETE FROM patients WHERE patient_id = ?", (int(patient_id),))
+                self.db.execute_named_update('patient_delete', (int(patient_id),))
                 print(f"\n✅ Patient '{patient_name}' deleted successfully!")
             else:
                 print("\n❌ Deletion cancelled.")
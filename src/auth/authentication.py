@@ -4,36 +4,89 @@ Handles user login, logout, and session management
 """
 
 import hashlib
+import hmac
+import os
+import threading
+import time
 from datetime import datetime, timedelta
 
+from src.auth.passwords import PasswordHasher
+
+# How long a password that verified against a stored hash is remembered,
+# so checking it again (e.g. to change it) skips the slow KDF
+VERIFY_CACHE_SECONDS = 300
+
 class AuthenticationManager:
-    def __init__(self, db_manager):
+    def __init__(self, db_manager, hasher=None):
         self.db_manager = db_manager
+        self.hasher = hasher or PasswordHasher()
         self.current_user = None
         self.session_timeout = timedelta(hours=8)
+        # stored hash -> (keyed digest of the password, expiry); the key
+        # never leaves this process, so the cache is useless if dumped
+        self._cache_key = os.urandom(32)
+        self._verified = {}
+        self._cache_lock = threading.Lock()
+        self._dummy_hash = None
         
     def hash_password(self, password):
-        """Hash password using SHA-256"""
-        return hashlib.sha256(password.encode()).hexdigest()
+        """Hash password with a random salt using the configured KDF"""
+        return self.hasher.hash(password)
+        
+    def verify_password(self, password, stored_hash):
+        """Check a password against a stored hash, using the recent-verify cache"""
+        digest = hmac.new(self._cache_key, password.encode(), hashlib.sha256).digest()
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._verified.get(stored_hash)
+        if cached and cached[1] > now and hmac.compare_digest(cached[0], digest):
+            return True
+            
+        if not self.hasher.verify(password, stored_hash):
+            return False
+        with self._cache_lock:
+            self._verified = {key: value for key, value in self._verified.items() if value[1] > now}
+            self._verified[stored_hash] = (digest, now + VERIFY_CACHE_SECONDS)
+        return True
         
     def authenticate(self, username, password):
-        """Authenticate user credentials"""
-        password_hash = self.hash_password(password)
+        """Authenticate user credentials
         
-        query = '''
-            SELECT user_id, username, role, full_name, email, phone, is_active
-            FROM users 
-            WHERE username = ? AND password_hash = ? AND is_active = 1
-        '''
+        Runs the password KDF, so it takes tens of milliseconds; the GUI
+        calls it on a worker thread. A hash in an older format or with
+        other cost settings is replaced after a successful login.
+        """
+        result = self.db_manager.execute_named('user_login', (username,))
         
-        result = self.db_manager.execute_query(query, (username, password_hash))
-        
-        if result:
-            user_data = dict(result[0])
-            user_data['login_time'] = datetime.now()
-            self.current_user = user_data
-            return user_data
-        return None
+        if not result:
+            # Spend the same time as a wrong password so response times
+            # do not reveal which usernames exist
+            self.hasher.verify(password, self._get_dummy_hash())
+            return None
+            
+        user_data = dict(result[0])
+        stored_hash = user_data.pop('password_hash')
+        if not self.verify_password(password, stored_hash):
+            return None
+        if self.hasher.needs_rehash(stored_hash):
+            self._set_password_hash(user_data['user_id'], self.hash_password(password), stored_hash)
+            
+        user_data['login_time'] = datetime.now()
+        self.current_user = user_data
+        return user_data
+        
+    def _get_dummy_hash(self):
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash_password(os.urandom(16).hex())
+        return self._dummy_hash
+        
+    def _set_password_hash(self, user_id, new_hash, old_hash=None):
+        """Store a new hash; with old_hash only if the stored one has not changed meanwhile"""
+        if old_hash is None:
+            query = "UPDATE users SET password_hash = ? WHERE user_id = ?"
+            return self.db_manager.execute_update(query, (new_hash, user_id))
+        query = "UPDATE users SET password_hash = ? WHERE user_id = ? AND password_hash = ?"
+        return self.db_manager.execute_update(query, (new_hash, user_id, old_hash))
         
     def create_user(self, username, password, role, full_name, email=None, phone=None):
         """Create a new user account"""
@@ -52,21 +105,20 @@ class AuthenticationManager:
         except Exception as e:
             return None
             
+    def check_password(self, user_id, password):
+        """Whether password is the user's current password"""
+        query = "SELECT password_hash FROM users WHERE user_id = ?"
+        result = self.db_manager.execute_query(query, (user_id,))
+        return bool(result) and self.verify_password(password, result[0]['password_hash'])
+        
     def change_password(self, user_id, old_password, new_password):
         """Change user password"""
-        old_hash = self.hash_password(old_password)
-        new_hash = self.hash_password(new_password)
-        
         # Verify old password
-        query = "SELECT user_id FROM users WHERE user_id = ? AND password_hash = ?"
-        result = self.db_manager.execute_query(query, (user_id, old_hash))
-        
-        if not result:
+        if not self.check_password(user_id, old_password):
             return False
             
         # Update password
-        update_query = "UPDATE users SET password_hash = ? WHERE user_id = ?"
-        rows_affected = self.db_manager.execute_update(update_query, (new_hash, user_id))
+        rows_affected = self._set_password_hash(user_id, self.hash_password(new_password))
         
         return rows_affected > 0
         
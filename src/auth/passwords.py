@@ -0,0 +1,142 @@
+"""
+Password Hashing for Hospital Management System
+Salted, versioned scrypt/PBKDF2 password hashes and cost calibration
+"""
+
+import base64
+import hashlib
+import hmac
+import os
+import time
+
+# Format version written into every hash: scheme$v=1$params$salt$hash
+HASH_VERSION = 1
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# scrypt is memory-hard and preferred; hashlib only has it when Python
+# is built against OpenSSL 1.1 or later, otherwise PBKDF2 is used
+SCRYPT_AVAILABLE = hasattr(hashlib, 'scrypt')
+
+DEFAULT_SCRYPT = {'n': 2 ** 14, 'r': 8, 'p': 1}
+DEFAULT_PBKDF2 = {'i': 310000}
+
+# Login time the calibration aims for on the terminals, in milliseconds
+TARGET_LOGIN_MS = 100
+
+# Hashes from before the versioned format: unsalted single-round SHA-256
+LEGACY_SCHEME = 'sha256'
+
+def _b64encode(data):
+    return base64.b64encode(data).decode().rstrip('=')
+
+def _b64decode(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+def _format_params(params):
+    return ",".join(f"{name}={value}" for name, value in sorted(params.items()))
+
+def _parse_params(text):
+    return {name: int(value) for name, value in (item.split('=') for item in text.split(','))}
+
+def derive(scheme, params, password, salt):
+    """Derive the key for a password with one scheme's cost parameters"""
+    secret = password.encode()
+    if scheme == 'scrypt':
+        n, r, p = params['n'], params['r'], params['p']
+        # Room for the 128 * n * r bytes scrypt needs, above hashlib's 32 MB default
+        return hashlib.scrypt(secret, salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+                              maxmem=128 * n * r * (p + 1) + 1024 * 1024)
+    if scheme == 'pbkdf2-sha256':
+        return hashlib.pbkdf2_hmac('sha256', secret, salt, params['i'], dklen=KEY_BYTES)
+    raise ValueError(f"Unknown password hash scheme: {scheme}")
+
+def parse_hash(stored):
+    """Split a stored hash into (scheme, version, params, salt, key)"""
+    if '$' not in stored:
+        # A bare SHA-256 hex digest from before salting
+        return LEGACY_SCHEME, 0, {}, b"", bytes.fromhex(stored)
+    scheme, version, params, salt, key = stored.split('$')
+    return scheme, int(version[len("v="):]), _parse_params(params), _b64decode(salt), _b64decode(key)
+
+class PasswordHasher:
+    """Hashes and verifies passwords with one scheme and cost setting
+    
+    Hashes look like scrypt$v=1$n=16384,p=1,r=8$<salt>$<key>, so each one
+    carries what is needed to verify it. verify() accepts any supported
+    scheme, old settings and the legacy SHA-256 hashes; needs_rehash()
+    tells which ones should be replaced after a successful login.
+    """
+    
+    def __init__(self, scheme=None, **params):
+        if scheme is None:
+            scheme = 'scrypt' if SCRYPT_AVAILABLE else 'pbkdf2-sha256'
+        if scheme == 'scrypt' and not SCRYPT_AVAILABLE:
+            # Same protection level is not available; fall back rather than fail logins
+            scheme, params = 'pbkdf2-sha256', {}
+        defaults = DEFAULT_SCRYPT if scheme == 'scrypt' else DEFAULT_PBKDF2
+        self.scheme = scheme
+        self.params = dict(defaults, **{name: params[name] for name in defaults if name in params})
+        
+    def hash(self, password):
+        """Hash a password with a new random salt"""
+        salt = os.urandom(SALT_BYTES)
+        key = derive(self.scheme, self.params, password, salt)
+        return "$".join([
+            self.scheme, f"v={HASH_VERSION}", _format_params(self.params), _b64encode(salt), _b64encode(key)
+        ])
+        
+    def verify(self, password, stored):
+        """Check a password against a stored hash in constant time"""
+        try:
+            scheme, version, params, salt, key = parse_hash(stored)
+            if scheme == LEGACY_SCHEME:
+                candidate = hashlib.sha256(password.encode()).digest()
+            else:
+                candidate = derive(scheme, params, password, salt)
+        except (ValueError, TypeError, KeyError, AttributeError):
+            # Malformed, or scrypt on a Python without it
+            return False
+        return hmac.compare_digest(candidate, key)
+        
+    def needs_rehash(self, stored):
+        """Whether a stored hash uses another scheme, other settings or an older format"""
+        try:
+            scheme, version, params, salt, key = parse_hash(stored)
+        except (ValueError, TypeError, KeyError):
+            return True
+        return scheme != self.scheme or version != HASH_VERSION or params != self.params
+
+def calibrate(target_ms=TARGET_LOGIN_MS, scheme=None, samples=3):
+    """Find the costliest settings that still hash within target_ms on this machine
+    
+    scrypt doubles n (memory and time) from 2**12; PBKDF2 doubles the
+    iterations from 50,000. Returns (params, milliseconds) for the last
+    setting under the target, or the cheapest one if none is.
+    """
+    if scheme is None:
+        scheme = 'scrypt' if SCRYPT_AVAILABLE else 'pbkdf2-sha256'
+    if scheme == 'scrypt':
+        candidates = [dict(DEFAULT_SCRYPT, n=2 ** power) for power in range(12, 21)]
+    else:
+        candidates = [{'i': 50000 * 2 ** step} for step in range(8)]
+        
+    chosen = None
+    for params in candidates:
+        elapsed = time_hash(scheme, params, samples)
+        if chosen is not None and elapsed > target_ms:
+            break
+        chosen = (params, elapsed)
+        if elapsed > target_ms:
+            break
+    return chosen
+
+def time_hash(scheme, params, samples=3):
+    """Median milliseconds one hash takes with these settings"""
+    timings = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        derive(scheme, params, "calibration password", os.urandom(SALT_BYTES))
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
@@ -0,0 +1,97 @@
+"""
+Receivables Aging for Hospital Management System
+Batch job marking overdue bills and bucketing unpaid balances by days past due
+"""
+
+# (bucket, first day past due, last day past due or None for no limit)
+AGING_BUCKETS = [
+    ("0-30", 0, 30),
+    ("31-60", 31, 60),
+    ("61-90", 61, 90),
+    ("90+", 91, None),
+]
+
+# Statuses of bills that still have a balance to collect
+UNPAID_STATUSES = ('pending', 'partial', 'overdue')
+
+def bucket_expression(days):
+    """SQL CASE giving the AGING_BUCKETS label for a days-past-due expression"""
+    cases = []
+    for name, first, last in AGING_BUCKETS:
+        if last is None:
+            cases.append(f"ELSE '{name}'")
+        else:
+            cases.append(f"WHEN {days} <= {last} THEN '{name}'")
+    return f"CASE {' '.join(cases)} END"
+
+def run_aging(conn, day):
+    """Age every unpaid bill as of day (a date) and store the results
+    
+    The unpaid bills due on or before day are read once, through the
+    (payment_status, due_date) index, into the aging_bills snapshot. Bills
+    past their due date are then marked 'overdue' and overdue bills that
+    are no longer past due go back to 'pending' or 'partial', in bulk.
+    The per-bucket totals are saved under a new aging_runs row. Returns
+    that run's summary. The caller is responsible for committing.
+    """
+    as_of = day.isoformat()
+    statuses = ", ".join(f"'{status}'" for status in UNPAID_STATUSES)
+    days = "CAST(julianday(?1) - julianday(b.due_date) AS INTEGER)"
+    
+    conn.execute("DELETE FROM aging_bills")
+    conn.execute(f'''
+        INSERT INTO aging_bills (bill_id, patient_id, due_date, days_overdue, bucket, balance_cents)
+        SELECT b.bill_id, b.patient_id, b.due_date, {days},
+               {bucket_expression(days)}, b.total_cents - b.paid_cents
+        FROM billing b
+        WHERE b.payment_status IN ({statuses}) AND b.due_date <= ?1
+          AND b.total_cents > b.paid_cents
+    ''', (as_of,))
+    
+    marked = conn.execute('''
+        UPDATE billing SET payment_status = 'overdue'
+        WHERE bill_id IN (SELECT bill_id FROM aging_bills WHERE days_overdue > 0)
+          AND payment_status != 'overdue'
+    ''').rowcount
+    cleared = conn.execute('''
+        UPDATE billing
+        SET payment_status = CASE WHEN paid_cents > 0 THEN 'partial' ELSE 'pending' END
+        WHERE payment_status = 'overdue'
+          AND bill_id NOT IN (SELECT bill_id FROM aging_bills WHERE days_overdue > 0)
+    ''').rowcount
+    
+    # Receivables not yet due, for the report's "current" total
+    current = conn.execute(f'''
+        SELECT COUNT(*), COALESCE(SUM(total_cents - paid_cents), 0) FROM billing
+        WHERE payment_status IN ({statuses}) AND (due_date > ? OR due_date IS NULL)
+          AND total_cents > paid_cents
+    ''', (as_of,)).fetchone()
+    
+    run_id = conn.execute('''
+        INSERT INTO aging_runs (as_of, current_bills, current_cents, marked_overdue, cleared_overdue)
+        VALUES (?, ?, ?, ?, ?)
+    ''', (as_of, current[0], current[1], marked, cleared)).lastrowid
+    conn.execute('''
+        INSERT INTO aging_buckets (run_id, bucket, bills, outstanding_cents)
+        SELECT ?, bucket, COUNT(*), SUM(balance_cents) FROM aging_bills GROUP BY bucket
+    ''', (run_id,))
+    return read_summary(conn, run_id)
+
+def read_summary(conn, run_id):
+    """Get one aging run with a row for every bucket, empty ones included"""
+    run = conn.execute('''
+        SELECT run_id, as_of, started_at, current_bills, current_cents, marked_overdue, cleared_overdue
+        FROM aging_runs WHERE run_id = ?
+    ''', (run_id,)).fetchone()
+    if run is None:
+        return None
+    totals = {
+        row[0]: (row[1], row[2]) for row in conn.execute(
+            "SELECT bucket, bills, outstanding_cents FROM aging_buckets WHERE run_id = ?", (run_id,)
+        )
+    }
+    summary = {key: run[key] for key in run.keys()}
+    summary['buckets'] = [
+        (name,) + totals.get(name, (0, 0)) for name, first, last in AGING_BUCKETS
+    ]
+    return summary
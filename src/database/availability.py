@@ -0,0 +1,176 @@
+"""
+Doctor Availability for Hospital Management System
+Weekly schedule templates and exceptions expanded into per-day bitmaps
+"""
+
+from datetime import timedelta
+
+# Each bit of a day bitmap covers this many minutes; bit 0 is 00:00-00:05
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# Exception kinds: leave removes working time, on_call adds it
+KIND_LEAVE = 'leave'
+KIND_ON_CALL = 'on_call'
+EXCEPTION_KINDS = (KIND_LEAVE, KIND_ON_CALL)
+
+def time_to_minutes(value):
+    """Convert 'HH:MM' or 'HH:MM:SS' to minutes since midnight"""
+    parts = str(value).strip().split(':')
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid time: {value!r}")
+    hours, minutes = int(parts[0]), int(parts[1])
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"Invalid time: {value!r}")
+    return hours * 60 + minutes
+
+def minutes_to_time(minutes):
+    """Convert minutes since midnight to 'HH:MM:SS'"""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+def parse_time_ranges(text):
+    """Parse '08:00-12:00, 13:00-17:00' into [('08:00', '12:00'), ('13:00', '17:00')]"""
+    ranges = []
+    for part in (text or '').replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if part.count('-') != 1:
+            raise ValueError(f"Invalid time range: {part!r} (use HH:MM-HH:MM)")
+        start_time, end_time = (value.strip() for value in part.split('-'))
+        if time_to_minutes(end_time) <= time_to_minutes(start_time):
+            raise ValueError(f"End time must be after start time ({part})")
+        ranges.append((start_time, end_time))
+    return ranges
+
+def format_time_ranges(ranges):
+    """Format (start_time, end_time) pairs as '08:00-12:00, 13:00-17:00'"""
+    return ", ".join(f"{str(start)[:5]}-{str(end)[:5]}" for start, end in ranges)
+
+def span_mask(start, end, inward=False):
+    """Bitmap of the 5-minute cells covered by [start, end) minutes
+    
+    Busy time rounds outwards (a 09:07 appointment blocks the 09:05 cell);
+    working time rounds inwards (a shift ending at 17:58 leaves 17:55 out).
+    """
+    if inward:
+        first = -(-start // SLOT_MINUTES)
+        last = end // SLOT_MINUTES
+    else:
+        first = start // SLOT_MINUTES
+        last = -(-end // SLOT_MINUTES)
+    last = min(last, SLOTS_PER_DAY)
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+def run_starts(mask, length):
+    """Bitmap of the cells where `length` consecutive set cells begin"""
+    # Doubling: after each step bit i says "cells i .. i+covered-1 are set"
+    covered = 1
+    while covered < length and mask:
+        shift = min(covered, length - covered)
+        mask &= mask >> shift
+        covered += shift
+    return mask
+
+def mask_windows(mask):
+    """Turn a day bitmap into sorted (start, end) minute windows"""
+    windows = []
+    cell = 0
+    while mask:
+        # Skip to the next set bit, then to the end of its run
+        skip = (mask & -mask).bit_length() - 1
+        mask >>= skip
+        cell += skip
+        run = (~mask & (mask + 1)).bit_length() - 1
+        windows.append((cell * SLOT_MINUTES, (cell + run) * SLOT_MINUTES))
+        mask >>= run
+        cell += run
+    return windows
+
+class AvailabilityExpander:
+    """Materialize doctors' working time as one bitmap per doctor and day
+    
+    A doctor with weekly template rows works exactly those hours; a doctor
+    without any works the default working hours every day. Exceptions on a
+    date are applied on top: leave clears time (the whole day if no times
+    are given), on_call adds it. Templates are read once and exceptions
+    once per date range, so expanding many doctor-days costs two queries.
+    """
+    
+    def __init__(self, conn, queries, default_hours):
+        self.conn = conn
+        self.queries = queries
+        self.default_mask = span_mask(
+            time_to_minutes(default_hours[0]), time_to_minutes(default_hours[1]), inward=True
+        )
+        self._templates = None
+        self._exceptions = {}
+        self._loaded_range = None
+        self._days = {}
+        
+    def load_range(self, start_date, end_date):
+        """Read the exceptions for start_date <= day < end_date up front"""
+        if self._loaded_range and self._loaded_range[0] <= start_date and end_date <= self._loaded_range[1]:
+            return
+        rows = self.queries.execute(
+            self.conn, 'doctor_schedule_exceptions_between',
+            (start_date.isoformat(), end_date.isoformat())
+        ).fetchall()
+        self._exceptions = {}
+        for row in rows:
+            key = (row['doctor_id'], row['exception_date'])
+            self._exceptions.setdefault(key, []).append(row)
+        self._loaded_range = (start_date, end_date)
+        self._days = {}
+        
+    def _weekly(self, doctor_id):
+        """Get the doctor's seven weekday bitmaps, or None without a template"""
+        if self._templates is None:
+            self._templates = {}
+            for row in self.queries.execute(self.conn, 'doctor_schedule_templates').fetchall():
+                week = self._templates.setdefault(row['doctor_id'], [0] * 7)
+                week[row['weekday']] |= span_mask(
+                    time_to_minutes(row['start_time']), time_to_minutes(row['end_time']), inward=True
+                )
+        return self._templates.get(doctor_id)
+        
+    def day_mask(self, doctor_id, day):
+        """Get the bitmap of a doctor's working time on a date"""
+        key = (doctor_id, day)
+        mask = self._days.get(key)
+        if mask is not None:
+            return mask
+            
+        if not self._loaded_range or not (self._loaded_range[0] <= day < self._loaded_range[1]):
+            self.load_range(day, day + timedelta(days=1))
+            
+        week = self._weekly(doctor_id)
+        mask = week[day.weekday()] if week is not None else self.default_mask
+        
+        exceptions = self._exceptions.get((doctor_id, day.isoformat()), [])
+        # Leave first, so on-call time given on a leave day still counts
+        for row in sorted(exceptions, key=lambda row: row['kind'] != KIND_LEAVE):
+            if row['start_time'] and row['end_time']:
+                # Leave blocks every cell it touches, on-call only full cells
+                change = span_mask(
+                    time_to_minutes(row['start_time']), time_to_minutes(row['end_time']),
+                    inward=row['kind'] != KIND_LEAVE
+                )
+            else:
+                change = span_mask(0, 24 * 60)
+            if row['kind'] == KIND_LEAVE:
+                mask &= ~change
+            else:
+                mask |= change
+                
+        self._days[key] = mask
+        return mask
+        
+    def covers(self, doctor_id, day, start, end):
+        """Check whether the doctor works throughout [start, end) minutes on a date"""
+        need = span_mask(start, end)
+        return need & ~self.day_mask(doctor_id, day) == 0
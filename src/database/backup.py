@@ -0,0 +1,176 @@
+"""
+Online Backups for Hospital Management System
+Consistent database copies through the SQLite backup API, taken a chunk at a time
+"""
+
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+
+# Pages copied per backup step; each step holds the source's read lock
+# only while it copies these pages
+PAGES_PER_STEP = 256
+
+# Pause between steps so the application's own queries get the database
+STEP_SLEEP = 0.005
+
+# A source written to by another connection makes the backup start over;
+# after this many restarts the rest is copied in one step instead
+MAX_RESTARTS = 3
+
+COMPRESSED_SUFFIX = ".gz"
+
+class BackupRestartError(Exception):
+    """Raised inside a backup that keeps restarting because the source keeps changing"""
+    pass
+
+class BackupReport:
+    """Timings of one backup
+    
+    steps and step_times cover the last attempt. max_step is the longest
+    time a single step kept the source locked, which bounds how long live
+    queries could have been held up.
+    """
+    
+    def __init__(self, source, destination):
+        self.source = source
+        self.destination = destination
+        self.compressed = False
+        self.pages = 0
+        self.page_size = 0
+        self.steps = 0
+        self.restarts = 0
+        self.step_times = []
+        self.elapsed = 0.0
+        self.size = 0
+        
+    @property
+    def database_bytes(self):
+        return self.pages * self.page_size
+        
+    @property
+    def max_step(self):
+        return max(self.step_times, default=0.0)
+        
+    @property
+    def mean_step(self):
+        return sum(self.step_times) / len(self.step_times) if self.step_times else 0.0
+        
+    @property
+    def throughput(self):
+        """Megabytes of database copied per second"""
+        return self.database_bytes / 1e6 / self.elapsed if self.elapsed else 0.0
+        
+    def lines(self):
+        """Human-readable report lines"""
+        lines = [
+            f"Copied {self.pages:,} pages ({self.database_bytes:,} bytes) in {self.elapsed:.2f} s "
+            f"({self.throughput:.1f} MB/s)",
+            f"{self.steps} steps: longest {self.max_step * 1000:.1f} ms, "
+            f"average {self.mean_step * 1000:.1f} ms",
+        ]
+        if self.restarts:
+            lines.append(f"Restarted {self.restarts} time(s) because the database changed")
+        if self.compressed and self.database_bytes:
+            lines.append(
+                f"Compressed to {self.size:,} bytes ({self.size / self.database_bytes:.0%} of the database)"
+            )
+        else:
+            lines.append(f"Backup size: {self.size:,} bytes")
+        return lines
+
+def backup_database(source_path, destination, pages_per_step=PAGES_PER_STEP, step_sleep=STEP_SLEEP,
+                    compress=False, max_restarts=MAX_RESTARTS):
+    """Copy a live database to destination and return a BackupReport
+    
+    Pages are copied pages_per_step at a time with a step_sleep pause in
+    between, so other connections keep working while the backup runs.
+    The copy is written next to destination and renamed into place only
+    once it is complete. With compress the result is gzipped and
+    COMPRESSED_SUFFIX is appended to destination.
+    """
+    if compress and not destination.endswith(COMPRESSED_SUFFIX):
+        destination += COMPRESSED_SUFFIX
+    directory = os.path.dirname(destination)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        
+    report = BackupReport(source_path, destination)
+    report.compressed = compress
+    partial = destination + ".partial"
+    copy_path = partial + ".db" if compress else partial
+    
+    started = time.perf_counter()
+    source = sqlite3.connect(source_path)
+    try:
+        try:
+            _copy_pages(source, copy_path, report, pages_per_step, step_sleep, max_restarts)
+        except BackupRestartError:
+            # The source changes faster than the chunks can be copied; copy
+            # the rest in one step, which holds one read snapshot throughout
+            _copy_pages(source, copy_path, report, -1, 0, None)
+        report.page_size = source.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        source.close()
+        
+    try:
+        if compress:
+            with open(copy_path, 'rb') as raw, gzip.open(partial, 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            os.remove(copy_path)
+        os.replace(partial, destination)
+    except Exception:
+        for path in (partial, copy_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+        
+    report.elapsed = time.perf_counter() - started
+    report.size = os.path.getsize(destination)
+    return report
+
+def _copy_pages(source, copy_path, report, pages_per_step, step_sleep, max_restarts):
+    """Run one backup attempt into copy_path, recording step timings in report"""
+    if os.path.exists(copy_path):
+        os.remove(copy_path)
+    report.steps = 0
+    report.step_times = []
+    state = {'remaining': None, 'step_started': time.perf_counter()}
+    
+    def progress(status, remaining, total):
+        now = time.perf_counter()
+        report.steps += 1
+        report.step_times.append(now - state['step_started'])
+        report.pages = total
+        if state['remaining'] is not None and remaining > state['remaining']:
+            # The source was written to by another connection; SQLite starts over
+            report.restarts += 1
+            if max_restarts is not None and report.restarts > max_restarts:
+                raise BackupRestartError(f"Backup restarted {report.restarts} times")
+        state['remaining'] = remaining
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+        state['step_started'] = time.perf_counter()
+        
+    destination = sqlite3.connect(copy_path)
+    try:
+        source.backup(destination, pages=pages_per_step, progress=progress)
+        # A copy of a WAL database is marked WAL too; make it a plain
+        # self-contained file
+        destination.execute("PRAGMA journal_mode=DELETE")
+    except Exception:
+        destination.close()
+        os.remove(copy_path)
+        raise
+    destination.close()
+
+def extract_backup(backup_path, destination):
+    """Write the database held in a backup file to destination, decompressing if needed"""
+    if backup_path.endswith(COMPRESSED_SUFFIX):
+        with gzip.open(backup_path, 'rb') as packed, open(destination, 'wb') as raw:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+    else:
+        shutil.copyfile(backup_path, destination)
+    return destination
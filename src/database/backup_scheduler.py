@@ -0,0 +1,198 @@
+"""
+Backup Scheduler for Hospital Management System
+Background snapshots on a grandfather-father-son policy, verified and pruned off the main thread
+"""
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from src.database.backup_store import BackupStore
+
+# Snapshots kept per tier: the newest snapshot of each of the last 24
+# hours, 7 days and 4 weeks. A tier set to 0 is not kept at all.
+DEFAULT_RETENTION = {'hourly': 24, 'daily': 7, 'weekly': 4}
+
+# How often a new snapshot is due for each tier; the shortest one kept wins
+TIER_PERIODS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+}
+
+# Seconds between the scheduler's checks for due, unverified and expired snapshots
+CHECK_INTERVAL = 60.0
+
+# Unreferenced chunks younger than this are left for the next prune, as
+# they may belong to a snapshot that is still being written
+GARBAGE_MIN_AGE = 3600
+
+# Label of snapshots the scheduler takes, to tell them from manual ones.
+# Only snapshots with this label are ever pruned.
+SCHEDULED_LABEL = "scheduled"
+
+def period_key(tier, created):
+    """The hour, day or ISO week a snapshot taken at created falls in"""
+    if tier == 'hourly':
+        return created.strftime("%Y-%m-%d %H")
+    if tier == 'daily':
+        return created.date().isoformat()
+    year, week, weekday = created.isocalendar()
+    return f"{year}-W{week:02d}"
+
+def select_retained(snapshots, retention):
+    """Get the ids of the snapshots a grandfather-father-son policy keeps
+    
+    For each tier the newest snapshot of each of the most recent
+    retention[tier] periods is kept. Snapshots that failed verification
+    are never kept, so an older good one stands in for their period.
+    """
+    candidates = [snapshot for snapshot in snapshots if not is_failed(snapshot)]
+    candidates.sort(key=lambda snapshot: snapshot['created'], reverse=True)
+    retained = set()
+    for tier, count in retention.items():
+        periods = []
+        for snapshot in candidates:
+            key = period_key(tier, snapshot_time(snapshot))
+            if key in periods:
+                continue
+            if len(periods) == count:
+                break
+            periods.append(key)
+            retained.add(snapshot['snapshot_id'])
+    return retained
+
+def snapshot_time(snapshot):
+    return datetime.strptime(snapshot['created'], "%Y-%m-%d %H:%M:%S")
+
+def is_failed(snapshot):
+    """Whether a snapshot was checked and found damaged"""
+    return snapshot.get('verified', {}).get('result', 'ok') != 'ok'
+
+def is_scheduled(snapshot):
+    return snapshot.get('label') == SCHEDULED_LABEL
+
+def check_database(path):
+    """Run PRAGMA quick_check on a database file opened read-only; runs in a worker process"""
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    try:
+        problems = [row[0] for row in conn.execute("PRAGMA quick_check")]
+    finally:
+        conn.close()
+    return "ok" if problems == ["ok"] else "; ".join(problems)
+
+class BackupScheduler:
+    """Takes, verifies and prunes backup store snapshots in a background thread
+    
+    Each check takes a snapshot when the newest scheduled one is older
+    than the shortest retained tier's period, verifies every snapshot not
+    checked yet and deletes the scheduled snapshots the retention policy
+    no longer keeps. Manual snapshots and ones that failed verification
+    are left for an operator to delete.
+    Verification rebuilds the snapshot into a scratch file and runs
+    quick_check on it in a separate process, so a long check neither
+    holds the GIL nor touches the live database.
+    """
+    
+    def __init__(self, db_path, store_path, retention=None, interval=CHECK_INTERVAL):
+        self.db_path = db_path
+        self.store = BackupStore(store_path)
+        self.retention = dict(DEFAULT_RETENTION if retention is None else retention)
+        self.interval = interval
+        self.last_error = None
+        self.last_run = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        
+    def start(self):
+        """Run checks every interval seconds in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="backup-scheduler", daemon=True)
+        self._thread.start()
+        
+    def stop(self):
+        """Stop the background thread; a check in progress finishes first"""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+            self._stop.wait(self.interval)
+            
+    def snapshot_period(self):
+        """How old the newest snapshot may get before the next one is due"""
+        periods = [TIER_PERIODS[tier] for tier, count in self.retention.items() if count]
+        return min(periods) if periods else None
+        
+    def run_once(self, now=None):
+        """Do one round of snapshot, verify and prune; returns what was done"""
+        with self._lock:
+            now = now or datetime.now()
+            result = {'snapshot': None, 'verified': {}, 'pruned': [], 'freed_bytes': 0}
+            snapshots = self.store.snapshots()
+            good = [snapshot for snapshot in snapshots if is_scheduled(snapshot) and not is_failed(snapshot)]
+            period = self.snapshot_period()
+            if period and os.path.exists(self.db_path) and (
+                not good or now - snapshot_time(good[-1]) >= period
+            ):
+                report = self.store.snapshot(self.db_path, label=SCHEDULED_LABEL)
+                result['snapshot'] = report.snapshot_id
+                snapshots = self.store.snapshots()
+                
+            for snapshot in snapshots:
+                if self._stop.is_set():
+                    return result
+                if 'verified' not in snapshot:
+                    result['verified'][snapshot['snapshot_id']] = self.verify(snapshot['snapshot_id'])
+                    
+            result['pruned'], result['freed_bytes'] = self.prune()
+            self.last_run = now
+            return result
+            
+    def verify(self, snapshot_id):
+        """Check one snapshot in a worker process and record the outcome in its manifest"""
+        scratch = os.path.join(self.store.work_dir, f"verify_{snapshot_id}.db")
+        try:
+            try:
+                self.store.restore(snapshot_id, scratch)
+            except Exception as e:
+                outcome = f"restore failed: {e}"
+            else:
+                # spawn, not fork: the parent has threads and open connections
+                with multiprocessing.get_context("spawn").Pool(1) as pool:
+                    outcome = pool.apply(check_database, (os.path.abspath(scratch),))
+        finally:
+            if os.path.exists(scratch):
+                os.remove(scratch)
+        self.store.mark_verified(snapshot_id, outcome)
+        return outcome
+        
+    def prune(self):
+        """Delete scheduled snapshots the retention policy does not keep; returns (ids, bytes freed)
+        
+        Manual snapshots are never deleted. Failed ones are kept as
+        evidence; retention skips them, so good snapshots still cover
+        their periods.
+        """
+        if not any(self.retention.values()):
+            return [], 0
+        snapshots = [snapshot for snapshot in self.store.snapshots() if is_scheduled(snapshot)]
+        retained = select_retained(snapshots, self.retention)
+        pruned = [
+            snapshot['snapshot_id'] for snapshot in snapshots
+            if snapshot['snapshot_id'] not in retained and not is_failed(snapshot)
+        ]
+        for snapshot_id in pruned:
+            self.store.delete_snapshot(snapshot_id)
+        freed_bytes = self.store.collect_garbage(min_age=GARBAGE_MIN_AGE)[1]
+        return pruned, freed_bytes
@@ -0,0 +1,268 @@
+"""
+Backup Store for Hospital Management System
+Deduplicated snapshots kept as page-aligned chunks stored once by their hash
+"""
+
+import hashlib
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+
+from src.database.backup import backup_database
+
+# Database pages per chunk. SQLite changes whole pages, so page-aligned
+# chunks of a snapshot match the previous snapshot's wherever no page in
+# them changed
+CHUNK_PAGES = 16
+
+MANIFEST_VERSION = 1
+
+def sync_directory(path):
+    """Flush a directory's entries to disk so a rename in it survives a crash"""
+    if os.name == 'nt':
+        # Windows cannot open a directory for fsync; NTFS journals renames
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+class BackupStoreError(Exception):
+    """Raised for a missing snapshot or a chunk that fails verification"""
+    pass
+
+class SnapshotReport:
+    """What one snapshot added to the store"""
+    
+    def __init__(self, manifest, new_chunks, new_bytes, elapsed, copy_report):
+        self.manifest = manifest
+        self.snapshot_id = manifest['snapshot_id']
+        self.chunks = len(manifest['chunks'])
+        self.new_chunks = new_chunks
+        self.new_bytes = new_bytes
+        self.elapsed = elapsed
+        self.copy_report = copy_report
+        
+    @property
+    def size(self):
+        return self.manifest['size']
+        
+    def lines(self):
+        """Human-readable report lines"""
+        return [
+            f"Snapshot {self.snapshot_id}: {self.size:,} bytes in {self.chunks:,} chunks",
+            f"{self.new_chunks:,} new chunks stored ({self.new_bytes:,} bytes), "
+            f"{self.chunks - self.new_chunks:,} already in the store",
+            f"Finished in {self.elapsed:.2f} s",
+        ]
+
+class BackupStore:
+    """A directory of deduplicated database snapshots
+    
+    root/chunks/ab/abcdef... holds each distinct chunk once, zlib
+    compressed and named by the SHA-256 of its contents. root/snapshots
+    holds one JSON manifest per snapshot listing its chunk hashes in
+    order. Files are written under a temporary name and renamed into
+    place, so an interrupted snapshot leaves no half-written entries.
+    """
+    
+    def __init__(self, root, chunk_pages=CHUNK_PAGES):
+        self.root = root
+        self.chunk_pages = chunk_pages
+        self.chunks_dir = os.path.join(root, "chunks")
+        self.snapshots_dir = os.path.join(root, "snapshots")
+        self.work_dir = os.path.join(root, "tmp")
+        for directory in (self.chunks_dir, self.snapshots_dir, self.work_dir):
+            os.makedirs(directory, exist_ok=True)
+            
+    def snapshot(self, source_path, label=""):
+        """Take a snapshot of a live database and return a SnapshotReport
+        
+        The database is first copied with the online backup API, so the
+        snapshot is consistent while the application keeps running; only
+        chunks the store does not hold yet are then written.
+        """
+        started = time.perf_counter()
+        created = datetime.now()
+        snapshot_id = created.strftime("%Y%m%d_%H%M%S_%f")
+        copy_path = os.path.join(self.work_dir, f"{snapshot_id}.db")
+        
+        copy_report = backup_database(source_path, copy_path)
+        try:
+            chunk_size = copy_report.page_size * self.chunk_pages
+            chunks = []
+            whole = hashlib.sha256()
+            size = 0
+            new_chunks = 0
+            new_bytes = 0
+            with open(copy_path, 'rb') as copy:
+                while True:
+                    data = copy.read(chunk_size)
+                    if not data:
+                        break
+                    whole.update(data)
+                    size += len(data)
+                    digest = hashlib.sha256(data).hexdigest()
+                    written = self._put_chunk(digest, data)
+                    if written:
+                        new_chunks += 1
+                        new_bytes += written
+                    chunks.append(digest)
+        finally:
+            os.remove(copy_path)
+            
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'snapshot_id': snapshot_id,
+            'created': created.strftime("%Y-%m-%d %H:%M:%S"),
+            'label': label,
+            'source': os.path.abspath(source_path),
+            'page_size': copy_report.page_size,
+            'chunk_size': chunk_size,
+            'size': size,
+            'sha256': whole.hexdigest(),
+            'chunks': chunks,
+        }
+        self._write_file(self._manifest_path(snapshot_id), json.dumps(manifest, indent=1).encode())
+        return SnapshotReport(manifest, new_chunks, new_bytes, time.perf_counter() - started, copy_report)
+        
+    def restore(self, snapshot_id, destination):
+        """Rebuild a snapshot's database file at destination, one chunk at a time
+        
+        Every chunk and the finished file are checked against their hashes
+        before the file is renamed into place.
+        """
+        manifest = self.get_snapshot(snapshot_id)
+        partial = destination + ".partial"
+        whole = hashlib.sha256()
+        try:
+            with open(partial, 'wb') as output:
+                for digest in manifest['chunks']:
+                    data = self._get_chunk(digest)
+                    whole.update(data)
+                    output.write(data)
+            if whole.hexdigest() != manifest['sha256'] or os.path.getsize(partial) != manifest['size']:
+                raise BackupStoreError(f"Restored snapshot {snapshot_id} does not match its manifest")
+            os.replace(partial, destination)
+        except Exception:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return destination
+        
+    def get_snapshot(self, snapshot_id):
+        """Get a snapshot's manifest"""
+        try:
+            with open(self._manifest_path(snapshot_id), 'rb') as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            raise BackupStoreError(f"Snapshot not found: {snapshot_id}")
+            
+    def snapshots(self):
+        """Get every snapshot's manifest, oldest first"""
+        return [
+            self.get_snapshot(name[:-len(".json")])
+            for name in sorted(os.listdir(self.snapshots_dir)) if name.endswith(".json")
+        ]
+        
+    def mark_verified(self, snapshot_id, result):
+        """Record the outcome of checking a snapshot ('ok' or the problems found) in its manifest"""
+        manifest = self.get_snapshot(snapshot_id)
+        manifest['verified'] = {'at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'result': result}
+        self._write_file(self._manifest_path(snapshot_id), json.dumps(manifest, indent=1).encode())
+        return manifest
+        
+    def delete_snapshot(self, snapshot_id):
+        """Remove a snapshot's manifest; its chunks go with collect_garbage()"""
+        try:
+            os.remove(self._manifest_path(snapshot_id))
+        except FileNotFoundError:
+            raise BackupStoreError(f"Snapshot not found: {snapshot_id}")
+            
+    def collect_garbage(self, min_age=0):
+        """Delete chunks no snapshot refers to; returns (chunks, bytes) freed
+        
+        A snapshot being taken writes or reuses its chunks before its
+        manifest exists. Pass a min_age in seconds longer than a snapshot
+        takes to leave the chunks used in that time alone.
+        """
+        referenced = set()
+        for manifest in self.snapshots():
+            referenced.update(manifest['chunks'])
+        cutoff = time.time() - min_age
+        freed = 0
+        freed_bytes = 0
+        for digest, path in self._chunk_files():
+            if digest not in referenced and (not min_age or os.path.getmtime(path) < cutoff):
+                freed_bytes += os.path.getsize(path)
+                os.remove(path)
+                freed += 1
+        return freed, freed_bytes
+        
+    def stats(self):
+        """Get snapshot count, stored chunk count and bytes, and the total snapshot size"""
+        snapshots = self.snapshots()
+        chunk_files = list(self._chunk_files())
+        return {
+            'snapshots': len(snapshots),
+            'chunks': len(chunk_files),
+            'stored_bytes': sum(os.path.getsize(path) for digest, path in chunk_files),
+            'snapshot_bytes': sum(manifest['size'] for manifest in snapshots),
+        }
+        
+    def _manifest_path(self, snapshot_id):
+        return os.path.join(self.snapshots_dir, f"{snapshot_id}.json")
+        
+    def _chunk_path(self, digest):
+        return os.path.join(self.chunks_dir, digest[:2], digest)
+        
+    def _chunk_files(self):
+        for prefix in os.listdir(self.chunks_dir):
+            directory = os.path.join(self.chunks_dir, prefix)
+            for digest in os.listdir(directory):
+                if not digest.endswith(".tmp"):
+                    yield digest, os.path.join(directory, digest)
+                    
+    def _put_chunk(self, digest, data):
+        """Store a chunk unless it is already there; returns the bytes written"""
+        path = self._chunk_path(digest)
+        if os.path.exists(path):
+            # Mark the chunk as in use for collect_garbage(min_age)
+            os.utime(path)
+            return 0
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+            sync_directory(self.chunks_dir)
+        packed = zlib.compress(data, 6)
+        self._write_file(path, packed)
+        return len(packed)
+        
+    def _get_chunk(self, digest):
+        try:
+            with open(self._chunk_path(digest), 'rb') as chunk:
+                data = zlib.decompress(chunk.read())
+        except FileNotFoundError:
+            raise BackupStoreError(f"Chunk missing from the store: {digest}")
+        except zlib.error:
+            raise BackupStoreError(f"Chunk is corrupt: {digest}")
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise BackupStoreError(f"Chunk is corrupt: {digest}")
+        return data
+        
+    def _write_file(self, path, data):
+        """Write data under a temporary name, flush it to disk and rename it into place
+        
+        Without the fsync a power loss after the rename could leave an
+        empty or truncated file under a chunk's content address.
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as output:
+            output.write(data)
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(temporary, path)
+        sync_directory(os.path.dirname(path))
@@ -0,0 +1,152 @@
+"""
+Connection Pool for Hospital Management System
+Hands out SQLite connections per thread: several readers, one writer
+"""
+
+import sqlite3
+import threading
+import queue
+from contextlib import contextmanager
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes free in time"""
+    pass
+
+class ConnectionPool:
+    def __init__(self, db_path, readers=4, timeout=30.0, on_connect=None, cached_statements=128):
+        self.db_path = db_path
+        self.timeout = timeout
+        self.on_connect = on_connect
+        self.cached_statements = cached_statements
+        
+        # A private in-memory database is not shared between connections,
+        # so everything has to go through the writer
+        if db_path == ":memory:":
+            readers = 0
+        self.reader_count = readers
+        
+        self._local = threading.local()
+        self._writer_lock = threading.RLock()
+        self._writer = self._connect()
+        self._readers = queue.LifoQueue()
+        self._connections = [self._writer]
+        
+        for _ in range(self.reader_count):
+            conn = self._connect()
+            self._readers.put(conn)
+            self._connections.append(conn)
+            
+        self._closed = False
+        
+    def _connect(self):
+        """Open a new connection configured like the rest of the application"""
+        conn = sqlite3.connect(
+            self.db_path, timeout=self.timeout, check_same_thread=False,
+            cached_statements=self.cached_statements
+        )
+        conn.row_factory = sqlite3.Row
+        if self.on_connect:
+            self.on_connect(conn)
+        return conn
+        
+    @property
+    def writer_connection(self):
+        """The single connection that owns all writes"""
+        return self._writer
+        
+    def _state(self):
+        """Per-thread checkout bookkeeping"""
+        local = self._local
+        if not hasattr(local, 'writer_depth'):
+            local.writer_depth = 0
+            local.reader = None
+            local.reader_depth = 0
+        return local
+        
+    def checkout_writer(self):
+        """Check out the writer connection, blocking other writers"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        if not self._writer_lock.acquire(timeout=self.timeout):
+            raise PoolTimeoutError("Timed out waiting for the writer connection")
+        self._state().writer_depth += 1
+        return self._writer
+        
+    def checkout_reader(self):
+        """Check out a reader connection for the current thread"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        state = self._state()
+        
+        # A thread that holds the writer must read through it so it sees
+        # its own uncommitted changes
+        if state.writer_depth or not self.reader_count:
+            return self.checkout_writer()
+            
+        if state.reader is None:
+            try:
+                state.reader = self._readers.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolTimeoutError("Timed out waiting for a reader connection")
+        state.reader_depth += 1
+        return state.reader
+        
+    def checkin(self, conn):
+        """Return a connection obtained from checkout_reader/checkout_writer"""
+        state = self._state()
+        
+        if conn is self._writer:
+            if not state.writer_depth:
+                raise sqlite3.ProgrammingError("Writer connection is not checked out by this thread")
+            state.writer_depth -= 1
+            self._writer_lock.release()
+            return
+            
+        if conn is not state.reader:
+            raise sqlite3.ProgrammingError("Connection is not checked out by this thread")
+        state.reader_depth -= 1
+        if state.reader_depth == 0:
+            state.reader = None
+            # Never hand a connection with an open read transaction to another thread
+            if conn.in_transaction:
+                conn.rollback()
+            self._readers.put(conn)
+            
+    @contextmanager
+    def reader(self):
+        """Context manager yielding a connection for read queries"""
+        conn = self.checkout_reader()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+            
+    @contextmanager
+    def writer(self):
+        """Context manager yielding the writer connection"""
+        conn = self.checkout_writer()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+            
+    def connections(self):
+        """Get every connection owned by the pool"""
+        return list(self._connections)
+        
+    def stats(self):
+        """Get current pool usage"""
+        return {
+            'readers': self.reader_count,
+            'readers_idle': self._readers.qsize(),
+            'readers_in_use': self.reader_count - self._readers.qsize()
+        }
+        
+    def close(self):
+        """Close every pooled connection"""
+        if self._closed:
+            return
+        self._closed = True
+        for conn in self._connections:
+            conn.close()
+        self._connections = []
@@ -0,0 +1,170 @@
+"""
+Statistics Counters for Hospital Management System
+Row counts kept up to date by triggers so dashboards never count rows
+"""
+
+import re
+
+COUNTERS_TABLE = "stats_counters"
+
+# Every trigger whose name starts with this prefix is owned by ensure_counters()
+TRIGGER_PREFIX = "trg_counter_"
+
+# (counter name, table, bucket expression, condition)
+# {row} stands for NEW/OLD inside triggers and for the table when seeding.
+# Counters without a bucket keep a single total under the bucket ''.
+COUNTERS = [
+    ("patients", "patients", None, None),
+    ("doctors", "doctors", None, None),
+    ("appointments", "appointments", None, None),
+    ("bills_pending", "billing", None, "{row}.payment_status = 'pending'"),
+    
+    # Per-day counts; a date range is a handful of primary key lookups
+    ("appointments_by_date", "appointments", "{row}.appointment_date", None),
+    ("patients_by_created_date", "patients", "DATE({row}.created_at)", None),
+]
+
+def _bucket(bucket, row):
+    """SQL expression for the bucket of a row"""
+    return bucket.format(row=row) if bucket else "''"
+
+def _delta(condition, row, sign):
+    """SQL expression for how much a row changes a counter"""
+    if not condition:
+        return sign
+    return f"CASE WHEN {condition.format(row=row)} THEN {sign} ELSE 0 END"
+
+def _upsert(name, bucket, delta):
+    """Trigger statement adding delta to one counter bucket"""
+    return (
+        f"INSERT INTO {COUNTERS_TABLE} (name, bucket, value) VALUES ('{name}', {bucket}, {delta}) "
+        f"ON CONFLICT (name, bucket) DO UPDATE SET value = value + excluded.value;"
+    )
+
+def _columns(*expressions):
+    """Column names a set of {row}.column expressions depends on"""
+    columns = []
+    for expression in expressions:
+        for column in re.findall(r"\{row\}\.(\w+)", expression or ""):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def trigger_sql(name, table, bucket=None, condition=None):
+    """Build {trigger name: CREATE TRIGGER statement} for one counter"""
+    prefix = f"{TRIGGER_PREFIX}{name}"
+    triggers = {
+        f"{prefix}_insert": (
+            f"CREATE TRIGGER {prefix}_insert AFTER INSERT ON {table} BEGIN "
+            f"{_upsert(name, _bucket(bucket, 'NEW'), _delta(condition, 'NEW', 1))} END"
+        ),
+        f"{prefix}_delete": (
+            f"CREATE TRIGGER {prefix}_delete AFTER DELETE ON {table} BEGIN "
+            f"{_upsert(name, _bucket(bucket, 'OLD'), _delta(condition, 'OLD', -1))} END"
+        ),
+    }
+    columns = _columns(bucket, condition)
+    if columns:
+        # Rows moving between buckets or in/out of the condition
+        triggers[f"{prefix}_update"] = (
+            f"CREATE TRIGGER {prefix}_update AFTER UPDATE OF {', '.join(columns)} ON {table} BEGIN "
+            f"{_upsert(name, _bucket(bucket, 'OLD'), _delta(condition, 'OLD', -1))} "
+            f"{_upsert(name, _bucket(bucket, 'NEW'), _delta(condition, 'NEW', 1))} END"
+        )
+    return triggers
+
+def seed_counter(conn, name, table, bucket=None, condition=None):
+    """Recount one counter from its table"""
+    conn.execute(f"DELETE FROM {COUNTERS_TABLE} WHERE name = ?", (name,))
+    where = f"WHERE {condition.format(row=table)}" if condition else ""
+    conn.execute(
+        f"INSERT INTO {COUNTERS_TABLE} (name, bucket, value) "
+        f"SELECT ?, {_bucket(bucket, table)} as bucket, COUNT(*) FROM {table} {where} "
+        f"GROUP BY bucket",
+        (name,)
+    )
+
+def ensure_counters(conn, counters=None):
+    """Create the counters table and bring its triggers in line with COUNTERS
+    
+    Counters whose triggers are created or rebuilt are recounted once;
+    after that the triggers keep them exact. Returns a dict listing the
+    created, rebuilt and dropped counters. The caller is responsible
+    for committing.
+    """
+    counters = COUNTERS if counters is None else counters
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS {COUNTERS_TABLE} (
+            name TEXT NOT NULL,
+            bucket TEXT NOT NULL DEFAULT '',
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, bucket)
+        ) WITHOUT ROWID
+    ''')
+    
+    existing = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+            (TRIGGER_PREFIX + "%",)
+        )
+    }
+    
+    result = {'created': [], 'rebuilt': [], 'dropped': []}
+    wanted = set()
+    
+    for name, table, bucket, condition in counters:
+        triggers = trigger_sql(name, table, bucket, condition)
+        wanted.update(triggers)
+        changed = False
+        new = False
+        
+        for trigger, sql in triggers.items():
+            if trigger not in existing:
+                new = True
+            elif existing[trigger] != sql:
+                conn.execute(f"DROP TRIGGER {trigger}")
+            else:
+                continue
+            conn.execute(sql)
+            changed = True
+            
+        if changed:
+            seed_counter(conn, name, table, bucket, condition)
+            result['created' if new else 'rebuilt'].append(name)
+            
+    known = {name for name, _, _, _ in counters}
+    for trigger in existing:
+        if trigger not in wanted:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            name = trigger[len(TRIGGER_PREFIX):].rsplit("_", 1)[0]
+            if name not in known and name not in result['dropped']:
+                conn.execute(f"DELETE FROM {COUNTERS_TABLE} WHERE name = ?", (name,))
+                result['dropped'].append(name)
+                
+    return result
+
+def rebuild_counters(conn, counters=None):
+    """Recount every counter from scratch; the caller commits"""
+    counters = COUNTERS if counters is None else counters
+    for name, table, bucket, condition in counters:
+        seed_counter(conn, name, table, bucket, condition)
+
+def read_counter(conn, name, bucket=''):
+    """Read a single counter value"""
+    row = conn.execute(
+        f"SELECT value FROM {COUNTERS_TABLE} WHERE name = ? AND bucket = ?",
+        (name, bucket)
+    ).fetchone()
+    return row[0] if row else 0
+
+def read_counter_range(conn, name, start=None, end=None):
+    """Sum a bucketed counter over start <= bucket < end (either bound optional)"""
+    query = f"SELECT COALESCE(SUM(value), 0) FROM {COUNTERS_TABLE} WHERE name = ?"
+    params = [name]
+    if start is not None:
+        query += " AND bucket >= ?"
+        params.append(start)
+    if end is not None:
+        query += " AND bucket < ?"
+        params.append(end)
+    return conn.execute(query, params).fetchone()[0]
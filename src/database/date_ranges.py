@@ -0,0 +1,85 @@
+"""
+Date Ranges for Hospital Management System
+Half-open date ranges turned into index-friendly SQL predicates
+"""
+
+import calendar
+from datetime import date, datetime, timedelta
+
+class DateRange:
+    """The days start <= day < end
+    
+    Dates are stored as 'YYYY-MM-DD' or 'YYYY-MM-DD HH:MM:SS' text, so
+    column >= start AND column < end matches whole days by plain string
+    comparison. The column stays bare and an index on it can be used,
+    unlike DATE(column) = DATE('now') or strftime() on the column.
+    """
+    
+    def __init__(self, start, end):
+        if end < start:
+            raise ValueError(f"Date range ends before it starts: {start} - {end}")
+        self.start = start
+        self.end = end
+        
+    def params(self):
+        """Get the (start, end) query parameters for range_predicate()"""
+        return (self.start.isoformat(), self.end.isoformat())
+        
+    def days(self):
+        """Get every date in the range"""
+        return [self.start + timedelta(days=i) for i in range((self.end - self.start).days)]
+        
+    def __contains__(self, day):
+        return self.start <= day < self.end
+        
+    def __eq__(self, other):
+        return isinstance(other, DateRange) and (self.start, self.end) == (other.start, other.end)
+        
+    def __repr__(self):
+        return f"DateRange({self.start.isoformat()}, {self.end.isoformat()})"
+
+def range_predicate(column):
+    """SQL for column in a DateRange; takes the two DateRange.params()"""
+    return f"{column} >= ? AND {column} < ?"
+
+def age_expression(column, today):
+    """SQL for the age in whole years of a 'YYYY-MM-DD' column on the date in today"""
+    return (
+        f"(CAST(substr({today}, 1, 4) AS INTEGER) - CAST(substr({column}, 1, 4) AS INTEGER)"
+        f" - (substr({today}, 6, 5) < substr({column}, 6, 5)))"
+    )
+
+def today():
+    """Get the local date (SQLite's DATE('now') is the UTC date)"""
+    return datetime.now().date()
+
+def day_range(day=None):
+    """Get the range of a single day, default today"""
+    day = day or today()
+    return DateRange(day, day + timedelta(days=1))
+
+def last_days(days, day=None):
+    """Get the range of the past days up to and including day (default today)"""
+    day = day or today()
+    return DateRange(day - timedelta(days=days), day + timedelta(days=1))
+
+def month_range(day=None):
+    """Get the range of the calendar month containing day (default today)"""
+    day = day or today()
+    start = day.replace(day=1)
+    return DateRange(start, start + timedelta(days=calendar.monthrange(day.year, day.month)[1]))
+
+def years_before(day, years):
+    """Get the same calendar date years earlier (29 February becomes 28 February)"""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+def age_band(min_age, max_age=None, day=None):
+    """Get the birth dates of people aged min_age <= age < max_age on day (default today)"""
+    day = day or today()
+    end = years_before(day, min_age) + timedelta(days=1)
+    if max_age is None:
+        return DateRange(date.min, end)
+    return DateRange(years_before(day, max_age) + timedelta(days=1), end)
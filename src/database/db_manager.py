@@ -5,23 +5,103 @@ Handles all database operations with SQLite
 
 import sqlite3
 import os
-from datetime import datetime
-import hashlib
+from datetime import date, datetime, timedelta
+import threading
+from contextlib import contextmanager
+
+from src.auth.passwords import PasswordHasher
+from src.database.connection_pool import ConnectionPool
+from src.database.pragmas import resolve_profile, apply_pragmas, read_pragmas
+from src.database.indexes import ensure_indexes, verify_query_plans
+from src.database.counters import ensure_counters, rebuild_counters, read_counter, read_counter_range
+from src.database.rollups import ensure_rollups, rebuild_rollups
+from src.database.payments import ensure_payment_ledger, payment_error, PaymentError
+from src.database.aging import run_aging, read_summary
+from src.database.backup import backup_database, PAGES_PER_STEP, STEP_SLEEP
+from src.database.wal_archive import WalArchiver, ARCHIVE_INTERVAL
+from src.database.backup_scheduler import BackupScheduler, CHECK_INTERVAL
+from src.database.search import ensure_search_index, match_expression
+from src.database.scheduling import (
+    AppointmentBook, SlotFinder, WORKING_HOURS, SLOT_STEP_MINUTES, as_date, recurring_dates
+)
+from src.database.availability import (
+    AvailabilityExpander, EXCEPTION_KINDS, mask_windows, time_to_minutes, minutes_to_time
+)
+from src.database.date_ranges import DateRange, today
+from src.database.queries import QUERIES
+
+# Keyset of the bill list before its first page; sorts after every
+# (bill_date, bill_id) since '~' follows the digits of any date
+FIRST_BILL_KEY = ('~', 2 ** 63 - 1)
+
+# Bill list status filters that are not a payment_status value
+BILL_FILTER_ALL = 'all'
+BILL_FILTER_OVERDUE = 'overdue'
 
 class DatabaseManager:
-    def __init__(self, db_path="data/hospital.db"):
+    def __init__(self, db_path="data/hospital.db", pool_size=4, profile="durable", queries=None,
+                 working_hours=WORKING_HOURS, wal_archive=None, archive_interval=ARCHIVE_INTERVAL,
+                 backup_store=None, backup_retention=None, backup_interval=CHECK_INTERVAL):
         self.db_path = db_path
+        self.wal_archive = wal_archive
+        self.working_hours = working_hours
         self.ensure_data_directory()
-        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+        self.pragma_profile = resolve_profile(profile)
+        self.queries = queries or QUERIES
+        self._local = threading.local()
+        self.pool = ConnectionPool(
+            self.db_path, readers=pool_size, on_connect=self._configure_connection,
+            cached_statements=max(128, len(self.queries.names()) * 2)
+        )
+        # Writer connection, kept for code that needs the raw connection
+        self.conn = self.pool.writer_connection
+        # Values SQLite actually accepted (e.g. WAL is refused for :memory:)
+        self.pragma_settings = read_pragmas(self.conn, list(self.pragma_profile))
+        
+        # Continuous WAL archiving for point-in-time restore; see wal_archive.py
+        self.wal_archiver = None
+        if wal_archive:
+            self.wal_archiver = WalArchiver(self, wal_archive, interval=archive_interval)
+            self.wal_archiver.start()
+            
+        # Scheduled snapshots with verification and retention; see backup_scheduler.py
+        self.backup_scheduler = None
+        if backup_store:
+            self.backup_scheduler = BackupScheduler(
+                self.db_path, backup_store, retention=backup_retention, interval=backup_interval
+            )
+            self.backup_scheduler.start()
+            
+    def _configure_connection(self, conn):
+        """Apply the startup PRAGMA profile to a new pooled connection"""
+        apply_pragmas(conn, self.pragma_profile)
+        if self.wal_archive:
+            # Only the archiver may checkpoint, once the frames are archived
+            conn.execute("PRAGMA wal_autocheckpoint = 0").fetchall()
+        
+    def get_pragma_report(self):
+        """Get the PRAGMA values in effect on the writer and one reader connection"""
+        with self.pool.writer() as conn:
+            report = {'writer': read_pragmas(conn)}
+        if self.pool.reader_count:
+            with self.pool.reader() as conn:
+                report['reader'] = read_pragmas(conn)
+        return report
         
     def ensure_data_directory(self):
         """Ensure data directory exists"""
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        
+        directory = os.path.dirname(self.db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            
     def create_tables(self):
         """Create all required database tables"""
-        cursor = self.conn.cursor()
+        with self.pool.writer() as conn:
+            self._create_tables(conn)
+            
+    def _create_tables(self, conn):
+        """Create all required database tables on the given connection"""
+        cursor = conn.cursor()
         
         # Users table (for authentication)
         cursor.execute('''
@@ -93,9 +173,60 @@ class DatabaseManager:
                 duration_minutes INTEGER DEFAULT 30,
                 status TEXT DEFAULT 'scheduled',
                 notes TEXT,
+                series_id INTEGER,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (patient_id) REFERENCES patients (patient_id),
+                FOREIGN KEY (doctor_id) REFERENCES doctors (doctor_id),
+                FOREIGN KEY (series_id) REFERENCES appointment_series (series_id)
+            )
+        ''')
+        # Databases created before recurring appointments lack the column
+        self._ensure_column(conn, 'appointments', 'series_id',
+                            'INTEGER REFERENCES appointment_series (series_id)')
+                            
+        # Recurring appointment series; each occurrence is an appointments row
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS appointment_series (
+                series_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id INTEGER NOT NULL,
+                doctor_id INTEGER NOT NULL,
+                first_date DATE NOT NULL,
+                appointment_time TIME NOT NULL,
+                duration_minutes INTEGER DEFAULT 30,
+                interval_days INTEGER NOT NULL CHECK (interval_days > 0),
+                occurrences INTEGER NOT NULL CHECK (occurrences > 0),
+                notes TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (patient_id) REFERENCES patients (patient_id),
+                FOREIGN KEY (doctor_id) REFERENCES doctors (doctor_id)
+            )
+        ''')
+        
+        # Weekly working hours per doctor; several rows per weekday allowed.
+        # Replaces the free-text doctors.schedule column, which is no longer used.
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS doctor_schedules (
+                schedule_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doctor_id INTEGER NOT NULL,
+                weekday INTEGER NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+                start_time TIME NOT NULL,
+                end_time TIME NOT NULL CHECK (end_time > start_time),
+                FOREIGN KEY (doctor_id) REFERENCES doctors (doctor_id)
+            )
+        ''')
+        
+        # Dated changes to the weekly hours: leave or extra on-call time
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS doctor_schedule_exceptions (
+                exception_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                doctor_id INTEGER NOT NULL,
+                exception_date DATE NOT NULL,
+                kind TEXT NOT NULL CHECK (kind IN ('leave', 'on_call')),
+                start_time TIME,
+                end_time TIME,
+                reason TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (doctor_id) REFERENCES doctors (doctor_id)
             )
         ''')
@@ -118,14 +249,14 @@ class DatabaseManager:
             )
         ''')
         
-        # Billing table
+        # Billing table; amounts are integer cents (see src/utils/money.py)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS billing (
                 bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 patient_id INTEGER NOT NULL,
                 appointment_id INTEGER,
-                total_amount DECIMAL(10,2) NOT NULL,
-                paid_amount DECIMAL(10,2) DEFAULT 0,
+                total_cents INTEGER NOT NULL,
+                paid_cents INTEGER NOT NULL DEFAULT 0,
                 payment_status TEXT DEFAULT 'pending',
                 payment_method TEXT,
                 bill_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
@@ -136,6 +267,53 @@ class DatabaseManager:
             )
         ''')
         
+        # Payments ledger; rows are only ever inserted, see src/database/payments.py
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS payments (
+                payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bill_id INTEGER NOT NULL,
+                amount_cents INTEGER NOT NULL CHECK (amount_cents > 0),
+                payment_method TEXT,
+                paid_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                notes TEXT,
+                FOREIGN KEY (bill_id) REFERENCES billing (bill_id)
+            )
+        ''')
+        
+        # Receivables aging: one row per run, its bucket totals, and the
+        # latest run's unpaid bills for dunning lists (src/database/aging.py)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS aging_runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                as_of DATE NOT NULL,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                current_bills INTEGER NOT NULL DEFAULT 0,
+                current_cents INTEGER NOT NULL DEFAULT 0,
+                marked_overdue INTEGER NOT NULL DEFAULT 0,
+                cleared_overdue INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS aging_buckets (
+                run_id INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                bills INTEGER NOT NULL,
+                outstanding_cents INTEGER NOT NULL,
+                PRIMARY KEY (run_id, bucket),
+                FOREIGN KEY (run_id) REFERENCES aging_runs (run_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS aging_bills (
+                bill_id INTEGER PRIMARY KEY,
+                patient_id INTEGER NOT NULL,
+                due_date DATE NOT NULL,
+                days_overdue INTEGER NOT NULL,
+                bucket TEXT NOT NULL,
+                balance_cents INTEGER NOT NULL
+            )
+        ''')
+        
         # Staff table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS staff (
@@ -171,11 +349,412 @@ class DatabaseManager:
             )
         ''')
         
-        self.conn.commit()
+        # Databases created before amounts were kept in cents
+        self.money_migrated = [
+            table for table, columns in (
+                ('billing', {'total_amount': 'total_cents', 'paid_amount': 'paid_cents'}),
+                ('payments', {'amount': 'amount_cents'})
+            ) if self._migrate_to_cents(conn, table, columns)
+        ]
+        
+        # Secondary indexes for the hot query predicates
+        self.index_changes = ensure_indexes(conn)
+        
+        # Bill paid amounts and statuses follow the payments ledger
+        self.ledger_backfilled = ensure_payment_ledger(conn)
+        
+        # Trigger-maintained row counts for the dashboards
+        self.counter_changes = ensure_counters(conn)
+        
+        # Trigger-maintained revenue and appointment rollups for the reports
+        self.rollup_changes = ensure_rollups(conn)
+        
+        # Full-text patient search index
+        self.search_index_rebuilt = ensure_search_index(conn)
+        
+        self._commit(conn)
+        
+    def _ensure_column(self, conn, table, column, definition):
+        """Add a column to an existing table if it is missing"""
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            
+    def _migrate_to_cents(self, conn, table, columns):
+        """Replace REAL money columns with integer cents columns
+        
+        columns maps each old column to its cents column. Triggers that
+        refer to the table are dropped first; ensure_payment_ledger(),
+        ensure_counters() and ensure_rollups() recreate them and recompute
+        the rollups. Returns True if the table was migrated.
+        """
+        existing = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        old_columns = [column for column in columns if column in existing]
+        if not old_columns:
+            return False
+            
+        for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND (tbl_name = ? OR sql LIKE ?)",
+            (table, f"%{table}%")
+        ).fetchall():
+            conn.execute(f"DROP TRIGGER {row[0]}")
+            
+        for old in old_columns:
+            cents = columns[old]
+            if cents not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {cents} INTEGER NOT NULL DEFAULT 0")
+            conn.execute(f"UPDATE {table} SET {cents} = CAST(ROUND(COALESCE({old}, 0) * 100) AS INTEGER)")
+            conn.execute(f"ALTER TABLE {table} DROP COLUMN {old}")
+        return True
+        
+    def backup(self, destination, compress=False, pages_per_step=PAGES_PER_STEP, step_sleep=STEP_SLEEP):
+        """Take an online backup of the database and return its BackupReport
+        
+        Uses the SQLite backup API on a separate connection, so the copy is
+        consistent even while the application keeps reading and writing.
+        See src/database/backup.py.
+        """
+        return backup_database(
+            self.db_path, destination, pages_per_step=pages_per_step,
+            step_sleep=step_sleep, compress=compress
+        )
+        
+    def verify_indexes(self, queries=None):
+        """Run EXPLAIN QUERY PLAN over the hot queries and report index usage"""
+        if queries is None:
+            queries = self.queries.indexed_queries()
+        with self.pool.reader() as conn:
+            return verify_query_plans(conn, queries)
+            
+    def get_counter(self, name, bucket=''):
+        """Get a trigger-maintained row count"""
+        with self.pool.reader() as conn:
+            return read_counter(conn, name, bucket)
+            
+    def get_counter_range(self, name, start=None, end=None):
+        """Get a per-day row count summed over start <= day < end"""
+        with self.pool.reader() as conn:
+            return read_counter_range(conn, name, start, end)
+            
+    def get_dashboard_counts(self):
+        """Get the totals shown on the dashboards without counting rows"""
+        today = datetime.now().date()
+        week_ago = (today - timedelta(days=7)).isoformat()
+        # created_at is stored in UTC by CURRENT_TIMESTAMP
+        utc_week_ago = (datetime.utcnow().date() - timedelta(days=7)).isoformat()
+        
+        with self.pool.reader() as conn:
+            return {
+                'patients': read_counter(conn, 'patients'),
+                'doctors': read_counter(conn, 'doctors'),
+                'appointments': read_counter(conn, 'appointments'),
+                'appointments_today': read_counter(conn, 'appointments_by_date', today.isoformat()),
+                'appointments_last_7_days': read_counter_range(conn, 'appointments_by_date', week_ago),
+                'patients_last_7_days': read_counter_range(conn, 'patients_by_created_date', utc_week_ago),
+                'bills_pending': read_counter(conn, 'bills_pending')
+            }
+            
+    def rebuild_counters(self):
+        """Recount every statistics counter from its table"""
+        with self.transaction() as conn:
+            rebuild_counters(conn)
+            
+    def rebuild_rollups(self):
+        """Recompute every rollup table from its source table"""
+        with self.transaction() as conn:
+            rebuild_rollups(conn)
+            
+    def record_payment(self, bill_id, amount, payment_method, notes='', paid_at=None):
+        """Append a Money payment to the ledger and return its payment_id
+        
+        The bill's paid amount and status are updated by trigger in the same
+        write transaction, so concurrent payments never overwrite each
+        other. Raises PaymentError if the bill does not exist or the amount
+        is not positive or exceeds the outstanding balance.
+        """
+        if amount.cents <= 0:
+            raise PaymentError(bill_id, "Payment amount must be greater than 0")
+        if paid_at is None:
+            paid_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+        try:
+            with self.transaction() as conn:
+                cursor = self.queries.execute(
+                    conn, 'payment_insert', (bill_id, amount.cents, payment_method, paid_at, notes)
+                )
+                return cursor.lastrowid
+        except sqlite3.IntegrityError as e:
+            error = payment_error(bill_id, e)
+            if error is None:
+                raise
+            raise error from e
+            
+    def get_bill_payments(self, bill_id):
+        """Get the ledger entries of a bill, oldest first"""
+        return self.execute_named('bill_payments', (bill_id,))
+        
+    def get_doctor_daily_load(self, start_date, end_date):
+        """Get (doctor_id, day, active appointments, booked minutes) per doctor-day with bookings"""
+        with self.pool.reader() as conn:
+            cursor = self.queries.execute(
+                conn, 'doctor_daily_load_between',
+                (as_date(start_date).isoformat(), as_date(end_date).isoformat())
+            )
+            cursor.row_factory = None
+            return cursor.fetchall()
+            
+    def search_patients(self, text, limit=50):
+        """Search patients by name, patient ID, national ID or phone
+        
+        Every word is matched as a prefix and results are ranked by relevance.
+        """
+        match = match_expression(text)
+        if match is None:
+            return []
+        return self.execute_named('patients_search', (today().isoformat(), match, limit))
+        
+    def get_patients_page(self, after_id, limit):
+        """Get the next keyset page of patients after after_id, newest first"""
+        return self.execute_named('patients_page', (today().isoformat(), after_id, limit))
+        
+    def run_aging(self, day=None):
+        """Run the receivables aging job as of day (default today) and return its summary
+        
+        Marks bills past their due date 'overdue' and stores the
+        0-30/31-60/61-90/90+ bucket totals and the aged bills, see
+        src/database/aging.py.
+        """
+        day = as_date(day) if day is not None else today()
+        with self.transaction() as conn:
+            return run_aging(conn, day)
+            
+    def get_aging_summary(self, refresh=True):
+        """Get the latest aging run's summary, first running the job if it has not run today
+        
+        Returns None if the job never ran and refresh is False.
+        """
+        latest = self.execute_named('aging_latest_run')
+        if refresh and (not latest or latest[0]['as_of'] != today().isoformat()):
+            return self.run_aging()
+        if not latest:
+            return None
+        with self.pool.reader() as conn:
+            return read_summary(conn, latest[0]['run_id'])
+            
+    def get_dunning_list(self, min_days=1, limit=100):
+        """Get unpaid bills at least min_days past due as of the latest aging run"""
+        return self.execute_named('dunning_list', (min_days, limit))
+        
+    def get_bills_page(self, after_key, limit, status=BILL_FILTER_ALL, date_range=None):
+        """Get the next keyset page of bills after after_key, newest first
+        
+        after_key is the (bill_date, bill_id) of the last bill shown, or
+        FIRST_BILL_KEY. status is BILL_FILTER_ALL, BILL_FILTER_OVERDUE or a
+        payment_status; date_range limits bill_date (default: all dates).
+        """
+        if date_range is None:
+            date_range = DateRange(date.min, date.max)
+        params = (today().isoformat(),) + date_range.params()
+        status = (status or BILL_FILTER_ALL).lower()
+        if status == BILL_FILTER_ALL:
+            name = 'bills_page'
+        elif status == BILL_FILTER_OVERDUE:
+            name = 'bills_page_overdue'
+        else:
+            name = 'bills_page_by_status'
+            params += (status,)
+        return self.execute_named(name, params + tuple(after_key) + (limit,))
+        
+    def book_appointment(self, patient_id, doctor_id, appointment_date, appointment_time,
+                         duration_minutes=30, notes='', status='scheduled'):
+        """Insert an appointment unless it overlaps one of the doctor's others
+        
+        The checks and the insert run in one write transaction. Raises
+        AppointmentConflictError on overlap and DoctorUnavailableError (a
+        subclass) outside the doctor's working time; returns the new
+        appointment_id.
+        """
+        with self.transaction() as conn:
+            availability = AvailabilityExpander(conn, self.queries, self.working_hours)
+            return AppointmentBook(conn, self.queries, availability).book(
+                patient_id, doctor_id, appointment_date, appointment_time,
+                duration_minutes, notes, status
+            )
+            
+    def book_appointments(self, requests, skip_conflicts=False):
+        """Book many appointments in one write transaction
+        
+        requests are (patient_id, doctor_id, date, time[, duration_minutes[,
+        notes]]) tuples. All of them are checked in one pass and inserted
+        with one statement; unless skip_conflicts is set nothing is booked
+        if any of them fails. Returns one outcome dict per request (see
+        AppointmentBook.book_many).
+        """
+        with self.transaction() as conn:
+            availability = AvailabilityExpander(conn, self.queries, self.working_hours)
+            return AppointmentBook(conn, self.queries, availability).book_many(requests, skip_conflicts)
+            
+    def book_recurring(self, patient_id, doctor_id, first_date, appointment_time, occurrences,
+                       duration_minutes=30, interval_days=7, notes='', skip_conflicts=False):
+        """Book a recurring series, e.g. every Tuesday 10:00 for 12 weeks
+        
+        Returns (series_id, outcomes) with one outcome per occurrence;
+        series_id is None if nothing was booked.
+        """
+        dates = recurring_dates(first_date, occurrences, interval_days)
+        requests = [
+            (patient_id, doctor_id, day, appointment_time, duration_minutes, notes) for day in dates
+        ]
+        with self.transaction() as conn:
+            cursor = self.queries.execute(conn, 'appointment_series_insert', (
+                patient_id, doctor_id, dates[0].isoformat(), appointment_time,
+                duration_minutes, interval_days, len(dates), notes
+            ))
+            series_id = cursor.lastrowid
+            availability = AvailabilityExpander(conn, self.queries, self.working_hours)
+            outcomes = AppointmentBook(conn, self.queries, availability).book_many(
+                requests, skip_conflicts, series_id
+            )
+            if not any(outcome['appointment_id'] for outcome in outcomes):
+                self.queries.execute(conn, 'appointment_series_delete', (series_id,))
+                series_id = None
+        return series_id, outcomes
+        
+    def cancel_appointment_series(self, series_id, from_date=None):
+        """Cancel the scheduled occurrences of a series on or after from_date (default: today)"""
+        if from_date is None:
+            from_date = datetime.now().date()
+        with self.transaction() as conn:
+            cursor = self.queries.execute(
+                conn, 'appointment_series_cancel', (series_id, as_date(from_date).isoformat())
+            )
+            return cursor.rowcount
+            
+    def get_series_appointments(self, series_id):
+        """Get the appointments of a recurring series in date order"""
+        return self.execute_named('appointment_series_appointments', (series_id,))
+        
+    def get_appointments_between(self, start_date, end_date):
+        """Get every appointment on start_date <= day < end_date with one range query
+        
+        Returns plain (appointment_id, doctor_id, appointment_date,
+        appointment_time, duration_minutes, status) tuples, which are much
+        cheaper than Rows for a month of appointments.
+        """
+        with self.pool.reader() as conn:
+            cursor = self.queries.execute(
+                conn, 'appointments_between',
+                (as_date(start_date).isoformat(), as_date(end_date).isoformat())
+            )
+            cursor.row_factory = None
+            return cursor.fetchall()
+            
+    def find_appointment_conflict(self, doctor_id, appointment_date, appointment_time, duration_minutes=30):
+        """Get the id of an appointment that [time, time + duration) would overlap, or None"""
+        with self.pool.reader() as conn:
+            return AppointmentBook(conn, self.queries).find_conflict(
+                doctor_id, appointment_date, appointment_time, duration_minutes
+            )
+            
+    def find_free_slots(self, start_date, end_date, duration_minutes=30, doctor_id=None,
+                        specialization=None, limit=10, step_minutes=SLOT_STEP_MINUTES, not_before=None):
+        """Get the earliest free appointment slots on start_date <= day < end_date
+        
+        Searches one doctor, every available doctor of a specialization or
+        every available doctor, within the working hours. Slots starting
+        before not_before (default: now) are skipped.
+        """
+        if not_before is None:
+            not_before = datetime.now()
+            
+        with self.pool.reader() as conn:
+            if doctor_id is not None:
+                rows = self.queries.execute(conn, 'doctor_by_id', (doctor_id,)).fetchall()
+            elif specialization is not None:
+                rows = self.queries.execute(conn, 'available_doctors_by_specialization', (specialization,)).fetchall()
+            else:
+                rows = self.queries.execute(conn, 'available_doctors').fetchall()
+            doctors = {row['doctor_id']: f"{row['first_name']} {row['last_name']}" for row in rows}
+            
+            finder = SlotFinder(conn, self.queries, self.working_hours, step_minutes)
+            return finder.find(
+                doctors, as_date(start_date), as_date(end_date),
+                duration_minutes, limit, not_before
+            )
+            
+    def get_doctor_schedule(self, doctor_id):
+        """Get a doctor's weekly template rows (weekday 0 is Monday)"""
+        return self.execute_named('doctor_schedule_for_doctor', (doctor_id,))
+        
+    def set_doctor_schedule(self, doctor_id, hours):
+        """Replace a doctor's weekly template with (weekday, start_time, end_time) rows
+        
+        An empty list removes the template, so the default working hours
+        apply again.
+        """
+        rows = []
+        for weekday, start_time, end_time in hours:
+            start, end = time_to_minutes(start_time), time_to_minutes(end_time)
+            if not 0 <= int(weekday) <= 6:
+                raise ValueError(f"Invalid weekday: {weekday!r}")
+            if end <= start:
+                raise ValueError(f"End time must be after start time ({start_time}-{end_time})")
+            rows.append((doctor_id, int(weekday), minutes_to_time(start), minutes_to_time(end)))
+            
+        with self.transaction() as conn:
+            self.queries.execute(conn, 'doctor_schedule_clear', (doctor_id,))
+            for row in rows:
+                self.queries.execute(conn, 'doctor_schedule_insert', row)
+                
+    def add_schedule_exception(self, doctor_id, exception_date, kind, start_time=None, end_time=None, reason=''):
+        """Record leave or on-call time for one date; without times it covers the whole day"""
+        if kind not in EXCEPTION_KINDS:
+            raise ValueError(f"Exception kind must be one of {', '.join(EXCEPTION_KINDS)}")
+        if (start_time is None) != (end_time is None):
+            raise ValueError("Give both a start and an end time, or neither")
+        if start_time is not None:
+            start, end = time_to_minutes(start_time), time_to_minutes(end_time)
+            if end <= start:
+                raise ValueError(f"End time must be after start time ({start_time}-{end_time})")
+            start_time, end_time = minutes_to_time(start), minutes_to_time(end)
+            
+        return self.execute_named_insert('doctor_exception_insert', (
+            doctor_id, as_date(exception_date).isoformat(), kind, start_time, end_time, reason
+        ))
+        
+    def remove_schedule_exception(self, exception_id):
+        """Delete a schedule exception"""
+        return self.execute_named_update('doctor_exception_delete', (exception_id,))
+        
+    def get_schedule_exceptions(self, doctor_id, from_date=None):
+        """Get a doctor's schedule exceptions from a date on (default: today)"""
+        from_date = as_date(from_date) if from_date is not None else datetime.now().date()
+        return self.execute_named('doctor_exceptions_for_doctor', (doctor_id, from_date.isoformat()))
+        
+    def get_doctor_availability(self, doctor_id, start_date, end_date):
+        """Get {date: [(start_time, end_time)]} working windows on start_date <= day < end_date"""
+        start_date, end_date = as_date(start_date), as_date(end_date)
+        availability = {}
+        with self.pool.reader() as conn:
+            expander = AvailabilityExpander(conn, self.queries, self.working_hours)
+            expander.load_range(start_date, end_date)
+            day = start_date
+            while day < end_date:
+                availability[day.isoformat()] = [
+                    (minutes_to_time(start), minutes_to_time(end))
+                    for start, end in mask_windows(expander.day_mask(doctor_id, day))
+                ]
+                day += timedelta(days=1)
+        return availability
         
     def create_default_admin(self):
         """Create default admin user if not exists"""
-        cursor = self.conn.cursor()
+        with self.pool.writer() as conn:
+            self._create_default_admin(conn)
+            
+    def _create_default_admin(self, conn):
+        """Create default admin user on the given connection"""
+        cursor = conn.cursor()
         
         # Check if admin already exists
         cursor.execute("SELECT user_id FROM users WHERE username = ?", ("admin",))
@@ -183,38 +762,135 @@ class DatabaseManager:
             return
             
         # Create default admin
-        password_hash = hashlib.sha256("admin123".encode()).hexdigest()
+        password_hash = PasswordHasher().hash("admin123")
         cursor.execute('''
             INSERT INTO users (username, password_hash, role, full_name, email)
             VALUES (?, ?, ?, ?, ?)
         ''', ("admin", password_hash, "admin", "System Administrator", "admin@hospital.com"))
         
-        self.conn.commit()
+        self._commit(conn)
         
     def execute_query(self, query, params=None):
         """Execute a query and return results"""
-        cursor = self.conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        return cursor.fetchall()
-        
+        with self.pool.reader() as conn:
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return cursor.fetchall()
+            
     def execute_insert(self, query, params):
         """Execute insert query and return last row id"""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        self.conn.commit()
-        return cursor.lastrowid
-        
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            self._commit(conn)
+            return cursor.lastrowid
+            
     def execute_update(self, query, params):
         """Execute update/delete query"""
-        cursor = self.conn.cursor()
-        cursor.execute(query, params)
-        self.conn.commit()
-        return cursor.rowcount
+        with self.pool.writer() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            self._commit(conn)
+            return cursor.rowcount
+            
+    def execute_named(self, name, params=None):
+        """Execute a registered read query and return results"""
+        with self.pool.reader() as conn:
+            return self.queries.execute(conn, name, params).fetchall()
+            
+    def execute_named_insert(self, name, params):
+        """Execute a registered insert query and return last row id"""
+        with self.pool.writer() as conn:
+            cursor = self.queries.execute(conn, name, params)
+            self._commit(conn)
+            return cursor.lastrowid
+            
+    def execute_named_update(self, name, params):
+        """Execute a registered update/delete query"""
+        with self.pool.writer() as conn:
+            cursor = self.queries.execute(conn, name, params)
+            self._commit(conn)
+            return cursor.rowcount
+            
+    def get_query_stats(self):
+        """Get call and timing counters per named query"""
+        return self.queries.stats()
+        
+    def execute_insert_many(self, query, params_seq):
+        """Execute an insert for every parameter set with a single commit
+        
+        params_seq may be any iterable (including a generator), so large
+        imports are streamed instead of built up in memory.
+        Returns the number of rows inserted.
+        """
+        with self.transaction() as conn:
+            cursor = conn.executemany(query, params_seq)
+            return cursor.rowcount
+            
+    def execute_update_many(self, query, params_seq):
+        """Execute an update/delete for every parameter set with a single commit"""
+        with self.transaction() as conn:
+            cursor = conn.executemany(query, params_seq)
+            return cursor.rowcount
+            
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one commit
+        
+        Yields the writer connection. execute_insert/execute_update calls made
+        on the same thread inside the block join the transaction instead of
+        committing. Everything is rolled back if the block raises. Nested
+        transaction() blocks become savepoints.
+        """
+        with self.pool.writer() as conn:
+            depth = getattr(self._local, 'transaction_depth', 0)
+            
+            if depth == 0:
+                if conn.in_transaction:
+                    conn.commit()
+                # Take the write lock up front so the block cannot fail
+                # half-way with SQLITE_BUSY on its first write
+                conn.execute("BEGIN IMMEDIATE")
+            else:
+                conn.execute(f"SAVEPOINT tx_{depth}")
+                
+            self._local.transaction_depth = depth + 1
+            try:
+                yield conn
+            except BaseException:
+                self._local.transaction_depth = depth
+                if depth == 0:
+                    conn.rollback()
+                else:
+                    conn.execute(f"ROLLBACK TO SAVEPOINT tx_{depth}")
+                    conn.execute(f"RELEASE SAVEPOINT tx_{depth}")
+                raise
+            else:
+                self._local.transaction_depth = depth
+                if depth == 0:
+                    conn.commit()
+                else:
+                    conn.execute(f"RELEASE SAVEPOINT tx_{depth}")
+                    
+    def in_transaction(self):
+        """Check if the current thread is inside a transaction() block"""
+        return getattr(self._local, 'transaction_depth', 0) > 0
         
+    def _commit(self, conn):
+        """Commit unless the current thread is inside a transaction() block"""
+        if not self.in_transaction():
+            conn.commit()
+            
     def close(self):
-        """Close database connection"""
-        if self.conn:
-            self.conn.close()
+        """Close all pooled database connections"""
+        if self.backup_scheduler:
+            self.backup_scheduler.stop()
+            self.backup_scheduler = None
+        if self.wal_archiver:
+            self.wal_archiver.stop()
+            self.wal_archiver = None
+        if self.pool:
+            self.pool.close()
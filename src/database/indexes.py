@@ -0,0 +1,125 @@
+"""
+Index Management for Hospital Management System
+Managed secondary indexes and EXPLAIN QUERY PLAN verification
+"""
+
+import re
+
+# Every index whose name starts with this prefix is owned by ensure_indexes();
+# managed indexes that are no longer listed below get dropped on startup
+MANAGED_PREFIX = "idx_"
+
+# (index name, table, columns) for every hot predicate and sort order
+INDEXES = [
+    # Appointment lists, conflict checks and per-doctor schedules; duration
+    # and status are included so conflict and free-slot checks never read
+    # the table itself
+    ("idx_appointments_doctor_date_time", "appointments", "doctor_id, appointment_date, appointment_time, duration_minutes, status"),
+    ("idx_appointments_date_time", "appointments", "appointment_date, appointment_time, doctor_id, duration_minutes, status"),
+    ("idx_appointments_patient", "appointments", "patient_id, appointment_date, appointment_time"),
+    ("idx_appointments_status", "appointments", "status"),
+    ("idx_appointments_series", "appointments", "series_id, appointment_date"),
+    
+    # Doctor schedule templates and exceptions
+    ("idx_doctor_schedules_doctor", "doctor_schedules", "doctor_id, weekday"),
+    ("idx_schedule_exceptions_date", "doctor_schedule_exceptions", "exception_date, doctor_id"),
+    ("idx_schedule_exceptions_doctor", "doctor_schedule_exceptions", "doctor_id, exception_date"),
+    
+    # Billing lists and summary cards
+    ("idx_billing_patient", "billing", "patient_id"),
+    ("idx_billing_status_due", "billing", "payment_status, due_date"),
+    ("idx_billing_bill_date", "billing", "bill_date"),
+    ("idx_billing_status_bill_date", "billing", "payment_status, bill_date"),
+    ("idx_payments_bill", "payments", "bill_id"),
+    
+    # Dunning lists read the latest aging snapshot, most overdue first
+    ("idx_aging_bills_days", "aging_bills", "days_overdue, bill_id"),
+    
+    # Patient lists sorted by name and "new patients" reports
+    ("idx_patients_name", "patients", "last_name, first_name"),
+    ("idx_patients_first_name", "patients", "first_name"),
+    ("idx_patients_created_at", "patients", "created_at"),
+]
+
+def _normalize_sql(sql):
+    """Collapse whitespace and case so index definitions can be compared"""
+    return re.sub(r"\s+", " ", sql or "").strip().lower()
+
+def index_sql(name, table, columns):
+    """Build the CREATE INDEX statement for a managed index"""
+    return f"CREATE INDEX {name} ON {table} ({columns})"
+
+def ensure_indexes(conn, indexes=None):
+    """Create, rebuild and drop managed indexes so the schema matches INDEXES
+    
+    Returns a dict listing the created, rebuilt and dropped index names.
+    The caller is responsible for committing.
+    """
+    indexes = INDEXES if indexes is None else indexes
+    wanted = {name: index_sql(name, table, columns) for name, table, columns in indexes}
+    
+    existing = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND name LIKE ?",
+            (MANAGED_PREFIX + "%",)
+        )
+    }
+    
+    result = {'created': [], 'rebuilt': [], 'dropped': []}
+    
+    for name in existing:
+        if name not in wanted:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+            result['dropped'].append(name)
+            
+    for name, sql in wanted.items():
+        if name not in existing:
+            conn.execute(sql)
+            result['created'].append(name)
+        elif _normalize_sql(existing[name]) != _normalize_sql(sql):
+            conn.execute(f"DROP INDEX {name}")
+            conn.execute(sql)
+            result['rebuilt'].append(name)
+            
+    if result['created'] or result['rebuilt']:
+        # Refresh planner statistics for the new indexes
+        conn.execute("PRAGMA optimize")
+        
+    return result
+
+def _parameter_count(sql):
+    """Count the parameters of a statement using ? and ?NNN placeholders"""
+    # A bare ? takes the number after the largest one used so far
+    count = 0
+    for number in re.findall(r"\?(\d*)", sql):
+        count = max(count, int(number)) if number else count + 1
+    return count
+
+def explain_query_plan(conn, sql, params=None):
+    """Return the EXPLAIN QUERY PLAN detail lines for a query"""
+    if params is None:
+        params = (None,) * _parameter_count(sql)
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+def verify_query_plans(conn, queries):
+    """Check that every query in {name: sql} is answered through an index
+    
+    Returns one dict per query with its plan and the table scans that
+    did not use an index. A query passes when it has no such scans.
+    """
+    report = []
+    
+    for name, sql in queries.items():
+        plan = explain_query_plan(conn, sql)
+        full_scans = [
+            line for line in plan
+            if line.startswith("SCAN ") and " USING " not in line
+        ]
+        report.append({
+            'name': name,
+            'uses_index': not full_scans,
+            'full_scans': full_scans,
+            'plan': plan
+        })
+        
+    return report
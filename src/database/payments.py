@@ -0,0 +1,117 @@
+"""
+Payment Ledger for Hospital Management System
+Append-only payments with each bill's paid amount and status kept by triggers
+"""
+
+# Every trigger whose name starts with this prefix is owned by ensure_payment_ledger()
+TRIGGER_PREFIX = "trg_payment_"
+
+# Note on the ledger entry that carries a paid amount a bill was created
+# with (or had before the ledger existed)
+OPENING_NOTE = "Opening balance"
+
+class PaymentError(Exception):
+    """Raised when a payment is rejected by the ledger"""
+    
+    def __init__(self, bill_id, message):
+        self.bill_id = bill_id
+        super().__init__(message)
+
+# Messages raised by the triggers, mapped back to PaymentError by record_payment()
+BILL_NOT_FOUND = "Bill not found"
+EXCEEDS_BALANCE = "Payment exceeds the outstanding balance"
+APPEND_ONLY = "Payments are append-only"
+
+TRIGGERS = {
+    # Reject payments for missing bills or above the remaining balance. The
+    # check and the insert run under the same write lock, so two cashiers
+    # paying the same bill cannot both pass it.
+    f"{TRIGGER_PREFIX}check": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}check BEFORE INSERT ON payments BEGIN "
+        f"SELECT RAISE(ABORT, '{BILL_NOT_FOUND}') "
+        f"WHERE NOT EXISTS (SELECT 1 FROM billing WHERE bill_id = NEW.bill_id); "
+        f"SELECT RAISE(ABORT, '{EXCEEDS_BALANCE}') FROM billing "
+        f"WHERE bill_id = NEW.bill_id AND NEW.amount_cents > total_cents - paid_cents; END"
+    ),
+    
+    # Add each payment to its bill; SET expressions see the old row. An
+    # overdue bill stays overdue until it is paid in full or re-aged.
+    f"{TRIGGER_PREFIX}apply": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}apply AFTER INSERT ON payments BEGIN "
+        f"UPDATE billing SET "
+        f"paid_cents = paid_cents + NEW.amount_cents, "
+        f"payment_status = CASE "
+        f"WHEN paid_cents + NEW.amount_cents >= total_cents THEN 'paid' "
+        f"WHEN payment_status = 'overdue' THEN 'overdue' "
+        f"WHEN paid_cents + NEW.amount_cents > 0 THEN 'partial' "
+        f"ELSE 'pending' END, "
+        f"payment_method = COALESCE(NEW.payment_method, payment_method) "
+        f"WHERE bill_id = NEW.bill_id; END"
+    ),
+    
+    f"{TRIGGER_PREFIX}no_update": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}no_update BEFORE UPDATE ON payments BEGIN "
+        f"SELECT RAISE(ABORT, '{APPEND_ONLY}'); END"
+    ),
+    f"{TRIGGER_PREFIX}no_delete": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}no_delete BEFORE DELETE ON payments BEGIN "
+        f"SELECT RAISE(ABORT, '{APPEND_ONLY}'); END"
+    ),
+    
+    # A bill inserted with a paid amount gets that amount as its first
+    # ledger entry, so the paid amount always equals the ledger total
+    f"{TRIGGER_PREFIX}opening": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}opening AFTER INSERT ON billing "
+        f"WHEN NEW.paid_cents > 0 BEGIN "
+        f"UPDATE billing SET paid_cents = 0 WHERE bill_id = NEW.bill_id; "
+        f"INSERT INTO payments (bill_id, amount_cents, payment_method, paid_at, notes) "
+        f"VALUES (NEW.bill_id, NEW.paid_cents, NEW.payment_method, NEW.bill_date, '{OPENING_NOTE}'); END"
+    ),
+}
+
+def backfill_ledger(conn):
+    """Add an opening entry for paid amounts the ledger does not cover yet
+    
+    Must run while the ledger triggers are dropped, so the entries do not
+    add to the bills a second time. Returns the number of entries added.
+    """
+    cursor = conn.execute(f'''
+        INSERT INTO payments (bill_id, amount_cents, payment_method, paid_at, notes)
+        SELECT b.bill_id, b.paid_cents - COALESCE(l.total, 0),
+               b.payment_method, b.bill_date, '{OPENING_NOTE}'
+        FROM billing b
+        LEFT JOIN (SELECT bill_id, SUM(amount_cents) as total FROM payments GROUP BY bill_id) l
+            ON l.bill_id = b.bill_id
+        WHERE b.paid_cents > COALESCE(l.total, 0)
+    ''')
+    return cursor.rowcount
+
+def ensure_payment_ledger(conn):
+    """Create the ledger triggers, backfilling the ledger whenever they change
+    
+    Returns the number of opening entries added. The caller is
+    responsible for committing.
+    """
+    existing = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+            (TRIGGER_PREFIX + "%",)
+        )
+    }
+    if existing == TRIGGERS:
+        return 0
+        
+    for name in existing:
+        conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    added = backfill_ledger(conn)
+    for sql in TRIGGERS.values():
+        conn.execute(sql)
+    return added
+
+def payment_error(bill_id, error):
+    """Turn a ledger trigger's IntegrityError into a PaymentError, or None"""
+    message = str(error)
+    for known in (BILL_NOT_FOUND, EXCEEDS_BALANCE, APPEND_ONLY):
+        if known in message:
+            return PaymentError(bill_id, known)
+    return None
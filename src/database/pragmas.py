@@ -0,0 +1,97 @@
+"""
+SQLite PRAGMA profiles for Hospital Management System
+Named startup presets applied to every pooled connection
+"""
+
+# Order matters: journal_mode must be switched before the other settings
+PRAGMA_ORDER = [
+    'journal_mode',
+    'synchronous',
+    'busy_timeout',
+    'cache_size',
+    'mmap_size',
+    'temp_store'
+]
+
+PRAGMA_PROFILES = {
+    # WAL with a full fsync on every commit: nothing committed is ever lost
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+        'cache_size': -16000,      # negative = KiB, so ~16 MB
+        'mmap_size': 0,
+        'temp_store': 'DEFAULT'
+    },
+    # WAL with fsync only at checkpoints: the database cannot corrupt, but the
+    # last few commits may roll back after a power loss
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'cache_size': -32000,
+        'mmap_size': 64 * 1024 * 1024,
+        'temp_store': 'MEMORY'
+    },
+    # No fsync at all; for imports, demos and test databases
+    'fast': {
+        'journal_mode': 'WAL',
+        'synchronous': 'OFF',
+        'busy_timeout': 5000,
+        'cache_size': -64000,
+        'mmap_size': 256 * 1024 * 1024,
+        'temp_store': 'MEMORY'
+    }
+}
+
+DEFAULT_PROFILE = 'durable'
+
+# Numeric values SQLite reports back for enumerated settings
+_SYNCHRONOUS_NAMES = {0: 'OFF', 1: 'NORMAL', 2: 'FULL', 3: 'EXTRA'}
+_TEMP_STORE_NAMES = {0: 'DEFAULT', 1: 'FILE', 2: 'MEMORY'}
+
+def resolve_profile(profile):
+    """Turn a profile name or dict into a settings dict"""
+    if profile is None:
+        profile = DEFAULT_PROFILE
+    if isinstance(profile, str):
+        try:
+            return dict(PRAGMA_PROFILES[profile.lower()])
+        except KeyError:
+            raise ValueError(
+                f"Unknown database profile '{profile}'. "
+                f"Choose one of: {', '.join(sorted(PRAGMA_PROFILES))}"
+            )
+    unknown = set(profile) - set(PRAGMA_ORDER)
+    if unknown:
+        raise ValueError(f"Unsupported PRAGMA settings: {', '.join(sorted(unknown))}")
+    for name, value in profile.items():
+        if not isinstance(value, int) and not str(value).isalnum():
+            raise ValueError(f"Invalid value for PRAGMA {name}: {value!r}")
+    return dict(profile)
+
+def read_pragmas(conn, names=None):
+    """Read the current value of each PRAGMA from a connection"""
+    values = {}
+    for name in names or PRAGMA_ORDER:
+        row = conn.execute(f"PRAGMA {name}").fetchone()
+        # Some settings (e.g. mmap_size on :memory:) report nothing at all
+        value = row[0] if row else None
+        if name == 'synchronous':
+            value = _SYNCHRONOUS_NAMES.get(value, value)
+        elif name == 'temp_store':
+            value = _TEMP_STORE_NAMES.get(value, value)
+        elif name == 'journal_mode' and value:
+            value = value.upper()
+        values[name] = value
+    return values
+
+def apply_pragmas(conn, profile):
+    """Apply a PRAGMA profile to a connection and return the values in effect"""
+    settings = resolve_profile(profile)
+    for name in PRAGMA_ORDER:
+        if name in settings:
+            # PRAGMA values cannot be bound as parameters; they come from
+            # the presets above or from validated configuration only
+            conn.execute(f"PRAGMA {name} = {settings[name]}").fetchall()
+    return read_pragmas(conn, [name for name in PRAGMA_ORDER if name in settings])
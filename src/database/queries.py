@@ -0,0 +1,450 @@
+"""
+Named Queries for Hospital Management System
+Every statement used by the GUI modules and the console interface
+"""
+
+from src.database.query_registry import QueryRegistry
+from src.database.search import SEARCH_TABLE, SEARCH_WEIGHTS
+from src.database.date_ranges import range_predicate, age_expression
+
+QUERIES = QueryRegistry()
+register = QUERIES.register
+
+# Users
+
+# The password is checked against password_hash in Python; see src/auth/passwords.py
+register('user_login', '''
+    SELECT user_id, username, role, full_name, email, phone, is_active, password_hash
+    FROM users
+    WHERE username = ? AND is_active = 1
+''', expect_index=True)
+
+# Patients
+
+# One row per patient with the doctor of their latest appointment, one
+# keyset page at a time: pass today's date, the last patient_id seen and
+# the page size
+register('patients_page', f'''
+    SELECT p.patient_id, p.national_id,
+           (p.first_name || ' ' || p.last_name) as full_name,
+           {age_expression('p.date_of_birth', '?1')} as age,
+           p.gender, p.phone,
+           COALESCE(d.specialization, 'Not Assigned') as department,
+           COALESCE((d.first_name || ' ' || d.last_name), 'Not Assigned') as doctor
+    FROM patients p
+    LEFT JOIN doctors d ON d.doctor_id = (
+        SELECT a.doctor_id FROM appointments a
+        WHERE a.patient_id = p.patient_id
+        ORDER BY a.appointment_date DESC, a.appointment_time DESC
+        LIMIT 1
+    )
+    WHERE p.patient_id < ?
+    ORDER BY p.patient_id DESC
+    LIMIT ?
+''', expect_index=True)
+
+# Patient search through the FTS index: score every match, keep the best
+# ones (with the LIMIT SQLite only keeps that many while sorting), then
+# join only those rows; pass today's date, the match expression and the limit
+register('patients_search', f'''
+    SELECT p.patient_id, p.national_id, p.first_name, p.last_name,
+           (p.first_name || ' ' || p.last_name) as full_name,
+           p.date_of_birth, {age_expression('p.date_of_birth', '?1')} as age,
+           p.gender, p.phone,
+           COALESCE(d.specialization, 'Not Assigned') as department,
+           COALESCE((d.first_name || ' ' || d.last_name), 'Not Assigned') as doctor
+    FROM (
+        SELECT rowid, bm25({SEARCH_TABLE}, {', '.join(str(weight) for weight in SEARCH_WEIGHTS)}) as score
+        FROM {SEARCH_TABLE}
+        WHERE {SEARCH_TABLE} MATCH ?
+        ORDER BY score, rowid DESC
+        LIMIT ?
+    ) m
+    JOIN patients p ON p.patient_id = m.rowid
+    LEFT JOIN doctors d ON d.doctor_id = (
+        SELECT a.doctor_id FROM appointments a
+        WHERE a.patient_id = p.patient_id
+        ORDER BY a.appointment_date DESC, a.appointment_time DESC
+        LIMIT 1
+    )
+    ORDER BY m.score, p.patient_id DESC
+''')
+
+register('patients_list', '''
+    SELECT patient_id, national_id, first_name, last_name,
+           date_of_birth, gender, phone
+    FROM patients
+    ORDER BY last_name, first_name
+''', expect_index=True)
+
+register('patient_choices', '''
+    SELECT patient_id, first_name, last_name FROM patients ORDER BY first_name
+''', expect_index=True)
+
+register('patient_choices_by_last_name', '''
+    SELECT patient_id, first_name, last_name FROM patients ORDER BY last_name
+''', expect_index=True)
+
+register('patient_by_id', '''
+    SELECT * FROM patients WHERE patient_id = ?
+''', expect_index=True)
+
+register('patient_name_by_id', '''
+    SELECT first_name, last_name FROM patients WHERE patient_id = ?
+''', expect_index=True)
+
+register('patient_insert', '''
+    INSERT INTO patients (
+        national_id, first_name, last_name, date_of_birth, gender,
+        phone, email, address, emergency_contact, emergency_phone,
+        blood_group, allergies, insurance_info
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+''')
+
+register('patient_update_contact', '''
+    UPDATE patients
+    SET first_name = ?, last_name = ?, phone = ?, email = ?, address = ?,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE patient_id = ?
+''')
+
+register('patient_delete', '''
+    DELETE FROM patients WHERE patient_id = ?
+''')
+
+register('patient_gender_counts', '''
+    SELECT gender, COUNT(*) as count FROM patients GROUP BY gender
+''')
+
+# Pass the children, adults and seniors birth date ranges (age_band())
+register('patient_age_groups', f'''
+    SELECT SUM({range_predicate('date_of_birth')}) as children,
+           SUM({range_predicate('date_of_birth')}) as adults,
+           SUM({range_predicate('date_of_birth')}) as seniors
+    FROM patients
+''')
+
+# Doctors
+
+register('doctors_list', '''
+    SELECT doctor_id, employee_id, first_name, last_name,
+           specialization, experience_years, consultation_fee, is_available
+    FROM doctors
+    ORDER BY last_name, first_name
+''')
+
+register('doctor_by_id', '''
+    SELECT * FROM doctors WHERE doctor_id = ?
+''', expect_index=True)
+
+register('doctor_insert', '''
+    INSERT INTO doctors (
+        employee_id, first_name, last_name, specialization,
+        qualification, experience_years, phone, email, address,
+        consultation_fee, is_available
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+''')
+
+register('doctor_names', '''
+    SELECT doctor_id, first_name, last_name FROM doctors ORDER BY first_name
+''')
+
+register('available_doctors', '''
+    SELECT doctor_id, first_name, last_name, specialization
+    FROM doctors WHERE is_available = 1 ORDER BY first_name
+''')
+
+register('available_doctors_by_specialization', '''
+    SELECT doctor_id, first_name, last_name, specialization
+    FROM doctors WHERE is_available = 1 AND specialization = ? ORDER BY first_name
+''')
+
+# Doctor schedules: weekly templates and dated exceptions, expanded into
+# availability bitmaps by src/database/availability.py
+
+register('doctor_schedule_templates', '''
+    SELECT doctor_id, weekday, start_time, end_time FROM doctor_schedules
+''')
+
+register('doctor_schedule_for_doctor', '''
+    SELECT schedule_id, weekday, start_time, end_time FROM doctor_schedules
+    WHERE doctor_id = ? ORDER BY weekday, start_time
+''', expect_index=True)
+
+register('doctor_schedule_insert', '''
+    INSERT INTO doctor_schedules (doctor_id, weekday, start_time, end_time)
+    VALUES (?, ?, ?, ?)
+''')
+
+register('doctor_schedule_clear', '''
+    DELETE FROM doctor_schedules WHERE doctor_id = ?
+''')
+
+register('doctor_schedule_exceptions_between', f'''
+    SELECT doctor_id, exception_date, kind, start_time, end_time
+    FROM doctor_schedule_exceptions
+    WHERE {range_predicate('exception_date')}
+''', expect_index=True)
+
+register('doctor_exceptions_for_doctor', '''
+    SELECT exception_id, exception_date, kind, start_time, end_time, reason
+    FROM doctor_schedule_exceptions
+    WHERE doctor_id = ? AND exception_date >= ?
+    ORDER BY exception_date, start_time
+''', expect_index=True)
+
+register('doctor_exception_insert', '''
+    INSERT INTO doctor_schedule_exceptions (doctor_id, exception_date, kind, start_time, end_time, reason)
+    VALUES (?, ?, ?, ?, ?, ?)
+''')
+
+register('doctor_exception_delete', '''
+    DELETE FROM doctor_schedule_exceptions WHERE exception_id = ?
+''')
+
+register('doctor_specialization_counts', '''
+    SELECT specialization, COUNT(*) as count FROM doctors
+    GROUP BY specialization ORDER BY count DESC
+''')
+
+register('doctor_availability_counts', '''
+    SELECT is_available, COUNT(*) as count FROM doctors GROUP BY is_available
+''')
+
+# Appointments
+
+register('appointments_for_day', '''
+    SELECT a.appointment_id, a.appointment_time, a.duration_minutes,
+           a.status, a.notes,
+           (p.first_name || ' ' || p.last_name) as patient_name,
+           (d.first_name || ' ' || d.last_name) as doctor_name
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.patient_id
+    JOIN doctors d ON a.doctor_id = d.doctor_id
+    WHERE a.appointment_date = ?
+    ORDER BY a.appointment_time
+''', expect_index=True)
+
+# Every appointment of start <= day < end for the calendar view; a range
+# scan of idx_appointments_date_time that never touches the table
+register('appointments_between', f'''
+    SELECT appointment_id, doctor_id, appointment_date, appointment_time,
+           duration_minutes, status
+    FROM appointments
+    WHERE {range_predicate('appointment_date')}
+''', expect_index=True)
+
+register('appointments_recent', '''
+    SELECT a.appointment_id, a.appointment_date, a.appointment_time, a.status,
+           (p.first_name || ' ' || p.last_name) as patient_name,
+           (d.first_name || ' ' || d.last_name) as doctor_name
+    FROM appointments a
+    JOIN patients p ON a.patient_id = p.patient_id
+    JOIN doctors d ON a.doctor_id = d.doctor_id
+    ORDER BY a.appointment_date DESC, a.appointment_time DESC
+    LIMIT 20
+''', expect_index=True)
+
+# Every slot a doctor has taken on a day, for the conflict checks in
+# src/database/scheduling.py
+register('appointment_day_intervals', '''
+    SELECT appointment_id, appointment_time, duration_minutes
+    FROM appointments
+    WHERE doctor_id = ? AND appointment_date = ? AND status != 'cancelled'
+    ORDER BY appointment_time
+''', expect_index=True)
+
+# Every slot taken on a day across all doctors, for the free-slot finder
+register('appointment_busy_intervals', '''
+    SELECT doctor_id, appointment_time, duration_minutes
+    FROM appointments
+    WHERE appointment_date = ? AND status != 'cancelled'
+''', expect_index=True)
+
+# A doctor's taken slots over start <= day < end, for checking bulk bookings
+register('appointment_intervals_between', f'''
+    SELECT appointment_id, appointment_date, appointment_time, duration_minutes
+    FROM appointments
+    WHERE doctor_id = ? AND {range_predicate('appointment_date')}
+      AND status != 'cancelled'
+''', expect_index=True)
+
+register('appointment_insert', '''
+    INSERT INTO appointments (
+        patient_id, doctor_id, appointment_date, appointment_time,
+        duration_minutes, status, notes, series_id
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+''')
+
+# Recurring series
+
+register('appointment_series_insert', '''
+    INSERT INTO appointment_series (
+        patient_id, doctor_id, first_date, appointment_time,
+        duration_minutes, interval_days, occurrences, notes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+''')
+
+register('appointment_series_delete', '''
+    DELETE FROM appointment_series WHERE series_id = ?
+''')
+
+register('appointment_series_cancel', '''
+    UPDATE appointments SET status = 'cancelled', updated_at = CURRENT_TIMESTAMP
+    WHERE series_id = ? AND appointment_date >= ? AND status = 'scheduled'
+''')
+
+register('appointment_series_appointments', '''
+    SELECT appointment_id, appointment_date, appointment_time, duration_minutes, status
+    FROM appointments
+    WHERE series_id = ?
+    ORDER BY appointment_date, appointment_time
+''', expect_index=True)
+
+register('appointment_set_status', '''
+    UPDATE appointments SET status = ? WHERE appointment_id = ?
+''')
+
+register('appointments_by_day', f'''
+    SELECT appointment_date as date, COUNT(*) as count
+    FROM appointments
+    WHERE {range_predicate('appointment_date')}
+    GROUP BY appointment_date
+    ORDER BY appointment_date
+''', expect_index=True)
+
+register('appointment_status_counts', '''
+    SELECT status, appointments as count FROM rollup_appointment_status
+    WHERE appointments > 0
+''')
+
+# Booked load per doctor and day from the rollup, for the month calendar
+register('doctor_daily_load_between', f'''
+    SELECT doctor_id, day, active, booked_minutes FROM rollup_doctor_daily
+    WHERE {range_predicate('day')} AND active > 0
+''', expect_index=True)
+
+register('doctor_appointment_counts_for_day', '''
+    SELECT doctor_id, appointments FROM rollup_doctor_daily WHERE day = ?
+''', expect_index=True)
+
+# Billing
+
+# The bill list is read one keyset page at a time, newest first. Pass
+# today's date (for the overdue flag), the bill_date DateRange params,
+# any filter value, the (bill_date, bill_id) of the last bill seen and the
+# page size. Balance and overdue are computed here, not per row in Python.
+_BILLS_PAGE = '''
+    SELECT b.bill_id, b.bill_date, b.total_cents, b.paid_cents,
+           b.total_cents - b.paid_cents as balance_cents,
+           b.payment_status, b.due_date,
+           (b.payment_status != 'paid' AND b.due_date < ?1) as overdue,
+           (p.first_name || ' ' || p.last_name) as patient_name
+    FROM billing b
+    JOIN patients p ON b.patient_id = p.patient_id
+    WHERE {date_range}{filter}
+      AND (b.bill_date, b.bill_id) < (?, ?)
+    ORDER BY b.bill_date DESC, b.bill_id DESC
+    LIMIT ?
+'''
+
+register('bills_page', _BILLS_PAGE.format(
+    date_range=range_predicate('b.bill_date'), filter=''
+), expect_index=True)
+
+register('bills_page_by_status', _BILLS_PAGE.format(
+    date_range=range_predicate('b.bill_date'), filter=' AND b.payment_status = ?'
+), expect_index=True)
+
+register('bills_page_overdue', _BILLS_PAGE.format(
+    date_range=range_predicate('b.bill_date'), filter=" AND b.payment_status != 'paid' AND b.due_date < ?1"
+), expect_index=True)
+
+register('bills_pending', '''
+    SELECT b.bill_id, b.total_cents, b.paid_cents, b.bill_date, b.due_date,
+           (p.first_name || ' ' || p.last_name) as patient_name
+    FROM billing b
+    JOIN patients p ON b.patient_id = p.patient_id
+    WHERE b.payment_status = 'pending'
+    ORDER BY b.due_date, b.bill_date
+''', expect_index=True)
+
+register('bill_insert', '''
+    INSERT INTO billing (
+        patient_id, total_cents, paid_cents, payment_status,
+        bill_date, due_date, notes
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+''')
+
+register('bill_payment_details', '''
+    SELECT b.total_cents, b.paid_cents,
+           (p.first_name || ' ' || p.last_name) as patient_name
+    FROM billing b
+    JOIN patients p ON b.patient_id = p.patient_id
+    WHERE b.bill_id = ?
+''', expect_index=True)
+
+# Payments are appended to the ledger; triggers update the bill
+register('payment_insert', '''
+    INSERT INTO payments (bill_id, amount_cents, payment_method, paid_at, notes)
+    VALUES (?, ?, ?, ?, ?)
+''')
+
+register('bill_payments', '''
+    SELECT payment_id, amount_cents, payment_method, paid_at, notes
+    FROM payments WHERE bill_id = ?
+    ORDER BY payment_id
+''', expect_index=True)
+
+# Billing totals read the trigger-maintained rollups in src/database/rollups.py
+# instead of aggregating the billing table. Amounts are integer cents.
+
+register('billing_revenue_total', '''
+    SELECT COALESCE(SUM(paid_cents), 0) as revenue_cents FROM rollup_billing_status
+''')
+
+register('billing_outstanding_total', '''
+    SELECT COALESCE(SUM(billed_cents - paid_cents), 0) as outstanding_cents FROM rollup_billing_status
+    WHERE payment_status != 'paid'
+''')
+
+# Revenue of the bills dated in a DateRange (day_range(), month_range(), ...)
+register('billing_revenue_between', f'''
+    SELECT COALESCE(SUM(paid_cents), 0) as revenue_cents FROM rollup_revenue_daily
+    WHERE {range_predicate('day')}
+''', expect_index=True)
+
+# Per-day billed, collected and outstanding amounts over a DateRange
+register('billing_daily_totals', f'''
+    SELECT day, bills, billed_cents, paid_cents, outstanding_cents FROM rollup_revenue_daily
+    WHERE {range_predicate('day')} AND bills > 0
+    ORDER BY day
+''', expect_index=True)
+
+register('billing_pending_count', '''
+    SELECT COALESCE(SUM(bills), 0) as pending_count FROM rollup_billing_status
+    WHERE payment_status = 'pending'
+''', expect_index=True)
+
+register('billing_status_summary', '''
+    SELECT payment_status, bills as count, billed_cents, paid_cents
+    FROM rollup_billing_status WHERE bills > 0
+''')
+
+# Receivables aging; the aging_* tables are filled by the batch job in
+# src/database/aging.py
+
+register('aging_latest_run', '''
+    SELECT run_id, as_of FROM aging_runs ORDER BY run_id DESC LIMIT 1
+''')
+
+# Unpaid bills at least ? days past due as of the latest run, most overdue first
+register('dunning_list', '''
+    SELECT a.bill_id, a.due_date, a.days_overdue, a.bucket, a.balance_cents,
+           (p.first_name || ' ' || p.last_name) as patient_name, p.phone
+    FROM aging_bills a
+    JOIN patients p ON a.patient_id = p.patient_id
+    WHERE a.days_overdue >= ?
+    ORDER BY a.days_overdue DESC, a.bill_id DESC
+    LIMIT ?
+''', expect_index=True)
@@ -0,0 +1,83 @@
+"""
+Query Registry for Hospital Management System
+Named SQL statements with usage counters
+"""
+
+import threading
+import time
+
+class QueryRegistry:
+    """Central catalogue of named SQL statements
+    
+    Every statement is registered once under a name and always executed with
+    the exact same SQL text, so sqlite3's per-connection prepared-statement
+    cache (cached_statements, sized from the registry by DatabaseManager)
+    compiles it once per connection. The registry counts calls and time
+    per query so the dominant queries are easy to spot.
+    """
+    
+    def __init__(self):
+        self._queries = {}
+        self._indexed = set()
+        self._stats = {}
+        self._lock = threading.Lock()
+        
+    def register(self, name, sql, expect_index=False):
+        """Register a named query; expect_index marks it for EXPLAIN checks"""
+        sql = sql.strip()
+        existing = self._queries.get(name)
+        if existing is not None and existing != sql:
+            raise ValueError(f"Query '{name}' is already registered with different SQL")
+        self._queries[name] = sql
+        if expect_index:
+            self._indexed.add(name)
+        self._stats.setdefault(name, {'calls': 0, 'total_time': 0.0})
+        return name
+        
+    def get(self, name):
+        """Get the SQL text of a registered query"""
+        try:
+            return self._queries[name]
+        except KeyError:
+            raise KeyError(f"Unknown query '{name}'")
+            
+    def __contains__(self, name):
+        return name in self._queries
+        
+    def names(self):
+        """Get all registered query names"""
+        return sorted(self._queries)
+        
+    def indexed_queries(self):
+        """Get {name: sql} for every query that must be answered through an index"""
+        return {name: self._queries[name] for name in sorted(self._indexed)}
+        
+    def execute(self, conn, name, params=None):
+        """Execute a named query on a connection and return a new cursor
+        
+        Each call gets its own cursor, so a caller may change its
+        row_factory without affecting anyone else.
+        """
+        sql = self.get(name)
+        started = time.perf_counter()
+        cursor = conn.execute(sql, params or ())
+        elapsed = time.perf_counter() - started
+        
+        stats = self._stats[name]
+        with self._lock:
+            stats['calls'] += 1
+            stats['total_time'] += elapsed
+        return cursor
+        
+    def stats(self):
+        """Get per-query counters, most expensive first"""
+        with self._lock:
+            rows = [dict(stats, name=name) for name, stats in self._stats.items() if stats['calls']]
+        rows.sort(key=lambda row: row['total_time'], reverse=True)
+        return rows
+        
+    def reset_stats(self):
+        """Reset all per-query counters"""
+        with self._lock:
+            for stats in self._stats.values():
+                stats.update(calls=0, total_time=0.0)
@@ -0,0 +1,173 @@
+"""
+Rollup Tables for Hospital Management System
+Per-day and per-status totals kept up to date by triggers
+"""
+
+import re
+
+# Every trigger whose name starts with this prefix and every table whose
+# name starts with ROLLUP_PREFIX is owned by ensure_rollups()
+TRIGGER_PREFIX = "trg_rollup_"
+ROLLUP_PREFIX = "rollup_"
+
+# Unpaid part of a bill, in cents
+_OUTSTANDING = (
+    "CASE WHEN {row}.payment_status != 'paid' "
+    "THEN {row}.total_cents - {row}.paid_cents ELSE 0 END"
+)
+_ACTIVE = "{row}.status IS NOT 'cancelled'"
+
+# (rollup table, source table, [(key column, type, expression)],
+#  [(measure column, type, expression)])
+# {row} stands for NEW/OLD inside triggers and for the source table when
+# rebuilding. Each source row adds its measures to the rollup row of its keys.
+ROLLUPS = [
+    # Revenue cards and date-range revenue reports
+    ("rollup_revenue_daily", "billing",
+     [("day", "TEXT", "COALESCE(substr({row}.bill_date, 1, 10), '')")],
+     [("bills", "INTEGER", "1"),
+      ("billed_cents", "INTEGER", "{row}.total_cents"),
+      ("paid_cents", "INTEGER", "{row}.paid_cents"),
+      ("outstanding_cents", "INTEGER", _OUTSTANDING)]),
+      
+    # Totals, outstanding balance and the payment status summary
+    ("rollup_billing_status", "billing",
+     [("payment_status", "TEXT", "COALESCE({row}.payment_status, '')")],
+     [("bills", "INTEGER", "1"),
+      ("billed_cents", "INTEGER", "{row}.total_cents"),
+      ("paid_cents", "INTEGER", "{row}.paid_cents")]),
+      
+    ("rollup_appointment_status", "appointments",
+     [("status", "TEXT", "COALESCE({row}.status, '')")],
+     [("appointments", "INTEGER", "1")]),
+     
+    # Doctor workload per day, keyed by day first for date-range reads
+    ("rollup_doctor_daily", "appointments",
+     [("day", "TEXT", "{row}.appointment_date"), ("doctor_id", "INTEGER", "{row}.doctor_id")],
+     [("appointments", "INTEGER", "1"),
+      ("active", "INTEGER", f"CASE WHEN {_ACTIVE} THEN 1 ELSE 0 END"),
+      ("booked_minutes", "INTEGER", f"CASE WHEN {_ACTIVE} THEN COALESCE({{row}}.duration_minutes, 0) ELSE 0 END")]),
+]
+
+def _source_columns(keys, measures):
+    """Source columns the keys and measures depend on, in order"""
+    columns = []
+    for _, _, expression in keys + measures:
+        for column in re.findall(r"\{row\}\.(\w+)", expression):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+def table_sql(name, keys, measures):
+    """CREATE TABLE statement for one rollup"""
+    columns = [f"{column} {kind} NOT NULL" for column, kind, _ in keys]
+    columns += [f"{column} {kind} NOT NULL DEFAULT 0" for column, kind, _ in measures]
+    primary_key = ", ".join(column for column, _, _ in keys)
+    return f"CREATE TABLE {name} ({', '.join(columns)}, PRIMARY KEY ({primary_key})) WITHOUT ROWID"
+
+def _upsert(name, keys, measures, row, sign):
+    """Trigger statement adding one source row to (or removing it from) its rollup row"""
+    columns = ", ".join(column for column, _, _ in keys + measures)
+    values = [expression.format(row=row) for _, _, expression in keys]
+    values += [f"{sign}({expression.format(row=row)})" for _, _, expression in measures]
+    updates = ", ".join(f"{column} = {column} + excluded.{column}" for column, _, _ in measures)
+    conflict = ", ".join(column for column, _, _ in keys)
+    return (
+        f"INSERT INTO {name} ({columns}) VALUES ({', '.join(values)}) "
+        f"ON CONFLICT ({conflict}) DO UPDATE SET {updates};"
+    )
+
+def trigger_sql(name, source, keys, measures):
+    """Build {trigger name: CREATE TRIGGER statement} for one rollup"""
+    prefix = f"{TRIGGER_PREFIX}{name[len(ROLLUP_PREFIX):]}"
+    return {
+        f"{prefix}_insert": (
+            f"CREATE TRIGGER {prefix}_insert AFTER INSERT ON {source} BEGIN "
+            f"{_upsert(name, keys, measures, 'NEW', '+')} END"
+        ),
+        f"{prefix}_delete": (
+            f"CREATE TRIGGER {prefix}_delete AFTER DELETE ON {source} BEGIN "
+            f"{_upsert(name, keys, measures, 'OLD', '-')} END"
+        ),
+        f"{prefix}_update": (
+            f"CREATE TRIGGER {prefix}_update AFTER UPDATE OF {', '.join(_source_columns(keys, measures))} "
+            f"ON {source} BEGIN "
+            f"{_upsert(name, keys, measures, 'OLD', '-')} "
+            f"{_upsert(name, keys, measures, 'NEW', '+')} END"
+        ),
+    }
+
+def rebuild_rollup(conn, name, source, keys, measures):
+    """Recompute one rollup table from its source table"""
+    conn.execute(f"DELETE FROM {name}")
+    key_exprs = [expression.format(row=source) for _, _, expression in keys]
+    sums = [f"SUM({expression.format(row=source)})" for _, _, expression in measures]
+    group_by = ", ".join(str(i + 1) for i in range(len(keys)))
+    columns = ", ".join(column for column, _, _ in keys + measures)
+    conn.execute(
+        f"INSERT INTO {name} ({columns}) "
+        f"SELECT {', '.join(key_exprs + sums)} FROM {source} GROUP BY {group_by}"
+    )
+
+def ensure_rollups(conn, rollups=None):
+    """Create the rollup tables and triggers, rebuilding any whose definition changed
+    
+    A rollup whose table or triggers are created or changed is recomputed
+    once; after that the triggers keep it exact. Rollup tables and
+    triggers no longer listed are dropped. Returns a dict listing the
+    created, rebuilt and dropped rollups. The caller is responsible for
+    committing.
+    """
+    rollups = ROLLUPS if rollups is None else rollups
+    existing_tables = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'table' AND name LIKE ?",
+            (ROLLUP_PREFIX + "%",)
+        )
+    }
+    existing_triggers = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name LIKE ?",
+            (TRIGGER_PREFIX + "%",)
+        )
+    }
+    
+    result = {'created': [], 'rebuilt': [], 'dropped': []}
+    wanted_triggers = set()
+    
+    for name, source, keys, measures in rollups:
+        table = table_sql(name, keys, measures)
+        triggers = trigger_sql(name, source, keys, measures)
+        wanted_triggers.update(triggers)
+        
+        new = name not in existing_tables
+        if not new and existing_tables[name] == table and all(
+            existing_triggers.get(trigger) == sql for trigger, sql in triggers.items()
+        ):
+            continue
+            
+        for trigger in triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        conn.execute(f"DROP TABLE IF EXISTS {name}")
+        conn.execute(table)
+        for sql in triggers.values():
+            conn.execute(sql)
+        rebuild_rollup(conn, name, source, keys, measures)
+        result['created' if new else 'rebuilt'].append(name)
+        
+    for trigger in existing_triggers:
+        if trigger not in wanted_triggers:
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    known = {name for name, _, _, _ in rollups}
+    for name in existing_tables:
+        if name not in known:
+            conn.execute(f"DROP TABLE IF EXISTS {name}")
+            result['dropped'].append(name)
+            
+    return result
+
+def rebuild_rollups(conn, rollups=None):
+    """Recompute every rollup table from scratch; the caller commits"""
+    rollups = ROLLUPS if rollups is None else rollups
+    for name, source, keys, measures in rollups:
+        rebuild_rollup(conn, name, source, keys, measures)
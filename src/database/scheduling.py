@@ -0,0 +1,415 @@
+"""
+Appointment Scheduling for Hospital Management System
+Per-doctor interval indexes and availability bitmaps for booking appointments
+"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+from src.database.availability import (
+    AvailabilityExpander, SLOT_MINUTES, SLOTS_PER_DAY, span_mask, run_starts,
+    time_to_minutes, minutes_to_time
+)
+
+# Appointments in these states do not occupy their time slot
+FREE_STATUSES = ('cancelled',)
+
+# Per-request outcomes of AppointmentBook.book_many()
+OUTCOME_BOOKED = 'booked'
+OUTCOME_CONFLICT = 'conflict'         # overlaps another appointment
+OUTCOME_UNAVAILABLE = 'unavailable'   # outside the doctor's working time
+OUTCOME_INVALID = 'invalid'           # bad date, time or duration
+OUTCOME_SKIPPED = 'skipped'           # fine, but the batch was not booked
+
+# Stand-in appointment_id for batch requests not inserted yet (real ids start at 1)
+IN_BATCH = 0
+
+class AppointmentConflictError(Exception):
+    """Raised when an appointment overlaps another one of the same doctor"""
+    
+    def __init__(self, doctor_id, appointment_date, start, end, conflict_id):
+        self.doctor_id = doctor_id
+        self.appointment_date = appointment_date
+        self.start = start
+        self.end = end
+        self.conflict_id = conflict_id
+        super().__init__(
+            f"Doctor {doctor_id} already has appointment {conflict_id} overlapping "
+            f"{appointment_date} {minutes_to_time(start)[:5]}-{minutes_to_time(end)[:5]}"
+        )
+
+class DoctorUnavailableError(AppointmentConflictError):
+    """Raised when an appointment falls outside the doctor's working time"""
+    
+    def __init__(self, doctor_id, appointment_date, start, end):
+        self.doctor_id = doctor_id
+        self.appointment_date = appointment_date
+        self.start = start
+        self.end = end
+        self.conflict_id = None
+        Exception.__init__(
+            self,
+            f"Doctor {doctor_id} is not working on {appointment_date} "
+            f"{minutes_to_time(start)[:5]}-{minutes_to_time(end)[:5]}"
+        )
+
+def recurring_dates(first_date, occurrences, interval_days=7):
+    """Get occurrences dates starting at first_date, interval_days apart"""
+    first_date = as_date(first_date)
+    occurrences, interval_days = int(occurrences), int(interval_days)
+    if occurrences <= 0 or interval_days <= 0:
+        raise ValueError("Occurrences and interval must be positive")
+    return [first_date + timedelta(days=i * interval_days) for i in range(occurrences)]
+
+def as_date(value):
+    """Accept a date, datetime or 'YYYY-MM-DD' string and return a date"""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+class DayIntervals:
+    """Sorted interval index of one doctor's appointments on one day
+    
+    Intervals are half-open [start, end) in minutes since midnight, so a
+    09:00-09:30 appointment does not clash with one starting at 09:30.
+    Alongside the sorted starts it keeps the running maximum end, which
+    answers "does anything overlap [start, end)?" with one binary search
+    even if older data already contains overlapping appointments.
+    """
+    
+    def __init__(self, intervals=()):
+        self._intervals = sorted(intervals)   # (start, end, appointment_id)
+        self._reindex(0)
+        
+    def _reindex(self, position):
+        """Rebuild the lookup lists from position onwards"""
+        if position == 0:
+            self._starts = []
+            self._max_end = []      # (largest end so far, its interval index)
+        del self._starts[position:]
+        del self._max_end[position:]
+        for i in range(position, len(self._intervals)):
+            start, end, appointment_id = self._intervals[i]
+            self._starts.append(start)
+            if self._max_end and self._max_end[-1][0] >= end:
+                self._max_end.append(self._max_end[-1])
+            else:
+                self._max_end.append((end, i))
+                
+    def find_overlap(self, start, end):
+        """Get the appointment_id of an interval overlapping [start, end), or None"""
+        # Only intervals starting before end can overlap; of those the one
+        # reaching furthest decides
+        count = bisect_left(self._starts, end)
+        if count and self._max_end[count - 1][0] > start:
+            return self._intervals[self._max_end[count - 1][1]][2]
+        return None
+        
+    def add(self, start, end, appointment_id=None):
+        """Add an interval, keeping the index sorted"""
+        position = bisect_right(self._starts, start)
+        self._intervals.insert(position, (start, end, appointment_id))
+        self._reindex(position)
+        
+    def intervals(self):
+        """Get (start, end, appointment_id) tuples in start order"""
+        return list(self._intervals)
+        
+    def __len__(self):
+        return len(self._intervals)
+
+class AppointmentBook:
+    """Conflict-checked appointment inserts on one connection
+    
+    Use inside a write transaction (DatabaseManager.transaction()): the
+    write lock is held from the first check to the commit, so no other
+    desk can book the same doctor in between. Day indexes are loaded once
+    per doctor and date and updated as appointments are booked, so booking
+    many appointments in one transaction stays cheap. With an
+    AvailabilityExpander, appointments outside the doctor's working time
+    are refused as well.
+    """
+    
+    def __init__(self, conn, queries, availability=None):
+        self.conn = conn
+        self.queries = queries
+        self.availability = availability
+        self._days = {}
+        
+    def day(self, doctor_id, appointment_date):
+        """Get the interval index of a doctor's day, loading it on first use"""
+        key = (doctor_id, as_date(appointment_date).isoformat())
+        if key not in self._days:
+            rows = self.queries.execute(self.conn, 'appointment_day_intervals', key).fetchall()
+            intervals = []
+            for row in rows:
+                start = time_to_minutes(row['appointment_time'])
+                intervals.append((start, start + (row['duration_minutes'] or 0), row['appointment_id']))
+            self._days[key] = DayIntervals(intervals)
+        return self._days[key]
+        
+    def preload(self, doctor_id, start_date, end_date):
+        """Load the doctor's day indexes for start_date <= day < end_date with one query"""
+        rows = self.queries.execute(
+            self.conn, 'appointment_intervals_between',
+            (doctor_id, start_date.isoformat(), end_date.isoformat())
+        ).fetchall()
+        by_day = {}
+        for row in rows:
+            start = time_to_minutes(row['appointment_time'])
+            by_day.setdefault(row['appointment_date'], []).append(
+                (start, start + (row['duration_minutes'] or 0), row['appointment_id'])
+            )
+            
+        day = start_date
+        while day < end_date:
+            key = (doctor_id, day.isoformat())
+            if key not in self._days:
+                self._days[key] = DayIntervals(by_day.get(key[1], []))
+            day += timedelta(days=1)
+            
+    def find_conflict(self, doctor_id, appointment_date, appointment_time, duration_minutes):
+        """Get the id of an appointment the new one would overlap, or None"""
+        start, end = self._interval(appointment_time, duration_minutes)
+        return self.day(doctor_id, appointment_date).find_overlap(start, end)
+        
+    def book(self, patient_id, doctor_id, appointment_date, appointment_time,
+             duration_minutes=30, notes='', status='scheduled'):
+        """Insert an appointment unless it overlaps; returns the new appointment_id"""
+        appointment_date = as_date(appointment_date).isoformat()
+        start, end = self._interval(appointment_time, duration_minutes)
+        if status in FREE_STATUSES:
+            day = None
+        else:
+            if self.availability and not self.availability.covers(doctor_id, as_date(appointment_date), start, end):
+                raise DoctorUnavailableError(doctor_id, appointment_date, start, end)
+            day = self.day(doctor_id, appointment_date)
+            conflict_id = day.find_overlap(start, end)
+            if conflict_id is not None:
+                raise AppointmentConflictError(doctor_id, appointment_date, start, end, conflict_id)
+                
+        cursor = self.queries.execute(self.conn, 'appointment_insert', (
+            patient_id, doctor_id, appointment_date, minutes_to_time(start),
+            duration_minutes, status, notes, None
+        ))
+        appointment_id = cursor.lastrowid
+        if day is not None:
+            day.add(start, end, appointment_id)
+        return appointment_id
+        
+    def book_many(self, requests, skip_conflicts=False, series_id=None):
+        """Check a batch of appointments in one pass and insert them with one statement
+        
+        requests are (patient_id, doctor_id, appointment_date,
+        appointment_time[, duration_minutes[, notes]]) tuples. Each one is
+        checked against the existing appointments, the doctor's working
+        time and the requests before it. Without skip_conflicts nothing is
+        inserted if any request fails; with it the failures are left out.
+        Returns one outcome dict per request, in order, with status,
+        appointment_id, conflict_id and message.
+        """
+        outcomes = []
+        for request in requests:
+            request = tuple(request)
+            patient_id, doctor_id, appointment_date, appointment_time = request[:4]
+            outcome = {
+                'patient_id': patient_id,
+                'doctor_id': doctor_id,
+                'appointment_date': appointment_date,
+                'appointment_time': appointment_time,
+                'duration_minutes': request[4] if len(request) > 4 else 30,
+                'notes': request[5] if len(request) > 5 else '',
+                'status': None,
+                'appointment_id': None,
+                'conflict_id': None,
+                'message': ''
+            }
+            try:
+                outcome['appointment_date'] = as_date(appointment_date).isoformat()
+                outcome['start'], outcome['end'] = self._interval(appointment_time, outcome['duration_minutes'])
+                outcome['appointment_time'] = minutes_to_time(outcome['start'])
+            except (TypeError, ValueError) as e:
+                outcome['status'] = OUTCOME_INVALID
+                outcome['message'] = str(e)
+            outcomes.append(outcome)
+            
+        # One range query per doctor instead of one per appointment
+        ranges = {}
+        for outcome in outcomes:
+            if outcome['status'] is None:
+                day = date.fromisoformat(outcome['appointment_date'])
+                first, last = ranges.get(outcome['doctor_id'], (day, day))
+                ranges[outcome['doctor_id']] = (min(first, day), max(last, day))
+        for doctor_id, (first, last) in ranges.items():
+            self.preload(doctor_id, first, last + timedelta(days=1))
+        if self.availability and ranges:
+            self.availability.load_range(
+                min(first for first, last in ranges.values()),
+                max(last for first, last in ranges.values()) + timedelta(days=1)
+            )
+            
+        touched = set()
+        for outcome in outcomes:
+            if outcome['status'] is not None:
+                continue
+            doctor_id, appointment_date = outcome['doctor_id'], outcome['appointment_date']
+            start, end = outcome['start'], outcome['end']
+            day = self.day(doctor_id, appointment_date)
+            conflict_id = day.find_overlap(start, end)
+            if self.availability and not self.availability.covers(doctor_id, date.fromisoformat(appointment_date), start, end):
+                error = DoctorUnavailableError(doctor_id, appointment_date, start, end)
+                outcome['status'] = OUTCOME_UNAVAILABLE
+            elif conflict_id == IN_BATCH:
+                outcome['status'] = OUTCOME_CONFLICT
+                outcome['message'] = "Overlaps an earlier appointment in the same batch"
+                continue
+            elif conflict_id is not None:
+                error = AppointmentConflictError(doctor_id, appointment_date, start, end, conflict_id)
+                outcome['status'] = OUTCOME_CONFLICT
+                outcome['conflict_id'] = conflict_id
+            else:
+                # Later requests in the batch must not overlap this one
+                day.add(start, end, IN_BATCH)
+                touched.add((doctor_id, appointment_date))
+                outcome['status'] = OUTCOME_BOOKED
+                continue
+            outcome['message'] = str(error)
+            
+        accepted = [outcome for outcome in outcomes if outcome['status'] == OUTCOME_BOOKED]
+        failed = len(accepted) < len(outcomes)
+        if accepted and (skip_conflicts or not failed):
+            self.conn.executemany(self.queries.get('appointment_insert'), [
+                (outcome['patient_id'], outcome['doctor_id'], outcome['appointment_date'],
+                 outcome['appointment_time'], outcome['duration_minutes'], 'scheduled',
+                 outcome['notes'], series_id)
+                for outcome in accepted
+            ])
+            # AUTOINCREMENT ids of one statement under the write lock are consecutive
+            last_id = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+            for appointment_id, outcome in enumerate(accepted, last_id - len(accepted) + 1):
+                outcome['appointment_id'] = appointment_id
+        else:
+            for outcome in accepted:
+                outcome['status'] = OUTCOME_SKIPPED
+                
+        # Batch intervals carry IN_BATCH rather than their ids; reload these days when next used
+        for key in touched:
+            self._days.pop(key, None)
+        for outcome in outcomes:
+            outcome.pop('start', None)
+            outcome.pop('end', None)
+        return outcomes
+        
+    def _interval(self, appointment_time, duration_minutes):
+        start = time_to_minutes(appointment_time)
+        duration_minutes = int(duration_minutes)
+        if duration_minutes <= 0:
+            raise ValueError("Duration must be a positive number of minutes")
+        return start, start + duration_minutes
+
+# Default working day, matching Config.WORKING_HOURS_START/END
+WORKING_HOURS = ("08:00", "18:00")
+
+# Free slots start on multiples of this many minutes (a multiple of SLOT_MINUTES)
+SLOT_STEP_MINUTES = 5
+
+class SlotFinder:
+    """Earliest free appointment slots for a set of doctors
+    
+    Works one day at a time on 5-minute bitmaps: working time comes from
+    the doctors' schedules, the day's appointments (one indexed query) are
+    OR-ed into a busy bitmap per doctor, and the cells where a long enough
+    free run starts are found with shifts and masks. The per-doctor slot
+    streams are merged in time order until enough slots are found.
+    """
+    
+    def __init__(self, conn, queries, working_hours=WORKING_HOURS, step_minutes=SLOT_STEP_MINUTES):
+        if step_minutes <= 0 or step_minutes % SLOT_MINUTES:
+            raise ValueError(f"Slot step must be a multiple of {SLOT_MINUTES} minutes")
+        self.conn = conn
+        self.queries = queries
+        self.availability = AvailabilityExpander(conn, queries, working_hours)
+        # One bit on every cell a slot may start on
+        self.grid = sum(1 << cell for cell in range(0, SLOTS_PER_DAY, step_minutes // SLOT_MINUTES))
+        
+    def busy_masks(self, day, doctor_ids):
+        """Get {doctor_id: bitmap} of the doctors' booked time on a day"""
+        busy = dict.fromkeys(doctor_ids, 0)
+        if len(busy) == 1:
+            doctor_id = next(iter(busy))
+            rows = self.queries.execute(self.conn, 'appointment_day_intervals', (doctor_id, day)).fetchall()
+            rows = [(doctor_id, row['appointment_time'], row['duration_minutes']) for row in rows]
+        else:
+            cursor = self.queries.execute(self.conn, 'appointment_busy_intervals', (day,))
+            # Plain tuples: this can be tens of thousands of rows per search
+            cursor.row_factory = None
+            rows = cursor.fetchall()
+            
+        # The same few start times and durations repeat across every
+        # doctor, so each bitmap is built once
+        spans = {}
+        for doctor_id, appointment_time, duration in rows:
+            if doctor_id in busy:
+                span = spans.get((appointment_time, duration))
+                if span is None:
+                    start = time_to_minutes(appointment_time)
+                    span = spans[(appointment_time, duration)] = span_mask(start, start + (duration or 0))
+                busy[doctor_id] |= span
+        return busy
+        
+    def _doctor_slots(self, doctor_id, day, busy, duration, earliest):
+        """Yield (start, doctor_id, end) for one doctor's free slots in time order"""
+        cells = -(-duration // SLOT_MINUTES)
+        free = self.availability.day_mask(doctor_id, day) & ~busy
+        starts = run_starts(free, cells) & self.grid
+        starts &= ~((1 << -(-earliest // SLOT_MINUTES)) - 1)
+        while starts:
+            cell = (starts & -starts).bit_length() - 1
+            start = cell * SLOT_MINUTES
+            yield start, doctor_id, start + duration
+            # Offer back-to-back slots: the next one starts after this one
+            starts &= ~((1 << (cell + cells)) - 1)
+            
+    def find(self, doctors, start_date, end_date, duration=30, limit=10, not_before=None):
+        """Get the earliest free slots for doctors on start_date <= day < end_date
+        
+        doctors maps doctor_id to a display name. not_before (a datetime)
+        hides slots that have already started. Returns up to limit dicts with
+        doctor_id, doctor_name, date, start_time and end_time, earliest first.
+        """
+        duration = int(duration)
+        if duration <= 0:
+            raise ValueError("Duration must be a positive number of minutes")
+        self.availability.load_range(start_date, end_date)
+        
+        slots = []
+        day = start_date
+        while day < end_date and len(slots) < limit and doctors:
+            day_text = day.isoformat()
+            earliest = 0
+            if not_before is not None:
+                if day < not_before.date():
+                    day += timedelta(days=1)
+                    continue
+                if day == not_before.date():
+                    earliest = not_before.hour * 60 + not_before.minute
+                    
+            busy = self.busy_masks(day_text, doctors)
+            streams = [
+                self._doctor_slots(doctor_id, day, busy[doctor_id], duration, earliest)
+                for doctor_id in doctors
+            ]
+            for start, doctor_id, end in islice(heapq.merge(*streams), limit - len(slots)):
+                slots.append({
+                    'doctor_id': doctor_id,
+                    'doctor_name': doctors[doctor_id],
+                    'date': day_text,
+                    'start_time': minutes_to_time(start),
+                    'end_time': minutes_to_time(end)
+                })
+            day += timedelta(days=1)
+        return slots
@@ -0,0 +1,99 @@
+"""
+Patient Search Index for Hospital Management System
+FTS5 index over patient names, IDs and phone numbers, kept in sync by triggers
+"""
+
+import re
+
+SEARCH_TABLE = "patients_fts"
+
+# Every trigger whose name starts with this prefix is owned by ensure_search_index()
+TRIGGER_PREFIX = "trg_patients_fts_"
+
+# Indexed columns in FTS column order; patient_ref is the patient_id as text
+SEARCH_COLUMNS = ["patient_ref", "first_name", "last_name", "national_id", "phone"]
+
+# bm25 weight per column: exact identifiers matter more than names, names
+# more than phone numbers
+SEARCH_WEIGHTS = [10.0, 5.0, 5.0, 10.0, 2.0]
+
+# Contentless: only the index is stored, rows are read back from patients.
+# Prefix indexes make 1 to 3 character typeahead prefixes single lookups.
+TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+    f"{', '.join(SEARCH_COLUMNS)}, content='', prefix='1 2 3', "
+    f"tokenize='unicode61 remove_diacritics 2')"
+)
+
+def _values(row):
+    """FTS column values for a patients row (NEW/OLD/patients)"""
+    return (
+        f"CAST({row}.patient_id AS TEXT), {row}.first_name, {row}.last_name, "
+        f"{row}.national_id, {row}.phone"
+    )
+
+COLUMNS_SQL = ", ".join(SEARCH_COLUMNS)
+
+TRIGGERS = {
+    f"{TRIGGER_PREFIX}insert": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}insert AFTER INSERT ON patients BEGIN "
+        f"INSERT INTO {SEARCH_TABLE} (rowid, {COLUMNS_SQL}) "
+        f"VALUES (NEW.patient_id, {_values('NEW')}); END"
+    ),
+    f"{TRIGGER_PREFIX}delete": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}delete AFTER DELETE ON patients BEGIN "
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {COLUMNS_SQL}) "
+        f"VALUES ('delete', OLD.patient_id, {_values('OLD')}); END"
+    ),
+    f"{TRIGGER_PREFIX}update": (
+        f"CREATE TRIGGER {TRIGGER_PREFIX}update AFTER UPDATE OF "
+        f"first_name, last_name, national_id, phone ON patients BEGIN "
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rowid, {COLUMNS_SQL}) "
+        f"VALUES ('delete', OLD.patient_id, {_values('OLD')}); "
+        f"INSERT INTO {SEARCH_TABLE} (rowid, {COLUMNS_SQL}) "
+        f"VALUES (NEW.patient_id, {_values('NEW')}); END"
+    ),
+}
+
+def ensure_search_index(conn):
+    """Create the patient search index and its triggers, rebuilding on changes
+    
+    The index is (re)filled from patients whenever the table or any trigger
+    had to be created. Returns True when that happened. The caller is
+    responsible for committing.
+    """
+    existing = {
+        row[0]: row[1] for row in conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE name = ? OR name LIKE ?",
+            (SEARCH_TABLE, TRIGGER_PREFIX + "%")
+        )
+    }
+    wanted = dict(TRIGGERS, **{SEARCH_TABLE: TABLE_SQL})
+    if existing == wanted:
+        return False
+        
+    for name in existing:
+        if name.startswith(TRIGGER_PREFIX):
+            conn.execute(f"DROP TRIGGER IF EXISTS {name}")
+    conn.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+    
+    conn.execute(TABLE_SQL)
+    conn.execute(
+        f"INSERT INTO {SEARCH_TABLE} (rowid, {COLUMNS_SQL}) "
+        f"SELECT patient_id, {_values('patients')} FROM patients"
+    )
+    for sql in TRIGGERS.values():
+        conn.execute(sql)
+    return True
+
+def match_expression(text):
+    """Turn free text into an FTS5 query where every word is a prefix
+    
+    "jo smi" becomes '"jo"* "smi"*', i.e. patients with a word starting
+    with "jo" and a word starting with "smi". Returns None when the text
+    contains nothing searchable.
+    """
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
@@ -0,0 +1,521 @@
+"""
+WAL Archive for Hospital Management System
+Continuous archiving of committed WAL frames and point-in-time restore from them
+"""
+
+import gzip
+import json
+import os
+import shutil
+import sqlite3
+import struct
+import threading
+import zlib
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+# Seconds between archive runs; a restore can reach any archive run, so
+# this is also the restore resolution
+ARCHIVE_INTERVAL = 10.0
+
+# WAL frames archived before the archiver checkpoints them into the
+# database file so the WAL can start over
+CHECKPOINT_FRAMES = 1000
+
+# Largest the WAL may grow while archive runs keep failing. Past this the
+# archiver checkpoints the unarchived frames anyway, records the gap and
+# starts a new generation, rather than filling the disk.
+MAX_WAL_BYTES = 256 * 1024 * 1024
+
+WAL_HEADER_SIZE = 32
+FRAME_HEADER_SIZE = 24
+
+GENERATION_FILE = "generation.json"
+BASE_FILE = "base.db.gz"
+SEGMENT_INDEX = "segments.jsonl"
+LOCK_FILE = "archiver.lock"
+GAPS_FILE = "gaps.jsonl"
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+class WalArchiveError(Exception):
+    """Raised when the WAL cannot be archived or a restore cannot be done"""
+    pass
+
+def read_wal_header(wal_path):
+    """Get (page_size, checkpoint_seq, salt1, salt2) from a WAL file, or None if it has no header"""
+    try:
+        with open(wal_path, 'rb') as wal:
+            header = wal.read(WAL_HEADER_SIZE)
+    except FileNotFoundError:
+        return None
+    if len(header) < WAL_HEADER_SIZE:
+        return None
+    magic, version, page_size, seq, salt1, salt2 = struct.unpack('>6I', header[:24])
+    return page_size, seq, salt1, salt2
+
+def scan_frames(wal, page_size, salt1, salt2, offset):
+    """Read the committed frames that follow offset in an open WAL file
+    
+    Frames belong to the current WAL cycle while their salts match the
+    header's; frames after the last commit frame are an unfinished or
+    rolled back transaction. Returns (data, frames, commits) where data
+    is the committed frames' bytes.
+    """
+    frame_size = FRAME_HEADER_SIZE + page_size
+    wal.seek(offset)
+    data = wal.read()
+    end = 0
+    frames = 0
+    commits = 0
+    position = 0
+    while position + frame_size <= len(data):
+        page, commit_size, frame_salt1, frame_salt2 = struct.unpack_from('>4I', data, position)
+        if (frame_salt1, frame_salt2) != (salt1, salt2) or page == 0:
+            break
+        position += frame_size
+        if commit_size:
+            end = position
+            commits += 1
+    return data[:end], end // frame_size, commits
+
+def apply_frames(database, data, page_size):
+    """Write WAL frames into an open database file, a transaction at a time"""
+    frame_size = FRAME_HEADER_SIZE + page_size
+    pending = []
+    commits = 0
+    for start in range(0, len(data), frame_size):
+        page, commit_size = struct.unpack('>2I', data[start:start + 8])
+        pending.append((page, start + FRAME_HEADER_SIZE))
+        if commit_size:
+            for page, page_start in pending:
+                database.seek((page - 1) * page_size)
+                database.write(data[page_start:page_start + page_size])
+            database.truncate(commit_size * page_size)
+            pending = []
+            commits += 1
+    return commits
+
+def compact_frames(data, page_size):
+    """Reduce committed WAL frames to the last version of each page
+    
+    A segment is restored as a whole, so only its final state matters.
+    The result is frames in page order with the final database size on
+    the last one, which apply_frames() replays as one transaction.
+    """
+    frame_size = FRAME_HEADER_SIZE + page_size
+    pages = {}
+    database_size = 0
+    for start in range(0, len(data), frame_size):
+        page, commit_size = struct.unpack('>2I', data[start:start + 8])
+        pages[page] = start + FRAME_HEADER_SIZE
+        if commit_size:
+            database_size = commit_size
+    output = []
+    numbers = sorted(page for page in pages if page <= database_size)
+    for i, page in enumerate(numbers):
+        commit_size = database_size if i == len(numbers) - 1 else 0
+        output.append(struct.pack('>2I', page, commit_size) + bytes(FRAME_HEADER_SIZE - 8))
+        output.append(data[pages[page]:pages[page] + page_size])
+    return b"".join(output)
+
+class WalArchiver:
+    """Ships a database's committed WAL frames into an archive directory
+    
+    Every generation directory under root holds a base copy of the
+    database and the WAL frames committed after it, as numbered segments.
+    The archiver is the database's only checkpointer: the manager turns
+    automatic checkpoints off, and frames are checkpointed only after
+    they have been archived. An archive run holds the manager's writer
+    connection, so no transaction is half-written while frames are read.
+    When frames may have been lost, e.g. the WAL was reset by another
+    process, a new generation starts with a fresh base copy.
+    
+    Only one archiver may write to a directory: it holds an exclusive
+    lock on root/archiver.lock. Another process started on the same
+    archive waits on standby and takes over once the lock is free.
+    """
+    
+    def __init__(self, db_manager, root, interval=ARCHIVE_INTERVAL, checkpoint_frames=CHECKPOINT_FRAMES,
+                 max_wal_bytes=MAX_WAL_BYTES):
+        self.db = db_manager
+        self.root = root
+        self.interval = interval
+        self.checkpoint_frames = checkpoint_frames
+        self.max_wal_bytes = max_wal_bytes
+        self.wal_path = db_manager.db_path + "-wal"
+        self.generation = None
+        self.position = None
+        self.segment = 0
+        self.last_error = None
+        self.last_archived = None
+        self._lock_file = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(root, exist_ok=True)
+        
+    def start(self):
+        """Start a generation and archive every interval seconds in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="wal-archiver", daemon=True)
+        self._thread.start()
+        
+    def stop(self):
+        """Stop the background thread after one last archive run"""
+        if self._thread:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        try:
+            if self.generation:
+                self.archive()
+        finally:
+            self.release()
+            
+    @property
+    def active(self):
+        """Whether this archiver holds the archive directory's lock"""
+        return self._lock_file is not None
+        
+    def acquire(self):
+        """Take the archive directory's lock; raises WalArchiveError while another archiver has it"""
+        if self._lock_file is not None:
+            return
+        lock_file = open(os.path.join(self.root, LOCK_FILE), 'a+')
+        try:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            raise WalArchiveError(f"Another archiver is writing to {self.root}")
+        lock_file.seek(0)
+        lock_file.truncate()
+        lock_file.write(f"{os.getpid()}\n")
+        lock_file.flush()
+        self._lock_file = lock_file
+        
+    def release(self):
+        """Give up the archive directory's lock"""
+        with self._lock:
+            if self._lock_file is not None:
+                # Closing the file drops the lock
+                self._lock_file.close()
+                self._lock_file = None
+                self.generation = None
+                
+    def _run(self):
+        while True:
+            try:
+                if self.generation is None:
+                    self.start_generation()
+                else:
+                    self.archive()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                if self.active:
+                    try:
+                        self.checkpoint_if_oversized(e)
+                    except Exception as checkpoint_error:
+                        self.last_error = checkpoint_error
+            if self._stop.wait(self.interval):
+                return
+                
+    def checkpoint_if_oversized(self, reason):
+        """Checkpoint a WAL grown past max_wal_bytes even though its frames are not archived
+        
+        Automatic checkpoints are off while archiving, so a failing
+        archive would otherwise let the WAL grow without bound. Frames
+        after the last archive run are lost to the archive: the gap is
+        recorded in root/gaps.jsonl and the next run starts a new
+        generation. Returns the gap record, or None if the WAL is small.
+        """
+        with self._lock:
+            try:
+                wal_bytes = os.path.getsize(self.wal_path)
+            except OSError:
+                return None
+            if wal_bytes <= self.max_wal_bytes:
+                return None
+            with self.db.pool.writer() as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+            gap = {
+                'at': datetime.now().strftime(TIME_FORMAT),
+                'generation': self.generation,
+                'last_archived': self.last_archived,
+                'wal_bytes': wal_bytes,
+                'reason': str(reason),
+            }
+            self.generation = None
+            # The archive directory may be what is failing, so the record is best effort
+            try:
+                with open(os.path.join(self.root, GAPS_FILE), 'a') as gaps:
+                    gaps.write(json.dumps(gap) + "\n")
+            except OSError:
+                pass
+            return gap
+            
+            
+    def start_generation(self):
+        """Take a new base copy and archive WAL frames against it from now on"""
+        with self._lock:
+            self.acquire()
+            with self.db.pool.writer() as conn:
+                if conn.execute("PRAGMA journal_mode").fetchone()[0].lower() != 'wal':
+                    raise WalArchiveError("WAL archiving needs a database in WAL mode")
+                position = self._current_position()
+                # A read transaction pins the database as of position while
+                # writers carry on; the archiver's checkpoints cannot pass it
+                source = sqlite3.connect(self.db.db_path, isolation_level=None)
+                source.execute("BEGIN")
+                source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                created = datetime.now()
+                
+            generation = created.strftime("%Y%m%d_%H%M%S_%f")
+            directory = os.path.join(self.root, generation)
+            os.makedirs(os.path.join(directory, "segments"))
+            copy_path = os.path.join(directory, "base.db")
+            try:
+                copy = sqlite3.connect(copy_path)
+                source.backup(copy)
+                page_size = copy.execute("PRAGMA page_size").fetchone()[0]
+                copy.close()
+            finally:
+                source.close()
+            with open(copy_path, 'rb') as raw, gzip.open(os.path.join(directory, BASE_FILE), 'wb', compresslevel=6) as packed:
+                shutil.copyfileobj(raw, packed, 1024 * 1024)
+            os.remove(copy_path)
+            
+            record = {
+                'generation': generation,
+                'created': created.strftime(TIME_FORMAT),
+                'source': os.path.abspath(self.db.db_path),
+                'page_size': page_size,
+                'position': position,
+            }
+            _write_json(os.path.join(directory, GENERATION_FILE), record)
+            self.generation = generation
+            self.position = position
+            self.segment = 0
+            self.last_archived = record['created']
+            return record
+            
+    def archive(self):
+        """Copy the frames committed since the last run into a new segment
+        
+        Returns the number of frames archived. The writer connection is
+        held only while the frames are read and checkpointed; they are
+        compacted and written out after it is released.
+        """
+        with self._lock:
+            self.acquire()
+            if self.generation is None:
+                self.start_generation()
+            with self.db.pool.writer() as conn:
+                header = read_wal_header(self.wal_path)
+                position = self.position
+                if header is None:
+                    # Nothing written since the WAL was truncated; the next
+                    # header shows whether frames were lost before that
+                    return 0
+                    
+                page_size, seq, salt1, salt2 = header
+                if position['salt1'] is None:
+                    offset = WAL_HEADER_SIZE
+                elif (salt1, salt2) == (position['salt1'], position['salt2']):
+                    offset = position['offset']
+                elif salt1 == (position['salt1'] + 1) & 0xFFFFFFFF and position['checkpointed']:
+                    # SQLite adds one to the first salt each time the WAL
+                    # starts over; this is the restart after the archiver's
+                    # own checkpoint of everything archived
+                    offset = WAL_HEADER_SIZE
+                else:
+                    # The WAL started over more than once, or before its
+                    # frames were archived
+                    offset = None
+                    
+                if offset is not None:
+                    with open(self.wal_path, 'rb') as wal:
+                        data, frames, commits = scan_frames(wal, page_size, salt1, salt2, offset)
+                    end = offset + len(data)
+                    
+                    # Checkpoint while the writer is still held, so only
+                    # frames read above can reach the database file
+                    checkpointed = position['checkpointed'] and not frames
+                    if (end - WAL_HEADER_SIZE) // (FRAME_HEADER_SIZE + page_size) >= self.checkpoint_frames:
+                        busy, logged, done = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+                        checkpointed = not busy and logged == done
+                    self.position = {
+                        'seq': seq, 'salt1': salt1, 'salt2': salt2, 'offset': end, 'checkpointed': checkpointed
+                    }
+                    
+            if offset is None:
+                self.generation = None
+                self.start_generation()
+                return 0
+            if frames:
+                self._write_segment(compact_frames(data, page_size), frames, commits, seq, offset)
+            return frames
+            
+    def _current_position(self):
+        """Where the WAL's committed frames end; the writer must be held"""
+        header = read_wal_header(self.wal_path)
+        if header is None:
+            return {'seq': None, 'salt1': None, 'salt2': None, 'offset': WAL_HEADER_SIZE, 'checkpointed': True}
+        page_size, seq, salt1, salt2 = header
+        with open(self.wal_path, 'rb') as wal:
+            data, frames, commits = scan_frames(wal, page_size, salt1, salt2, WAL_HEADER_SIZE)
+        return {
+            'seq': seq, 'salt1': salt1, 'salt2': salt2, 'offset': WAL_HEADER_SIZE + len(data), 'checkpointed': False
+        }
+        
+    def _write_segment(self, data, frames, commits, seq, offset):
+        directory = os.path.join(self.root, self.generation)
+        self.segment += 1
+        name = f"{self.segment:08d}.wal.z"
+        path = os.path.join(directory, "segments", name)
+        with open(path + ".tmp", 'wb') as segment:
+            segment.write(zlib.compress(data, 6))
+            segment.flush()
+            os.fsync(segment.fileno())
+        os.replace(path + ".tmp", path)
+        entry = {
+            'segment': name,
+            'archived_at': datetime.now().strftime(TIME_FORMAT),
+            'frames': frames,
+            'commits': commits,
+            'wal_seq': seq,
+            'wal_offset': offset,
+        }
+        with open(os.path.join(directory, SEGMENT_INDEX), 'a') as index:
+            index.write(json.dumps(entry) + "\n")
+            index.flush()
+            os.fsync(index.fileno())
+        self.last_archived = entry['archived_at']
+
+def list_generations(root):
+    """Get every generation's record with its segment entries, oldest first"""
+    generations = []
+    if not os.path.isdir(root):
+        return generations
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name, GENERATION_FILE)
+        if not os.path.exists(path):
+            continue
+        with open(path) as record_file:
+            record = json.load(record_file)
+        record['segments'] = _read_segments(os.path.join(root, name))
+        generations.append(record)
+    return generations
+
+def list_gaps(root):
+    """Get the records of WAL frames checkpointed without being archived, oldest first"""
+    gaps = []
+    try:
+        with open(os.path.join(root, GAPS_FILE)) as gaps_file:
+            for line in gaps_file:
+                try:
+                    gaps.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return gaps
+
+def _read_segments(directory):
+    segments = []
+    try:
+        with open(os.path.join(directory, SEGMENT_INDEX)) as index:
+            for line in index:
+                try:
+                    segments.append(json.loads(line))
+                except ValueError:
+                    # A run interrupted while writing its entry; its
+                    # segment was never part of the archive
+                    break
+    except FileNotFoundError:
+        pass
+    return segments
+
+def restore_to(root, destination, target=None):
+    """Rebuild the database as of target (a datetime, or None for the latest archive run)
+    
+    Picks the newest generation whose base copy was taken at or before
+    target, then replays the segments archived at or before target on
+    top of it. Returns a dict describing what was restored.
+    """
+    candidates = [
+        generation for generation in list_generations(root)
+        if target is None or _parse_time(generation['created']) <= target
+    ]
+    if not candidates:
+        raise WalArchiveError("No archived base copy at or before the requested time")
+    generation = candidates[-1]
+    directory = os.path.join(root, generation['generation'])
+    segments = [
+        segment for segment in generation['segments']
+        if target is None or _parse_time(segment['archived_at']) <= target
+    ]
+    
+    partial = destination + ".partial"
+    commits = 0
+    try:
+        with gzip.open(os.path.join(directory, BASE_FILE), 'rb') as packed, open(partial, 'wb') as raw:
+            shutil.copyfileobj(packed, raw, 1024 * 1024)
+        with open(partial, 'r+b') as database:
+            for segment in segments:
+                with open(os.path.join(directory, "segments", segment['segment']), 'rb') as segment_file:
+                    data = zlib.decompress(segment_file.read())
+                apply_frames(database, data, generation['page_size'])
+                commits += segment['commits']
+                
+        # The replayed header still marks the file as WAL; make it a
+        # plain self-contained database and check it before using it
+        conn = sqlite3.connect(partial)
+        try:
+            conn.execute("PRAGMA journal_mode=DELETE")
+            check = conn.execute("PRAGMA quick_check").fetchone()[0]
+        finally:
+            conn.close()
+        if check != 'ok':
+            raise WalArchiveError(f"Restored database failed its integrity check: {check}")
+        os.replace(partial, destination)
+    except Exception:
+        for path in (partial, partial + "-journal", partial + "-wal", partial + "-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+        
+    last = segments[-1]['archived_at'] if segments else generation['created']
+    # Commits between the restored state and target that the archive lost
+    gaps = [
+        gap for gap in list_gaps(root)
+        if gap['generation'] == generation['generation'] and (target is None or _parse_time(gap['at']) <= target)
+    ]
+    return {
+        'generation': generation['generation'],
+        'base_created': generation['created'],
+        'segments': len(segments),
+        'transactions': commits,
+        'restored_to': last,
+        'destination': destination,
+        'gap': gaps[-1] if gaps else None,
+    }
+
+def _parse_time(text):
+    return datetime.strptime(text, TIME_FORMAT)
+
+def _write_json(path, record):
+    with open(path + ".tmp", 'w') as record_file:
+        json.dump(record, record_file, indent=1)
+    os.replace(path + ".tmp", path)
@@ -8,10 +8,19 @@ from tkinter import ttk, messagebox
 from datetime import datetime, timedelta
 import calendar
 
+from src.database.scheduling import AppointmentConflictError, OUTCOME_SKIPPED
+from src.gui.calendar_view import (
+    CalendarView, CalendarData, VIEW_WEEK, VIEW_MONTH, calendar_range, shift_anchor
+)
+
 class AppointmentManagement:
-    def __init__(self, parent, db_manager):
+    # View choices: the day list or a doctor-by-day calendar
+    VIEW_OPTIONS = {"Day": None, "Week": VIEW_WEEK, "Month": VIEW_MONTH}
+    
+    def __init__(self, parent, db_manager, async_db):
         self.parent = parent
         self.db_manager = db_manager
+        self.async_db = async_db
         
         self.create_widgets()
         self.load_appointments()
@@ -123,6 +132,39 @@ class AppointmentManagement:
             command=self.show_today
         ).pack(side='left', padx=5)
         
+        for text, steps in (("◀", -1), ("▶", 1)):
+            tk.Button(
+                filter_frame,
+                text=text,
+                font=('Arial', 9),
+                bg='#ecf0f1',
+                relief='flat',
+                padx=6,
+                pady=2,
+                cursor='hand2',
+                command=lambda steps=steps: self.step_date(steps)
+            ).pack(side='left', padx=2)
+            
+        # View selector
+        tk.Label(
+            filter_frame,
+            text="View:",
+            font=('Arial', 11),
+            bg='white',
+            fg='#34495e'
+        ).pack(side='left', padx=(20, 5))
+        
+        self.view_var = tk.StringVar(value="Day")
+        view_combo = ttk.Combobox(
+            filter_frame,
+            textvariable=self.view_var,
+            values=list(self.VIEW_OPTIONS),
+            width=7,
+            state="readonly"
+        )
+        view_combo.pack(side='left', padx=5)
+        view_combo.bind('<<ComboboxSelected>>', self.on_view_change)
+        
         # Status filter
         tk.Label(
             filter_frame,
@@ -168,10 +210,16 @@ class AppointmentManagement:
         # Appointment list
         self.create_appointment_list()
         
+        # Week/month calendar, shown instead of the list
+        self.calendar = CalendarView(
+            self.parent, on_select_day=self.open_day, working_hours=self.db_manager.working_hours
+        )
+        
     def create_appointment_list(self):
         """Create appointment list with treeview"""
         list_frame = tk.Frame(self.parent, bg='white')
         list_frame.pack(fill='both', expand=True, padx=20, pady=10)
+        self.list_frame = list_frame
         
         # Treeview
         columns = ('ID', 'Time', 'Patient', 'Doctor', 'Duration', 'Status', 'Notes')
@@ -208,63 +256,118 @@ class AppointmentManagement:
         
     def load_doctors_filter(self):
         """Load doctors for filter dropdown"""
-        try:
-            doctors = self.db_manager.execute_query(
-                "SELECT doctor_id, first_name, last_name FROM doctors ORDER BY first_name"
-            )
+        self.async_db.named(
+            'doctor_names',
+            callback=self.show_doctors_filter,
+            errback=lambda e: print(f"Failed to load doctors: {e}"),
+            owner=self.doctor_combo
+        )
+        
+    def show_doctors_filter(self, doctors):
+        """Fill the doctor filter dropdown"""
+        doctor_list = ["All"]
+        for doctor in doctors:
+            doctor_list.append(f"{doctor['first_name']} {doctor['last_name']}")
             
-            doctor_list = ["All"]
-            for doctor in doctors:
-                doctor_list.append(f"{doctor['first_name']} {doctor['last_name']}")
-                
-            self.doctor_combo['values'] = doctor_list
+        self.doctor_combo['values'] = doctor_list
+        
+    def load_appointments(self):
+        """Load appointments from database in the background"""
+        # Get current date filter
+        filter_date = self.date_var.get()
+        
+        view = self.VIEW_OPTIONS[self.view_var.get()]
+        if view is not None:
+            self.load_calendar(filter_date, view)
+            return
             
-        except Exception as e:
-            print(f"Failed to load doctors: {e}")
+        # Switching dates quickly only shows the last date picked
+        self.async_db.named(
+            'appointments_for_day', (filter_date,),
+            callback=self.show_appointments,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load appointments: {str(e)}"),
+            key='appointments',
+            owner=self.tree
+        )
+        
+    def show_appointments(self, appointments):
+        """Show loaded appointments in the list"""
+        # Clear existing items
+        for item in self.tree.get_children():
+            self.tree.delete(item)
             
-    def load_appointments(self):
-        """Load appointments from database"""
-        try:
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-                
-            # Get current date filter
-            filter_date = self.date_var.get()
+        for appointment in appointments:
+            # Determine row tag based on status
+            status = appointment['status'].lower()
+            tag = status if status in ['scheduled', 'completed', 'cancelled'] else 'no_show'
             
-            # Build query with filters
-            query = '''
-                SELECT a.appointment_id, a.appointment_time, a.duration_minutes,
-                       a.status, a.notes,
-                       (p.first_name || ' ' || p.last_name) as patient_name,
-                       (d.first_name || ' ' || d.last_name) as doctor_name
-                FROM appointments a
-                JOIN patients p ON a.patient_id = p.patient_id
-                JOIN doctors d ON a.doctor_id = d.doctor_id
-                WHERE DATE(a.appointment_date) = ?
-                ORDER BY a.appointment_time
-            '''
+            self.tree.insert('', 'end', values=(
+                appointment['appointment_id'],
+                appointment['appointment_time'],
+                appointment['patient_name'],
+                appointment['doctor_name'],
+                f"{appointment['duration_minutes']} min",
+                appointment['status'].title(),
+                appointment['notes'] or ''
+            ), tags=(tag,))
             
-            appointments = self.db_manager.execute_query(query, (filter_date,))
+    def load_calendar(self, filter_date, view):
+        """Load the week or month around the date with one range query"""
+        try:
+            anchor = datetime.strptime(filter_date, '%Y-%m-%d').date()
+        except ValueError:
+            messagebox.showerror("Validation", "Invalid date format. Use YYYY-MM-DD.")
+            return
             
-            for appointment in appointments:
-                # Determine row tag based on status
-                status = appointment['status'].lower()
-                tag = status if status in ['scheduled', 'completed', 'cancelled'] else 'no_show'
-                
-                self.tree.insert('', 'end', values=(
-                    appointment['appointment_id'],
-                    appointment['appointment_time'],
-                    appointment['patient_name'],
-                    appointment['doctor_name'],
-                    f"{appointment['duration_minutes']} min",
-                    appointment['status'].title(),
-                    appointment['notes'] or ''
-                ), tags=(tag,))
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load appointments: {str(e)}")
+        start_date, end_date = calendar_range(anchor, view)
+        
+        def fetch():
+            doctors = self.db_manager.execute_named('doctor_names')
+            if view == VIEW_MONTH:
+                # A month only shows per-day load, which the rollup already has
+                loads = self.db_manager.get_doctor_daily_load(start_date, end_date)
+                return CalendarData.from_daily_load(start_date, end_date, doctors, loads)
+            rows = self.db_manager.get_appointments_between(start_date, end_date)
+            return CalendarData(start_date, end_date, doctors, rows)
             
+        self.async_db.submit(
+            fetch,
+            callback=lambda data: self.calendar.show(data, view),
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load calendar: {str(e)}"),
+            key='appointments',
+            owner=self.calendar.canvas
+        )
+        
+    def on_view_change(self, event=None):
+        """Swap between the day list and the calendar"""
+        if self.VIEW_OPTIONS[self.view_var.get()] is None:
+            self.calendar.pack_forget()
+            self.list_frame.pack(fill='both', expand=True, padx=20, pady=10)
+        else:
+            self.list_frame.pack_forget()
+            self.calendar.pack(fill='both', expand=True, padx=20, pady=10)
+        self.load_appointments()
+        
+    def step_date(self, steps):
+        """Move to the previous or next day, week or month"""
+        try:
+            anchor = datetime.strptime(self.date_var.get(), '%Y-%m-%d').date()
+        except ValueError:
+            anchor = datetime.now().date()
+        view = self.VIEW_OPTIONS[self.view_var.get()]
+        if view is None:
+            anchor += timedelta(days=steps)
+        else:
+            anchor = shift_anchor(anchor, view, steps)
+        self.date_var.set(anchor.isoformat())
+        self.load_appointments()
+        
+    def open_day(self, day):
+        """Show the day list for a date picked in the calendar"""
+        self.date_var.set(day.isoformat())
+        self.view_var.set("Day")
+        self.on_view_change()
+        
     def on_filter(self, *args):
         """Handle filter changes"""
         self.load_appointments()
@@ -280,7 +383,7 @@ class AppointmentManagement:
         
     def new_appointment(self):
         """Open new appointment dialog"""
-        NewAppointmentDialog(self.parent, self.db_manager, self.load_appointments)
+        NewAppointmentDialog(self.parent, self.db_manager, self.load_appointments, self.async_db)
         
     def reschedule_appointment(self):
         """Reschedule selected appointment"""
@@ -303,9 +406,8 @@ class AppointmentManagement:
         
         if messagebox.askyesno("Confirm", "Are you sure you want to cancel this appointment?"):
             try:
-                self.db_manager.execute_update(
-                    "UPDATE appointments SET status = 'cancelled' WHERE appointment_id = ?",
-                    (appointment_id,)
+                self.db_manager.execute_named_update(
+                    'appointment_set_status', ('cancelled', appointment_id)
                 )
                 messagebox.showinfo("Success", "Appointment cancelled successfully.")
                 self.load_appointments()
@@ -322,9 +424,8 @@ class AppointmentManagement:
         appointment_id = self.tree.item(selected[0])['values'][0]
         
         try:
-            self.db_manager.execute_update(
-                "UPDATE appointments SET status = 'completed' WHERE appointment_id = ?",
-                (appointment_id,)
+            self.db_manager.execute_named_update(
+                'appointment_set_status', ('completed', appointment_id)
             )
             messagebox.showinfo("Success", "Appointment marked as completed.")
             self.load_appointments()
@@ -345,14 +446,28 @@ class AppointmentManagement:
         self.load_appointments()
 
 class NewAppointmentDialog:
-    def __init__(self, parent, db_manager, callback):
+    # Free slot search: how far ahead to look, how many to offer and the
+    # start time grid (matches the minute dropdown)
+    SLOT_SEARCH_DAYS = 14
+    SLOT_LIMIT = 20
+    SLOT_STEP_MINUTES = 15
+    
+    # Recurrence choices and their interval in days
+    REPEAT_OPTIONS = {"Does not repeat": 0, "Daily": 1, "Weekly": 7, "Every 2 weeks": 14}
+    MAX_OCCURRENCES = 52
+    
+    def __init__(self, parent, db_manager, callback, async_db):
         self.db_manager = db_manager
         self.callback = callback
+        self.async_db = async_db
+        self.patient_data = {}
+        self.doctor_data = {}
+        self.slot_data = {}
         
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("New Appointment")
-        self.dialog.geometry("500x600")
+        self.dialog.geometry("500x710")
         self.dialog.resizable(False, False)
         self.dialog.configure(bg='white')
         
@@ -369,8 +484,8 @@ class NewAppointmentDialog:
         """Center the dialog window"""
         self.dialog.update_idletasks()
         x = (self.dialog.winfo_screenwidth() // 2) - (500 // 2)
-        y = (self.dialog.winfo_screenheight() // 2) - (600 // 2)
-        self.dialog.geometry(f"500x600+{x}+{y}")
+        y = (self.dialog.winfo_screenheight() // 2) - (710 // 2)
+        self.dialog.geometry(f"500x710+{x}+{y}")
         
     def create_widgets(self):
         """Create form widgets"""
@@ -495,6 +610,73 @@ class NewAppointmentDialog:
         )
         duration_combo.grid(row=4, column=1, sticky='w', padx=10, pady=10)
         
+        # Free slots
+        tk.Label(
+            form_frame,
+            text="Free Slots",
+            font=('Arial', 11, 'bold'),
+            bg='white',
+            fg='#34495e'
+        ).grid(row=5, column=0, sticky='w', pady=10)
+        
+        slot_frame = tk.Frame(form_frame, bg='white')
+        slot_frame.grid(row=5, column=1, sticky='w', padx=10, pady=10)
+        
+        self.slot_var = tk.StringVar()
+        self.slot_combo = ttk.Combobox(
+            slot_frame,
+            textvariable=self.slot_var,
+            width=22,
+            state="readonly"
+        )
+        self.slot_combo.pack(side='left')
+        self.slot_combo.bind('<<ComboboxSelected>>', self.on_slot_selected)
+        
+        tk.Button(
+            slot_frame,
+            text="🔍 Find",
+            font=('Arial', 9),
+            bg='#3498db',
+            fg='white',
+            relief='flat',
+            padx=8,
+            cursor='hand2',
+            command=self.find_free_slots
+        ).pack(side='left', padx=(8, 0))
+        
+        # Repeat
+        tk.Label(
+            form_frame,
+            text="Repeat",
+            font=('Arial', 11, 'bold'),
+            bg='white',
+            fg='#34495e'
+        ).grid(row=6, column=0, sticky='w', pady=10)
+        
+        repeat_frame = tk.Frame(form_frame, bg='white')
+        repeat_frame.grid(row=6, column=1, sticky='w', padx=10, pady=10)
+        
+        self.repeat_var = tk.StringVar(value="Does not repeat")
+        ttk.Combobox(
+            repeat_frame,
+            textvariable=self.repeat_var,
+            values=list(self.REPEAT_OPTIONS),
+            width=16,
+            state="readonly"
+        ).pack(side='left')
+        
+        tk.Label(repeat_frame, text="times:", bg='white', font=('Arial', 10)).pack(side='left', padx=(8, 4))
+        
+        self.occurrences_var = tk.StringVar(value="1")
+        tk.Spinbox(
+            repeat_frame,
+            textvariable=self.occurrences_var,
+            from_=1,
+            to=self.MAX_OCCURRENCES,
+            width=5,
+            font=('Arial', 10)
+        ).pack(side='left')
+        
         # Notes
         tk.Label(
             form_frame,
@@ -502,7 +684,7 @@ class NewAppointmentDialog:
             font=('Arial', 11, 'bold'),
             bg='white',
             fg='#34495e'
-        ).grid(row=5, column=0, sticky='nw', pady=10)
+        ).grid(row=7, column=0, sticky='nw', pady=10)
         
         self.notes_text = tk.Text(
             form_frame,
@@ -511,7 +693,7 @@ class NewAppointmentDialog:
             font=('Arial', 10),
             wrap='word'
         )
-        self.notes_text.grid(row=5, column=1, sticky='w', padx=10, pady=10)
+        self.notes_text.grid(row=7, column=1, sticky='w', padx=10, pady=10)
         
         # Load data
         self.load_patients()
@@ -549,43 +731,93 @@ class NewAppointmentDialog:
         
     def load_patients(self):
         """Load patients for dropdown"""
-        try:
-            patients = self.db_manager.execute_query(
-                "SELECT patient_id, first_name, last_name FROM patients ORDER BY first_name"
-            )
+        self.async_db.named(
+            'patient_choices',
+            callback=self.show_patients,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load patients: {str(e)}"),
+            owner=self.patient_combo
+        )
+        
+    def show_patients(self, patients):
+        """Fill the patient dropdown"""
+        patient_list = []
+        self.patient_data = {}
+        
+        for patient in patients:
+            name = f"{patient['first_name']} {patient['last_name']}"
+            patient_list.append(name)
+            self.patient_data[name] = patient['patient_id']
             
-            patient_list = []
-            self.patient_data = {}
+        self.patient_combo['values'] = patient_list
+        
+    def load_doctors(self):
+        """Load doctors for dropdown"""
+        self.async_db.named(
+            'available_doctors',
+            callback=self.show_doctors,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load doctors: {str(e)}"),
+            owner=self.doctor_combo
+        )
+        
+    def show_doctors(self, doctors):
+        """Fill the doctor dropdown"""
+        doctor_list = []
+        self.doctor_data = {}
+        
+        for doctor in doctors:
+            name = f"Dr. {doctor['first_name']} {doctor['last_name']} ({doctor['specialization']})"
+            doctor_list.append(name)
+            self.doctor_data[name] = doctor['doctor_id']
             
-            for patient in patients:
-                name = f"{patient['first_name']} {patient['last_name']}"
-                patient_list.append(name)
-                self.patient_data[name] = patient['patient_id']
-                
-            self.patient_combo['values'] = patient_list
+        self.doctor_combo['values'] = doctor_list
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load patients: {str(e)}")
+    def find_free_slots(self):
+        """Look up the doctor's earliest free slots from the chosen date"""
+        if not self.doctor_var.get():
+            messagebox.showerror("Validation", "Please select a doctor.")
+            return
             
-    def load_doctors(self):
-        """Load doctors for dropdown"""
         try:
-            doctors = self.db_manager.execute_query(
-                "SELECT doctor_id, first_name, last_name, specialization FROM doctors WHERE is_available = 1 ORDER BY first_name"
-            )
-            
-            doctor_list = []
-            self.doctor_data = {}
+            start_date = datetime.strptime(self.date_var.get(), '%Y-%m-%d').date()
+        except ValueError:
+            messagebox.showerror("Validation", "Invalid date format. Use YYYY-MM-DD.")
+            return
             
-            for doctor in doctors:
-                name = f"Dr. {doctor['first_name']} {doctor['last_name']} ({doctor['specialization']})"
-                doctor_list.append(name)
-                self.doctor_data[name] = doctor['doctor_id']
-                
-            self.doctor_combo['values'] = doctor_list
+        end_date = start_date + timedelta(days=self.SLOT_SEARCH_DAYS)
+        duration = int(self.duration_var.get())
+        doctor_id = self.doctor_data[self.doctor_var.get()]
+        
+        self.slot_combo['values'] = ["Searching..."]
+        self.slot_var.set("Searching...")
+        self.async_db.submit(
+            lambda: self.db_manager.find_free_slots(
+                start_date, end_date, duration, doctor_id=doctor_id,
+                limit=self.SLOT_LIMIT, step_minutes=self.SLOT_STEP_MINUTES
+            ),
+            callback=self.show_free_slots,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to find free slots: {str(e)}"),
+            key='free_slots',
+            owner=self.slot_combo
+        )
+        
+    def show_free_slots(self, slots):
+        """Offer found slots in the dropdown"""
+        self.slot_data = {f"{slot['date']} {slot['start_time'][:5]}": slot for slot in slots}
+        self.slot_combo['values'] = list(self.slot_data)
+        self.slot_var.set("")
+        if not slots:
+            messagebox.showinfo(
+                "Free Slots",
+                f"No free slots in the next {self.SLOT_SEARCH_DAYS} days for the selected doctor."
+            )
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load doctors: {str(e)}")
+    def on_slot_selected(self, event=None):
+        """Copy the chosen slot into the date and time fields"""
+        slot = self.slot_data.get(self.slot_var.get())
+        if slot:
+            self.date_var.set(slot['date'])
+            self.hour_var.set(slot['start_time'][:2])
+            self.minute_var.set(slot['start_time'][3:5])
             
     def save_appointment(self):
         """Save new appointment to database"""
@@ -614,34 +846,34 @@ class NewAppointmentDialog:
                 messagebox.showerror("Validation", "Invalid date format. Use YYYY-MM-DD.")
                 return
                 
-            # Check for conflicts
-            conflict_query = '''
-                SELECT appointment_id FROM appointments 
-                WHERE doctor_id = ? AND appointment_date = ? 
-                AND appointment_time = ? AND status != 'cancelled'
-            '''
-            
-            conflicts = self.db_manager.execute_query(
-                conflict_query, (doctor_id, appointment_date, appointment_time)
-            )
-            
-            if conflicts:
-                messagebox.showerror("Conflict", "This time slot is already booked for the selected doctor.")
+            interval_days = self.REPEAT_OPTIONS[self.repeat_var.get()]
+            if interval_days:
+                try:
+                    occurrences = int(self.occurrences_var.get())
+                except ValueError:
+                    occurrences = 0
+                if not 1 <= occurrences <= self.MAX_OCCURRENCES:
+                    messagebox.showerror("Validation", f"Repeat between 1 and {self.MAX_OCCURRENCES} times.")
+                    return
+                if not self.save_series(patient_id, doctor_id, appointment_date, appointment_time,
+                                        duration, notes, interval_days, occurrences):
+                    return
+                self.callback()
+                self.dialog.destroy()
                 return
                 
-            # Insert appointment
-            insert_query = '''
-                INSERT INTO appointments (
+            # Insert appointment; the overlap check runs in the same transaction
+            try:
+                self.db_manager.book_appointment(
                     patient_id, doctor_id, appointment_date, appointment_time,
-                    duration_minutes, status, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            '''
-            
-            self.db_manager.execute_insert(
-                insert_query, 
-                (patient_id, doctor_id, appointment_date, appointment_time, 
-                 duration, 'scheduled', notes)
-            )
+                    duration, notes
+                )
+            except AppointmentConflictError as e:
+                messagebox.showerror(
+                    "Conflict",
+                    f"This time slot is not available for the selected doctor.\n\n{e}"
+                )
+                return
             
             messagebox.showinfo("Success", "Appointment scheduled successfully!")
             self.callback()  # Refresh appointment list
@@ -649,3 +881,43 @@ class NewAppointmentDialog:
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save appointment: {str(e)}")
+            
+    def save_series(self, patient_id, doctor_id, first_date, appointment_time,
+                    duration, notes, interval_days, occurrences):
+        """Book a recurring series; returns True if anything was booked
+        
+        All dates are checked in one go. If some are taken the user can
+        book the free ones only, or nothing.
+        """
+        series_id, outcomes = self.db_manager.book_recurring(
+            patient_id, doctor_id, first_date, appointment_time, occurrences,
+            duration, interval_days, notes
+        )
+        if series_id is None:
+            failed = [outcome for outcome in outcomes if outcome['status'] != OUTCOME_SKIPPED]
+            free = len(outcomes) - len(failed)
+            details = "\n".join(
+                f"{outcome['appointment_date']}: {outcome['message']}" for outcome in failed[:10]
+            )
+            if len(failed) > 10:
+                details += f"\n... and {len(failed) - 10} more"
+            if not free:
+                messagebox.showerror("Conflict", f"None of the dates are available.\n\n{details}")
+                return False
+            if not messagebox.askyesno(
+                "Conflict",
+                f"{len(failed)} of {len(outcomes)} dates are not available:\n\n{details}\n\n"
+                f"Book the {free} available dates only?"
+            ):
+                return False
+            series_id, outcomes = self.db_manager.book_recurring(
+                patient_id, doctor_id, first_date, appointment_time, occurrences,
+                duration, interval_days, notes, skip_conflicts=True
+            )
+            
+        booked = sum(1 for outcome in outcomes if outcome['appointment_id'])
+        if not booked:
+            messagebox.showerror("Conflict", "The available dates were taken in the meantime.")
+            return False
+        messagebox.showinfo("Success", f"Booked {booked} of {len(outcomes)} appointments in the series.")
+        return True
@@ -0,0 +1,153 @@
+"""
+Background Database Access for Hospital Management System
+Runs database calls on worker threads and hands results back to the Tk loop
+"""
+
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+# How often the Tk loop checks for finished requests while any are running
+POLL_MS = 15
+
+class DatabaseRequest:
+    """Handle for one submitted database call"""
+    
+    def __init__(self, key, owner, callback, errback):
+        self.key = key
+        self.owner = owner
+        self.callback = callback
+        self.errback = errback
+        self.cancelled = False
+        self.future = None
+
+class AsyncDatabase:
+    """Run DatabaseManager calls on a worker pool without blocking the UI
+    
+    submit() must be called from the Tk thread. The call runs on a worker
+    and its callback runs later on the Tk thread via root.after. A newer
+    request with the same key supersedes an older one: the older one is
+    cancelled if it has not started and its result is dropped otherwise.
+    Results for widgets that have been destroyed are dropped as well.
+    """
+    
+    def __init__(self, root, db_manager, workers=None):
+        self.root = root
+        self.db_manager = db_manager
+        if workers is None:
+            workers = max(2, db_manager.pool.reader_count)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hms-db")
+        self._done = queue.Queue()
+        self._latest = {}
+        self._running = 0
+        self._poll_job = None
+        self._busy_listeners = []
+        self._closed = False
+        
+    def submit(self, func, *args, callback=None, errback=None, key=None, owner=None):
+        """Run func(*args) on a worker and pass the result to callback"""
+        if self._closed:
+            raise RuntimeError("Background database access is shut down")
+        if key is not None:
+            self.cancel(key)
+            
+        request = DatabaseRequest(key, owner, callback, errback)
+        if key is not None:
+            self._latest[key] = request
+        request.future = self._executor.submit(self._run, request, func, args)
+        
+        self._running += 1
+        if self._running == 1:
+            self._notify_busy(True)
+        self._schedule_poll()
+        return request
+        
+    def named(self, name, params=None, **kwargs):
+        """Run a registered read query in the background"""
+        return self.submit(self.db_manager.execute_named, name, params, **kwargs)
+        
+    def cancel(self, key):
+        """Cancel the latest request submitted under key"""
+        request = self._latest.pop(key, None)
+        if request is None:
+            return
+        request.cancelled = True
+        if request.future.cancel():
+            # Never started, so it will never report back
+            self._finish()
+            
+    def _run(self, request, func, args):
+        """Worker side: run the call and queue the outcome"""
+        try:
+            self._done.put((request, func(*args), None))
+        except Exception as e:
+            self._done.put((request, None, e))
+            
+    def _schedule_poll(self):
+        if self._poll_job is None and self._running:
+            self._poll_job = self.root.after(POLL_MS, self._poll)
+            
+    def _poll(self):
+        """Tk side: deliver finished requests"""
+        self._poll_job = None
+        try:
+            while True:
+                try:
+                    request, result, error = self._done.get_nowait()
+                except queue.Empty:
+                    break
+                self._finish()
+                try:
+                    self._deliver(request, result, error)
+                except Exception:
+                    # A failing callback must not stop delivery of the others
+                    self.root.report_callback_exception(*sys.exc_info())
+        finally:
+            if not self._closed:
+                self._schedule_poll()
+        
+    def _deliver(self, request, result, error):
+        if request.cancelled:
+            return
+        if request.key is not None:
+            if self._latest.get(request.key) is not request:
+                return
+            del self._latest[request.key]
+        if request.owner is not None and not request.owner.winfo_exists():
+            return
+            
+        if error is None:
+            if request.callback:
+                request.callback(result)
+        elif request.errback:
+            request.errback(error)
+        else:
+            messagebox.showerror("Error", f"Database error: {str(error)}")
+            
+    def _finish(self):
+        self._running -= 1
+        if self._running == 0:
+            self._notify_busy(False)
+            
+    def is_busy(self):
+        """Whether any request is still running"""
+        return self._running > 0
+        
+    def add_busy_listener(self, listener):
+        """Call listener(busy) whenever work starts or the last request finishes"""
+        self._busy_listeners.append(listener)
+        
+    def _notify_busy(self, busy):
+        for listener in self._busy_listeners:
+            listener(busy)
+            
+    def shutdown(self):
+        """Stop accepting work and wait for running calls to finish"""
+        self._closed = True
+        for key in list(self._latest):
+            self.cancel(key)
+        if self._poll_job is not None:
+            self.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self._executor.shutdown(wait=True)
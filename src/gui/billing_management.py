@@ -5,12 +5,23 @@ Comprehensive billing and payment tracking
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+
+from src.database.date_ranges import DateRange, day_range, month_range
+from src.database.db_manager import FIRST_BILL_KEY, BILL_FILTER_ALL
+from src.database.payments import PaymentError
+from src.database.scheduling import as_date
+from src.utils.money import Money
+from src.gui.paged_tree import PagedTreeview
+
+# Bills fetched per keyset page while scrolling
+PAGE_SIZE = 200
 
 class BillingManagement:
-    def __init__(self, parent, db_manager):
+    def __init__(self, parent, db_manager, async_db):
         self.parent = parent
         self.db_manager = db_manager
+        self.async_db = async_db
         
         self.create_widgets()
         self.load_bills()
@@ -166,55 +177,28 @@ class BillingManagement:
         summary_frame = tk.Frame(self.parent, bg='white')
         summary_frame.pack(fill='x', padx=20, pady=10)
         
-        # Get summary data
-        try:
-            # Total outstanding
-            outstanding_result = self.db_manager.execute_query(
-                "SELECT SUM(total_amount - paid_amount) as outstanding FROM billing WHERE payment_status != 'paid'"
-            )
-            outstanding = outstanding_result[0]['outstanding'] if outstanding_result and outstanding_result[0]['outstanding'] else 0
-            
-            # Today's revenue
-            today_result = self.db_manager.execute_query(
-                "SELECT SUM(paid_amount) as today_revenue FROM billing WHERE DATE(bill_date) = DATE('now')"
-            )
-            today_revenue = today_result[0]['today_revenue'] if today_result and today_result[0]['today_revenue'] else 0
-            
-            # This month's revenue
-            month_result = self.db_manager.execute_query(
-                "SELECT SUM(paid_amount) as month_revenue FROM billing WHERE strftime('%Y-%m', bill_date) = strftime('%Y-%m', 'now')"
-            )
-            month_revenue = month_result[0]['month_revenue'] if month_result and month_result[0]['month_revenue'] else 0
-            
-            # Pending bills count
-            pending_result = self.db_manager.execute_query(
-                "SELECT COUNT(*) as pending_count FROM billing WHERE payment_status = 'pending'"
-            )
-            pending_count = pending_result[0]['pending_count'] if pending_result else 0
-            
-        except Exception as e:
-            outstanding = today_revenue = month_revenue = pending_count = 0
-            
-        # Create cards
+        # Create cards; values are filled in once the summary query returns
         cards_data = [
-            ("Outstanding Amount", f"${outstanding:,.2f}", "#e74c3c"),
-            ("Today's Revenue", f"${today_revenue:,.2f}", "#27ae60"),
-            ("This Month", f"${month_revenue:,.2f}", "#3498db"),
-            ("Pending Bills", str(pending_count), "#f39c12")
+            ('outstanding', "Outstanding Amount", "#e74c3c"),
+            ('today_revenue', "Today's Revenue", "#27ae60"),
+            ('month_revenue', "This Month", "#3498db"),
+            ('pending_count', "Pending Bills", "#f39c12")
         ]
         
-        for i, (title, value, color) in enumerate(cards_data):
+        self.summary_labels = {}
+        for i, (key, title, color) in enumerate(cards_data):
             card_frame = tk.Frame(summary_frame, bg=color, width=200, height=80)
             card_frame.pack(side='left', padx=10, pady=5, fill='x', expand=True)
             card_frame.pack_propagate(False)
             
-            tk.Label(
+            self.summary_labels[key] = tk.Label(
                 card_frame,
-                text=value,
+                text="...",
                 font=('Arial', 16, 'bold'),
                 bg=color,
                 fg='white'
-            ).pack(pady=(10, 0))
+            )
+            self.summary_labels[key].pack(pady=(10, 0))
             
             tk.Label(
                 card_frame,
@@ -224,6 +208,51 @@ class BillingManagement:
                 fg='white'
             ).pack()
             
+        self.load_summary()
+        
+    def fetch_summary(self):
+        """Get summary data (runs on a background worker)"""
+        # Total outstanding
+        outstanding_result = self.db_manager.execute_named('billing_outstanding_total')
+        outstanding = outstanding_result[0]['outstanding_cents'] if outstanding_result else 0
+        
+        # Today's revenue
+        today_result = self.db_manager.execute_named('billing_revenue_between', day_range().params())
+        today_revenue = today_result[0]['revenue_cents'] if today_result else 0
+        
+        # This month's revenue
+        month_result = self.db_manager.execute_named('billing_revenue_between', month_range().params())
+        month_revenue = month_result[0]['revenue_cents'] if month_result else 0
+        
+        # Pending bills count
+        pending_result = self.db_manager.execute_named('billing_pending_count')
+        pending_count = pending_result[0]['pending_count'] if pending_result else 0
+        
+        return {
+            'outstanding': outstanding,
+            'today_revenue': today_revenue,
+            'month_revenue': month_revenue,
+            'pending_count': pending_count
+        }
+        
+    def load_summary(self):
+        """Refresh the summary cards in the background"""
+        self.async_db.submit(
+            self.fetch_summary,
+            callback=self.show_summary,
+            errback=lambda e: self.show_summary(dict.fromkeys(self.summary_labels, 0)),
+            key='billing_summary',
+            owner=self.summary_labels['pending_count']
+        )
+        
+    def show_summary(self, summary):
+        """Show summary values on the cards"""
+        for key, label in self.summary_labels.items():
+            if key == 'pending_count':
+                label.config(text=str(summary[key]))
+            else:
+                label.config(text=str(Money.of(summary[key])))
+                
     def create_bills_list(self):
         """Create bills list with treeview"""
         list_frame = tk.Frame(self.parent, bg='white')
@@ -246,7 +275,20 @@ class BillingManagement:
         v_scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(list_frame, orient='horizontal', command=self.tree.xview)
         
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        # Bills are fetched one keyset page at a time as the list scrolls
+        self.pager = PagedTreeview(
+            self.tree,
+            self.fetch_bills(BILL_FILTER_ALL, None),
+            key=lambda bill: (bill['bill_date'], bill['bill_id']),
+            row_values=self.bill_values,
+            row_tags=self.bill_tags,
+            page_size=PAGE_SIZE,
+            first_key=FIRST_BILL_KEY,
+            yscrollcommand=v_scrollbar.set,
+            async_db=self.async_db
+        )
         
         # Pack widgets
         self.tree.pack(side='left', fill='both', expand=True)
@@ -262,57 +304,58 @@ class BillingManagement:
         self.tree.tag_configure('overdue', background='#f8e8e8')
         self.tree.tag_configure('partial', background='#e8f4f8')
         
+    def fetch_bills(self, status, date_range):
+        """Build a fetcher for keyset pages of the bills matching the filters"""
+        def fetch(after_key, limit):
+            return self.db_manager.get_bills_page(after_key, limit, status, date_range)
+        return fetch
+        
+    def filter_dates(self):
+        """Get the bill date range from the filter fields; either end may be left empty"""
+        start = self.date_from_var.get().strip()
+        end = self.date_to_var.get().strip()
+        return DateRange(
+            as_date(start) if start else date.min,
+            as_date(end) + timedelta(days=1) if end else date.max
+        )
+        
     def load_bills(self):
-        """Load bills from database"""
+        """Load the first page of bills matching the filters in the background"""
         try:
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-                
-            # Get bills data
-            query = '''
-                SELECT b.bill_id, b.bill_date, b.total_amount, b.paid_amount,
-                       b.payment_status, b.due_date,
-                       (p.first_name || ' ' || p.last_name) as patient_name
-                FROM billing b
-                JOIN patients p ON b.patient_id = p.patient_id
-                ORDER BY b.bill_date DESC
-            '''
-            
-            bills = self.db_manager.execute_query(query)
-            
-            for bill in bills:
-                balance = float(bill['total_amount']) - float(bill['paid_amount'])
-                
-                # Determine status tag
-                status = bill['payment_status'].lower()
-                tag = status if status in ['paid', 'pending', 'partial'] else 'overdue'
-                
-                # Check if overdue
-                if bill['due_date'] and datetime.strptime(bill['due_date'], '%Y-%m-%d') < datetime.now() and status != 'paid':
-                    tag = 'overdue'
-                    
-                self.tree.insert('', 'end', values=(
-                    bill['bill_id'],
-                    bill['bill_date'][:10],  # Show only date part
-                    bill['patient_name'],
-                    f"${bill['total_amount']:,.2f}",
-                    f"${bill['paid_amount']:,.2f}",
-                    f"${balance:,.2f}",
-                    bill['payment_status'].title(),
-                    bill['due_date'] or 'N/A'
-                ), tags=(tag,))
-                
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load bills: {str(e)}")
-            
+            date_range = self.filter_dates()
+        except (ValueError, OverflowError):
+            # OverflowError: an end date of 9999-12-31 has no following day
+            messagebox.showerror("Validation", "Please enter dates as YYYY-MM-DD, with the start on or before the end.")
+            return
+        self.pager.set_source(self.fetch_bills(self.status_var.get(), date_range))
+        
+    def bill_values(self, bill):
+        """Treeview values for a bill row"""
+        return (
+            bill['bill_id'],
+            bill['bill_date'][:10],  # Show only date part
+            bill['patient_name'],
+            str(Money(bill['total_cents'])),
+            str(Money(bill['paid_cents'])),
+            str(Money(bill['balance_cents'])),
+            bill['payment_status'].title(),
+            bill['due_date'] or 'N/A'
+        )
+        
+    def bill_tags(self, bill):
+        """Row color tag for a bill; overdue is computed by the query"""
+        if bill['overdue']:
+            return ('overdue',)
+        status = bill['payment_status'].lower()
+        return (status if status in ['paid', 'pending', 'partial'] else 'overdue',)
+        
     def on_filter(self, *args):
         """Handle status filter"""
-        self.load_bills()  # Simplified - could implement actual filtering
+        self.load_bills()
         
     def apply_date_filter(self):
         """Apply date range filter"""
-        self.load_bills()  # Simplified - could implement actual filtering
+        self.load_bills()
         
     def on_item_double_click(self, event):
         """Handle double-click on bill item"""
@@ -320,7 +363,7 @@ class BillingManagement:
         
     def create_bill(self):
         """Open create bill dialog"""
-        CreateBillDialog(self.parent, self.db_manager, self.load_bills)
+        CreateBillDialog(self.parent, self.db_manager, self.load_bills, self.async_db)
         
     def record_payment(self):
         """Record payment for selected bill"""
@@ -343,8 +386,24 @@ class BillingManagement:
         messagebox.showinfo("Info", f"Print bill {bill_id} - Implementation in progress")
         
     def show_reports(self):
-        """Show billing reports"""
-        messagebox.showinfo("Info", "Billing reports - Implementation in progress")
+        """Show the receivables aging report, running the aging job if it has not run today"""
+        self.async_db.submit(
+            self.db_manager.get_aging_summary,
+            callback=self.show_aging,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load aging report: {str(e)}"),
+            key='aging',
+            owner=self.tree
+        )
+        
+    def show_aging(self, summary):
+        """Show an aging summary and refresh the bills whose status it changed"""
+        lines = [f"Receivables as of {summary['as_of']}", ""]
+        lines.append(f"Not yet due: {summary['current_bills']} bills, {Money(summary['current_cents'])}")
+        for bucket, bills, cents in summary['buckets']:
+            lines.append(f"{bucket} days past due: {bills} bills, {Money(cents)}")
+        messagebox.showinfo("Receivables Aging", "\n".join(lines))
+        if summary['marked_overdue'] or summary['cleared_overdue']:
+            self.refresh()
         
     def view_bill_details(self):
         """View detailed bill information"""
@@ -358,12 +417,14 @@ class BillingManagement:
     def refresh(self):
         """Refresh bills list"""
         self.load_bills()
-        self.create_summary_cards()  # Refresh summary as well
+        self.load_summary()  # Refresh summary as well
 
 class CreateBillDialog:
-    def __init__(self, parent, db_manager, callback):
+    def __init__(self, parent, db_manager, callback, async_db):
         self.db_manager = db_manager
         self.callback = callback
+        self.async_db = async_db
+        self.patient_data = {}
         
         # Create dialog window
         self.dialog = tk.Toplevel(parent)
@@ -510,24 +571,25 @@ class CreateBillDialog:
         ).pack(side='left', padx=10)
         
     def load_patients(self):
-        """Load patients for dropdown"""
-        try:
-            patients = self.db_manager.execute_query(
-                "SELECT patient_id, first_name, last_name FROM patients ORDER BY first_name"
-            )
-            
-            patient_list = []
-            self.patient_data = {}
-            
-            for patient in patients:
-                name = f"{patient['first_name']} {patient['last_name']}"
-                patient_list.append(name)
-                self.patient_data[name] = patient['patient_id']
-                
-            self.patient_combo['values'] = patient_list
+        """Load patients for dropdown in the background"""
+        self.async_db.named(
+            'patient_choices',
+            callback=self.show_patients,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load patients: {str(e)}"),
+            owner=self.dialog
+        )
+        
+    def show_patients(self, patients):
+        """Fill the patient dropdown"""
+        patient_list = []
+        self.patient_data = {}
+        
+        for patient in patients:
+            name = f"{patient['first_name']} {patient['last_name']}"
+            patient_list.append(name)
+            self.patient_data[name] = patient['patient_id']
             
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load patients: {str(e)}")
+        self.patient_combo['values'] = patient_list
             
     def save_bill(self):
         """Save new bill to database"""
@@ -543,26 +605,19 @@ class CreateBillDialog:
                 
             # Get data
             patient_id = self.patient_data[self.patient_var.get()]
-            total_amount = float(self.amount_var.get())
+            total_amount = Money.parse(self.amount_var.get())
             due_date = self.due_date_var.get() if self.due_date_var.get() else None
             notes = self.notes_text.get(1.0, 'end-1c').strip()
             
             # Validate amount
-            if total_amount <= 0:
+            if total_amount <= Money(0):
                 messagebox.showerror("Validation", "Amount must be greater than 0.")
                 return
                 
             # Insert bill
-            query = '''
-                INSERT INTO billing (
-                    patient_id, total_amount, paid_amount, payment_status,
-                    bill_date, due_date, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            '''
-            
-            self.db_manager.execute_insert(
-                query, 
-                (patient_id, total_amount, 0, 'pending', 
+            self.db_manager.execute_named_insert(
+                'bill_insert',
+                (patient_id, total_amount.cents, 0, 'pending',
                  datetime.now().strftime('%Y-%m-%d %H:%M:%S'), due_date, notes)
             )
             
@@ -610,19 +665,11 @@ class RecordPaymentDialog:
     def load_bill_details(self):
         """Load bill details"""
         try:
-            query = '''
-                SELECT b.total_amount, b.paid_amount, 
-                       (p.first_name || ' ' || p.last_name) as patient_name
-                FROM billing b
-                JOIN patients p ON b.patient_id = p.patient_id
-                WHERE b.bill_id = ?
-            '''
-            
-            result = self.db_manager.execute_query(query, (self.bill_id,))
+            result = self.db_manager.execute_named('bill_payment_details', (self.bill_id,))
             
             if result:
                 self.bill_data = result[0]
-                self.remaining_amount = float(self.bill_data['total_amount']) - float(self.bill_data['paid_amount'])
+                self.remaining_amount = Money(self.bill_data['total_cents']) - Money(self.bill_data['paid_cents'])
             else:
                 messagebox.showerror("Error", "Bill not found.")
                 self.dialog.destroy()
@@ -658,7 +705,7 @@ class RecordPaymentDialog:
         
         tk.Label(
             info_frame,
-            text=f"Total Amount: ${self.bill_data['total_amount']:,.2f}",
+            text=f"Total Amount: {Money(self.bill_data['total_cents'])}",
             font=('Arial', 11),
             bg='#ecf0f1',
             fg='#2c3e50'
@@ -666,7 +713,7 @@ class RecordPaymentDialog:
         
         tk.Label(
             info_frame,
-            text=f"Already Paid: ${self.bill_data['paid_amount']:,.2f}",
+            text=f"Already Paid: {Money(self.bill_data['paid_cents'])}",
             font=('Arial', 11),
             bg='#ecf0f1',
             fg='#2c3e50'
@@ -674,7 +721,7 @@ class RecordPaymentDialog:
         
         tk.Label(
             info_frame,
-            text=f"Remaining: ${self.remaining_amount:,.2f}",
+            text=f"Remaining: {self.remaining_amount}",
             font=('Arial', 11, 'bold'),
             bg='#ecf0f1',
             fg='#e74c3c'
@@ -693,7 +740,7 @@ class RecordPaymentDialog:
             fg='#34495e'
         ).pack(anchor='w', pady=(0, 5))
         
-        self.payment_var = tk.StringVar(value=str(self.remaining_amount))
+        self.payment_var = tk.StringVar(value=self.remaining_amount.amount())
         self.payment_entry = tk.Entry(
             form_frame,
             textvariable=self.payment_var,
@@ -755,9 +802,9 @@ class RecordPaymentDialog:
         """Save payment record"""
         try:
             # Validate payment amount
-            payment_amount = float(self.payment_var.get())
+            payment_amount = Money.parse(self.payment_var.get())
             
-            if payment_amount <= 0:
+            if payment_amount <= Money(0):
                 messagebox.showerror("Validation", "Payment amount must be greater than 0.")
                 return
                 
@@ -765,34 +812,17 @@ class RecordPaymentDialog:
                 messagebox.showerror("Validation", "Payment amount cannot exceed remaining balance.")
                 return
                 
-            # Calculate new totals
-            new_paid_amount = float(self.bill_data['paid_amount']) + payment_amount
-            total_amount = float(self.bill_data['total_amount'])
-            
-            # Determine new payment status
-            if new_paid_amount >= total_amount:
-                new_status = 'paid'
-            elif new_paid_amount > 0:
-                new_status = 'partial'
-            else:
-                new_status = 'pending'
-                
-            # Update bill
-            update_query = '''
-                UPDATE billing 
-                SET paid_amount = ?, payment_status = ?, payment_method = ?
-                WHERE bill_id = ?
-            '''
-            
-            self.db_manager.execute_update(
-                update_query, 
-                (new_paid_amount, new_status, self.method_var.get(), self.bill_id)
-            )
+            # The ledger re-checks the balance, in case another payment was
+            # recorded since this dialog opened
+            self.db_manager.record_payment(self.bill_id, payment_amount, self.method_var.get())
             
-            messagebox.showinfo("Success", f"Payment of ${payment_amount:,.2f} recorded successfully!")
+            messagebox.showinfo("Success", f"Payment of {payment_amount} recorded successfully!")
             self.callback()  # Refresh bills list
             self.dialog.destroy()
             
+        except PaymentError as e:
+            messagebox.showerror("Payment Rejected", f"{e}. Please reopen the bill to see its current balance.")
+            self.callback()
         except ValueError:
             messagebox.showerror("Validation", "Please enter a valid payment amount.")
         except Exception as e:
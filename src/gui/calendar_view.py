@@ -0,0 +1,268 @@
+"""
+Calendar View for Hospital Management System
+Week and month appointment grids on a Canvas, one row per doctor
+"""
+
+import calendar
+import tkinter as tk
+from tkinter import ttk
+from datetime import date, timedelta
+
+from src.database.availability import time_to_minutes
+from src.database.scheduling import FREE_STATUSES, WORKING_HOURS
+
+VIEW_WEEK = 'week'
+VIEW_MONTH = 'month'
+
+STATUS_COLORS = {
+    'scheduled': '#27ae60',
+    'completed': '#3498db',
+    'cancelled': '#e6b0aa',
+    'no_show': '#f39c12'
+}
+
+def calendar_range(anchor, view):
+    """Get the [start, end) dates of the week (Monday first) or month containing anchor"""
+    if view == VIEW_MONTH:
+        start = anchor.replace(day=1)
+        return start, start + timedelta(days=calendar.monthrange(anchor.year, anchor.month)[1])
+    start = anchor - timedelta(days=anchor.weekday())
+    return start, start + timedelta(days=7)
+
+def shift_anchor(anchor, view, steps):
+    """Move anchor by whole weeks or months"""
+    if view == VIEW_MONTH:
+        month = anchor.year * 12 + anchor.month - 1 + steps
+        year, month = divmod(month, 12)
+        day = min(anchor.day, calendar.monthrange(year, month + 1)[1])
+        return date(year, month + 1, day)
+    return anchor + timedelta(days=7 * steps)
+
+class CalendarData:
+    """Appointments of a date range grouped by doctor and day
+    
+    doctors are rows with doctor_id, first_name and last_name; rows come
+    from the appointments_between query. Built on a worker thread so the
+    Tk thread only has to draw. Each cell holds (start, end, status,
+    appointment_id) tuples in minutes since midnight.
+    """
+    
+    def __init__(self, start_date, end_date, doctors, rows=()):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = [start_date + timedelta(days=i) for i in range((end_date - start_date).days)]
+        self.doctors = [
+            (doctor['doctor_id'], f"Dr. {doctor['first_name']} {doctor['last_name']}") for doctor in doctors
+        ]
+        self._positions = {doctor_id: i for i, (doctor_id, name) in enumerate(self.doctors)}
+        self._columns = {day.isoformat(): i for i, day in enumerate(self.days)}
+        
+        self.cells = {}
+        self.counts = {}
+        self.booked_minutes = {}
+        minutes = {}
+        for appointment_id, doctor_id, appointment_date, appointment_time, duration, status in rows:
+            row = self._positions.get(doctor_id)
+            column = self._columns.get(appointment_date)
+            if row is None or column is None:
+                continue
+            start = minutes.get(appointment_time)
+            if start is None:
+                start = minutes[appointment_time] = time_to_minutes(appointment_time)
+            status = (status or 'scheduled').lower()
+            self.cells.setdefault((row, column), []).append(
+                (start, start + (duration or 0), status, appointment_id)
+            )
+            if status not in FREE_STATUSES:
+                self.counts[(row, column)] = self.counts.get((row, column), 0) + 1
+                self.booked_minutes[(row, column)] = self.booked_minutes.get((row, column), 0) + (duration or 0)
+                
+    @classmethod
+    def from_daily_load(cls, start_date, end_date, doctors, loads):
+        """Build counts and booked minutes only, from (doctor_id, day, active, booked_minutes) rollup rows"""
+        data = cls(start_date, end_date, doctors)
+        for doctor_id, day, active, booked_minutes in loads:
+            row = data._positions.get(doctor_id)
+            column = data._columns.get(day)
+            if row is not None and column is not None:
+                data.counts[(row, column)] = active
+                data.booked_minutes[(row, column)] = booked_minutes
+        return data
+        
+    def cell(self, row, column):
+        """Get the appointments of one doctor on one day"""
+        return self.cells.get((row, column), [])
+        
+    def count(self, row, column):
+        """Count the appointments of one doctor on one day that hold their slot"""
+        return self.counts.get((row, column), 0)
+
+class CalendarView:
+    """Doctor-by-day appointment grid that only draws the rows in view
+    
+    The week view draws every appointment as a bar placed by its time
+    within the working day; the month view draws one load bar and count
+    per doctor and day. Scrolling redraws just the visible rows, so the
+    cost of a redraw does not grow with the number of doctors.
+    on_select_day(day) is called when a day column or cell is clicked.
+    """
+    
+    NAME_WIDTH = 170
+    HEADER_HEIGHT = 36
+    ROW_HEIGHT = 28
+    
+    def __init__(self, parent, on_select_day=None, working_hours=WORKING_HOURS):
+        self.on_select_day = on_select_day
+        self.day_start = time_to_minutes(working_hours[0])
+        self.day_end = time_to_minutes(working_hours[1])
+        self.data = None
+        self.view = VIEW_WEEK
+        self._redraw_job = None
+        self._full_redraw = False
+        
+        self.frame = tk.Frame(parent, bg='white')
+        self.header = tk.Canvas(self.frame, height=self.HEADER_HEIGHT, bg='#ecf0f1', highlightthickness=0)
+        self.header.pack(side='top', fill='x')
+        
+        body = tk.Frame(self.frame, bg='white')
+        body.pack(side='top', fill='both', expand=True)
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical')
+        self.scrollbar.pack(side='right', fill='y')
+        self.canvas = tk.Canvas(
+            body, bg='white', highlightthickness=0,
+            yscrollincrement=self.ROW_HEIGHT, yscrollcommand=self._on_scroll
+        )
+        self.canvas.pack(side='left', fill='both', expand=True)
+        self.scrollbar.configure(command=self.canvas.yview)
+        
+        self.canvas.bind('<Configure>', lambda event: self.schedule_redraw(full=True))
+        self.canvas.bind('<MouseWheel>', self._on_wheel)
+        self.canvas.bind('<Button-4>', lambda event: self.canvas.yview_scroll(-1, 'units'))
+        self.canvas.bind('<Button-5>', lambda event: self.canvas.yview_scroll(1, 'units'))
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.header.bind('<Button-1>', self._on_click)
+        
+    def pack(self, **kwargs):
+        self.frame.pack(**kwargs)
+        
+    def pack_forget(self):
+        self.frame.pack_forget()
+        
+    def show(self, data, view=VIEW_WEEK):
+        """Show loaded calendar data"""
+        self.data = data
+        self.view = view
+        self.canvas.configure(scrollregion=(0, 0, 0, len(data.doctors) * self.ROW_HEIGHT))
+        self.canvas.yview_moveto(0)
+        self.schedule_redraw(full=True)
+        
+    def schedule_redraw(self, full=False):
+        """Redraw once Tk is idle, merging bursts of scroll and resize events"""
+        self._full_redraw = self._full_redraw or full
+        if self._redraw_job is None:
+            self._redraw_job = self.canvas.after_idle(self.redraw)
+            
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.schedule_redraw()
+        
+    def _on_wheel(self, event):
+        self.canvas.yview_scroll(-1 if event.delta > 0 else 1, 'units')
+        
+    def _columns(self):
+        """Get the x position and width of each day column"""
+        width = max(self.canvas.winfo_width(), self.header.winfo_width())
+        count = len(self.data.days)
+        column_width = max((width - self.NAME_WIDTH) / count, 12)
+        return [self.NAME_WIDTH + i * column_width for i in range(count)], column_width
+        
+    def redraw(self):
+        """Draw the header and the rows currently in view"""
+        self._redraw_job = None
+        if self.data is None:
+            return
+        columns, column_width = self._columns()
+        if self._full_redraw:
+            self._full_redraw = False
+            self._draw_header(columns, column_width)
+            
+        self.canvas.delete('row')
+        top = int(self.canvas.canvasy(0))
+        height = self.canvas.winfo_height()
+        first = max(top // self.ROW_HEIGHT, 0)
+        last = min((top + height) // self.ROW_HEIGHT + 1, len(self.data.doctors))
+        right = columns[-1] + column_width if columns else self.NAME_WIDTH
+        
+        for row in range(first, last):
+            y = row * self.ROW_HEIGHT
+            if row % 2:
+                self.canvas.create_rectangle(0, y, right, y + self.ROW_HEIGHT, fill='#f8f9fa', width=0, tags='row')
+            self.canvas.create_text(
+                8, y + self.ROW_HEIGHT / 2, text=self.data.doctors[row][1], anchor='w',
+                font=('Arial', 9), fill='#2c3e50', tags='row'
+            )
+            for column, x in enumerate(columns):
+                if self.view == VIEW_MONTH:
+                    self._draw_load(row, column, x, y, column_width)
+                else:
+                    self._draw_bars(row, column, x, y, column_width)
+                    
+        # Column separators over the visible rows only
+        bottom = top + height
+        for x in columns:
+            self.canvas.create_line(x, top, x, bottom, fill='#dfe6e9', tags='row')
+            
+    def _draw_header(self, columns, column_width):
+        self.header.delete('all')
+        today = date.today()
+        self.header.create_text(8, self.HEADER_HEIGHT / 2, text="Doctor", anchor='w', font=('Arial', 10, 'bold'))
+        for day, x in zip(self.data.days, columns):
+            if day == today:
+                self.header.create_rectangle(x, 0, x + column_width, self.HEADER_HEIGHT, fill='#d6eaf8', width=0)
+            if self.view == VIEW_MONTH:
+                text = str(day.day)
+            else:
+                text = f"{calendar.day_abbr[day.weekday()]} {day.day:02d}/{day.month:02d}"
+            self.header.create_text(
+                x + column_width / 2, self.HEADER_HEIGHT / 2, text=text, font=('Arial', 9, 'bold'), fill='#2c3e50'
+            )
+            self.header.create_line(x, 0, x, self.HEADER_HEIGHT, fill='#bdc3c7')
+            
+    def _draw_bars(self, row, column, x, y, column_width):
+        """Week view: one bar per appointment, placed by time of day"""
+        span = self.day_end - self.day_start
+        scale = (column_width - 4) / span
+        top, bottom = y + 5, y + self.ROW_HEIGHT - 5
+        for start, end, status, appointment_id in self.data.cell(row, column):
+            left = max(start, self.day_start) - self.day_start
+            right = min(end, self.day_end) - self.day_start
+            if right <= left:
+                continue
+            self.canvas.create_rectangle(
+                x + 2 + left * scale, top, x + 2 + max(right * scale, left * scale + 2), bottom,
+                fill=STATUS_COLORS.get(status, STATUS_COLORS['no_show']), outline='white', tags='row'
+            )
+            
+    def _draw_load(self, row, column, x, y, column_width):
+        """Month view: a bar for the share of the working day that is booked"""
+        count = self.data.count(row, column)
+        if not count:
+            return
+        share = min(self.data.booked_minutes.get((row, column), 0) / (self.day_end - self.day_start), 1)
+        self.canvas.create_rectangle(
+            x + 2, y + self.ROW_HEIGHT - 6, x + 2 + (column_width - 4) * share, y + self.ROW_HEIGHT - 3,
+            fill='#e74c3c' if share >= 0.9 else '#27ae60', width=0, tags='row'
+        )
+        self.canvas.create_text(
+            x + column_width / 2, y + self.ROW_HEIGHT / 2 - 2, text=str(count),
+            font=('Arial', 8), fill='#2c3e50', tags='row'
+        )
+        
+    def _on_click(self, event):
+        """Report the day under the pointer"""
+        if self.data is None or self.on_select_day is None or event.x < self.NAME_WIDTH:
+            return
+        columns, column_width = self._columns()
+        column = int((event.x - self.NAME_WIDTH) // column_width)
+        if 0 <= column < len(self.data.days):
+            self.on_select_day(self.data.days[column])
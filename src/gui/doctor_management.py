@@ -7,10 +7,16 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+from src.database.availability import (
+    WEEKDAYS, EXCEPTION_KINDS, parse_time_ranges, format_time_ranges
+)
+from src.database.date_ranges import day_range
+
 class DoctorManagement:
-    def __init__(self, parent, db_manager):
+    def __init__(self, parent, db_manager, async_db):
         self.parent = parent
         self.db_manager = db_manager
+        self.async_db = async_db
         
         self.create_widgets()
         self.load_doctors()
@@ -155,79 +161,60 @@ class DoctorManagement:
         self.tree.bind('<Double-1>', self.on_item_double_click)
         
     def load_doctors(self):
-        """Load doctors from database"""
+        """Load doctors from database in the background"""
         try:
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-                
-            # Get doctors data with appointment count for today
-            query = '''
-                SELECT d.doctor_id, d.employee_id,
-                       (d.first_name || ' ' || d.last_name) as full_name,
-                       d.specialization, d.experience_years, d.phone,
-                       d.consultation_fee, 
-                       CASE WHEN d.is_available = 1 THEN 'Available' ELSE 'Unavailable' END as status,
-                       COUNT(a.appointment_id) as appointments_today
-                FROM doctors d
-                LEFT JOIN appointments a ON d.doctor_id = a.doctor_id 
-                    AND DATE(a.appointment_date) = DATE('now')
-                GROUP BY d.doctor_id
-                ORDER BY d.doctor_id DESC
-            '''
-            
-            doctors = self.db_manager.execute_query(query)
+            search_text = self.search_var.get().lower()
+            today = (day_range().start.isoformat(),)
             
-            for doctor in doctors:
-                self.tree.insert('', 'end', values=(
-                    doctor['doctor_id'],
-                    doctor['employee_id'],
-                    doctor['full_name'],
-                    doctor['specialization'],
-                    f"{doctor['experience_years']} years" if doctor['experience_years'] else 'N/A',
-                    doctor['phone'] or 'N/A',
-                    f"${doctor['consultation_fee']}" if doctor['consultation_fee'] else 'N/A',
-                    doctor['status'],
-                    doctor['appointments_today']
-                ))
+            if search_text:
+                query = '''
+                    SELECT d.doctor_id, d.employee_id,
+                           (d.first_name || ' ' || d.last_name) as full_name,
+                           d.specialization, d.experience_years, d.phone,
+                           d.consultation_fee,
+                           CASE WHEN d.is_available = 1 THEN 'Available' ELSE 'Unavailable' END as status,
+                           COALESCE(r.appointments, 0) as appointments_today
+                    FROM doctors d
+                    LEFT JOIN rollup_doctor_daily r ON r.day = ? AND r.doctor_id = d.doctor_id
+                    WHERE LOWER(d.first_name) LIKE ? OR LOWER(d.last_name) LIKE ?
+                       OR LOWER(d.employee_id) LIKE ? OR LOWER(d.specialization) LIKE ?
+                    ORDER BY d.doctor_id DESC
+                '''
+                search_pattern = f"%{search_text}%"
+                params = today + (search_pattern, search_pattern, search_pattern, search_pattern)
+            else:
+                # Get doctors data with appointment count for today
+                query = '''
+                    SELECT d.doctor_id, d.employee_id,
+                           (d.first_name || ' ' || d.last_name) as full_name,
+                           d.specialization, d.experience_years, d.phone,
+                           d.consultation_fee,
+                           CASE WHEN d.is_available = 1 THEN 'Available' ELSE 'Unavailable' END as status,
+                           COALESCE(r.appointments, 0) as appointments_today
+                    FROM doctors d
+                    LEFT JOIN rollup_doctor_daily r ON r.day = ? AND r.doctor_id = d.doctor_id
+                    ORDER BY d.doctor_id DESC
+                '''
+                params = today
                 
+            # A newer search replaces a load that is still running
+            self.async_db.submit(
+                self.db_manager.execute_query, query, params,
+                callback=self.show_doctors,
+                errback=self.show_load_error,
+                key='doctors',
+                owner=self.tree
+            )
+            
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to load doctors: {str(e)}")
+            self.show_load_error(e)
             
-    def on_search(self, *args):
-        """Handle search input"""
-        search_text = self.search_var.get().lower()
-        
-        # Clear current items
+    def show_doctors(self, doctors):
+        """Show loaded doctors in the list"""
+        # Clear existing items
         for item in self.tree.get_children():
             self.tree.delete(item)
             
-        if not search_text:
-            self.load_doctors()
-            return
-            
-        # Search in database
-        query = '''
-            SELECT d.doctor_id, d.employee_id,
-                   (d.first_name || ' ' || d.last_name) as full_name,
-                   d.specialization, d.experience_years, d.phone,
-                   d.consultation_fee,
-                   CASE WHEN d.is_available = 1 THEN 'Available' ELSE 'Unavailable' END as status,
-                   COUNT(a.appointment_id) as appointments_today
-            FROM doctors d
-            LEFT JOIN appointments a ON d.doctor_id = a.doctor_id 
-                AND DATE(a.appointment_date) = DATE('now')
-            WHERE LOWER(d.first_name) LIKE ? OR LOWER(d.last_name) LIKE ? 
-               OR LOWER(d.employee_id) LIKE ? OR LOWER(d.specialization) LIKE ?
-            GROUP BY d.doctor_id
-            ORDER BY d.doctor_id DESC
-        '''
-        
-        search_pattern = f"%{search_text}%"
-        doctors = self.db_manager.execute_query(
-            query, (search_pattern, search_pattern, search_pattern, search_pattern)
-        )
-        
         for doctor in doctors:
             self.tree.insert('', 'end', values=(
                 doctor['doctor_id'],
@@ -241,6 +228,14 @@ class DoctorManagement:
                 doctor['appointments_today']
             ))
             
+    def show_load_error(self, error):
+        """Report a failed load"""
+        messagebox.showerror("Error", f"Failed to load doctors: {str(error)}")
+        
+    def on_search(self, *args):
+        """Handle search input"""
+        self.load_doctors()
+        
     def on_filter(self, *args):
         """Handle specialization filter"""
         self.load_doctors()  # Simplified - could implement actual filtering
@@ -270,8 +265,8 @@ class DoctorManagement:
             messagebox.showwarning("Selection", "Please select a doctor to manage schedule.")
             return
             
-        doctor_id = self.tree.item(selected[0])['values'][0]
-        messagebox.showinfo("Info", f"Schedule management for doctor {doctor_id} - Implementation in progress")
+        values = self.tree.item(selected[0])['values']
+        ScheduleDialog(self.parent, self.db_manager, values[0], values[2], self.async_db)
         
     def view_doctor_details(self):
         """View detailed doctor information"""
@@ -444,14 +439,6 @@ class AddDoctorDialog:
             is_available = 1 if data['is_available'] == 'Yes' else 0
             
             # Insert into database
-            query = '''
-                INSERT INTO doctors (
-                    employee_id, first_name, last_name, specialization,
-                    qualification, experience_years, phone, email, address,
-                    consultation_fee, is_available
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            '''
-            
             values = (
                 data['employee_id'], data['first_name'], data['last_name'],
                 data['specialization'], data['qualification'], 
@@ -461,7 +448,7 @@ class AddDoctorDialog:
                 is_available
             )
             
-            self.db_manager.execute_insert(query, values)
+            self.db_manager.execute_named_insert('doctor_insert', values)
             
             messagebox.showinfo("Success", "Doctor added successfully!")
             self.callback()  # Refresh doctor list
@@ -469,3 +456,282 @@ class AddDoctorDialog:
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save doctor: {str(e)}")
+
+class ScheduleDialog:
+    def __init__(self, parent, db_manager, doctor_id, doctor_name, async_db):
+        self.db_manager = db_manager
+        self.doctor_id = doctor_id
+        self.async_db = async_db
+        
+        # Create dialog window
+        self.dialog = tk.Toplevel(parent)
+        self.dialog.title(f"Schedule - {doctor_name}")
+        self.dialog.geometry("640x680")
+        self.dialog.resizable(False, False)
+        self.dialog.configure(bg='white')
+        
+        # Center dialog
+        self.center_dialog()
+        
+        # Make modal
+        self.dialog.transient(parent)
+        self.dialog.grab_set()
+        
+        self.create_widgets(doctor_name)
+        self.load_schedule()
+        self.load_exceptions()
+        
+    def center_dialog(self):
+        """Center the dialog window"""
+        self.dialog.update_idletasks()
+        x = (self.dialog.winfo_screenwidth() // 2) - (640 // 2)
+        y = (self.dialog.winfo_screenheight() // 2) - (680 // 2)
+        self.dialog.geometry(f"640x680+{x}+{y}")
+        
+    def create_widgets(self, doctor_name):
+        """Create weekly hours and exception widgets"""
+        # Header
+        tk.Label(
+            self.dialog,
+            text=f"📅 Schedule for {doctor_name}",
+            font=('Arial', 16, 'bold'),
+            bg='white',
+            fg='#2c3e50'
+        ).pack(pady=15)
+        
+        # Weekly hours
+        week_frame = tk.LabelFrame(
+            self.dialog,
+            text="Weekly Hours",
+            font=('Arial', 11, 'bold'),
+            bg='white',
+            fg='#34495e'
+        )
+        week_frame.pack(fill='x', padx=20, pady=5)
+        
+        tk.Label(
+            week_frame,
+            text="Ranges like 08:00-12:00, 13:00-17:00. Leave a day empty when off;\n"
+                 "leave every day empty to use the hospital's default working hours.",
+            font=('Arial', 9),
+            bg='white',
+            fg='#7f8c8d',
+            justify='left'
+        ).grid(row=0, column=0, columnspan=2, sticky='w', padx=10, pady=(5, 10))
+        
+        self.day_vars = []
+        for weekday, name in enumerate(WEEKDAYS):
+            tk.Label(
+                week_frame,
+                text=name,
+                font=('Arial', 10),
+                bg='white',
+                fg='#34495e'
+            ).grid(row=weekday + 1, column=0, sticky='w', padx=10, pady=3)
+            
+            var = tk.StringVar()
+            tk.Entry(
+                week_frame,
+                textvariable=var,
+                font=('Arial', 10),
+                width=45,
+                relief='solid',
+                bd=1
+            ).grid(row=weekday + 1, column=1, sticky='w', padx=10, pady=3)
+            self.day_vars.append(var)
+            
+        tk.Button(
+            week_frame,
+            text="💾 Save Weekly Hours",
+            font=('Arial', 10, 'bold'),
+            bg='#27ae60',
+            fg='white',
+            relief='flat',
+            padx=15,
+            pady=5,
+            cursor='hand2',
+            command=self.save_schedule
+        ).grid(row=len(WEEKDAYS) + 1, column=1, sticky='e', padx=10, pady=10)
+        
+        # Exceptions
+        exception_frame = tk.LabelFrame(
+            self.dialog,
+            text="Leave and On-Call",
+            font=('Arial', 11, 'bold'),
+            bg='white',
+            fg='#34495e'
+        )
+        exception_frame.pack(fill='both', expand=True, padx=20, pady=5)
+        
+        columns = ('ID', 'Date', 'Type', 'Hours', 'Reason')
+        self.exception_tree = ttk.Treeview(exception_frame, columns=columns, show='headings', height=5)
+        column_widths = {'ID': 40, 'Date': 90, 'Type': 70, 'Hours': 110, 'Reason': 250}
+        for col in columns:
+            self.exception_tree.heading(col, text=col)
+            self.exception_tree.column(col, width=column_widths[col])
+        self.exception_tree.pack(fill='x', padx=10, pady=5)
+        
+        form_frame = tk.Frame(exception_frame, bg='white')
+        form_frame.pack(fill='x', padx=10, pady=5)
+        
+        self.exception_date_var = tk.StringVar(value=datetime.now().strftime('%Y-%m-%d'))
+        self.exception_kind_var = tk.StringVar(value=EXCEPTION_KINDS[0])
+        self.exception_hours_var = tk.StringVar()
+        self.exception_reason_var = tk.StringVar()
+        
+        for label, widget in [
+            ("Date", tk.Entry(form_frame, textvariable=self.exception_date_var, width=11)),
+            ("Type", ttk.Combobox(form_frame, textvariable=self.exception_kind_var,
+                                  values=list(EXCEPTION_KINDS), width=8, state="readonly")),
+            ("Hours", tk.Entry(form_frame, textvariable=self.exception_hours_var, width=12)),
+            ("Reason", tk.Entry(form_frame, textvariable=self.exception_reason_var, width=18)),
+        ]:
+            tk.Label(form_frame, text=label, font=('Arial', 9), bg='white').pack(side='left', padx=(0, 3))
+            widget.pack(side='left', padx=(0, 8))
+            
+        btn_frame = tk.Frame(exception_frame, bg='white')
+        btn_frame.pack(fill='x', padx=10, pady=5)
+        
+        tk.Label(
+            btn_frame,
+            text="Empty hours means the whole day.",
+            font=('Arial', 9),
+            bg='white',
+            fg='#7f8c8d'
+        ).pack(side='left')
+        
+        tk.Button(
+            btn_frame,
+            text="🗑️ Remove Selected",
+            font=('Arial', 10),
+            bg='#e74c3c',
+            fg='white',
+            relief='flat',
+            padx=10,
+            cursor='hand2',
+            command=self.remove_exception
+        ).pack(side='right', padx=5)
+        
+        tk.Button(
+            btn_frame,
+            text="➕ Add",
+            font=('Arial', 10),
+            bg='#3498db',
+            fg='white',
+            relief='flat',
+            padx=10,
+            cursor='hand2',
+            command=self.add_exception
+        ).pack(side='right', padx=5)
+        
+        tk.Button(
+            self.dialog,
+            text="Close",
+            font=('Arial', 11),
+            bg='#7f8c8d',
+            fg='white',
+            relief='flat',
+            padx=20,
+            pady=6,
+            cursor='hand2',
+            command=self.dialog.destroy
+        ).pack(pady=10)
+        
+    def load_schedule(self):
+        """Load the weekly template in the background"""
+        self.async_db.submit(
+            self.db_manager.get_doctor_schedule, self.doctor_id,
+            callback=self.show_schedule,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load schedule: {str(e)}"),
+            owner=self.dialog
+        )
+        
+    def show_schedule(self, rows):
+        """Fill the weekday entries from template rows"""
+        ranges = [[] for _ in WEEKDAYS]
+        for row in rows:
+            ranges[row['weekday']].append((row['start_time'], row['end_time']))
+        for var, day_ranges in zip(self.day_vars, ranges):
+            var.set(format_time_ranges(day_ranges))
+            
+    def save_schedule(self):
+        """Replace the weekly template with the entered hours"""
+        try:
+            hours = []
+            for weekday, var in enumerate(self.day_vars):
+                try:
+                    day_ranges = parse_time_ranges(var.get())
+                except ValueError as e:
+                    messagebox.showerror("Validation", f"{WEEKDAYS[weekday]}: {str(e)}")
+                    return
+                hours.extend((weekday, start, end) for start, end in day_ranges)
+                
+            self.db_manager.set_doctor_schedule(self.doctor_id, hours)
+            messagebox.showinfo("Success", "Weekly hours saved successfully!")
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save schedule: {str(e)}")
+            
+    def load_exceptions(self):
+        """Load upcoming leave and on-call entries in the background"""
+        self.async_db.submit(
+            self.db_manager.get_schedule_exceptions, self.doctor_id,
+            callback=self.show_exceptions,
+            errback=lambda e: messagebox.showerror("Error", f"Failed to load exceptions: {str(e)}"),
+            key=('schedule_exceptions', self.doctor_id),
+            owner=self.exception_tree
+        )
+        
+    def show_exceptions(self, rows):
+        """Show upcoming exceptions in the list"""
+        for item in self.exception_tree.get_children():
+            self.exception_tree.delete(item)
+            
+        for row in rows:
+            hours = format_time_ranges([(row['start_time'], row['end_time'])]) if row['start_time'] else 'All day'
+            self.exception_tree.insert('', 'end', values=(
+                row['exception_id'],
+                row['exception_date'],
+                row['kind'].replace('_', ' ').title(),
+                hours,
+                row['reason'] or ''
+            ))
+            
+    def add_exception(self):
+        """Record leave or on-call time from the form"""
+        try:
+            try:
+                exception_date = datetime.strptime(self.exception_date_var.get(), '%Y-%m-%d').date()
+                ranges = parse_time_ranges(self.exception_hours_var.get())
+            except ValueError as e:
+                messagebox.showerror("Validation", str(e))
+                return
+                
+            if not ranges:
+                ranges = [(None, None)]
+            for start_time, end_time in ranges:
+                self.db_manager.add_schedule_exception(
+                    self.doctor_id, exception_date, self.exception_kind_var.get(),
+                    start_time, end_time, self.exception_reason_var.get().strip()
+                )
+                
+            self.exception_hours_var.set("")
+            self.exception_reason_var.set("")
+            self.load_exceptions()
+            
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to add exception: {str(e)}")
+            
+    def remove_exception(self):
+        """Delete the selected exception"""
+        selected = self.exception_tree.selection()
+        if not selected:
+            messagebox.showwarning("Selection", "Please select an entry to remove.")
+            return
+            
+        try:
+            exception_id = self.exception_tree.item(selected[0])['values'][0]
+            self.db_manager.remove_schedule_exception(exception_id)
+            self.load_exceptions()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to remove exception: {str(e)}")
@@ -6,11 +6,15 @@ Modern login interface with validation
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from src.gui.async_db import AsyncDatabase
+
 class LoginWindow:
     def __init__(self, parent, auth_manager, on_success_callback):
         self.parent = parent
         self.auth_manager = auth_manager
         self.on_success = on_success_callback
+        # Password hashing takes tens of milliseconds; keep it off the Tk thread
+        self.async_db = AsyncDatabase(parent, auth_manager.db_manager, workers=1)
         
         # Hide main window during login
         self.parent.withdraw()
@@ -198,12 +202,19 @@ class LoginWindow:
             
         # Disable login button during authentication
         self.login_btn.config(state='disabled', text='Logging in...')
-        self.window.update()
         
-        # Attempt authentication
-        user_data = self.auth_manager.authenticate(username, password)
+        # Attempt authentication in the background
+        self.async_db.submit(
+            self.auth_manager.authenticate, username, password,
+            callback=self.on_authenticated, errback=self.on_login_error,
+            key='login', owner=self.window
+        )
         
+    def on_authenticated(self, user_data):
+        """Finish a login attempt once the credentials have been checked"""
         if user_data:
+            self.async_db.shutdown()
+            
             # Hide login window
             self.window.withdraw()
             
@@ -222,7 +233,13 @@ class LoginWindow:
             self.password_entry.delete(0, 'end')
             self.password_entry.focus()
             
+    def on_login_error(self, error):
+        """Re-enable the form when the login check itself failed"""
+        self.login_btn.config(state='normal', text='LOGIN')
+        messagebox.showerror("Login Error", f"Could not check the login: {str(error)}")
+        
     def on_close(self):
         """Handle window close event"""
         if messagebox.askokcancel("Exit", "Do you want to exit the application?"):
+            self.async_db.shutdown()
             self.parent.quit()
@@ -17,6 +17,7 @@ from src.gui.doctor_management import DoctorManagement
 from src.gui.appointment_management import AppointmentManagement
 from src.gui.billing_management import BillingManagement
 from src.gui.reports_dashboard import ReportsDashboard
+from src.gui.async_db import AsyncDatabase
 
 class MainWindow:
     def __init__(self, root, db_manager, current_user):
@@ -24,6 +25,9 @@ class MainWindow:
         self.db_manager = db_manager
         self.current_user = current_user
         
+        # Database calls made by the modules run on background workers
+        self.async_db = AsyncDatabase(self.root, self.db_manager)
+        
         # Configure main window
         self.setup_main_window()
         
@@ -63,6 +67,10 @@ class MainWindow:
         # Status bar
         self.create_status_bar()
         
+        # Show a loading indicator while background queries run
+        self.async_db.add_busy_listener(self.on_busy)
+        self.on_busy(self.async_db.is_busy())
+        
     def create_header(self):
         """Create header with navigation and user info"""
         header_frame = tk.Frame(self.root, bg='#34495e', height=80)
@@ -204,49 +212,55 @@ class MainWindow:
             fg='white'
         ).pack(pady=(0, 10))
         
-        # Get statistics from database
-        try:
-            patients_count = len(self.db_manager.execute_query("SELECT patient_id FROM patients"))
-            doctors_count = len(self.db_manager.execute_query("SELECT doctor_id FROM doctors"))
-            appointments_today = len(self.db_manager.execute_query(
-                "SELECT appointment_id FROM appointments WHERE DATE(appointment_date) = DATE('now')"
-            ))
+        # Statistics are filled in once the background query returns
+        self.quick_stats_frame = stats_frame
+        self.async_db.submit(
+            self.db_manager.get_dashboard_counts,
+            callback=self.show_quick_stats,
+            errback=self.show_quick_stats_error,
+            key='quick_stats',
+            owner=stats_frame
+        )
+        
+    def show_quick_stats(self, counts):
+        """Fill the quick statistics panel"""
+        stats_frame = self.quick_stats_frame
+        stats_data = [
+            ("Patients", counts['patients'], "#3498db"),
+            ("Doctors", counts['doctors'], "#2ecc71"),
+            ("Today's Appointments", counts['appointments_today'], "#f39c12")
+        ]
+        
+        for label, value, color in stats_data:
+            stat_frame = tk.Frame(stats_frame, bg=color, height=60)
+            stat_frame.pack(fill='x', pady=2)
+            stat_frame.pack_propagate(False)
             
-            stats_data = [
-                ("Patients", patients_count, "#3498db"),
-                ("Doctors", doctors_count, "#2ecc71"),
-                ("Today's Appointments", appointments_today, "#f39c12")
-            ]
+            tk.Label(
+                stat_frame,
+                text=str(value),
+                font=('Arial', 16, 'bold'),
+                bg=color,
+                fg='white'
+            ).pack(pady=(5, 0))
             
-            for label, value, color in stats_data:
-                stat_frame = tk.Frame(stats_frame, bg=color, height=60)
-                stat_frame.pack(fill='x', pady=2)
-                stat_frame.pack_propagate(False)
-                
-                tk.Label(
-                    stat_frame,
-                    text=str(value),
-                    font=('Arial', 16, 'bold'),
-                    bg=color,
-                    fg='white'
-                ).pack(pady=(5, 0))
-                
-                tk.Label(
-                    stat_frame,
-                    text=label,
-                    font=('Arial', 8),
-                    bg=color,
-                    fg='white'
-                ).pack()
-                
-        except Exception as e:
             tk.Label(
-                stats_frame,
-                text="Stats unavailable",
-                font=('Arial', 10),
-                bg='#2c3e50',
-                fg='#7f8c8d'
+                stat_frame,
+                text=label,
+                font=('Arial', 8),
+                bg=color,
+                fg='white'
             ).pack()
+            
+    def show_quick_stats_error(self, error):
+        """Show that the quick statistics could not be loaded"""
+        tk.Label(
+            self.quick_stats_frame,
+            text="Stats unavailable",
+            font=('Arial', 10),
+            bg='#2c3e50',
+            fg='#7f8c8d'
+        ).pack()
         
     def create_content_area(self, parent):
         """Create main content display area"""
@@ -281,6 +295,15 @@ class MainWindow:
         )
         system_info.pack(side='right', padx=10, pady=2)
         
+    def on_busy(self, busy):
+        """Show or hide the loading indicator"""
+        if busy:
+            self.status_label.config(text="⏳ Loading...")
+            self.root.config(cursor='watch')
+        else:
+            self.status_label.config(text="Ready")
+            self.root.config(cursor='')
+            
     def init_modules(self):
         """Initialize all management modules"""
         # These will be created when needed to improve startup time
@@ -347,7 +370,7 @@ class MainWindow:
         self.set_active_nav("Patients")
         
         if 'patients' not in self.modules:
-            self.modules['patients'] = PatientManagement(self.content_frame, self.db_manager)
+            self.modules['patients'] = PatientManagement(self.content_frame, self.db_manager, self.async_db)
         else:
             self.modules['patients'].refresh()
             
@@ -357,7 +380,7 @@ class MainWindow:
         self.set_active_nav("Doctors")
         
         if 'doctors' not in self.modules:
-            self.modules['doctors'] = DoctorManagement(self.content_frame, self.db_manager)
+            self.modules['doctors'] = DoctorManagement(self.content_frame, self.db_manager, self.async_db)
         else:
             self.modules['doctors'].refresh()
             
@@ -367,7 +390,7 @@ class MainWindow:
         self.set_active_nav("Appointments")
         
         if 'appointments' not in self.modules:
-            self.modules['appointments'] = AppointmentManagement(self.content_frame, self.db_manager)
+            self.modules['appointments'] = AppointmentManagement(self.content_frame, self.db_manager, self.async_db)
         else:
             self.modules['appointments'].refresh()
             
@@ -390,7 +413,7 @@ class MainWindow:
         self.set_active_nav("Billing")
         
         if 'billing' not in self.modules:
-            self.modules['billing'] = BillingManagement(self.content_frame, self.db_manager)
+            self.modules['billing'] = BillingManagement(self.content_frame, self.db_manager, self.async_db)
         else:
             self.modules['billing'].refresh()
             
@@ -426,7 +449,7 @@ class MainWindow:
         self.set_active_nav("Reports")
         
         if 'reports' not in self.modules:
-            self.modules['reports'] = ReportsDashboard(self.content_frame, self.db_manager)
+            self.modules['reports'] = ReportsDashboard(self.content_frame, self.db_manager, self.async_db)
         else:
             self.modules['reports'].refresh()
             
@@ -451,5 +474,6 @@ class MainWindow:
     def on_close(self):
         """Handle window close"""
         if messagebox.askyesno("Exit", "Are you sure you want to exit?"):
+            self.async_db.shutdown()
             self.db_manager.close()
             self.root.quit()
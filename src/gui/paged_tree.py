@@ -0,0 +1,126 @@
+"""
+Paged Treeview for Hospital Management System
+Keyset-paginated loading into a Treeview with a reusable item pool
+"""
+
+from tkinter import messagebox
+
+# Larger than any INTEGER PRIMARY KEY, used as the key before the first page
+# of a list sorted by id descending
+FIRST_KEY = 2 ** 63 - 1
+
+class PagedTreeview:
+    """Fill a Treeview one page at a time as the user scrolls
+    
+    fetch_page(after_key, limit) returns the next rows after after_key,
+    key(row) gives the keyset value of a row, row_values(row) the
+    Treeview values and the optional row_tags(row) its tags. Items are kept in a pool and updated in place on
+    reload; surplus items are detached rather than deleted.
+    yscrollcommand (usually a Scrollbar's set) still receives every update.
+    With an AsyncDatabase pages are fetched on a worker thread and a page
+    requested by a newer reload replaces any page still in flight.
+    """
+    
+    def __init__(self, tree, fetch_page, key, row_values, page_size=200,
+                 first_key=FIRST_KEY, yscrollcommand=None, async_db=None, row_tags=None):
+        self.tree = tree
+        self.fetch_page = fetch_page
+        self.key = key
+        self.row_values = row_values
+        self.row_tags = row_tags
+        self.page_size = page_size
+        self.first_key = first_key
+        self.async_db = async_db
+        
+        self._items = []        # pooled item ids, attached ones first
+        self._shown = 0         # how many pooled items are attached
+        self._last_key = first_key
+        self._exhausted = False
+        self._pending = False
+        self._loading = False
+        self._replace = False   # the next page replaces the current rows
+        
+        # Watch the scroll position to know when to fetch the next page
+        self._scroll_command = yscrollcommand
+        tree.configure(yscrollcommand=self._on_scroll)
+        
+    def set_source(self, fetch_page):
+        """Switch to another row source (e.g. a search) and reload"""
+        self.fetch_page = fetch_page
+        self.reload()
+        
+    def reload(self):
+        """Show the first page again, reusing the existing items"""
+        self._last_key = self.first_key
+        self._exhausted = False
+        self._loading = False
+        self._replace = True
+        self.load_next_page()
+        
+    def load_next_page(self):
+        """Fetch and append the next page of rows"""
+        self._pending = False
+        if self._exhausted or self._loading:
+            return
+        if self.async_db is None:
+            self.add_page(self.fetch_page(self._last_key, self.page_size))
+            return
+        self._loading = True
+        self.async_db.submit(
+            self.fetch_page, self._last_key, self.page_size,
+            callback=self.add_page, errback=self._on_error, key=self, owner=self.tree
+        )
+        
+    def add_page(self, rows):
+        """Show a fetched page"""
+        self._loading = False
+        replace = self._replace
+        if replace:
+            self._replace = False
+            shown = self._shown
+            self._shown = 0
+            self.tree.selection_remove(self.tree.selection())
+            
+        for row in rows:
+            self._show(self.row_values(row), self.row_tags(row) if self.row_tags else None)
+        if rows:
+            self._last_key = self.key(rows[-1])
+        if len(rows) < self.page_size:
+            self._exhausted = True
+            
+        if replace:
+            # Detach items left over from a longer previous list
+            if self._shown < shown:
+                self.tree.detach(*self._items[self._shown:shown])
+            if self._items:
+                self.tree.yview_moveto(0)
+                
+    def _on_error(self, error):
+        self._loading = False
+        messagebox.showerror("Error", f"Failed to load rows: {str(error)}")
+        
+    def _show(self, values, tags=None):
+        """Attach the next pooled item with new values, growing the pool if needed"""
+        options = {'values': values}
+        if tags is not None:
+            options['tags'] = tags
+        if self._shown < len(self._items):
+            item = self._items[self._shown]
+            self.tree.item(item, **options)
+            self.tree.move(item, '', self._shown)
+        else:
+            item = self.tree.insert('', 'end', **options)
+            self._items.append(item)
+        self._shown += 1
+        
+    def _on_scroll(self, first, last):
+        """Forward scroll updates and fetch more rows near the bottom"""
+        if self._scroll_command:
+            self._scroll_command(first, last)
+        if float(last) >= 0.9 and not self._exhausted and not self._pending:
+            # Let Tk finish the current redraw before growing the list
+            self._pending = True
+            self.tree.after_idle(self.load_next_page)
+            
+    def __len__(self):
+        return self._shown
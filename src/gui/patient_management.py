@@ -8,10 +8,21 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 import re
 
+from src.gui.paged_tree import PagedTreeview, FIRST_KEY
+
+# Patients fetched per keyset page while scrolling
+PAGE_SIZE = 200
+
+# Typeahead: wait this long after the last keystroke, then show the best matches
+SEARCH_DELAY_MS = 150
+SEARCH_LIMIT = 200
+
 class PatientManagement:
-    def __init__(self, parent, db_manager):
+    def __init__(self, parent, db_manager, async_db):
         self.parent = parent
         self.db_manager = db_manager
+        self.async_db = async_db
+        self._search_job = None
         
         self.create_widgets()
         self.load_patients()
@@ -143,7 +154,18 @@ class PatientManagement:
         v_scrollbar = ttk.Scrollbar(list_frame, orient='vertical', command=self.tree.yview)
         h_scrollbar = ttk.Scrollbar(list_frame, orient='horizontal', command=self.tree.xview)
         
-        self.tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        # Pages are fetched as the list is scrolled
+        self.pager = PagedTreeview(
+            self.tree,
+            self.fetch_patients,
+            key=lambda patient: patient['patient_id'],
+            row_values=self.patient_values,
+            page_size=PAGE_SIZE,
+            yscrollcommand=v_scrollbar.set,
+            async_db=self.async_db
+        )
         
         # Pack widgets
         self.tree.pack(side='left', fill='both', expand=True)
@@ -153,104 +175,67 @@ class PatientManagement:
         # Bind double-click
         self.tree.bind('<Double-1>', self.on_item_double_click)
         
-    def load_patients(self):
-        """Load patients from database"""
+    def fetch_patients(self, after_id, limit):
+        """Fetch one keyset page of patients, newest first"""
+        return self.db_manager.get_patients_page(after_id, limit)
+        
+    def search_patients(self, text):
+        """Build a fetcher returning the best search matches as a single page"""
+        def fetch(after_id, limit):
+            if after_id != FIRST_KEY:
+                return []
+            return self.db_manager.search_patients(text, SEARCH_LIMIT)
+        return fetch
+        
+    def patient_values(self, patient):
+        """Treeview values for a patient row"""
+        # Calculate age from date of birth
+        age = "N/A"
         try:
-            # Clear existing items
-            for item in self.tree.get_children():
-                self.tree.delete(item)
-                
-            # Get patients data
-            query = '''
-                SELECT p.patient_id, p.national_id, 
-                       (p.first_name || ' ' || p.last_name) as full_name,
-                       (DATE('now') - p.date_of_birth) as age,
-                       p.gender, p.phone, 
-                       COALESCE(d.specialization, 'Not Assigned') as department,
-                       COALESCE((d.first_name || ' ' || d.last_name), 'Not Assigned') as doctor
-                FROM patients p
-                LEFT JOIN appointments a ON p.patient_id = a.patient_id
-                LEFT JOIN doctors d ON a.doctor_id = d.doctor_id
-                ORDER BY p.patient_id DESC
-            '''
+            if patient['age']:
+                age = str(patient['age'])
+        except:
+            pass
             
-            patients = self.db_manager.execute_query(query)
-            
-            for patient in patients:
-                # Calculate age from date of birth
-                age = "N/A"
-                try:
-                    if patient['age']:
-                        age = str(patient['age'])
-                except:
-                    pass
-                    
-                self.tree.insert('', 'end', values=(
-                    patient['patient_id'],
-                    patient['national_id'],
-                    patient['full_name'],
-                    age,
-                    patient['gender'],
-                    patient['phone'] or 'N/A',
-                    patient['department'],
-                    patient['doctor']
-                ))
+        return (
+            patient['patient_id'],
+            patient['national_id'],
+            patient['full_name'],
+            age,
+            patient['gender'],
+            patient['phone'] or 'N/A',
+            patient['department'],
+            patient['doctor']
+        )
+        
+    def load_patients(self):
+        """Load the first page of patients from database"""
+        try:
+            search_text = self.search_var.get().strip()
+            if search_text:
+                self.pager.set_source(self.search_patients(search_text))
+            else:
+                self.pager.set_source(self.fetch_patients)
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load patients: {str(e)}")
             
     def on_search(self, *args):
-        """Handle search input"""
-        search_text = self.search_var.get().lower()
-        
-        # Clear current items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        """Handle search input, debounced so only the last keystroke searches"""
+        self.cancel_search()
+        self._search_job = self.parent.after(SEARCH_DELAY_MS, self.run_search)
+        
+    def cancel_search(self):
+        """Cancel a search that has not started yet"""
+        if self._search_job is not None:
+            self.parent.after_cancel(self._search_job)
+            self._search_job = None
             
-        if not search_text:
-            self.load_patients()
-            return
-            
-        # Search in database
-        query = '''
-            SELECT p.patient_id, p.national_id, 
-                   (p.first_name || ' ' || p.last_name) as full_name,
-                   (DATE('now') - p.date_of_birth) as age,
-                   p.gender, p.phone,
-                   COALESCE(d.specialization, 'Not Assigned') as department,
-                   COALESCE((d.first_name || ' ' || d.last_name), 'Not Assigned') as doctor
-            FROM patients p
-            LEFT JOIN appointments a ON p.patient_id = a.patient_id
-            LEFT JOIN doctors d ON a.doctor_id = d.doctor_id
-            WHERE LOWER(p.first_name) LIKE ? OR LOWER(p.last_name) LIKE ? 
-               OR LOWER(p.national_id) LIKE ? OR LOWER(p.phone) LIKE ?
-            ORDER BY p.patient_id DESC
-        '''
-        
-        search_pattern = f"%{search_text}%"
-        patients = self.db_manager.execute_query(
-            query, (search_pattern, search_pattern, search_pattern, search_pattern)
-        )
+    def run_search(self):
+        """Run the pending search"""
+        self._search_job = None
+        self.load_patients()
         
-        for patient in patients:
-            age = "N/A"
-            try:
-                if patient['age']:
-                    age = str(patient['age'])
-            except:
-                pass
-                
-            self.tree.insert('', 'end', values=(
-                patient['patient_id'],
-                patient['national_id'],
-                patient['full_name'],
-                age,
-                patient['gender'],
-                patient['phone'] or 'N/A',
-                patient['department'],
-                patient['doctor']
-            ))
-            
     def on_filter(self, *args):
         """Handle filter selection"""
         # Implementation for filtering
@@ -286,7 +271,7 @@ class PatientManagement:
         
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete patient '{patient_name}'?"):
             try:
-                self.db_manager.execute_update("DELETE FROM patients WHERE patient_id = ?", (patient_id,))
+                self.db_manager.execute_named_update('patient_delete', (patient_id,))
                 messagebox.showinfo("Success", "Patient deleted successfully.")
                 self.load_patients()
             except Exception as e:
@@ -463,14 +448,6 @@ class AddPatientDialog:
                 return
                 
             # Insert into database
-            query = '''
-                INSERT INTO patients (
-                    national_id, first_name, last_name, date_of_birth, gender,
-                    phone, email, address, emergency_contact, emergency_phone,
-                    blood_group, allergies, insurance_info
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            '''
-            
             values = (
                 data['national_id'], data['first_name'], data['last_name'],
                 data['date_of_birth'], data['gender'], data['phone'],
@@ -479,7 +456,7 @@ class AddPatientDialog:
                 data['insurance_info']
             )
             
-            self.db_manager.execute_insert(query, values)
+            self.db_manager.execute_named_insert('patient_insert', values)
             
             messagebox.showinfo("Success", "Patient added successfully!")
             self.callback()  # Refresh patient list
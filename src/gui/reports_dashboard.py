@@ -17,10 +17,14 @@ except ImportError:
     np = None
     HAS_MATPLOTLIB = False
 
+from src.database.date_ranges import month_range, last_days
+from src.utils.money import Money
+
 class ReportsDashboard:
-    def __init__(self, parent, db_manager):
+    def __init__(self, parent, db_manager, async_db):
         self.parent = parent
         self.db_manager = db_manager
+        self.async_db = async_db
         
         self.create_widgets()
         self.load_reports()
@@ -107,54 +111,13 @@ class ReportsDashboard:
         metrics_frame = tk.Frame(summary_frame, bg='white')
         metrics_frame.pack(fill='x', padx=20, pady=20)
         
-        try:
-            # Get key metrics
-            total_patients = len(self.db_manager.execute_query("SELECT patient_id FROM patients"))
-            total_doctors = len(self.db_manager.execute_query("SELECT doctor_id FROM doctors"))
-            total_appointments = len(self.db_manager.execute_query("SELECT appointment_id FROM appointments"))
-            
-            # Revenue this month
-            revenue_result = self.db_manager.execute_query(
-                "SELECT SUM(paid_amount) as revenue FROM billing WHERE strftime('%Y-%m', bill_date) = strftime('%Y-%m', 'now')"
-            )
-            monthly_revenue = revenue_result[0]['revenue'] if revenue_result and revenue_result[0]['revenue'] else 0
-            
-            metrics_data = [
-                ("Total Patients", total_patients, "#3498db"),
-                ("Active Doctors", total_doctors, "#27ae60"),
-                ("Total Appointments", total_appointments, "#f39c12"),
-                ("Monthly Revenue", f"${monthly_revenue:,.2f}", "#e74c3c")
-            ]
-            
-            for i, (title, value, color) in enumerate(metrics_data):
-                card = tk.Frame(metrics_frame, bg=color, width=200, height=100)
-                card.pack(side='left', padx=10, fill='x', expand=True)
-                card.pack_propagate(False)
-                
-                tk.Label(
-                    card,
-                    text=str(value),
-                    font=('Arial', 18, 'bold'),
-                    bg=color,
-                    fg='white'
-                ).pack(pady=(15, 5))
-                
-                tk.Label(
-                    card,
-                    text=title,
-                    font=('Arial', 11),
-                    bg=color,
-                    fg='white'
-                ).pack()
-                
-        except Exception as e:
-            tk.Label(
-                metrics_frame,
-                text=f"Error loading metrics: {str(e)}",
-                font=('Arial', 12),
-                fg='red'
-            ).pack()
-            
+        self.async_db.submit(
+            self.fetch_key_metrics,
+            callback=lambda metrics: self.show_key_metrics(metrics_frame, metrics),
+            errback=lambda e: self.show_load_error(metrics_frame, f"Error loading metrics: {str(e)}"),
+            owner=metrics_frame
+        )
+        
         # Recent activity
         activity_frame = tk.Frame(summary_frame, bg='white')
         activity_frame.pack(fill='both', expand=True, padx=20, pady=20)
@@ -180,6 +143,53 @@ class ReportsDashboard:
         # Load recent activity
         self.load_recent_activity(activity_text)
         
+    def fetch_key_metrics(self):
+        """Get key metrics (runs on a background worker)"""
+        counts = self.db_manager.get_dashboard_counts()
+        
+        # Revenue this month
+        revenue_result = self.db_manager.execute_named('billing_revenue_between', month_range().params())
+        monthly_revenue = Money.of(revenue_result[0]['revenue_cents'] if revenue_result else 0)
+        
+        return [
+            ("Total Patients", counts['patients'], "#3498db"),
+            ("Active Doctors", counts['doctors'], "#27ae60"),
+            ("Total Appointments", counts['appointments'], "#f39c12"),
+            ("Monthly Revenue", str(monthly_revenue), "#e74c3c")
+        ]
+        
+    def show_key_metrics(self, metrics_frame, metrics_data):
+        """Show key metrics cards"""
+        for i, (title, value, color) in enumerate(metrics_data):
+            card = tk.Frame(metrics_frame, bg=color, width=200, height=100)
+            card.pack(side='left', padx=10, fill='x', expand=True)
+            card.pack_propagate(False)
+            
+            tk.Label(
+                card,
+                text=str(value),
+                font=('Arial', 18, 'bold'),
+                bg=color,
+                fg='white'
+            ).pack(pady=(15, 5))
+            
+            tk.Label(
+                card,
+                text=title,
+                font=('Arial', 11),
+                bg=color,
+                fg='white'
+            ).pack()
+            
+    def show_load_error(self, frame, message):
+        """Show a load error inside a report frame"""
+        tk.Label(
+            frame,
+            text=message,
+            font=('Arial', 12),
+            fg='red'
+        ).pack()
+        
     def create_patient_analytics_tab(self):
         """Create patient analytics tab"""
         patient_frame = tk.Frame(self.notebook, bg='white')
@@ -201,22 +211,18 @@ class ReportsDashboard:
         charts_frame = tk.Frame(demo_frame, bg='white')
         charts_frame.pack(fill='both', expand=True)
         
-        try:
-            # Gender distribution
-            gender_data = self.db_manager.execute_query(
-                "SELECT gender, COUNT(*) as count FROM patients GROUP BY gender"
-            )
-            
-            if gender_data:
-                self.create_pie_chart(charts_frame, gender_data, "Gender Distribution", "gender", "count")
-                
-        except Exception as e:
-            tk.Label(
-                charts_frame,
-                text=f"Error loading patient analytics: {str(e)}",
-                font=('Arial', 12),
-                fg='red'
-            ).pack()
+        # Gender distribution
+        self.async_db.named(
+            'patient_gender_counts',
+            callback=lambda gender_data: self.show_gender_chart(charts_frame, gender_data),
+            errback=lambda e: self.show_load_error(charts_frame, f"Error loading patient analytics: {str(e)}"),
+            owner=charts_frame
+        )
+        
+    def show_gender_chart(self, charts_frame, gender_data):
+        """Show gender distribution chart"""
+        if gender_data:
+            self.create_pie_chart(charts_frame, gender_data, "Gender Distribution", "gender", "count")
             
     def create_financial_reports_tab(self):
         """Create financial reports tab"""
@@ -235,37 +241,34 @@ class ReportsDashboard:
             fg='#2c3e50'
         ).pack(anchor='w', pady=(0, 10))
         
-        try:
-            # Payment status distribution
-            payment_data = self.db_manager.execute_query(
-                "SELECT payment_status, COUNT(*) as count, SUM(total_amount) as amount FROM billing GROUP BY payment_status"
-            )
+        # Payment status distribution
+        self.async_db.named(
+            'billing_status_summary',
+            callback=lambda payment_data: self.show_payment_summary(revenue_frame, payment_data),
+            errback=lambda e: self.show_load_error(revenue_frame, f"Error loading financial reports: {str(e)}"),
+            owner=revenue_frame
+        )
+        
+    def show_payment_summary(self, revenue_frame, payment_data):
+        """Show payment status table"""
+        if payment_data:
+            # Create payment status table
+            columns = ('Status', 'Count', 'Total Amount', 'Collected')
+            tree = ttk.Treeview(revenue_frame, columns=columns, show='headings', height=6)
             
-            if payment_data:
-                # Create payment status table
-                columns = ('Status', 'Count', 'Total Amount')
-                tree = ttk.Treeview(revenue_frame, columns=columns, show='headings', height=6)
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=150)
                 
-                for col in columns:
-                    tree.heading(col, text=col)
-                    tree.column(col, width=150)
-                    
-                for row in payment_data:
-                    tree.insert('', 'end', values=(
-                        row['payment_status'].title(),
-                        row['count'],
-                        f"${row['amount']:,.2f}"
-                    ))
-                    
-                tree.pack(fill='x')
+            for row in payment_data:
+                tree.insert('', 'end', values=(
+                    row['payment_status'].title(),
+                    row['count'],
+                    str(Money(row['billed_cents'])),
+                    str(Money(row['paid_cents']))
+                ))
                 
-        except Exception as e:
-            tk.Label(
-                revenue_frame,
-                text=f"Error loading financial reports: {str(e)}",
-                font=('Arial', 12),
-                fg='red'
-            ).pack()
+            tree.pack(fill='x')
             
     def create_appointment_stats_tab(self):
         """Create appointment statistics tab"""
@@ -284,40 +287,36 @@ class ReportsDashboard:
             fg='#2c3e50'
         ).pack(anchor='w', pady=(0, 10))
         
-        try:
-            # Appointments by status
-            status_data = self.db_manager.execute_query(
-                "SELECT status, COUNT(*) as count FROM appointments GROUP BY status"
-            )
+        # Appointments by status
+        self.async_db.named(
+            'appointment_status_counts',
+            callback=lambda status_data: self.show_status_summary(trends_frame, status_data),
+            errback=lambda e: self.show_load_error(trends_frame, f"Error loading appointment statistics: {str(e)}"),
+            owner=trends_frame
+        )
+        
+    def show_status_summary(self, trends_frame, status_data):
+        """Show appointment status table"""
+        if status_data:
+            # Create status table
+            columns = ('Status', 'Count', 'Percentage')
+            tree = ttk.Treeview(trends_frame, columns=columns, show='headings', height=6)
             
-            if status_data:
-                # Create status table
-                columns = ('Status', 'Count', 'Percentage')
-                tree = ttk.Treeview(trends_frame, columns=columns, show='headings', height=6)
+            for col in columns:
+                tree.heading(col, text=col)
+                tree.column(col, width=150)
                 
-                for col in columns:
-                    tree.heading(col, text=col)
-                    tree.column(col, width=150)
-                    
-                total_appointments = sum(row['count'] for row in status_data)
-                
-                for row in status_data:
-                    percentage = (row['count'] / total_appointments * 100) if total_appointments > 0 else 0
-                    tree.insert('', 'end', values=(
-                        row['status'].title(),
-                        row['count'],
-                        f"{percentage:.1f}%"
-                    ))
-                    
-                tree.pack(fill='x')
+            total_appointments = sum(row['count'] for row in status_data)
+            
+            for row in status_data:
+                percentage = (row['count'] / total_appointments * 100) if total_appointments > 0 else 0
+                tree.insert('', 'end', values=(
+                    row['status'].title(),
+                    row['count'],
+                    f"{percentage:.1f}%"
+                ))
                 
-        except Exception as e:
-            tk.Label(
-                trends_frame,
-                text=f"Error loading appointment statistics: {str(e)}",
-                font=('Arial', 12),
-                fg='red'
-            ).pack()
+            tree.pack(fill='x')
             
     def create_pie_chart(self, parent, data, title, label_field, value_field):
         """Create a pie chart"""
@@ -358,54 +357,52 @@ class ReportsDashboard:
             ).pack(side='left', padx=10)
             
     def load_recent_activity(self, text_widget):
-        """Load recent activity summary"""
-        try:
-            text_widget.config(state='normal')
-            text_widget.delete(1.0, 'end')
-            
-            # Get recent activities
-            activities = []
-            
-            # Recent appointments
-            recent_appointments = self.db_manager.execute_query(
-                "SELECT COUNT(*) as count FROM appointments WHERE DATE(appointment_date) >= DATE('now', '-7 days')"
-            )
-            if recent_appointments:
-                activities.append(f"• {recent_appointments[0]['count']} appointments scheduled in the last 7 days")
-                
-            # Recent patients
-            recent_patients = self.db_manager.execute_query(
-                "SELECT COUNT(*) as count FROM patients WHERE DATE(created_at) >= DATE('now', '-7 days')"
-            )
-            if recent_patients:
-                activities.append(f"• {recent_patients[0]['count']} new patients registered in the last 7 days")
-                
-            # Recent payments
-            recent_payments = self.db_manager.execute_query(
-                "SELECT SUM(paid_amount) as amount FROM billing WHERE DATE(bill_date) >= DATE('now', '-7 days')"
-            )
-            if recent_payments and recent_payments[0]['amount']:
-                activities.append(f"• ${recent_payments[0]['amount']:,.2f} collected in payments in the last 7 days")
-                
-            # Today's statistics
-            today_appointments = self.db_manager.execute_query(
-                "SELECT COUNT(*) as count FROM appointments WHERE DATE(appointment_date) = DATE('now')"
-            )
-            if today_appointments:
-                activities.append(f"• {today_appointments[0]['count']} appointments scheduled for today")
-                
-            if not activities:
-                activities.append("• No recent activity to display")
-                
-            activity_text = "Recent Activity Summary (Last 7 Days):\n\n" + "\n".join(activities)
-            text_widget.insert(1.0, activity_text)
-            text_widget.config(state='disabled')
-            
-        except Exception as e:
-            text_widget.config(state='normal')
-            text_widget.insert(1.0, f"Error loading activity: {str(e)}")
-            text_widget.config(state='disabled')
+        """Load recent activity summary in the background"""
+        self.async_db.submit(
+            self.fetch_recent_activity,
+            callback=lambda activities: self.show_recent_activity(text_widget, activities),
+            errback=lambda e: self.show_activity_error(text_widget, e),
+            owner=text_widget
+        )
+        
+    def fetch_recent_activity(self):
+        """Get recent activities (runs on a background worker)"""
+        activities = []
+        counts = self.db_manager.get_dashboard_counts()
+        
+        # Recent appointments
+        activities.append(f"• {counts['appointments_last_7_days']} appointments scheduled in the last 7 days")
+        
+        # Recent patients
+        activities.append(f"• {counts['patients_last_7_days']} new patients registered in the last 7 days")
+        
+        # Recent payments
+        recent_payments = self.db_manager.execute_named('billing_revenue_between', last_days(7).params())
+        if recent_payments and recent_payments[0]['revenue_cents']:
+            activities.append(f"• {Money(recent_payments[0]['revenue_cents'])} collected in payments in the last 7 days")
             
+        # Today's statistics
+        activities.append(f"• {counts['appointments_today']} appointments scheduled for today")
+        
+        if not activities:
+            activities.append("• No recent activity to display")
+        return activities
+        
+    def show_recent_activity(self, text_widget, activities):
+        """Show recent activity summary"""
+        text_widget.config(state='normal')
+        text_widget.delete(1.0, 'end')
+        activity_text = "Recent Activity Summary (Last 7 Days):\n\n" + "\n".join(activities)
+        text_widget.insert(1.0, activity_text)
+        text_widget.config(state='disabled')
+        
+    def show_activity_error(self, text_widget, error):
+        """Show an activity load error"""
+        text_widget.config(state='normal')
+        text_widget.delete(1.0, 'end')
+        text_widget.insert(1.0, f"Error loading activity: {str(error)}")
+        text_widget.config(state='disabled')
+        
     def generate_custom_report(self):
         """Generate custom report"""
         messagebox.showinfo("Info", "Custom report generation - Implementation in progress")
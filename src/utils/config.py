@@ -10,10 +10,19 @@ class Config:
         # Database configuration
         self.DATABASE_PATH = "data/hospital.db"
         self.BACKUP_PATH = "data/backups/"
+        self.BACKUP_SCHEDULE = True  # snapshot, verify and prune in the background
+        self.BACKUP_RETENTION = {'hourly': 24, 'daily': 7, 'weekly': 4}  # snapshots kept per tier
+        self.WAL_ARCHIVE_PATH = "data/wal_archive/"  # None turns point-in-time recovery off
+        self.WAL_ARCHIVE_INTERVAL = 10  # seconds between archive runs = restore resolution
+        self.DATABASE_POOL_SIZE = 4  # reader connections; writes use one dedicated connection
+        self.DATABASE_PROFILE = "durable"  # PRAGMA preset: "durable", "balanced" or "fast"
         
         # Security settings
         self.SESSION_TIMEOUT = timedelta(hours=8)
         self.PASSWORD_MIN_LENGTH = 6
+        # Password KDF and cost; run benchmark_passwords.py on a terminal to pick
+        # the costliest setting that still logs in within the target time
+        self.PASSWORD_HASHING = {'scheme': 'scrypt', 'n': 2 ** 14, 'r': 8, 'p': 1}
         self.MAX_LOGIN_ATTEMPTS = 3
         
         # Application settings
@@ -58,6 +67,7 @@ class Config:
         directories = [
             os.path.dirname(self.DATABASE_PATH),
             self.BACKUP_PATH,
+            self.WAL_ARCHIVE_PATH,
             self.LOGS_PATH,
             self.REPORTS_PATH,
             self.TEMP_PATH
@@ -0,0 +1,86 @@
+"""
+Money for Hospital Management System
+Amounts held as whole cents so sums and balances are exact
+"""
+
+from decimal import Decimal, InvalidOperation
+from functools import total_ordering
+
+@total_ordering
+class Money:
+    """An amount of money in integer cents
+    
+    The billing tables store cents in INTEGER columns; Money converts
+    them for display and parses what users type. Only whole cents exist,
+    so adding, subtracting and comparing amounts never drifts.
+    """
+    
+    __slots__ = ('cents',)
+    
+    def __init__(self, cents=0):
+        if isinstance(cents, bool) or not isinstance(cents, int):
+            raise TypeError(f"Money takes integer cents, not {cents!r}")
+        self.cents = cents
+        
+    @classmethod
+    def parse(cls, text):
+        """Parse user input such as '120', '99.5' or '$1,234.56'
+        
+        Raises ValueError for anything that is not an amount with at
+        most two decimal places.
+        """
+        cleaned = str(text).strip().replace(',', '').replace('$', '')
+        try:
+            amount = Decimal(cleaned)
+        except InvalidOperation:
+            raise ValueError(f"Not a valid amount: {text!r}")
+        if not amount.is_finite():
+            raise ValueError(f"Not a valid amount: {text!r}")
+        cents = amount * 100
+        if cents != cents.to_integral_value():
+            raise ValueError(f"Amounts cannot have more than two decimal places: {text!r}")
+        return cls(int(cents))
+        
+    @classmethod
+    def of(cls, cents):
+        """Money for a cents column that may be NULL (a SUM over no rows)"""
+        return cls(cents or 0)
+        
+    def __add__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents + other.cents)
+        
+    def __sub__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return Money(self.cents - other.cents)
+        
+    def __neg__(self):
+        return Money(-self.cents)
+        
+    def __eq__(self, other):
+        return isinstance(other, Money) and self.cents == other.cents
+        
+    def __lt__(self, other):
+        if not isinstance(other, Money):
+            return NotImplemented
+        return self.cents < other.cents
+        
+    def __hash__(self):
+        return hash(self.cents)
+        
+    def __bool__(self):
+        return self.cents != 0
+        
+    def amount(self):
+        """Get the amount as text without a currency sign, e.g. '1234.56'"""
+        sign = '-' if self.cents < 0 else ''
+        return f"{sign}{abs(self.cents) // 100}.{abs(self.cents) % 100:02d}"
+        
+    def __str__(self):
+        sign = '-' if self.cents < 0 else ''
+        return f"{sign}${abs(self.cents) // 100:,}.{abs(self.cents) % 100:02d}"
+        
+    def __repr__(self):
+        return f"Money({self.cents})"
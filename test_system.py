@@ -124,6 +124,2172 @@ def test_authentication():
         print(f"\n❌ Authentication test error: {e}")
         return False
 
+def test_connection_pool():
+    """Test pooled connections for concurrent readers and writer"""
+    try:
+        print("\nTesting connection pool...")
+        
+        import threading
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_pool.db", pool_size=2)
+        db.create_tables()
+        print("✓ Pooled database manager created")
+        
+        # Readers are separate connections from the writer
+        with db.pool.reader() as reader:
+            if reader is db.pool.writer_connection:
+                print("❌ Reader checkout returned the writer connection")
+                return False
+        print("✓ Reader checkout uses a dedicated connection")
+        
+        # Reads inside a writer checkout go through the writer
+        with db.pool.writer() as writer:
+            with db.pool.reader() as reader:
+                if reader is not writer:
+                    print("❌ Writer thread did not read through its own connection")
+                    return False
+        print("✓ Writer thread reads its own connection")
+        
+        # Concurrent readers and writes from several threads
+        errors = []
+        
+        def worker(n):
+            try:
+                for i in range(10):
+                    db.execute_insert(
+                        "INSERT INTO rooms (room_number, room_type) VALUES (?, ?)",
+                        (f"{n}-{i}", "general")
+                    )
+                    db.execute_query("SELECT COUNT(*) as count FROM rooms")
+            except Exception as e:
+                errors.append(e)
+                
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+            
+        count = db.execute_query("SELECT COUNT(*) as count FROM rooms")[0]['count']
+        if errors or count != 40:
+            print(f"❌ Concurrent access failed: {errors or count}")
+            return False
+        print("✓ Concurrent reads and writes succeeded")
+        
+        stats = db.pool.stats()
+        if stats['readers_in_use'] != 0:
+            print("❌ Reader connections were not checked back in")
+            return False
+        print("✓ All connections returned to the pool")
+        
+        # Clean up
+        db.close()
+        os.remove("test_pool.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Connection pool tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Connection pool test error: {e}")
+        return False
+
+def test_pragma_profiles():
+    """Test PRAGMA profiles applied at startup"""
+    try:
+        print("\nTesting PRAGMA profiles...")
+        
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_pragmas.db", pool_size=1, profile="fast")
+        settings = db.pragma_settings
+        if settings['journal_mode'] != 'WAL' or settings['synchronous'] != 'OFF':
+            print(f"❌ Fast profile not applied: {settings}")
+            return False
+        print("✓ Fast profile applied to writer")
+        
+        report = db.get_pragma_report()
+        if report['reader']['temp_store'] != 'MEMORY':
+            print(f"❌ Reader connection not configured: {report['reader']}")
+            return False
+        print("✓ Profile applied to reader connections")
+        db.close()
+        
+        try:
+            DatabaseManager("test_pragmas.db", profile="reckless")
+            print("❌ Unknown profile accepted")
+            return False
+        except ValueError:
+            print("✓ Unknown profile rejected")
+            
+        # Clean up
+        os.remove("test_pragmas.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ PRAGMA profile tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ PRAGMA profile test error: {e}")
+        return False
+
+def test_indexes():
+    """Test managed secondary indexes and query plan verification"""
+    try:
+        print("\nTesting indexes...")
+        
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_indexes.db")
+        db.create_tables()
+        
+        indexes = db.execute_query(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'"
+        )
+        if not any(row['name'] == 'idx_appointments_doctor_date_time' for row in indexes):
+            print("❌ Managed indexes were not created")
+            return False
+        print(f"✓ {len(indexes)} managed indexes created")
+        
+        # Stale managed indexes are dropped on the next startup
+        db.execute_update("CREATE INDEX idx_obsolete ON rooms (floor)", ())
+        db.create_tables()
+        if 'idx_obsolete' not in db.index_changes['dropped']:
+            print("❌ Obsolete managed index was not dropped")
+            return False
+        print("✓ Obsolete managed index dropped")
+        
+        report = db.verify_indexes()
+        unindexed = [entry['name'] for entry in report if not entry['uses_index']]
+        if unindexed:
+            print(f"❌ Queries without index: {', '.join(unindexed)}")
+            return False
+        print(f"✓ All {len(report)} hot queries use an index")
+        
+        # Clean up
+        db.close()
+        os.remove("test_indexes.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Index tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Index test error: {e}")
+        return False
+
+def test_transactions():
+    """Test batched writes and explicit transactions"""
+    try:
+        print("\nTesting transactions...")
+        
+        import threading
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_transactions.db")
+        db.create_tables()
+        
+        # Bulk insert in one commit
+        rows = ((f"R{i}", "general", i % 5) for i in range(1000))
+        inserted = db.execute_insert_many(
+            "INSERT INTO rooms (room_number, room_type, floor) VALUES (?, ?, ?)", rows
+        )
+        if inserted != 1000:
+            print(f"❌ Bulk insert reported {inserted} rows")
+            return False
+        print("✓ Bulk insert of 1000 rows")
+        
+        updated = db.execute_update_many(
+            "UPDATE rooms SET status = ? WHERE floor = ?",
+            [("cleaning", 1), ("maintenance", 2)]
+        )
+        if updated != 400:
+            print(f"❌ Bulk update reported {updated} rows")
+            return False
+        print("✓ Bulk update")
+        
+        # Single-row writes join the transaction and roll back together
+        try:
+            with db.transaction():
+                db.execute_insert(
+                    "INSERT INTO rooms (room_number, room_type) VALUES (?, ?)", ("X1", "icu")
+                )
+                db.execute_update("UPDATE rooms SET floor = 9", ())
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+            
+        rolled_back = db.execute_query(
+            "SELECT COUNT(*) as count FROM rooms WHERE room_number = 'X1' OR floor = 9"
+        )[0]['count']
+        if rolled_back != 0:
+            print("❌ Writes inside a failed transaction were committed")
+            return False
+        print("✓ Failed transaction rolled back")
+        
+        with db.transaction():
+            db.execute_insert(
+                "INSERT INTO rooms (room_number, room_type) VALUES (?, ?)", ("X2", "icu")
+            )
+            # Other threads must not see the row before the commit
+            visible = []
+            reader = threading.Thread(target=lambda: visible.extend(db.execute_query(
+                "SELECT room_id FROM rooms WHERE room_number = 'X2'"
+            )))
+            reader.start()
+            reader.join()
+            if visible:
+                print("❌ execute_insert committed early inside a transaction")
+                return False
+        print("✓ Single-row writes deferred until the transaction commits")
+        
+        # Clean up
+        db.close()
+        os.remove("test_transactions.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Transaction tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Transaction test error: {e}")
+        return False
+
+def test_query_registry():
+    """Test named queries and the per-connection statement cache"""
+    try:
+        print("\nTesting query registry...")
+        
+        from src.database.db_manager import DatabaseManager
+        from src.database.query_registry import QueryRegistry
+        
+        db = DatabaseManager("test_queries.db")
+        db.create_tables()
+        db.queries.reset_stats()
+        
+        patient_id = db.execute_named_insert('patient_insert', (
+            "Q-001", "Query", "Tester", "1990-01-01", "Female",
+            "555-0100", None, None, None, None, None, None, None
+        ))
+        result = db.execute_named('patient_by_id', (patient_id,))
+        if not result or result[0]['national_id'] != "Q-001":
+            print("❌ Named insert/select failed")
+            return False
+        print("✓ Named insert and select work")
+        
+        for _ in range(3):
+            db.execute_named('patient_by_id', (patient_id,))
+        stats = {row['name']: row for row in db.get_query_stats()}
+        if stats['patient_by_id']['calls'] != 4 or stats['patient_by_id']['total_time'] <= 0:
+            print("❌ Query counters not recorded")
+            return False
+        print(f"✓ Query counters recorded: {stats['patient_by_id']['calls']} calls")
+        
+        # A caller switching its cursor to plain tuples does not affect later callers
+        with db.pool.reader() as conn:
+            cursor = db.queries.execute(conn, 'patient_by_id', (patient_id,))
+            cursor.row_factory = None
+            cursor.fetchall()
+            if db.queries.execute(conn, 'patient_by_id', (patient_id,)).fetchone()['national_id'] != "Q-001":
+                print("❌ row_factory change leaked to another call")
+                return False
+        print("✓ Each call gets its own cursor")
+        
+        registry = QueryRegistry()
+        registry.register('one', "SELECT 1")
+        registry.register('one', "SELECT 1")
+        try:
+            registry.register('one', "SELECT 2")
+            print("❌ Conflicting registration accepted")
+            return False
+        except ValueError:
+            pass
+        print("✓ Conflicting registration rejected")
+        
+        report = db.verify_indexes()
+        unindexed = [entry['name'] for entry in report if not entry['uses_index']]
+        if unindexed:
+            print(f"❌ Named queries without index: {', '.join(unindexed)}")
+            return False
+        print(f"✓ All {len(report)} indexed named queries use an index")
+        
+        # Clean up
+        db.close()
+        os.remove("test_queries.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Query registry tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Query registry test error: {e}")
+        return False
+
+def test_counters():
+    """Test trigger-maintained statistics counters"""
+    try:
+        print("\nTesting statistics counters...")
+        
+        from datetime import datetime, timedelta
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_counters.db")
+        db.create_tables()
+        
+        # Rows that exist before the counters are seeded from the tables
+        for row in db.execute_query("SELECT name FROM sqlite_master WHERE type = 'trigger'"):
+            db.execute_update(f"DROP TRIGGER {row['name']}", ())
+        db.execute_update("DROP TABLE stats_counters", ())
+        db.execute_insert_many(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ((f"C-{i:03d}", "Count", f"Patient{i}", "1980-01-01", "Male") for i in range(5))
+        )
+        db.create_tables()
+        if db.get_counter('patients') != 5:
+            print("❌ Counters not seeded from existing rows")
+            return False
+        print("✓ Counters seeded from existing rows")
+        
+        today = datetime.now().strftime('%Y-%m-%d')
+        tomorrow = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        doctor_id = db.execute_insert(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+            ("C-DOC", "Count", "Doctor", "General")
+        )
+        appointment_ids = [
+            db.execute_insert(
+                "INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time) VALUES (?, ?, ?, ?)",
+                (1, doctor_id, today, f"0{hour}:00:00")
+            ) for hour in range(1, 4)
+        ]
+        bill_id = db.execute_insert(
+            "INSERT INTO billing (patient_id, total_cents, payment_status) VALUES (?, ?, ?)",
+            (1, 100, 'pending')
+        )
+        
+        counts = db.get_dashboard_counts()
+        expected = {'patients': 5, 'doctors': 1, 'appointments': 3, 'appointments_today': 3, 'bills_pending': 1}
+        for name, value in expected.items():
+            if counts[name] != value:
+                print(f"❌ Counter {name} is {counts[name]}, expected {value}")
+                return False
+        print("✓ Insert triggers keep totals current")
+        
+        # Moving, deleting and settling rows
+        db.execute_update(
+            "UPDATE appointments SET appointment_date = ? WHERE appointment_id = ?", (tomorrow, appointment_ids[0])
+        )
+        db.execute_update("DELETE FROM appointments WHERE appointment_id = ?", (appointment_ids[1],))
+        db.execute_update("UPDATE billing SET payment_status = 'paid' WHERE bill_id = ?", (bill_id,))
+        
+        counts = db.get_dashboard_counts()
+        if counts['appointments'] != 2 or counts['appointments_today'] != 1 or counts['bills_pending'] != 0:
+            print(f"❌ Update/delete triggers out of sync: {counts}")
+            return False
+        if db.get_counter('appointments_by_date', tomorrow) != 1:
+            print("❌ Appointment not moved to its new day")
+            return False
+        print("✓ Update and delete triggers keep counters exact")
+        
+        # A full recount must agree with the incremental counts
+        db.rebuild_counters()
+        if db.get_dashboard_counts() != counts:
+            print("❌ Rebuilt counters differ from incremental counters")
+            return False
+        print("✓ Rebuilt counters match")
+        
+        # Clean up
+        db.close()
+        os.remove("test_counters.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Counter tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Counter test error: {e}")
+        return False
+
+def test_patient_pages():
+    """Test keyset-paginated patient loading"""
+    try:
+        print("\nTesting paginated patient list...")
+        
+        from src.database.db_manager import DatabaseManager
+        from src.gui.paged_tree import PagedTreeview, FIRST_KEY
+        
+        db = DatabaseManager("test_pages.db")
+        db.create_tables()
+        
+        db.execute_insert_many(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ((f"P-{i:03d}", "Page", f"Patient{i}", "1980-01-01", "Female") for i in range(25))
+        )
+        doctor_ids = [
+            db.execute_insert(
+                "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+                (f"D-{i}", "Doc", f"Number{i}", "General")
+            ) for i in range(2)
+        ]
+        # Patient 1 has a long history; the latest visit is with the second doctor
+        db.execute_insert_many(
+            "INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time) VALUES (?, ?, ?, ?)",
+            [(1, doctor_ids[0], f"2024-01-{day:02d}", "09:00:00") for day in range(1, 11)] +
+            [(1, doctor_ids[1], "2024-02-01", "09:00:00")]
+        )
+        
+        seen = []
+        after_id = FIRST_KEY
+        while True:
+            page = db.get_patients_page(after_id, 10)
+            if not page:
+                break
+            seen.extend(row['patient_id'] for row in page)
+            after_id = page[-1]['patient_id']
+        if seen != list(range(25, 0, -1)):
+            print("❌ Keyset pages skipped or repeated patients")
+            return False
+        print("✓ Keyset pages return every patient exactly once")
+        
+        patient = db.get_patients_page(2, 10)[0]
+        if patient['doctor'] != "Doc Number1":
+            print(f"❌ Expected latest doctor, got {patient['doctor']}")
+            return False
+        print("✓ One row per patient with the latest doctor")
+        
+        class FakeTree:
+            """Minimal stand-in for a Treeview"""
+            def __init__(self):
+                self.rows = {}
+                self.order = []
+                self.inserted = 0
+            def configure(self, **options):
+                pass
+            def insert(self, parent, index, values):
+                self.inserted += 1
+                item = f"I{self.inserted}"
+                self.rows[item] = values
+                self.order.append(item)
+                return item
+            def item(self, item, values):
+                self.rows[item] = values
+            def move(self, item, parent, index):
+                if item in self.order:
+                    self.order.remove(item)
+                self.order.insert(index, item)
+            def detach(self, *items):
+                for item in items:
+                    self.order.remove(item)
+            def selection(self):
+                return ()
+            def selection_remove(self, items):
+                pass
+            def yview_moveto(self, fraction):
+                pass
+                
+        tree = FakeTree()
+        pager = PagedTreeview(
+            tree,
+            db.get_patients_page,
+            key=lambda row: row['patient_id'],
+            row_values=lambda row: (row['patient_id'],),
+            page_size=10
+        )
+        pager.reload()
+        pager.load_next_page()
+        if len(pager) != 20:
+            print("❌ Next page was not appended")
+            return False
+            
+        # A narrower source reuses pooled items instead of creating new ones
+        pager.set_source(
+            lambda after_id, limit: db.search_patients("patient1", limit) if after_id == FIRST_KEY else []
+        )
+        pager.load_next_page()
+        if tree.inserted != 20 or len(tree.order) != len(pager) or len(pager) != 10:
+            print("❌ Treeview items were not reused")
+            return False
+        print("✓ Treeview items pooled and reused across reloads")
+        
+        # Clean up
+        db.close()
+        os.remove("test_pages.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Pagination tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Pagination test error: {e}")
+        return False
+
+def test_patient_search():
+    """Test the full-text patient search index"""
+    try:
+        print("\nTesting patient search...")
+        
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_search.db")
+        db.create_tables()
+        
+        db.execute_insert_many(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, phone) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                ("S-1001", "Johnathan", "Smith", "1980-01-01", "Male", "555-0101"),
+                ("S-1002", "Joanna", "Johnson", "1985-05-05", "Female", "555-0102"),
+                ("S-1003", "Maria", "Lopez", "1990-09-09", "Female", "555-0103"),
+                ("S-2001", "Élodie", "Martin", "1975-03-03", "Female", "555-0201"),
+                ("S-7777", "Rank", "Identity", "1970-01-01", "Male", "555-0301"),
+                ("S-3001", "Rank", "Phone", "1970-01-01", "Male", "555-7777"),
+            ]
+        )
+        
+        names = [row['first_name'] for row in db.search_patients("jo")]
+        if sorted(names) != ["Joanna", "Johnathan"]:
+            print(f"❌ Prefix search returned {names}")
+            return False
+        print("✓ Prefix matching works")
+        
+        if [row['first_name'] for row in db.search_patients("jo smi")] != ["Johnathan"]:
+            print("❌ Multi-word search failed")
+            return False
+        if [row['national_id'] for row in db.search_patients("s-1003")] != ["S-1003"]:
+            print("❌ National ID search failed")
+            return False
+        if [row['first_name'] for row in db.search_patients("elodie")] != ["Élodie"]:
+            print("❌ Accent-insensitive search failed")
+            return False
+        if db.search_patients("--") != []:
+            print("❌ Punctuation-only search should return nothing")
+            return False
+        print("✓ Multi-word, ID and accent-insensitive searches work")
+        
+        # A match on the national ID ranks above a match on a phone number
+        ranked = db.search_patients("7777")
+        if [row['national_id'] for row in ranked] != ["S-7777", "S-3001"]:
+            print("❌ Results are not ranked by relevance")
+            return False
+        # The best match still wins when thousands of newer rows match too
+        db.execute_insert_many(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, phone) VALUES (?, ?, ?, ?, ?, ?)",
+            [(f"P-{i}", "Rank", "Newer", "1970-01-01", "Male", "555-7777") for i in range(2500)]
+        )
+        if [row['national_id'] for row in db.search_patients("7777", 1)] != ["S-7777"]:
+            print("❌ Older best match dropped from the ranking")
+            return False
+        print("✓ Results ranked by relevance")
+        
+        # Triggers keep the index in sync with the patients table
+        db.execute_update("UPDATE patients SET last_name = 'Garcia' WHERE national_id = 'S-1003'", ())
+        db.execute_update("DELETE FROM patients WHERE national_id = 'S-1002'", ())
+        if db.search_patients("lopez") or not db.search_patients("garcia"):
+            print("❌ Search index not updated")
+            return False
+        if [row['first_name'] for row in db.search_patients("jo")] != ["Johnathan"]:
+            print("❌ Deleted patient still found")
+            return False
+        print("✓ Search index kept in sync by triggers")
+        
+        # Clean up
+        db.close()
+        os.remove("test_search.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Patient search tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Patient search test error: {e}")
+        return False
+
+def test_async_db():
+    """Test background database reads and result delivery"""
+    try:
+        print("\nTesting background database access...")
+        
+        import threading
+        import time
+        from src.database.db_manager import DatabaseManager
+        from src.gui.async_db import AsyncDatabase
+        
+        class FakeRoot:
+            """Stands in for the Tk root: after() jobs run when drive() is called"""
+            def __init__(self):
+                self.jobs = {}
+                self.next_id = 0
+                self.reported = []
+                
+            def after(self, ms, func):
+                self.next_id += 1
+                self.jobs[self.next_id] = func
+                return self.next_id
+                
+            def after_cancel(self, job_id):
+                self.jobs.pop(job_id, None)
+                
+            def report_callback_exception(self, exc, value, tb):
+                self.reported.append(value)
+                
+            def drive(self, until, timeout=5):
+                deadline = time.time() + timeout
+                while not until() and time.time() < deadline:
+                    jobs, self.jobs = self.jobs, {}
+                    for func in jobs.values():
+                        func()
+                    time.sleep(0.005)
+                return until()
+                
+        db = DatabaseManager("test_async.db")
+        db.create_tables()
+        root = FakeRoot()
+        async_db = AsyncDatabase(root, db)
+        
+        busy_changes = []
+        async_db.add_busy_listener(busy_changes.append)
+        
+        # Results are delivered through the Tk loop, not the worker thread
+        results = []
+        threads = []
+        def on_result(rows):
+            results.append(rows)
+            threads.append(threading.current_thread())
+        async_db.named('patient_choices', callback=on_result)
+        if not root.drive(lambda: results):
+            print("❌ Result was not delivered")
+            return False
+        if results[0] != [] or threads[0] is not threading.current_thread():
+            print("❌ Result delivered on the wrong thread")
+            return False
+        print("✓ Results delivered on the Tk thread")
+        
+        # A newer request with the same key supersedes the older one
+        release = threading.Event()
+        delivered = []
+        async_db.submit(lambda: release.wait(5) and "old", callback=delivered.append, key='list')
+        async_db.submit(lambda: "new", callback=delivered.append, key='list')
+        release.set()
+        if not root.drive(lambda: not async_db.is_busy()) or delivered != ["new"]:
+            print(f"❌ Superseded request delivered: {delivered}")
+            return False
+        print("✓ Superseded requests are dropped")
+        
+        # Errors go to the errback
+        errors = []
+        async_db.submit(db.execute_query, "SELECT * FROM no_such_table", errback=errors.append)
+        if not root.drive(lambda: errors):
+            print("❌ Errback not called")
+            return False
+        print("✓ Errors reported to errback")
+        
+        # A callback that raises is reported and later requests still arrive
+        def broken(rows):
+            raise RuntimeError("callback failed")
+        delivered = []
+        async_db.submit(lambda: 1, callback=broken)
+        async_db.submit(lambda: 2, callback=delivered.append)
+        if not root.drive(lambda: delivered) or len(root.reported) != 1:
+            print(f"❌ Failing callback stopped delivery: {delivered}, {root.reported}")
+            return False
+        async_db.submit(lambda: 3, callback=delivered.append)
+        if not root.drive(lambda: len(delivered) == 2):
+            print("❌ Polling stopped after a failing callback")
+            return False
+        print("✓ Failing callback reported without stopping delivery")
+        
+        # Busy listener sees every start and finish of a burst of work
+        if not busy_changes or busy_changes[0] is not True or busy_changes[-1] is not False:
+            print(f"❌ Busy notifications wrong: {busy_changes}")
+            return False
+        print("✓ Busy indicator notified")
+        
+        # Clean up
+        async_db.shutdown()
+        db.close()
+        os.remove("test_async.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Background database tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Background database test error: {e}")
+        return False
+
+def test_appointment_conflicts():
+    """Test interval-based appointment conflict detection"""
+    try:
+        print("\nTesting appointment conflicts...")
+        
+        import threading
+        from src.database.db_manager import DatabaseManager
+        from src.database.scheduling import DayIntervals, AppointmentConflictError
+        
+        # Interval index on its own, including already-overlapping data
+        day = DayIntervals([(540, 600, 1), (550, 560, 2), (720, 750, 3)])
+        if day.find_overlap(590, 620) != 1 or day.find_overlap(600, 720) is not None:
+            print("❌ Interval index gives wrong overlaps")
+            return False
+        day.add(600, 630, 4)
+        if day.find_overlap(615, 616) != 4 or day.find_overlap(630, 720) is not None:
+            print("❌ Interval index not updated on add")
+            return False
+        print("✓ Interval index finds overlaps")
+        
+        db = DatabaseManager("test_conflicts.db")
+        db.create_tables()
+        
+        doctor_id = db.execute_insert(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization, phone) VALUES (?, ?, ?, ?, ?)",
+            ("EMP-C1", "Conflict", "Doctor", "General", "555-0000")
+        )
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, phone) VALUES (?, ?, ?, ?, ?, ?)",
+            ("C-1", "Conflict", "Patient", "1980-01-01", "Male", "555-0001")
+        )
+        
+        first = db.book_appointment(patient_id, doctor_id, "2030-01-07", "09:00", 60)
+        
+        # A 30 minute slot inside a 60 minute one is a conflict
+        try:
+            db.book_appointment(patient_id, doctor_id, "2030-01-07", "09:30", 30)
+            print("❌ Overlapping appointment was booked")
+            return False
+        except AppointmentConflictError as e:
+            if e.conflict_id != first:
+                print(f"❌ Wrong conflicting appointment reported: {e.conflict_id}")
+                return False
+        print("✓ Overlapping durations rejected")
+        
+        # Back-to-back slots and other days are fine
+        db.book_appointment(patient_id, doctor_id, "2030-01-07", "10:00", 30)
+        db.book_appointment(patient_id, doctor_id, "2030-01-08", "09:30", 30)
+        if db.find_appointment_conflict(doctor_id, "2030-01-07", "08:30", 30) is not None:
+            print("❌ Adjacent slot reported as conflict")
+            return False
+            
+        # Cancelled appointments free their slot
+        db.execute_named_update('appointment_set_status', ('cancelled', first))
+        db.book_appointment(patient_id, doctor_id, "2030-01-07", "09:15", 30)
+        print("✓ Adjacent and cancelled slots can be booked")
+        
+        # Two desks booking the same slot at once: exactly one wins
+        desks = [DatabaseManager("test_conflicts.db") for _ in range(2)]
+        outcomes = []
+        start = threading.Barrier(len(desks))
+        def book(desk):
+            start.wait()
+            try:
+                desk.book_appointment(patient_id, doctor_id, "2030-01-09", "11:00", 45)
+                outcomes.append('booked')
+            except AppointmentConflictError:
+                outcomes.append('conflict')
+        threads = [threading.Thread(target=book, args=(desk,)) for desk in desks]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for desk in desks:
+            desk.close()
+        if sorted(outcomes) != ['booked', 'conflict']:
+            print(f"❌ Concurrent bookings not serialized: {outcomes}")
+            return False
+        print("✓ Check and insert are atomic across connections")
+        
+        # Clean up
+        db.close()
+        os.remove("test_conflicts.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Appointment conflict tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Appointment conflict test error: {e}")
+        return False
+
+def test_free_slots():
+    """Test the free appointment slot finder"""
+    try:
+        print("\nTesting free slot finder...")
+        
+        from datetime import datetime
+        from src.database.db_manager import DatabaseManager
+        
+        db = DatabaseManager("test_slots.db", working_hours=("08:00", "12:00"))
+        db.create_tables()
+        
+        db.execute_insert_many(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+            [("EMP-S1", "Slot", "One", "Cardiology"), ("EMP-S2", "Slot", "Two", "Neurology")]
+        )
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("SL-1", "Slot", "Patient", "1980-01-01", "Male")
+        )
+        db.execute_insert_many(
+            "INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, duration_minutes, status) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (patient_id, 1, "2030-01-07", "09:00:00", 60, "scheduled"),
+                (patient_id, 1, "2030-01-07", "09:45:00", 45, "scheduled"),   # overlaps the one before
+                (patient_id, 1, "2030-01-07", "11:10:00", 30, "cancelled"),
+                (patient_id, 1, "2030-01-07", "11:45:00", 15, "scheduled"),
+                (patient_id, 2, "2030-01-07", "08:00:00", 240, "scheduled"),
+            ]
+        )
+        
+        long_ago = datetime(2000, 1, 1)
+        slots = db.find_free_slots("2030-01-07", "2030-01-09", 30, doctor_id=1, limit=6, not_before=long_ago)
+        found = [(slot['date'], slot['start_time'][:5]) for slot in slots]
+        expected = [
+            ("2030-01-07", "08:00"), ("2030-01-07", "08:30"), ("2030-01-07", "10:30"),
+            ("2030-01-07", "11:00"), ("2030-01-08", "08:00"), ("2030-01-08", "08:30")
+        ]
+        if found != expected:
+            print(f"❌ Wrong free slots: {found}")
+            return False
+        print("✓ Busy intervals merged and swept against working hours")
+        
+        # Across doctors the earliest slots come first, whichever doctor has them
+        slots = db.find_free_slots("2030-01-07", "2030-01-09", 60, limit=4, not_before=long_ago)
+        found = [(slot['doctor_id'], slot['date'], slot['start_time'][:5]) for slot in slots]
+        expected = [
+            (1, "2030-01-07", "08:00"), (1, "2030-01-07", "10:30"),
+            (1, "2030-01-08", "08:00"), (2, "2030-01-08", "08:00")
+        ]
+        if found != expected:
+            print(f"❌ Wrong slots across doctors: {found}")
+            return False
+        slots = db.find_free_slots("2030-01-07", "2030-01-08", 30, specialization="Neurology", not_before=long_ago)
+        if slots:
+            print("❌ Fully booked doctor offered a slot")
+            return False
+        print("✓ Doctor and specialization searches work")
+        
+        # Slots that already started are skipped
+        slots = db.find_free_slots("2030-01-07", "2030-01-08", 30, doctor_id=1, not_before=datetime(2030, 1, 7, 8, 10))
+        if slots[0]['start_time'] != "08:10:00":
+            print(f"❌ Past slots offered: {slots[0]}")
+            return False
+        print("✓ Past slots skipped")
+        
+        # Clean up
+        db.close()
+        os.remove("test_slots.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Free slot finder tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Free slot finder test error: {e}")
+        return False
+
+def test_doctor_schedules():
+    """Test weekly schedule templates, exceptions and availability bitmaps"""
+    try:
+        print("\nTesting doctor schedules...")
+        
+        from datetime import datetime
+        from src.database.db_manager import DatabaseManager
+        from src.database.availability import span_mask, run_starts, mask_windows, parse_time_ranges
+        from src.database.scheduling import DoctorUnavailableError
+        
+        # Bitmap helpers
+        mask = span_mask(540, 600) | span_mask(660, 690)
+        if mask_windows(mask) != [(540, 600), (660, 690)]:
+            print("❌ Bitmap windows wrong")
+            return False
+        if mask_windows(run_starts(mask, 6)) != [(540, 575), (660, 665)]:
+            print("❌ Free run search wrong")
+            return False
+        if span_mask(547, 552) != span_mask(545, 555) or span_mask(547, 552, inward=True) != 0:
+            print("❌ Bitmap rounding wrong")
+            return False
+        try:
+            parse_time_ranges("12:00-09:00")
+            print("❌ Backwards range accepted")
+            return False
+        except ValueError:
+            pass
+        print("✓ Bitmap helpers work")
+        
+        db = DatabaseManager("test_schedules.db")
+        db.create_tables()
+        db.execute_insert_many(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+            [("EMP-W1", "Week", "Template", "General"), ("EMP-W2", "No", "Template", "General")]
+        )
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("W-1", "Week", "Patient", "1980-01-01", "Female")
+        )
+        
+        # Doctor 1 works Monday with a lunch break and Wednesday mornings only
+        monday = [(0, start, end) for start, end in parse_time_ranges("09:00-12:00, 13:00-17:00")]
+        db.set_doctor_schedule(1, monday + [(2, "08:00", "12:00")])
+        availability = db.get_doctor_availability(1, "2030-01-07", "2030-01-10")
+        expected = {
+            "2030-01-07": [("09:00:00", "12:00:00"), ("13:00:00", "17:00:00")],
+            "2030-01-08": [],
+            "2030-01-09": [("08:00:00", "12:00:00")],
+        }
+        if availability != expected:
+            print(f"❌ Weekly template expanded wrong: {availability}")
+            return False
+        if db.get_doctor_availability(2, "2030-01-08", "2030-01-09") != {"2030-01-08": [("08:00:00", "18:00:00")]}:
+            print("❌ Default working hours not used without a template")
+            return False
+        print("✓ Weekly templates expanded into availability")
+        
+        # Leave on a Monday, on-call on a Tuesday
+        db.add_schedule_exception(1, "2030-01-14", "leave", reason="Conference")
+        db.add_schedule_exception(1, "2030-01-15", "on_call", "10:00", "12:00")
+        availability = db.get_doctor_availability(1, "2030-01-14", "2030-01-16")
+        if availability != {"2030-01-14": [], "2030-01-15": [("10:00:00", "12:00:00")]}:
+            print(f"❌ Exceptions applied wrong: {availability}")
+            return False
+        if len(db.get_schedule_exceptions(1, "2030-01-01")) != 2:
+            print("❌ Exceptions not listed")
+            return False
+        print("✓ Leave and on-call exceptions applied")
+        
+        # Slot search and booking follow the schedule
+        long_ago = datetime(2000, 1, 1)
+        slots = db.find_free_slots("2030-01-07", "2030-01-08", 60, doctor_id=1, limit=5, not_before=long_ago)
+        if [slot['start_time'][:5] for slot in slots] != ["09:00", "10:00", "11:00", "13:00", "14:00"]:
+            print(f"❌ Slots ignore the schedule: {slots}")
+            return False
+        for day, time in [("2030-01-07", "11:30"), ("2030-01-08", "09:00"), ("2030-01-14", "09:00")]:
+            try:
+                db.book_appointment(patient_id, 1, day, time, 60)
+                print(f"❌ Booked outside working time on {day} {time}")
+                return False
+            except DoctorUnavailableError:
+                pass
+        db.book_appointment(patient_id, 1, "2030-01-15", "10:00", 60)
+        print("✓ Slot search and booking follow the schedule")
+        
+        # Clearing the template falls back to the default hours
+        db.set_doctor_schedule(1, [])
+        if db.get_doctor_availability(1, "2030-01-08", "2030-01-09")["2030-01-08"] != [("08:00:00", "18:00:00")]:
+            print("❌ Clearing the template did not restore default hours")
+            return False
+        print("✓ Template can be cleared")
+        
+        # Clean up
+        db.close()
+        os.remove("test_schedules.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Doctor schedule tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Doctor schedule test error: {e}")
+        return False
+
+def test_recurring_booking():
+    """Test bulk booking and recurring appointment series"""
+    try:
+        print("\nTesting recurring booking...")
+        
+        from src.database.db_manager import DatabaseManager
+        from src.database.scheduling import recurring_dates
+        
+        db = DatabaseManager("test_recurring.db")
+        db.create_tables()
+        doctor_id = db.execute_insert(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+            ("EMP-R1", "Series", "Doctor", "General")
+        )
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("R-1", "Series", "Patient", "1975-01-01", "Male")
+        )
+        
+        # Every Tuesday 10:00 for 12 weeks (2030-01-01 is a Tuesday)
+        dates = recurring_dates("2030-01-01", 12)
+        if len(dates) != 12 or any(day.weekday() != 1 for day in dates):
+            print("❌ Recurring dates wrong")
+            return False
+        series_id, outcomes = db.book_recurring(patient_id, doctor_id, "2030-01-01", "10:00", 12)
+        if series_id is None or [outcome['status'] for outcome in outcomes] != ['booked'] * 12:
+            print("❌ Weekly series not booked")
+            return False
+        appointments = db.get_series_appointments(series_id)
+        if [row['appointment_id'] for row in appointments] != [outcome['appointment_id'] for outcome in outcomes]:
+            print("❌ Reported appointment ids do not match the series")
+            return False
+        print("✓ Weekly series booked with ids reported per occurrence")
+        
+        # A clash on one date blocks the whole series unless skipped
+        db.book_appointment(patient_id, doctor_id, "2030-04-01", "14:15", 30)
+        db.add_schedule_exception(doctor_id, "2030-04-08", "leave")
+        series_id, outcomes = db.book_recurring(
+            patient_id, doctor_id, "2030-03-25", "14:00", 4, duration_minutes=30
+        )
+        statuses = [outcome['status'] for outcome in outcomes]
+        if series_id is not None or statuses != ['skipped', 'conflict', 'unavailable', 'skipped']:
+            print(f"❌ All-or-nothing series wrong: {statuses}")
+            return False
+        if outcomes[1]['conflict_id'] is None:
+            print("❌ Conflicting appointment not reported")
+            return False
+        if db.execute_query("SELECT COUNT(*) as count FROM appointments WHERE appointment_date >= '2030-03-25'")[0]['count'] != 1:
+            print("❌ Failed series left appointments behind")
+            return False
+        series_id, outcomes = db.book_recurring(
+            patient_id, doctor_id, "2030-03-25", "14:00", 4, skip_conflicts=True
+        )
+        if series_id is None or [bool(outcome['appointment_id']) for outcome in outcomes] != [True, False, False, True]:
+            print("❌ Skipping conflicts booked the wrong dates")
+            return False
+        print("✓ Conflicts and leave reported per occurrence")
+        
+        # Bulk requests are also checked against each other
+        outcomes = db.book_appointments([
+            (patient_id, doctor_id, "2030-06-03", "09:00", 60),
+            (patient_id, doctor_id, "2030-06-03", "09:30"),
+            (patient_id, doctor_id, "2030-06-03", "25:00"),
+            (patient_id, doctor_id, "2030-06-04", "09:00")
+        ], skip_conflicts=True)
+        statuses = [outcome['status'] for outcome in outcomes]
+        if statuses != ['booked', 'conflict', 'invalid', 'booked']:
+            print(f"❌ Bulk booking outcomes wrong: {statuses}")
+            return False
+        if db.find_appointment_conflict(doctor_id, "2030-06-03", "09:45") != outcomes[0]['appointment_id']:
+            print("❌ Bulk booked appointment not found by the conflict check")
+            return False
+        print("✓ Bulk booking checks requests against each other")
+        
+        # Cancelling a series frees its remaining dates
+        cancelled = db.cancel_appointment_series(series_id, "2030-04-01")
+        if cancelled != 1 or db.find_appointment_conflict(doctor_id, "2030-04-15", "14:00") is not None:
+            print("❌ Series cancel wrong")
+            return False
+        print("✓ Series cancel frees the remaining dates")
+        
+        # Clean up
+        db.close()
+        os.remove("test_recurring.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Recurring booking tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Recurring booking test error: {e}")
+        return False
+
+def test_calendar_view():
+    """Test the week and month calendar data"""
+    try:
+        print("\nTesting calendar view data...")
+        
+        from datetime import date
+        from src.database.db_manager import DatabaseManager
+        from src.gui.calendar_view import CalendarData, calendar_range, shift_anchor, VIEW_WEEK, VIEW_MONTH
+        
+        # Weeks start on Monday; months cover every day
+        if calendar_range(date(2030, 1, 3), VIEW_WEEK) != (date(2029, 12, 31), date(2030, 1, 7)):
+            print("❌ Week range wrong")
+            return False
+        if calendar_range(date(2030, 2, 14), VIEW_MONTH) != (date(2030, 2, 1), date(2030, 3, 1)):
+            print("❌ Month range wrong")
+            return False
+        if shift_anchor(date(2030, 1, 31), VIEW_MONTH, 1) != date(2030, 2, 28):
+            print("❌ Month step wrong")
+            return False
+        print("✓ Calendar ranges work")
+        
+        db = DatabaseManager("test_calendar.db")
+        db.create_tables()
+        db.execute_insert_many(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+            [("EMP-C1", "Alpha", "One", "General"), ("EMP-C2", "Beta", "Two", "General")]
+        )
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("C-1", "Calendar", "Patient", "1985-01-01", "Female")
+        )
+        db.execute_insert_many(
+            "INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, duration_minutes, status) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (patient_id, 1, "2029-12-31", "09:00:00", 30, "scheduled"),
+                (patient_id, 1, "2029-12-31", "10:00:00", 60, "completed"),
+                (patient_id, 2, "2030-01-06", "11:00:00", 30, "cancelled"),
+                (patient_id, 2, "2030-01-07", "09:00:00", 30, "scheduled")
+            ]
+        )
+        
+        start_date, end_date = calendar_range(date(2030, 1, 3), VIEW_WEEK)
+        rows = db.get_appointments_between(start_date, end_date)
+        if len(rows) != 3:
+            print(f"❌ Range query returned {len(rows)} appointments, expected 3")
+            return False
+        data = CalendarData(start_date, end_date, db.execute_named('doctor_names'), rows)
+        if [(start, end) for start, end, status, appointment_id in data.cell(0, 0)] != [(540, 570), (600, 660)]:
+            print("❌ Week cell wrong")
+            return False
+        if data.count(1, 6) != 0 or len(data.cell(1, 6)) != 1 or data.booked_minutes.get((0, 0)) != 90:
+            print("❌ Cancelled appointments should be drawn but not counted")
+            return False
+        print("✓ Week grouped by doctor and day")
+        
+        plan = [result for result in db.verify_indexes() if result['name'] == 'appointments_between']
+        if not plan or not plan[0]['uses_index']:
+            print("❌ Calendar range query does not use an index")
+            return False
+        print("✓ Calendar range query uses an index")
+        
+        # Clean up
+        db.close()
+        os.remove("test_calendar.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Calendar view tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Calendar view test error: {e}")
+        return False
+
+def test_date_ranges():
+    """Test half-open date ranges and the queries built on them"""
+    try:
+        print("\nTesting date ranges...")
+        
+        from datetime import date
+        from src.database.db_manager import DatabaseManager
+        from src.database.queries import QUERIES
+        from src.database.date_ranges import DateRange, day_range, last_days, month_range, age_band
+        
+        if month_range(date(2028, 2, 10)) != DateRange(date(2028, 2, 1), date(2028, 3, 1)):
+            print("❌ Month range wrong")
+            return False
+        if last_days(7, date(2030, 1, 8)).params() != ("2030-01-01", "2030-01-09"):
+            print("❌ Last days range wrong")
+            return False
+        if date(2012, 3, 2) not in age_band(0, 18, date(2030, 3, 1)) or date(2012, 3, 1) in age_band(0, 18, date(2030, 3, 1)):
+            print("❌ Age band boundaries wrong")
+            return False
+        print("✓ Date ranges work")
+        
+        # No registered query may wrap a column in a date function
+        wrapped = [name for name in QUERIES.names() if "DATE(" in QUERIES.get(name).upper() or "STRFTIME(" in QUERIES.get(name).upper()]
+        if wrapped:
+            print(f"❌ Queries still using date functions: {', '.join(wrapped)}")
+            return False
+        print("✓ No query wraps a date column in a function")
+        
+        db = DatabaseManager("test_date_ranges.db")
+        db.create_tables()
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("D-1", "Range", "Patient", "2012-03-01", "Male")
+        )
+        db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("D-2", "Senior", "Patient", "1960-01-01", "Female")
+        )
+        db.execute_insert_many(
+            "INSERT INTO billing (patient_id, total_cents, paid_cents, payment_status, bill_date) VALUES (?, ?, ?, ?, ?)",
+            [
+                (patient_id, 10000, 10000, "paid", "2030-01-31 23:59:59"),
+                (patient_id, 5000, 5000, "paid", "2030-02-01 00:00:00"),
+                (patient_id, 2000, 2000, "paid", "2030-01-01")
+            ]
+        )
+        
+        revenue = lambda date_range: db.execute_named('billing_revenue_between', date_range.params())[0]['revenue_cents']
+        if revenue(day_range(date(2030, 1, 31))) != 10000 or revenue(month_range(date(2030, 1, 5))) != 12000:
+            print("❌ Revenue by date range wrong")
+            return False
+        print("✓ Half-open ranges include the whole day and nothing after it")
+        
+        day = date(2030, 3, 1)
+        groups = db.execute_named(
+            'patient_age_groups',
+            age_band(0, 18, day).params() + age_band(18, 65, day).params() + age_band(65, None, day).params()
+        )[0]
+        if (groups['children'], groups['adults'], groups['seniors']) != (0, 1, 1):
+            print("❌ Age groups wrong")
+            return False
+        print("✓ Age groups use birth date ranges")
+        
+        # Clean up
+        db.close()
+        os.remove("test_date_ranges.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Date range tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Date range test error: {e}")
+        return False
+
+def test_rollups():
+    """Test trigger-maintained revenue and appointment rollups"""
+    try:
+        print("\nTesting rollup tables...")
+        
+        from datetime import date
+        from src.database.db_manager import DatabaseManager
+        from src.database.date_ranges import day_range, month_range
+        from src.utils.money import Money
+        
+        db = DatabaseManager("test_rollups.db")
+        db.create_tables()
+        db.execute_insert_many(
+            "INSERT INTO doctors (employee_id, first_name, last_name, specialization) VALUES (?, ?, ?, ?)",
+            [("EMP-U1", "Roll", "One", "General"), ("EMP-U2", "Roll", "Two", "General")]
+        )
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("U-1", "Rollup", "Patient", "1970-01-01", "Male")
+        )
+        
+        # Bills that exist before the rollups are seeded from the table
+        for trigger in ("insert", "delete", "update"):
+            db.execute_update(f"DROP TRIGGER trg_rollup_billing_status_{trigger}", ())
+        db.execute_update("DROP TABLE rollup_billing_status", ())
+        db.execute_insert(
+            "INSERT INTO billing (patient_id, total_cents, paid_cents, payment_status, bill_date) VALUES (?, ?, ?, ?, ?)",
+            (patient_id, 20000, 0, "pending", "2030-01-10 09:00:00")
+        )
+        db.create_tables()
+        if 'rollup_billing_status' not in db.rollup_changes['created']:
+            print("❌ Missing rollup not recreated")
+            return False
+        if db.execute_named('billing_outstanding_total')[0]['outstanding_cents'] != 20000:
+            print("❌ Rollup not seeded from existing rows")
+            return False
+        print("✓ Rollups seeded from existing rows")
+        
+        bill_id = db.execute_insert(
+            "INSERT INTO billing (patient_id, total_cents, paid_cents, payment_status, bill_date) VALUES (?, ?, ?, ?, ?)",
+            (patient_id, 15000, 0, "pending", "2030-01-11 16:30:00")
+        )
+        db.record_payment(bill_id, Money(15000), 'cash')
+        db.execute_insert_many(
+            "INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, duration_minutes, status) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (patient_id, 1, "2030-01-10", "09:00:00", 30, "scheduled"),
+                (patient_id, 1, "2030-01-10", "10:00:00", 45, "scheduled"),
+                (patient_id, 2, "2030-01-10", "09:00:00", 30, "scheduled")
+            ]
+        )
+        db.execute_named_update('appointment_set_status', ('cancelled', 3))
+        
+        revenue = db.execute_named('billing_revenue_between', month_range(date(2030, 1, 1)).params())[0]['revenue_cents']
+        today = db.execute_named('billing_revenue_between', day_range(date(2030, 1, 10)).params())[0]['revenue_cents']
+        pending = db.execute_named('billing_pending_count')[0]['pending_count']
+        if (revenue, today, pending) != (15000, 0, 1):
+            print(f"❌ Revenue rollups wrong: {(revenue, today, pending)}")
+            return False
+        statuses = {row['status']: row['count'] for row in db.execute_named('appointment_status_counts')}
+        if statuses != {'scheduled': 2, 'cancelled': 1}:
+            print(f"❌ Appointment status rollup wrong: {statuses}")
+            return False
+        load = sorted(db.get_doctor_daily_load("2030-01-10", "2030-01-11"))
+        if load != [(1, "2030-01-10", 2, 75)]:
+            print(f"❌ Doctor daily load wrong: {load}")
+            return False
+        print("✓ Triggers keep revenue, status and doctor load current")
+        
+        # The rollups must agree with aggregating the source tables
+        raw = db.execute_query(
+            "SELECT payment_status, COUNT(*), SUM(total_cents), SUM(paid_cents) FROM billing GROUP BY payment_status ORDER BY payment_status"
+        )
+        summary = sorted(db.execute_named('billing_status_summary'), key=lambda row: row['payment_status'])
+        if [tuple(row) for row in raw] != [tuple(row) for row in summary]:
+            print("❌ Billing status rollup differs from the billing table")
+            return False
+        before = db.execute_query("SELECT * FROM rollup_revenue_daily ORDER BY day")
+        db.rebuild_rollups()
+        after = db.execute_query("SELECT * FROM rollup_revenue_daily ORDER BY day")
+        if [tuple(row) for row in before] != [tuple(row) for row in after]:
+            print("❌ Rebuilt rollups differ from incremental rollups")
+            return False
+        print("✓ Rebuilt rollups match")
+        
+        # Clean up
+        db.close()
+        os.remove("test_rollups.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Rollup tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Rollup test error: {e}")
+        return False
+
+def test_payment_ledger():
+    """Test the append-only payments ledger and atomic bill balances"""
+    try:
+        print("\nTesting payment ledger...")
+        
+        import sqlite3
+        import threading
+        from src.database.db_manager import DatabaseManager
+        from src.database.payments import PaymentError
+        from src.utils.money import Money
+        
+        db = DatabaseManager("test_payments.db")
+        db.create_tables()
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("L-1", "Ledger", "Patient", "1970-01-01", "Female")
+        )
+        insert_bill = lambda total, paid: db.execute_insert(
+            "INSERT INTO billing (patient_id, total_cents, paid_cents, payment_status, payment_method, bill_date) VALUES (?, ?, ?, ?, ?, ?)",
+            (patient_id, total, paid, 'pending', 'Cash', "2030-02-01 10:00:00")
+        )
+        bill = lambda bill_id: db.execute_query(
+            "SELECT paid_cents, payment_status FROM billing WHERE bill_id = ?", (bill_id,)
+        )[0]
+        
+        # A paid amount given at creation becomes the first ledger entry
+        bill_id = insert_bill(10000, 5000)
+        payments = db.get_bill_payments(bill_id)
+        if len(payments) != 1 or payments[0]['amount_cents'] != 5000 or tuple(bill(bill_id)) != (5000, 'partial'):
+            print("❌ Opening payment not recorded in the ledger")
+            return False
+        print("✓ Opening payment recorded")
+        
+        db.record_payment(bill_id, Money.parse('30'), 'Credit Card')
+        if tuple(bill(bill_id)) != (8000, 'partial'):
+            print(f"❌ Partial payment wrong: {tuple(bill(bill_id))}")
+            return False
+        try:
+            db.record_payment(bill_id, Money.parse('20.01'), 'Cash')
+            print("❌ Overpayment accepted")
+            return False
+        except PaymentError:
+            pass
+        db.record_payment(bill_id, Money.parse('20'), 'Cash')
+        if tuple(bill(bill_id)) != (10000, 'paid') or len(db.get_bill_payments(bill_id)) != 3:
+            print(f"❌ Final payment wrong: {tuple(bill(bill_id))}")
+            return False
+        print("✓ Payments update the bill's paid amount and status")
+        
+        for statement in ("UPDATE payments SET amount_cents = 1", "DELETE FROM payments"):
+            try:
+                db.execute_update(statement, ())
+                print(f"❌ Ledger allowed: {statement}")
+                return False
+            except sqlite3.IntegrityError:
+                pass
+        try:
+            db.record_payment(999999, Money(1000), 'Cash')
+            print("❌ Payment for a missing bill accepted")
+            return False
+        except PaymentError:
+            pass
+        print("✓ Ledger is append-only and rejects bad payments")
+        
+        # Two cashiers on separate connections paying the same bill at once
+        bill_id = insert_bill(10000, 0)
+        other = DatabaseManager("test_payments.db")
+        results = []
+        def pay(manager):
+            try:
+                results.append(manager.record_payment(bill_id, Money(6000), 'Cash'))
+            except PaymentError:
+                results.append(None)
+        threads = [threading.Thread(target=pay, args=(manager,)) for manager in (db, other)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        other.close()
+        if sorted(result is None for result in results) != [False, True] or bill(bill_id)['paid_cents'] != 6000:
+            print(f"❌ Concurrent payments not serialized: {results}, {tuple(bill(bill_id))}")
+            return False
+        print("✓ Concurrent payments cannot overpay a bill")
+        
+        # Bills paid before the ledger existed get an opening entry once
+        for row in db.execute_query("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'trg_payment_%'"):
+            db.execute_update(f"DROP TRIGGER {row['name']}", ())
+        legacy_id = insert_bill(7000, 4000)
+        db.create_tables()
+        backfilled = db.ledger_backfilled
+        db.create_tables()
+        if (backfilled, db.ledger_backfilled) != (1, 0) or [p['amount_cents'] for p in db.get_bill_payments(legacy_id)] != [4000]:
+            print("❌ Existing paid amounts not backfilled into the ledger")
+            return False
+        mismatched = db.execute_query('''
+            SELECT b.bill_id FROM billing b
+            LEFT JOIN (SELECT bill_id, SUM(amount_cents) as total FROM payments GROUP BY bill_id) l ON l.bill_id = b.bill_id
+            WHERE b.paid_cents != COALESCE(l.total, 0)
+        ''')
+        if mismatched or db.execute_named('billing_revenue_total')[0]['revenue_cents'] != 20000:
+            print("❌ Paid amounts or revenue differ from the ledger")
+            return False
+        print("✓ Existing paid amounts backfilled into the ledger")
+        
+        # Clean up
+        db.close()
+        os.remove("test_payments.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Payment ledger tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Payment ledger test error: {e}")
+        return False
+
+def test_money():
+    """Test integer-cents money and the migration of REAL amounts"""
+    try:
+        print("\nTesting money amounts...")
+        
+        import sqlite3
+        from src.database.db_manager import DatabaseManager
+        from src.utils.money import Money
+        
+        if [Money.parse(text).cents for text in ("120", "99.5", "$1,234.56", " 0.07 ")] != [12000, 9950, 123456, 7]:
+            print("❌ Amounts parsed wrong")
+            return False
+        for text in ("", "abc", "1.234", "NaN"):
+            try:
+                Money.parse(text)
+                print(f"❌ Invalid amount accepted: {text!r}")
+                return False
+            except ValueError:
+                pass
+        if str(Money(123456)) != "$1,234.56" or str(Money(-5)) != "-$0.05" or Money(9950).amount() != "99.50":
+            print("❌ Amounts formatted wrong")
+            return False
+        total = Money(0)
+        for _ in range(10):
+            total = total + Money.parse("0.10")
+        if total != Money.parse("1.00") or Money(300) - Money(100) <= Money(100):
+            print("❌ Money arithmetic wrong")
+            return False
+        print("✓ Money parses, formats and adds exactly")
+        
+        # A database from before the cents columns, with REAL amounts
+        conn = sqlite3.connect("test_money.db")
+        conn.executescript('''
+            CREATE TABLE billing (
+                bill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                patient_id INTEGER NOT NULL,
+                appointment_id INTEGER,
+                total_amount DECIMAL(10,2) NOT NULL,
+                paid_amount DECIMAL(10,2) DEFAULT 0,
+                payment_status TEXT DEFAULT 'pending',
+                payment_method TEXT,
+                bill_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                due_date DATE,
+                notes TEXT
+            );
+            INSERT INTO billing (patient_id, total_amount, paid_amount, payment_status, bill_date)
+            VALUES (1, 100.1, 0.3, 'partial', '2030-03-01'), (1, 19.99, 19.99, 'paid', '2030-03-02');
+        ''')
+        conn.commit()
+        conn.close()
+        
+        db = DatabaseManager("test_money.db")
+        db.create_tables()
+        columns = [row['name'] for row in db.execute_query("PRAGMA table_info(billing)")]
+        rows = [tuple(row) for row in db.execute_query("SELECT total_cents, paid_cents FROM billing ORDER BY bill_id")]
+        if 'total_amount' in columns or rows != [(10010, 30), (1999, 1999)] or db.money_migrated != ['billing']:
+            print(f"❌ Billing not migrated to cents: {columns}, {rows}")
+            return False
+        revenue = db.execute_named('billing_revenue_total')[0]['revenue_cents']
+        ledger = db.execute_query("SELECT SUM(amount_cents) as total FROM payments")[0]['total']
+        if (revenue, ledger) != (2029, 2029):
+            print(f"❌ Migrated totals wrong: {(revenue, ledger)}")
+            return False
+        db.record_payment(1, Money.parse("99.80"), 'Cash')
+        db.create_tables()
+        if db.money_migrated or db.execute_named('billing_outstanding_total')[0]['outstanding_cents'] != 0:
+            print("❌ Migrated bill did not balance to the cent")
+            return False
+        print("✓ REAL amounts migrated to cents")
+        
+        # Clean up
+        db.close()
+        os.remove("test_money.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Money tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Money test error: {e}")
+        return False
+
+def test_bill_pages():
+    """Test server-side filters and keyset pages of the bill list"""
+    try:
+        print("\nTesting bill list pages...")
+        
+        from datetime import date
+        from src.database.db_manager import DatabaseManager, FIRST_BILL_KEY
+        from src.database.date_ranges import DateRange
+        
+        db = DatabaseManager("test_bill_pages.db")
+        db.create_tables()
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("P-1", "Page", "Patient", "1970-01-01", "Male")
+        )
+        # Several bills share a bill_date, so pages must break ties by bill_id
+        rows = []
+        for i in range(25):
+            status = ('pending', 'partial', 'paid')[i % 3]
+            due_date = "2000-01-01" if i % 5 == 0 else "2999-01-01"
+            rows.append((patient_id, 1000 + i, {'pending': 0, 'partial': 500, 'paid': 1000 + i}[status],
+                         status, f"2030-01-{1 + i // 3:02d} 09:00:00", due_date))
+        db.execute_insert_many(
+            "INSERT INTO billing (patient_id, total_cents, paid_cents, payment_status, bill_date, due_date) VALUES (?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        
+        def read_all(status='all', date_range=None):
+            bills, key = [], FIRST_BILL_KEY
+            while True:
+                page = db.get_bills_page(key, 4, status, date_range)
+                bills.extend(page)
+                if len(page) < 4:
+                    return bills
+                key = (page[-1]['bill_date'], page[-1]['bill_id'])
+                
+        bills = read_all()
+        keys = [(bill['bill_date'], bill['bill_id']) for bill in bills]
+        if len(bills) != 25 or keys != sorted(keys, reverse=True) or len(set(keys)) != 25:
+            print("❌ Keyset pages skipped, repeated or misordered bills")
+            return False
+        print("✓ Keyset pages cover every bill once, newest first")
+        
+        if any(bill['balance_cents'] != bill['total_cents'] - bill['paid_cents'] for bill in bills):
+            print("❌ Balance wrong")
+            return False
+        overdue = {bill['bill_id'] for bill in bills if bill['overdue']}
+        expected = {i + 1 for i in range(25) if i % 5 == 0 and i % 3 != 2}
+        if overdue != expected or {bill['bill_id'] for bill in read_all('Overdue')} != expected:
+            print(f"❌ Overdue bills wrong: {sorted(overdue)}")
+            return False
+        pending = read_all('Pending')
+        if len(pending) != 9 or any(bill['payment_status'] != 'pending' for bill in pending):
+            print("❌ Status filter wrong")
+            return False
+        january_2_3 = read_all('all', DateRange(date(2030, 1, 2), date(2030, 1, 4)))
+        if sorted(bill['bill_id'] for bill in january_2_3) != list(range(4, 10)):
+            print("❌ Date range filter wrong")
+            return False
+        print("✓ Status, overdue and date filters run in SQL")
+        
+        # Clean up
+        db.close()
+        os.remove("test_bill_pages.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Bill list tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Bill list test error: {e}")
+        return False
+
+def test_aging():
+    """Test the receivables aging batch job"""
+    try:
+        print("\nTesting receivables aging...")
+        
+        from datetime import date
+        from src.database.db_manager import DatabaseManager
+        from src.utils.money import Money
+        
+        db = DatabaseManager("test_aging.db")
+        db.create_tables()
+        patient_id = db.execute_insert(
+            "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+            ("A-1", "Aging", "Patient", "1970-01-01", "Female")
+        )
+        due_dates = ["2030-06-30", "2030-06-01", "2030-05-01", "2030-04-01", "2029-01-01", "2030-07-15", None]
+        bill_ids = [
+            db.execute_insert(
+                "INSERT INTO billing (patient_id, total_cents, payment_status, bill_date, due_date) VALUES (?, ?, ?, ?, ?)",
+                (patient_id, 1000 * (i + 1), 'pending', "2029-01-01", due_date)
+            ) for i, due_date in enumerate(due_dates)
+        ]
+        paid_id = db.execute_insert(
+            "INSERT INTO billing (patient_id, total_cents, paid_cents, payment_status, bill_date, due_date) VALUES (?, ?, ?, ?, ?, ?)",
+            (patient_id, 500, 500, 'paid', "2029-01-01", "2029-01-01")
+        )
+        db.record_payment(bill_ids[2], Money(1000), 'Cash')
+        
+        summary = db.run_aging(date(2030, 6, 30))
+        buckets = {bucket: (bills, cents) for bucket, bills, cents in summary['buckets']}
+        expected = {'0-30': (2, 3000), '31-60': (1, 2000), '61-90': (1, 4000), '90+': (1, 5000)}
+        if buckets != expected or (summary['current_bills'], summary['current_cents']) != (2, 13000):
+            print(f"❌ Aging buckets wrong: {buckets}, current {summary['current_cents']}")
+            return False
+        print("✓ Unpaid balances bucketed by days past due")
+        
+        statuses = {
+            row['bill_id']: row['payment_status']
+            for row in db.execute_query("SELECT bill_id, payment_status FROM billing")
+        }
+        overdue = {bill_id for bill_id, status in statuses.items() if status == 'overdue'}
+        if overdue != set(bill_ids[1:5]) or summary['marked_overdue'] != 4 or statuses[paid_id] != 'paid':
+            print(f"❌ Overdue statuses wrong: {statuses}")
+            return False
+        dunning = db.get_dunning_list()
+        if [bill['bill_id'] for bill in dunning] != [bill_ids[4], bill_ids[3], bill_ids[2], bill_ids[1]]:
+            print("❌ Dunning list not ordered by days past due")
+            return False
+        print("✓ Past-due bills marked overdue in bulk")
+        
+        # A part payment keeps a bill overdue; paying it off clears it
+        db.record_payment(bill_ids[3], Money(1000), 'Cash')
+        db.record_payment(bill_ids[4], Money(5000), 'Cash')
+        statuses = dict(db.execute_query("SELECT bill_id, payment_status FROM billing WHERE bill_id IN (?, ?)", (bill_ids[3], bill_ids[4])))
+        if statuses != {bill_ids[3]: 'overdue', bill_ids[4]: 'paid'}:
+            print(f"❌ Payments on overdue bills wrong: {statuses}")
+            return False
+            
+        # Re-aging as of an earlier day clears bills no longer past due
+        summary = db.run_aging(date(2030, 4, 15))
+        statuses = dict(db.execute_query("SELECT bill_id, payment_status FROM billing"))
+        if statuses[bill_ids[1]] != 'pending' or statuses[bill_ids[2]] != 'partial' or statuses[bill_ids[3]] != 'overdue':
+            print(f"❌ Re-aging did not clear overdue bills: {statuses}")
+            return False
+        if summary['cleared_overdue'] != 2 or db.get_aging_summary(refresh=False)['run_id'] != summary['run_id']:
+            print("❌ Latest aging run not stored")
+            return False
+        print("✓ Payments and re-aging update overdue statuses")
+        
+        # Clean up
+        db.close()
+        os.remove("test_aging.db")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Aging tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Aging test error: {e}")
+        return False
+
+def test_online_backup():
+    """Test online backups through the SQLite backup API"""
+    try:
+        print("\nTesting online backups...")
+        
+        import sqlite3
+        import threading
+        from src.database.db_manager import DatabaseManager
+        from src.database.backup import extract_backup
+        
+        db = DatabaseManager("test_backup.db")
+        db.create_tables()
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, address) VALUES (?, ?, ?, ?, ?, ?)",
+                [(f"B-{i}", "Backup", f"Patient{i}", "1980-01-01", "Male", "x" * 200) for i in range(3000)]
+            )
+            
+        # Keep writing from another connection while the backup copies pages
+        stop = threading.Event()
+        written = []
+        
+        def write_patients():
+            writer = sqlite3.connect("test_backup.db", timeout=10)
+            i = 0
+            while not stop.is_set():
+                writer.execute(
+                    "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender) VALUES (?, ?, ?, ?, ?)",
+                    (f"W-{i}", "Writer", "Patient", "1980-01-01", "Female")
+                )
+                writer.commit()
+                written.append(i)
+                i += 1
+            writer.close()
+            
+        thread = threading.Thread(target=write_patients)
+        thread.start()
+        try:
+            report = db.backup("test_backups/live.db", pages_per_step=8, step_sleep=0.001)
+        finally:
+            stop.set()
+            thread.join()
+            
+        copy = sqlite3.connect(report.destination)
+        check = copy.execute("PRAGMA quick_check").fetchone()[0]
+        copied = copy.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+        journal = copy.execute("PRAGMA journal_mode").fetchone()[0]
+        copy.close()
+        if check != 'ok' or not 3000 <= copied <= 3000 + len(written) or journal != 'delete':
+            print(f"❌ Backup taken during writes not consistent: {check}, {copied} patients, {journal}")
+            return False
+        print(f"✓ Backup consistent while {len(written)} rows were written ({report.restarts} restarts)")
+        
+        # Without other writers the pages are copied a step at a time
+        report = db.backup("test_backups/quiet.db", pages_per_step=8, step_sleep=0)
+        if report.restarts or report.steps != -(-report.pages // 8) or report.max_step <= 0 or not report.lines():
+            print(f"❌ Backup report wrong: {report.steps} steps, {report.pages} pages")
+            return False
+        print(f"✓ {report.pages} pages copied in {report.steps} steps")
+        
+        # Compressed backups extract to the same database
+        report = db.backup("test_backups/packed.db", compress=True)
+        if not report.destination.endswith(".db.gz") or report.size >= report.database_bytes:
+            print(f"❌ Compressed backup wrong: {report.destination}, {report.size} bytes")
+            return False
+        extract_backup(report.destination, "test_backups/restored.db")
+        restored = sqlite3.connect("test_backups/restored.db")
+        count = restored.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+        restored.close()
+        if count != db.execute_query("SELECT COUNT(*) FROM patients")[0][0]:
+            print(f"❌ Extracted backup has {count} patients")
+            return False
+        if any(name.endswith(".partial") for name in os.listdir("test_backups")):
+            print("❌ Partial backup file left behind")
+            return False
+        print("✓ Compressed backup extracts to the same database")
+        
+        # Clean up
+        db.close()
+        os.remove("test_backup.db")
+        import shutil
+        shutil.rmtree("test_backups")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Online backup tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Online backup test error: {e}")
+        return False
+
+def test_backup_store():
+    """Test the deduplicated backup store"""
+    try:
+        print("\nTesting backup store...")
+        
+        import shutil
+        import sqlite3
+        from src.database.db_manager import DatabaseManager
+        from src.database.backup_store import BackupStore, BackupStoreError
+        
+        db = DatabaseManager("test_store.db")
+        db.create_tables()
+        with db.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, address) VALUES (?, ?, ?, ?, ?, ?)",
+                [(f"S-{i}", "Store", f"Patient{i}", "1980-01-01", "Male", f"{i:0>300}") for i in range(3000)]
+            )
+        store = BackupStore("test_store")
+        first = store.snapshot(db.db_path)
+        if first.new_chunks != first.chunks:
+            print(f"❌ First snapshot stored {first.new_chunks} of {first.chunks} chunks")
+            return False
+            
+        # A small change only adds the chunks holding the changed pages
+        db.execute_update("UPDATE patients SET phone = '555-0100' WHERE national_id = ?", ('S-10',))
+        second = store.snapshot(db.db_path)
+        if not 0 < second.new_chunks < second.chunks / 4:
+            print(f"❌ Second snapshot stored {second.new_chunks} of {second.chunks} chunks")
+            return False
+        stats = store.stats()
+        if stats['snapshots'] != 2 or stats['chunks'] != first.chunks + second.new_chunks:
+            print(f"❌ Chunks not deduplicated: {stats}")
+            return False
+        print(f"✓ Second snapshot stored {second.new_chunks} of {second.chunks} chunks")
+        
+        for report, phone in ((first, None), (second, '555-0100')):
+            store.restore(report.snapshot_id, "test_store_restored.db")
+            restored = sqlite3.connect("test_store_restored.db")
+            check = restored.execute("PRAGMA quick_check").fetchone()[0]
+            row = restored.execute("SELECT COUNT(*), MAX(phone) FROM patients").fetchone()
+            restored.close()
+            os.remove("test_store_restored.db")
+            if check != 'ok' or row != (3000, phone):
+                print(f"❌ Restored snapshot {report.snapshot_id} wrong: {check}, {row}")
+                return False
+        print("✓ Each snapshot restores to its own database")
+        
+        # A damaged chunk is caught and no restored file is left behind
+        damaged = store._chunk_path(second.manifest['chunks'][0])
+        with open(damaged, 'r+b') as chunk:
+            chunk.write(b"damaged")
+        try:
+            store.restore(second.snapshot_id, "test_store_restored.db")
+            print("❌ Damaged chunk not detected")
+            return False
+        except BackupStoreError:
+            pass
+        if os.path.exists("test_store_restored.db") or os.path.exists("test_store_restored.db.partial"):
+            print("❌ Failed restore left a file behind")
+            return False
+        print("✓ Damaged chunks are detected")
+        
+        store.delete_snapshot(first.snapshot_id)
+        freed, freed_bytes = store.collect_garbage()
+        if freed != second.new_chunks or store.stats()['chunks'] != second.chunks:
+            print(f"❌ Garbage collection freed {freed} chunks")
+            return False
+        print("✓ Chunks of deleted snapshots are collected")
+        
+        # Clean up
+        db.close()
+        os.remove("test_store.db")
+        shutil.rmtree("test_store")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Backup store tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Backup store test error: {e}")
+        return False
+
+def test_wal_archive():
+    """Test WAL archiving and point-in-time restore"""
+    try:
+        print("\nTesting WAL archive...")
+        
+        import shutil
+        import sqlite3
+        import threading
+        import time
+        from datetime import datetime
+        from src.database.db_manager import DatabaseManager
+        from src.database.wal_archive import restore_to, list_generations, list_gaps, WalArchiveError
+        
+        def add_patients(db, prefix, count):
+            with db.transaction() as conn:
+                conn.executemany(
+                    "INSERT INTO patients (national_id, first_name, last_name, date_of_birth, gender, address) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(f"{prefix}-{i}", "Wal", "Patient", "1980-01-01", "Female", "x" * 200) for i in range(count)]
+                )
+                
+        def restored_count(target):
+            restore_to("test_wal_archive", "test_wal_restored.db", target)
+            restored = sqlite3.connect("test_wal_restored.db")
+            count = restored.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+            restored.close()
+            os.remove("test_wal_restored.db")
+            return count
+            
+        db = DatabaseManager("test_wal.db", wal_archive="test_wal_archive", archive_interval=3600)
+        db.create_tables()
+        archiver = db.wal_archiver
+        archiver.checkpoint_frames = 50
+        
+        # Archive after each batch and remember the time in between
+        marks = []
+        for batch in range(4):
+            add_patients(db, f"B{batch}", 500)
+            archiver.archive()
+            time.sleep(0.01)
+            marks.append(datetime.now())
+            time.sleep(0.01)
+        counts = [restored_count(mark) for mark in marks]
+        if counts != [500, 1000, 1500, 2000] or len(list_generations("test_wal_archive")) != 1:
+            print(f"❌ Point-in-time restores wrong: {counts}")
+            return False
+        print("✓ Restores reach each archive run across checkpoints")
+        
+        # A WAL reset the archiver did not do starts a new generation
+        add_patients(db, "C", 100)
+        outside = sqlite3.connect("test_wal.db")
+        outside.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        outside.close()
+        archiver.archive()
+        add_patients(db, "D", 100)
+        archiver.archive()
+        if len(list_generations("test_wal_archive")) != 2 or restored_count(None) != 2200 or restored_count(marks[-1]) != 2000:
+            print("❌ Lost WAL frames not handled with a new generation")
+            return False
+        print("✓ WAL reset outside the archiver starts a new generation")
+        
+        # Archive continuously while several threads write
+        archiver.interval = 0.02
+        archiver.start()
+        threads = [threading.Thread(target=add_patients, args=(db, f"T{n}-{i}", 50)) for n in range(4) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        live = db.execute_query("SELECT COUNT(*) FROM patients")[0][0]
+        db.close()
+        if restored_count(None) != live:
+            print("❌ Latest restore does not match the database")
+            return False
+        print(f"✓ Latest restore matches the database after concurrent writes ({live} patients)")
+        
+        # A second archiver on the same directory stands by until the first stops
+        first = DatabaseManager("test_wal.db", wal_archive="test_wal_archive", archive_interval=3600)
+        second = DatabaseManager("test_wal.db", wal_archive="test_wal_archive", archive_interval=3600)
+        for _ in range(100):
+            if first.wal_archiver.active and second.wal_archiver.last_error:
+                break
+            time.sleep(0.05)
+        try:
+            second.wal_archiver.archive()
+            print("❌ Second archiver wrote to a locked archive")
+            return False
+        except WalArchiveError:
+            pass
+        if not first.wal_archiver.active or second.wal_archiver.active:
+            print("❌ Archive lock not held by exactly one archiver")
+            return False
+        first.close()
+        add_patients(second, "E", 100)
+        second.wal_archiver.archive()
+        if not second.wal_archiver.active or restored_count(None) != live + 100:
+            print("❌ Standby archiver did not take over")
+            return False
+        print("✓ Only one archiver writes; the standby takes over")
+        
+        # A WAL past the size limit is checkpointed anyway and the gap recorded
+        archiver = second.wal_archiver
+        archiver.max_wal_bytes = 1024
+        add_patients(second, "F", 100)
+        gap = archiver.checkpoint_if_oversized("archive failing")
+        if not gap or os.path.getsize("test_wal.db-wal") != 0 or list_gaps("test_wal_archive") != [gap]:
+            print(f"❌ Oversized WAL not checkpointed: {gap}")
+            return False
+        add_patients(second, "G", 100)
+        archiver.archive()
+        generations = list_generations("test_wal_archive")
+        if gap['generation'] != generations[-2]['generation'] or restored_count(None) != live + 300:
+            print("❌ No new generation after the gap")
+            return False
+        if restore_to("test_wal_archive", "test_wal_restored.db", datetime.now())['gap'] is not None:
+            print("❌ Gap reported for the new generation")
+            return False
+        os.remove("test_wal_restored.db")
+        in_gap = datetime.strptime(gap['at'], "%Y-%m-%d %H:%M:%S.%f")
+        if restore_to("test_wal_archive", "test_wal_restored.db", in_gap)['gap'] != gap:
+            print("❌ Restore into the gap does not report it")
+            return False
+        os.remove("test_wal_restored.db")
+        second.close()
+        print("✓ Oversized WAL checkpointed and the gap recorded")
+        
+        # Clean up
+        os.remove("test_wal.db")
+        shutil.rmtree("test_wal_archive")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ WAL archive tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ WAL archive test error: {e}")
+        return False
+
+def test_backup_scheduler():
+    """Test scheduled backup verification and retention"""
+    try:
+        print("\nTesting backup scheduler...")
+        
+        import shutil
+        import time
+        from datetime import datetime, timedelta
+        from src.database.db_manager import DatabaseManager
+        from src.database.backup_scheduler import BackupScheduler, SCHEDULED_LABEL, select_retained
+        
+        # Grandfather-father-son: newest per hour, day and week
+        start = datetime(2030, 1, 1, 0, 30)
+        snapshots = [
+            {'snapshot_id': f"s{i}", 'created': (start + timedelta(hours=i)).strftime("%Y-%m-%d %H:%M:%S")}
+            for i in range(24 * 30)
+        ]
+        kept = select_retained(snapshots, {'hourly': 24, 'daily': 7, 'weekly': 4})
+        hourly = {f"s{i}" for i in range(24 * 30 - 24, 24 * 30)}
+        daily = {f"s{24 * day + 23}" for day in range(23, 30)}
+        # Sundays ending the two ISO weeks before the daily ones
+        weekly = {"s311", "s479"}
+        if kept != hourly | daily | weekly:
+            print(f"❌ Retention kept {len(kept)} snapshots")
+            return False
+        snapshots[-1]['verified'] = {'at': "", 'result': "page 2 is never used"}
+        if "s719" in select_retained(snapshots, {'hourly': 1}) or "s718" not in select_retained(snapshots, {'hourly': 1}):
+            print("❌ Failed snapshot kept by retention")
+            return False
+        print(f"✓ Grandfather-father-son retention keeps {len(kept)} of {len(snapshots)} snapshots")
+        
+        db = DatabaseManager("test_scheduler.db")
+        db.create_tables()
+        scheduler = BackupScheduler(db.db_path, "test_scheduler", retention={'hourly': 2})
+        first = scheduler.run_once()
+        if not first['snapshot'] or first['verified'] != {first['snapshot']: 'ok'}:
+            print(f"❌ Scheduled snapshot not taken and verified: {first}")
+            return False
+        if scheduler.run_once()['snapshot'] is not None:
+            print("❌ Snapshot taken before one was due")
+            return False
+        print("✓ Due snapshot taken and checked in a worker process")
+        
+        # Manual snapshots are never pruned, even in a period already covered
+        manual = scheduler.store.snapshot(db.db_path)
+        result = scheduler.run_once()
+        if result['verified'] != {manual.snapshot_id: 'ok'} or result['pruned']:
+            print(f"❌ Manual snapshot pruned: {result}")
+            return False
+        print("✓ Manual snapshot verified and left alone by prune")
+        
+        # A damaged scheduled snapshot fails verification and is kept as evidence
+        damaged = scheduler.store.snapshot(db.db_path, label=SCHEDULED_LABEL)
+        with open(scheduler.store._chunk_path(damaged.manifest['chunks'][-1]), 'wb') as chunk:
+            chunk.write(b"damaged")
+        result = scheduler.run_once()
+        snapshot_ids = [snapshot['snapshot_id'] for snapshot in scheduler.store.snapshots()]
+        if not result['verified'][damaged.snapshot_id].startswith("restore failed") or damaged.snapshot_id not in snapshot_ids:
+            print(f"❌ Damaged snapshot not caught and kept: {result}")
+            return False
+        # The good scheduled snapshot still covers the hour; nothing is pruned
+        if result['pruned'] or snapshot_ids != [first['snapshot'], manual.snapshot_id, damaged.snapshot_id]:
+            print(f"❌ Prune removed the wrong snapshots: {result}")
+            return False
+        print("✓ Damaged snapshot fails verification and is kept")
+        
+        # Started with the manager, the scheduler runs without blocking it
+        db.close()
+        db = DatabaseManager("test_scheduler.db", backup_store="test_scheduler_bg", backup_retention={'hourly': 1})
+        started = datetime.now()
+        db.create_tables()
+        blocked = (datetime.now() - started).total_seconds()
+        for _ in range(100):
+            if db.backup_scheduler.last_run:
+                break
+            time.sleep(0.1)
+        snapshots = db.backup_scheduler.store.snapshots()
+        if len(snapshots) != 1 or snapshots[0].get('verified', {}).get('result') != 'ok' or blocked > 1:
+            print(f"❌ Background scheduler did not run: {snapshots}, {db.backup_scheduler.last_error}")
+            return False
+        print("✓ Background scheduler snapshots and verifies on its own")
+        
+        # Clean up
+        db.close()
+        os.remove("test_scheduler.db")
+        shutil.rmtree("test_scheduler")
+        shutil.rmtree("test_scheduler_bg")
+        print("✓ Test database cleaned up")
+        
+        print("\n✅ Backup scheduler tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Backup scheduler test error: {e}")
+        return False
+
+def test_password_hashing():
+    """Test salted password hashes, rehash on login and the verify cache"""
+    try:
+        print("\nTesting password hashing...")
+        
+        import hashlib
+        from src.database.db_manager import DatabaseManager
+        from src.auth.authentication import AuthenticationManager
+        from src.auth.passwords import PasswordHasher, parse_hash
+        
+        # Cheap settings keep the test fast; the format is the same
+        hasher = PasswordHasher('scrypt', n=2 ** 10, r=8, p=1)
+        first = hasher.hash("secret")
+        second = hasher.hash("secret")
+        if first == second or not first.startswith("scrypt$v=1$n=1024,p=1,r=8$"):
+            print(f"❌ Hashes not salted or badly formatted: {first}")
+            return False
+        if not hasher.verify("secret", first) or hasher.verify("wrong", first) or hasher.verify("secret", "garbage$"):
+            print("❌ Password verification wrong")
+            return False
+        pbkdf2 = PasswordHasher('pbkdf2-sha256', i=1000)
+        if not pbkdf2.verify("secret", pbkdf2.hash("secret")) or not hasher.verify("secret", pbkdf2.hash("secret")):
+            print("❌ PBKDF2 hashes do not verify")
+            return False
+        print("✓ Hashes are salted and verify across schemes")
+        
+        if hasher.needs_rehash(first) or not PasswordHasher('scrypt', n=2 ** 11).needs_rehash(first):
+            print("❌ needs_rehash does not follow the cost settings")
+            return False
+        print("✓ Changed cost settings call for a rehash")
+        
+        class CountingHasher(PasswordHasher):
+            verifies = 0
+            
+            def verify(self, password, stored):
+                CountingHasher.verifies += 1
+                return PasswordHasher.verify(self, password, stored)
+                
+        db = DatabaseManager("test_passwords.db")
+        db.create_tables()
+        db.create_default_admin()
+        auth = AuthenticationManager(db, CountingHasher('scrypt', n=2 ** 10, r=8, p=1))
+        
+        # A legacy unsalted SHA-256 hash is upgraded on the first login
+        legacy = hashlib.sha256("nurse123".encode()).hexdigest()
+        user_id = db.execute_insert(
+            "INSERT INTO users (username, password_hash, role, full_name) VALUES (?, ?, ?, ?)",
+            ("legacy_nurse", legacy, "nurse", "Legacy Nurse")
+        )
+        user = auth.authenticate("legacy_nurse", "nurse123")
+        stored = db.execute_query("SELECT password_hash FROM users WHERE user_id = ?", (user_id,))[0]['password_hash']
+        if not user or 'password_hash' in user or parse_hash(stored)[:3] != ('scrypt', 1, auth.hasher.params):
+            print(f"❌ Legacy hash not upgraded on login: {stored}")
+            return False
+        if not auth.authenticate("legacy_nurse", "nurse123") or auth.authenticate("legacy_nurse", legacy):
+            print("❌ Upgraded hash does not verify")
+            return False
+        print("✓ Legacy SHA-256 hash upgraded on login")
+        
+        # The default admin was hashed with the default cost, so it is rehashed too
+        admin_hash = db.execute_query("SELECT password_hash FROM users WHERE username = 'admin'")[0]['password_hash']
+        if not auth.authenticate("admin", "admin123"):
+            print("❌ Default admin login failed")
+            return False
+        new_admin_hash = db.execute_query("SELECT password_hash FROM users WHERE username = 'admin'")[0]['password_hash']
+        if new_admin_hash == admin_hash or auth.hasher.needs_rehash(new_admin_hash):
+            print("❌ Admin hash not moved to the configured cost")
+            return False
+        print("✓ Hash rehashed when the cost settings change")
+        
+        if auth.authenticate("nobody", "nurse123") or auth.authenticate("legacy_nurse", "wrong"):
+            print("❌ Unknown user or wrong password accepted")
+            return False
+        print("✓ Unknown user and wrong password rejected")
+        
+        # A password verified moments ago is not run through the KDF again
+        before = CountingHasher.verifies
+        if not auth.check_password(user_id, "nurse123") or CountingHasher.verifies != before:
+            print("❌ Recent verification not served from the cache")
+            return False
+        if auth.check_password(user_id, "wrong") or CountingHasher.verifies != before + 1:
+            print("❌ Wrong password served from the cache")
+            return False
+        print("✓ Recent verification served from the cache")
+        
+        if not auth.change_password(user_id, "nurse123", "nurse456") or auth.change_password(user_id, "nurse123", "x"):
+            print("❌ Password change failed")
+            return False
+        if auth.authenticate("legacy_nurse", "nurse123") or not auth.authenticate("legacy_nurse", "nurse456"):
+            print("❌ Changed password does not take effect")
+            return False
+        print("✓ Password changed; old password no longer works")
+        
+        # Clean up
+        db.close()
+        os.remove("test_passwords.db")
+        
+        print("\n✅ Password hashing tests passed!")
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Password hashing test error: {e}")
+        return False
+
 def main():
     """Run all tests"""
     print("=" * 50)
@@ -144,6 +2310,106 @@ def main():
     if not test_authentication():
         all_passed = False
         
+    # Test connection pool
+    if not test_connection_pool():
+        all_passed = False
+        
+    # Test PRAGMA profiles
+    if not test_pragma_profiles():
+        all_passed = False
+        
+    # Test indexes
+    if not test_indexes():
+        all_passed = False
+        
+    # Test transactions
+    if not test_transactions():
+        all_passed = False
+        
+    # Test query registry
+    if not test_query_registry():
+        all_passed = False
+        
+    # Test statistics counters
+    if not test_counters():
+        all_passed = False
+        
+    # Test paginated patient list
+    if not test_patient_pages():
+        all_passed = False
+        
+    # Test patient search
+    if not test_patient_search():
+        all_passed = False
+        
+    # Test background database access
+    if not test_async_db():
+        all_passed = False
+        
+    # Test appointment conflicts
+    if not test_appointment_conflicts():
+        all_passed = False
+        
+    # Test free slot finder
+    if not test_free_slots():
+        all_passed = False
+        
+    # Test doctor schedules
+    if not test_doctor_schedules():
+        all_passed = False
+        
+    # Test recurring booking
+    if not test_recurring_booking():
+        all_passed = False
+        
+    # Test calendar view
+    if not test_calendar_view():
+        all_passed = False
+        
+    # Test date ranges
+    if not test_date_ranges():
+        all_passed = False
+        
+    # Test rollup tables
+    if not test_rollups():
+        all_passed = False
+        
+    # Test payment ledger
+    if not test_payment_ledger():
+        all_passed = False
+        
+    # Test money amounts
+    if not test_money():
+        all_passed = False
+        
+    # Test bill list pages
+    if not test_bill_pages():
+        all_passed = False
+        
+    # Test receivables aging
+    if not test_aging():
+        all_passed = False
+        
+    # Test online backups
+    if not test_online_backup():
+        all_passed = False
+        
+    # Test backup store
+    if not test_backup_store():
+        all_passed = False
+        
+    # Test WAL archive
+    if not test_wal_archive():
+        all_passed = False
+        
+    # Test backup scheduler
+    if not test_backup_scheduler():
+        all_passed = False
+        
+    # Test password hashing
+    if not test_password_hashing():
+        all_passed = False
+        
     print("\n" + "=" * 50)
     if all_passed:
         print("🎉 ALL TESTS PASSED! System is ready to use.")